@@ -1,23 +1,45 @@
+import functools
 import random
 import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 from typing import Optional
 
 import click
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
 from schnapsen.alternative_engines.ace_one_engine import AceOneGamePlayEngine
 
-from schnapsen.bots import MLDataBot, train_ML_model, MLPlayingBot, RandBot
+from schnapsen.bots import train_ML_model, MLPlayingBot, RandBot
 from schnapsen.bots.cockybot import CockyBot, StrictCockyBot
 #from schnapsen.bots.cockybot_updated_conditions_v1 import CockyBot 
 from schnapsen.bots.bully_bot import BullyBot
 
 from schnapsen.bots.example_bot import ExampleBot
 
-from schnapsen.game import (Bot, GamePlayEngine, Move, PlayerPerspective,
+from schnapsen.game import (Bot, BotState, CloseTalon, GamePlayEngine, GameState, LeaderPerspective, Move, PlayerPerspective,
                             SchnapsenGamePlayEngine, TrumpExchange)
 from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
 
 from schnapsen.bots.rdeep import RdeepBot
+from schnapsen.bots.ismcts import ISMCTSBot
+from schnapsen.bots.alphabeta import AlphaBetaBot, OneFixedMoveBot
+from schnapsen.bots.minimax import MiniMaxBot
+from schnapsen.bots.pimc import PIMCBot
+from schnapsen.bots.expectimax import ExpectimaxBot
+from schnapsen.bots.opening_book_bot import OpeningBookBot
+from schnapsen.bots.distilled_bot import DistilledBot, generate_teacher_decisions, train_distilled_policy
+from schnapsen.bots.value_model import ValueModelEvaluator, generate_value_data, train_value_model
+from schnapsen.bots.ml_bot import BotFactory, create_state_and_actions_vector_representation, generate_replay_memory, get_state_feature_vector
+from schnapsen.bots.ml_features import candidate_feature_vectors, state_feature_vectors
+from schnapsen.bots.rollout_policy import DistilledRolloutPolicy, RolloutPolicy, greedy_rollout_policy
+from schnapsen.bots.numpy_network import NumpyNetwork
+from schnapsen.bots.replay_memory import MANIFEST_NAME, convert_text_replay_memory, merge_replay_memory_shards
+from schnapsen import opening_book, tablebase
+from schnapsen.tablebase import MAX_CARDS
+from schnapsen.transposition import SharedTranspositionTable
 
 
 @click.group()
@@ -110,48 +132,439 @@ def rdeep_game() -> None:
             print(f"won {wins} out of {game_number}")
 
 
+class _TimedBot(Bot):
+    """Wraps a bot and keeps track of the time it spends on its moves."""
+
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(str(bot))
+        self.bot = bot
+        self.total_time = 0.0
+        self.moves = 0
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        start = time.perf_counter()
+        move = self.bot.get_move(perspective, leader_move)
+        self.total_time += time.perf_counter() - start
+        self.moves += 1
+        return move
+
+    def notify_game_end(self, won: bool, perspective: PlayerPerspective) -> None:
+        self.bot.notify_game_end(won, perspective)
+
+    def notify_trump_exchange(self, move: TrumpExchange) -> None:
+        self.bot.notify_trump_exchange(move)
+
+
+@main.command()
+@click.option("--pairs", default=100, help="The number of pairs of games against each opponent")
+@click.option("--rdeep-samples", default=8, help="The number of samples per move of the RdeepBot")
+@click.option("--rdeep-depth", default=4, help="The depth of the rollouts of the RdeepBot")
+def ismcts_experiment(pairs: int, rdeep_samples: int, rdeep_depth: int) -> None:
+    """
+    Compare ISMCTSBot with RdeepBot at equal CPU time.
+    First RdeepBot plays against RandBot, to measure how much time it uses per move. Then ISMCTSBot gets that time per move
+    and plays against RandBot and against RdeepBot. All games are played in pairs with the same dealing of the cards.
+    """
+    engine = SchnapsenGamePlayEngine()
+    rdeep = _TimedBot(RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(4564654644)))
+    rdeep_wins = play_games_and_return_stats(engine, rdeep, RandBot(random.Random(464566)), pairs)
+    time_per_move = rdeep.total_time / rdeep.moves
+    print(f"RdeepBot won {rdeep_wins} out of {2 * pairs} games against RandBot, using {time_per_move * 1000:.2f}ms per move")
+
+    for opponent in [RandBot(random.Random(464566)), RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(4564654644))]:
+        ismcts = _TimedBot(ISMCTSBot(rand=random.Random(6546541), iterations=None, time_limit=time_per_move))
+        ismcts_wins = play_games_and_return_stats(engine, ismcts, opponent, pairs)
+        print(f"ISMCTSBot won {ismcts_wins} out of {2 * pairs} games against {type(opponent).__name__}, using {ismcts.total_time / ismcts.moves * 1000:.2f}ms per move")
+
+
+@main.command()
+@click.option("--pairs", default=50, help="The number of pairs of games against each opponent")
+@click.option("--depth", default=2, help="The number of tricks searched by the ExpectimaxBot before using its leaf evaluator")
+@click.option("--worlds", default=20, help="The largest number of hands of the opponent the ExpectimaxBot enumerates")
+@click.option("--rdeep-samples", default=8, help="The number of samples per move of the RdeepBot")
+@click.option("--rdeep-depth", default=4, help="The depth of the rollouts of the RdeepBot")
+def expectimax_experiment(pairs: int, depth: int, worlds: int, rdeep_samples: int, rdeep_depth: int) -> None:
+    """Play ExpectimaxBot against RandBot and against RdeepBot, in pairs of games with the same dealing of the cards."""
+    engine = SchnapsenGamePlayEngine()
+    for opponent in [RandBot(random.Random(464566)), RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(4564654644))]:
+        expectimax = _TimedBot(ExpectimaxBot(random.Random(6546541), depth=depth, max_worlds=worlds))
+        wins = play_games_and_return_stats(engine, expectimax, opponent, pairs)
+        print(f"ExpectimaxBot won {wins} out of {2 * pairs} games against {type(opponent).__name__}, using {expectimax.total_time / expectimax.moves * 1000:.2f}ms per move")
+
+
+def _rdeep_teacher(num_samples: int, depth: int, rand: random.Random) -> Bot:
+    return RdeepBot(num_samples=num_samples, depth=depth, rand=rand)
+
+
+@main.command()
+@click.option("--games", default=1000, help="The number of games played by the teacher to generate decisions")
+@click.option("--processes", default=1, help="The number of processes playing the games of the teacher")
+@click.option("--rdeep-samples", default=8, help="The number of samples per move of the RdeepBot teacher")
+@click.option("--rdeep-depth", default=4, help="The depth of the rollouts of the RdeepBot teacher")
+@click.option("--pairs", default=100, help="The number of pairs of games of the teacher and of the distilled bot against RandBot")
+@click.option("--policy-file", default="ML_models/distilled_policy.npz", help="The file to store the distilled policy in")
+def distillation_experiment(games: int, processes: int, rdeep_samples: int, rdeep_depth: int, pairs: int, policy_file: str) -> None:
+    """Distill an RdeepBot into a DistilledBot, and compare their win rates against RandBot and their time per move."""
+    start = time.perf_counter()
+    features, chosen, decisions = generate_teacher_decisions(functools.partial(_rdeep_teacher, rdeep_samples, rdeep_depth), games, processes=processes)
+    print(f"Recorded {decisions[-1] + 1} decisions with {len(chosen)} moves in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    policy_location = pathlib.Path(policy_file)
+    train_distilled_policy(features, chosen, policy_location)
+    print(f"Trained the policy in {time.perf_counter() - start:.1f}s, stored in {policy_location}")
+
+    engine = SchnapsenGamePlayEngine()
+    results = []
+    for bot in [RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(4564654644)), DistilledBot(policy_location)]:
+        timed = _TimedBot(bot)
+        wins = play_games_and_return_stats(engine, timed, RandBot(random.Random(464566)), pairs)
+        time_per_move = timed.total_time / timed.moves
+        results.append((wins, time_per_move))
+        print(f"{type(bot).__name__} won {wins} out of {2 * pairs} games against RandBot, using {time_per_move * 1000:.3f}ms per move")
+    (teacher_wins, teacher_time), (student_wins, student_time) = results
+    print(f"The distilled bot keeps {(student_wins - pairs) / max(1, teacher_wins - pairs):.0%} of the advantage of the teacher over RandBot, "
+          f"at {student_time / teacher_time:.2%} of the time per move")
+
+
+@main.command()
+@click.option("--games", default=5000, help="The number of random games to train the value model on")
+@click.option("--processes", default=1, help="The number of processes playing the random games")
+@click.option("--samples", "-s", multiple=True, type=int, default=[1, 2, 4, 8, 16], help="The numbers of samples per move to compare")
+@click.option("--depth", default=4, help="The depth of the rollouts")
+@click.option("--pairs", default=100, help="The number of pairs of games against the reference RdeepBot for each setting")
+@click.option("--model-file", default="ML_models/value_model.npz", help="The file to store the value model in")
+def rdeep_evaluator_experiment(games: int, processes: int, samples: list[int], depth: int, pairs: int, model_file: str) -> None:
+    """
+    Train a value model, and compare the RdeepBot with the default evaluator and with the value model, for several numbers of samples.
+    All settings play against the same reference RdeepBot, with 8 samples of depth 4 and the default evaluator.
+    """
+    start = time.perf_counter()
+    features, won = generate_value_data(games, processes=processes)
+    print(f"Recorded {len(won)} states in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    model_location = pathlib.Path(model_file)
+    train_value_model(features, won, model_location)
+    print(f"Trained the value model in {time.perf_counter() - start:.1f}s, stored in {model_location}")
+
+    engine = SchnapsenGamePlayEngine()
+    evaluators = {"score ratio": None, "value model": ValueModelEvaluator(model_location)}
+    for num_samples in samples:
+        for evaluator_name, evaluator in evaluators.items():
+            timed = _TimedBot(RdeepBot(num_samples=num_samples, depth=depth, rand=random.Random(4564654644), evaluator=evaluator))
+            wins = play_games_and_return_stats(engine, timed, RdeepBot(num_samples=8, depth=4, rand=random.Random(464566)), pairs)
+            print(f"{num_samples} samples, {evaluator_name}: won {wins} out of {2 * pairs} games, using {timed.total_time / timed.moves * 1000:.3f}ms per move")
+
+
+@main.command()
+@click.option("--games", default=500, help="The number of games played by the RdeepBot teacher of the distilled rollout policy")
+@click.option("--processes", default=1, help="The number of processes playing the games of the teacher")
+@click.option("--samples", "-s", multiple=True, type=int, default=[1, 2, 4, 8], help="The numbers of samples per move to compare")
+@click.option("--depth", default=4, help="The depth of the rollouts")
+@click.option("--pairs", default=100, help="The number of pairs of games against the reference RdeepBot for each setting")
+@click.option("--policy-file", default="ML_models/rollout_policy.npz", help="The file to store the distilled rollout policy in")
+def rdeep_rollout_policy_experiment(games: int, processes: int, samples: list[int], depth: int, pairs: int, policy_file: str) -> None:
+    """
+    Distill a rollout policy from an RdeepBot, and compare the RdeepBot with random, greedy and distilled rollouts, for several numbers of samples.
+    All settings play against the same reference RdeepBot, with 8 samples of depth 4 and random rollouts.
+    """
+    start = time.perf_counter()
+    features, chosen, decisions = generate_teacher_decisions(functools.partial(_rdeep_teacher, 8, 4), games, processes=processes)
+    print(f"Recorded {decisions[-1] + 1} decisions with {len(chosen)} moves in {time.perf_counter() - start:.1f}s")
+    policy_location = pathlib.Path(policy_file)
+    train_distilled_policy(features, chosen, policy_location)
+
+    engine = SchnapsenGamePlayEngine()
+    policies: dict[str, Optional[RolloutPolicy]] = {"random": None, "greedy": greedy_rollout_policy, "distilled": DistilledRolloutPolicy(policy_location)}
+    for num_samples in samples:
+        for policy_name, policy in policies.items():
+            timed = _TimedBot(RdeepBot(num_samples=num_samples, depth=depth, rand=random.Random(4564654644), rollout_policy=policy))
+            wins = play_games_and_return_stats(engine, timed, RdeepBot(num_samples=8, depth=4, rand=random.Random(464566)), pairs)
+            print(f"{num_samples} samples, {policy_name} rollouts: won {wins} out of {2 * pairs} games, using {timed.total_time / timed.moves * 1000:.3f}ms per move")
+
+
+@main.command()
+@click.option("--positions", default=50, help="The number of random phase two positions to search")
+def transposition_benchmark(positions: int) -> None:
+    """
+    Measure the effect of the transposition table on MiniMaxBot and AlphaBetaBot.
+    Each bot searches random positions from the second phase of the game, with and without a table.
+    A new bot is used for every position, so only positions repeated within one search are found in the table.
+    """
+    engine = SchnapsenGamePlayEngine()
+    states = [engine.get_random_phase_two_state(random.Random(seed)) for seed in range(positions)]
+    for bot_class in [MiniMaxBot, AlphaBetaBot]:
+        for table_size in [None, 2 ** 16]:
+            nodes = probes = hits = 0
+            values = []
+            start = time.perf_counter()
+            for state in states:
+                bot = bot_class(transposition_table_size=table_size)
+                value, _ = bot.value(state, engine, leader_move=None, maximizing=True)
+                values.append(value)
+                nodes += bot.nodes
+                if bot.transposition_table is not None:
+                    probes += bot.transposition_table.probes
+                    hits += bot.transposition_table.hits
+            duration = time.perf_counter() - start
+            hit_rate = f"{hits / probes:.1%}" if probes else "-"
+            print(f"{bot_class.__name__} table size {table_size}: {nodes} nodes, hit rate {hit_rate}, {duration:.2f}s, sum of values {sum(values)}")
+
+
+def _closed_talon_states(engine: GamePlayEngine, positions: int) -> list[GameState]:
+    """Random deals after which the first leader closes the talon, so all cards are still in the hands. The same for every run."""
+    states = []
+    for seed in range(positions):
+        rng = random.Random(seed)
+        cards = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), rng)
+        hand1, hand2, talon = engine.hand_generator.generateHands(cards)
+        start_state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                                talon=talon, previous=None)
+        states.append(engine.play_one_trick(start_state, new_leader=OneFixedMoveBot(CloseTalon()), new_follower=RandBot(rng)))
+    return states
+
+
+@main.command()
+@click.option("--positions", default=50, help="The number of positions to search")
+@click.option("--time-limit", default=0.05, help="The time limit per move in seconds, for the search with iterative deepening")
+def alphabeta_benchmark(positions: int, time_limit: float) -> None:
+    """
+    Measure the effect of move ordering and iterative deepening on AlphaBetaBot.
+    The positions are dealt at random, after which the first leader closes the talon, so all cards are still in the hands.
+    """
+    engine = SchnapsenGamePlayEngine()
+    states = _closed_talon_states(engine, positions)
+    for move_ordering in [False, True]:
+        nodes = 0
+        values = []
+        start = time.perf_counter()
+        for state in states:
+            bot = AlphaBetaBot(transposition_table_size=2 ** 16, move_ordering=move_ordering)
+            value, _ = bot.value(state, engine, leader_move=None, maximizing=True)
+            values.append(value)
+            nodes += bot.nodes
+        duration = time.perf_counter() - start
+        print(f"Complete search, move ordering {move_ordering}: {nodes} nodes, {duration / positions * 1000:.1f}ms per position, sum of values {sum(values)}")
+
+    depths = []
+    longest = 0.0
+    start = time.perf_counter()
+    for state in states:
+        bot = AlphaBetaBot(transposition_table_size=2 ** 16, time_limit=time_limit)
+        move_start = time.perf_counter()
+        bot.get_move(LeaderPerspective(state, engine), leader_move=None)
+        longest = max(longest, time.perf_counter() - move_start)
+        depths.append(bot.last_depth)
+    duration = time.perf_counter() - start
+    complete = sum(depth == len(state.leader.hand.cards) for depth, state in zip(depths, states))
+    print(f"Iterative deepening with a time limit of {time_limit * 1000:.0f}ms: {duration / positions * 1000:.1f}ms per move on average, "
+          f"at most {longest * 1000:.1f}ms, {complete} out of {positions} searches complete")
+
+
+@main.command()
+@click.option("--positions", default=50, help="The number of positions to search")
+@click.option("--processes", default=4, help="The number of processes of the parallel search")
+def parallel_alphabeta_benchmark(positions: int, processes: int) -> None:
+    """
+    Compare the parallel search of AlphaBetaBot with the serial one, on the positions of alphabeta-benchmark.
+    The positions are unrelated, so the tables kept by the bots between positions hardly help. The moves must be the same.
+    """
+    engine = SchnapsenGamePlayEngine()
+    states = _closed_talon_states(engine, positions)
+    serial = AlphaBetaBot(transposition_table_size=2 ** 16)
+    start = time.perf_counter()
+    serial_moves = [serial.get_move(LeaderPerspective(state, engine), leader_move=None) for state in states]
+    serial_duration = time.perf_counter() - start
+
+    parallel = AlphaBetaBot(transposition_table_size=2 ** 16, processes=processes)
+    try:
+        # start the worker processes before measuring
+        parallel.get_move(LeaderPerspective(_closed_talon_states(engine, positions + 1)[-1], engine), leader_move=None)
+        start = time.perf_counter()
+        parallel_moves = [parallel.get_move(LeaderPerspective(state, engine), leader_move=None) for state in states]
+        parallel_duration = time.perf_counter() - start
+    finally:
+        parallel.close()
+    same = sum(serial_move == parallel_move for serial_move, parallel_move in zip(serial_moves, parallel_moves))
+    print(f"Serial: {serial_duration / positions * 1000:.1f}ms per position, parallel with {processes} processes: {parallel_duration / positions * 1000:.1f}ms "
+          f"per position, speedup {serial_duration / parallel_duration:.2f}, {same} out of {positions} moves the same")
+
+
+@main.command()
+@click.option("--output", default="tablebase.bin", help="The file to write the tablebase to")
+@click.option("--max-cards", default=MAX_CARDS, help="The largest number of cards in the hands of the positions in the tablebase")
+@click.option("--processes", default=1, help="The number of worker processes")
+def generate_tablebase(output: str, max_cards: int, processes: int) -> None:
+    """Generate the endgame tablebase for the second phase of the game, for the positions in which the talon is empty."""
+    start = time.perf_counter()
+    tablebase.generate_tablebase(output, max_cards=max_cards, processes=processes)
+    print(f"Generated the tablebase for up to {max_cards} cards in {time.perf_counter() - start:.1f}s, stored in {output}")
+
+
+@main.command()
+@click.option("--tablebase-file", default="tablebase.bin", help="The file containing the tablebase, see generate-tablebase")
+@click.option("--positions", default=50, help="The number of random phase two positions to search")
+def tablebase_benchmark(tablebase_file: str, positions: int) -> None:
+    """Compare the search of AlphaBetaBot with and without the tablebase, on random positions in which the talon is empty."""
+    engine = SchnapsenGamePlayEngine()
+    states: list[GameState] = []
+    seed = 0
+    while len(states) < positions:
+        state = engine.get_random_phase_two_state(random.Random(seed))
+        seed += 1
+        if not state.is_talon_closed:
+            states.append(state)
+    loaded = tablebase.Tablebase(tablebase_file)
+    for used_tablebase in [None, loaded]:
+        nodes = 0
+        values = []
+        start = time.perf_counter()
+        for state in states:
+            bot = AlphaBetaBot(transposition_table_size=2 ** 16, tablebase=used_tablebase)
+            value, _ = bot.value(state, engine, leader_move=None, maximizing=True)
+            values.append(value)
+            nodes += bot.nodes
+        duration = time.perf_counter() - start
+        print(f"AlphaBetaBot {'with' if used_tablebase else 'without'} tablebase: {nodes} nodes, {duration / positions * 1000:.1f}ms per position, sum of values {sum(values)}")
+
+
+@main.command()
+@click.option("--output", default="opening_book.bin", help="The file to write the opening book to")
+@click.option("--deals", default=100, help="The number of deals solved for each opening")
+@click.option("--processes", default=1, help="The number of worker processes")
+@click.option("--seed", default=0, help="The seed of the random deals")
+@click.option("--twenty-four", is_flag=True, help="Generate the book for the 24 card Schnapsen, instead of the standard game")
+def generate_opening_book(output: str, deals: int, processes: int, seed: int, twenty_four: bool) -> None:
+    """Generate the opening book with the first move and the equity of every opening hand and trump card."""
+    engine: GamePlayEngine = TwentyFourSchnapsenGamePlayEngine() if twenty_four else SchnapsenGamePlayEngine()
+    start = time.perf_counter()
+    opening_book.generate_opening_book(output, engine, deals=deals, processes=processes, seed=seed)
+    print(f"Generated the opening book with {opening_book.OpeningBook(output).openings} openings in {time.perf_counter() - start:.1f}s, stored in {output}")
+
+
+@main.command()
+@click.option("--book-file", default="opening_book.bin", help="The file containing the opening book, see generate-opening-book")
+@click.option("--pairs", default=50, help="The number of pairs of games")
+@click.option("--rdeep-samples", default=8, help="The number of samples per move of the RdeepBots")
+@click.option("--rdeep-depth", default=4, help="The depth of the rollouts of the RdeepBots")
+def opening_book_experiment(book_file: str, pairs: int, rdeep_samples: int, rdeep_depth: int) -> None:
+    """Play an RdeepBot using the opening book for its first move against a plain RdeepBot."""
+    engine = SchnapsenGamePlayEngine()
+    book = opening_book.OpeningBook(book_file)
+    bot = OpeningBookBot(book, RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(1)), name="book")
+    opponent = RdeepBot(num_samples=rdeep_samples, depth=rdeep_depth, rand=random.Random(2), name="rdeep")
+    wins = play_games_and_return_stats(engine, bot, opponent, pairs)
+    print(f"RdeepBot with opening book won {wins} out of {2 * pairs} games, {bot.lookups} first moves were found in the book")
+
+
+def _play_pimc_games(table: Optional[SharedTranspositionTable], seeds: list[int], num_samples: int) -> int:
+    """Play a game for each seed between a PIMCBot using the table and a RandBot, and return the number of games won by the PIMCBot."""
+    engine = SchnapsenGamePlayEngine()
+    wins = 0
+    for seed in seeds:
+        pimc = PIMCBot(random.Random(seed), num_samples=num_samples, name="pimc", transposition_table=table)
+        opponent = RandBot(random.Random(-seed), "rand")
+        bots = (pimc, opponent) if seed % 2 == 0 else (opponent, pimc)
+        winner, _, _ = engine.play_game(bots[0], bots[1], random.Random(seed))
+        wins += winner is pimc
+    return wins
+
+
+@main.command()
+@click.option("--games", default=40, help="The number of games to play")
+@click.option("--processes", default=4, help="The number of processes playing games")
+@click.option("--samples", default=10, help="The number of samples per move of the PIMCBots")
+@click.option("--table-file", default=None, help="Load the shared table from this file if it exists, and write it to this file afterwards")
+@click.option("--table-size", default=2 ** 20, help="The number of entries of a new shared table")
+def shared_table_tournament(games: int, processes: int, samples: int, table_file: Optional[str], table_size: int) -> None:
+    """
+    Play games between PIMCBots and RandBots in several processes, with and without a SharedTranspositionTable used by all PIMCBots.
+    With a table file, the table is kept from one run to the next.
+    """
+    seeds = list(range(games))
+    chunks = [seeds[start::processes] for start in range(processes)]
+    if table_file is not None and pathlib.Path(table_file).exists():
+        table = SharedTranspositionTable.load(table_file)
+    else:
+        table = SharedTranspositionTable(size=table_size)
+    try:
+        for used_table in [None, table]:
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                wins = sum(executor.map(_play_pimc_games, [used_table] * processes, chunks, [samples] * processes))
+            duration = time.perf_counter() - start
+            print(f"PIMCBot {'with' if used_table else 'without'} shared table: won {wins} out of {games} games, {duration:.1f}s")
+        print(f"{int((table.words[:, 1] != 0).sum())} out of {table.size} entries of the shared table are used")
+        if table_file is not None:
+            table.dump(table_file)
+    finally:
+        table.close()
+
+
 @main.group()
 def ml() -> None:
     """Commands for the ML bot"""
 
 
+def _ml_playing_bot(model_location: pathlib.Path, rand: random.Random) -> Bot:
+    return MLPlayingBot(model_location)
+
+
+def _bot_factory(spec: str) -> BotFactory:
+    """
+    Parse the specification of a bot on the command line: 'rand', 'bully', 'rdeep:SAMPLES:DEPTH', or 'ml:MODEL_FILE'.
+    The factories are picklable, such that they can be sent to worker processes.
+    """
+    name, *arguments = spec.split(":")
+    if name == "rand" and not arguments:
+        return RandBot
+    if name == "bully" and not arguments:
+        return BullyBot
+    if name == "rdeep" and len(arguments) == 2 and all(argument.isdigit() for argument in arguments):
+        return functools.partial(_rdeep_teacher, int(arguments[0]), int(arguments[1]))
+    if name == "ml" and len(arguments) == 1:
+        return functools.partial(_ml_playing_bot, pathlib.Path(arguments[0]))
+    raise click.BadParameter(f"Unknown bot '{spec}', expected rand, bully, rdeep:SAMPLES:DEPTH or ml:MODEL_FILE")
+
+
 @ml.command()
-def create_replay_memory_dataset() -> None:
-    # define replay memory database creation parameters
-    num_of_games: int = 10000
-    replay_memory_dir: str = 'ML_replay_memories'
-    replay_memory_filename: str = 'random_random_10k_games.txt'
-    replay_memory_location = pathlib.Path(replay_memory_dir) / replay_memory_filename
-
-    bot_1_behaviour: Bot = RandBot(random.Random(5234243))
-    # bot_1_behaviour: Bot = RdeepBot(num_samples=4, depth=4, rand=random.Random(4564654644))
-    bot_2_behaviour: Bot = RandBot(random.Random(54354))
-    # bot_2_behaviour: Bot = RdeepBot(num_samples=4, depth=4, rand=random.Random(68438))
-    delete_existing_older_dataset = False
-
-    # check if needed to delete any older versions of the dataset
-    if delete_existing_older_dataset and replay_memory_location.exists():
-        print(f"An existing dataset was found at location '{replay_memory_location}', which will be deleted as selected.")
-        replay_memory_location.unlink()
-
-    # in any case make sure the directory exists
-    replay_memory_location.parent.mkdir(parents=True, exist_ok=True)
-
-    # create new replay memory dataset, according to the behaviour of the provided bots and the provided random seed
-    engine = SchnapsenGamePlayEngine()
-    replay_memory_recording_bot_1 = MLDataBot(bot_1_behaviour, replay_memory_location=replay_memory_location)
-    replay_memory_recording_bot_2 = MLDataBot(bot_2_behaviour, replay_memory_location=replay_memory_location)
-    for i in range(1, num_of_games + 1):
-        if i % 500 == 0:
-            print(f"Progress: {i}/{num_of_games}")
-        engine.play_game(replay_memory_recording_bot_1, replay_memory_recording_bot_2, random.Random(i))
-    print(f"Replay memory dataset recorder for {num_of_games} games.\nDataset is stored at: {replay_memory_location}")
+@click.option("--bot1", default="rand", help="The first bot: rand, bully, rdeep:SAMPLES:DEPTH or ml:MODEL_FILE. It leads the first trick.")
+@click.option("--bot2", default="rand", help="The second bot, like --bot1")
+@click.option("--games", default=10000, help="The number of games to record")
+@click.option("--first-seed", default=1, help="The seed of the first game, game i is played with first-seed + i")
+@click.option("--processes", default=1, help="The number of worker processes playing the games")
+@click.option("--games-per-shard", type=int, default=None, help="The number of games recorded in each shard, by default four shards per process")
+@click.option("--output", default="ML_replay_memories/random_random_10k_games.bin", help="The replay memory file, the samples are appended if it exists")
+@click.option("--keep-shards", is_flag=True, help="Keep the shards and their manifest after merging them")
+def create_replay_memory_dataset(bot1: str, bot2: str, games: int, first_seed: int, processes: int, games_per_shard: Optional[int], output: str,
+                                 keep_shards: bool) -> None:
+    """
+    Record the decisions of two bots in a replay memory in the binary format. The games are played by a pool of processes, each
+    writing its own shards next to the output, which are merged at the end. The result does not depend on the number of processes.
+    """
+    bot1_factory = _bot_factory(bot1)
+    bot2_factory = _bot_factory(bot2)
+    replay_memory_location = pathlib.Path(output)
+    shard_directory = replay_memory_location.with_name(replay_memory_location.name + ".shards")
+
+    start = time.perf_counter()
+    manifest = generate_replay_memory(bot1_factory, bot2_factory, games, shard_directory, processes=processes, seed=first_seed,
+                                      games_per_shard=games_per_shard)
+    elapsed = time.perf_counter() - start
+    print(f"Recorded {manifest['samples']} samples of {games} games in {len(manifest['shards'])} shards, in {elapsed:.1f}s "
+          f"({games / elapsed:.1f} games per second with {processes} processes)")
+    merge_replay_memory_shards(shard_directory, replay_memory_location)
+    if not keep_shards:
+        for shard in manifest["shards"]:
+            (shard_directory / shard["file"]).unlink()
+        (shard_directory / MANIFEST_NAME).unlink()
+        shard_directory.rmdir()
+    print(f"Dataset is stored at: {replay_memory_location}")
 
 
 @ml.command()
 def train_model() -> None:
-    # directory where the replay memory is saved
-    replay_memory_filename: str = 'random_random_10k_games.txt'
+    # directory where the replay memory is saved, in the text or in the binary format
+    replay_memory_filename: str = 'random_random_10k_games.bin'
     # filename of replay memory within that directory
     replay_memories_directory: str = 'ML_replay_memories'
     # Whether to train a complicated Neural Network model or a simple one.
@@ -172,6 +585,17 @@ def train_model() -> None:
                    model_class='LR')
 
 
+@ml.command()
+@click.option("--text-file", default="ML_replay_memories/random_random_10k_games.txt", help="The replay memory in the text format")
+@click.option("--binary-file", default="ML_replay_memories/random_random_10k_games.bin", help="The file to append the samples to, in the binary format")
+def convert_replay_memory(text_file: str, binary_file: str) -> None:
+    """Convert a replay memory in the text format to the binary format."""
+    start = time.perf_counter()
+    samples = convert_text_replay_memory(pathlib.Path(text_file), pathlib.Path(binary_file))
+    print(f"Converted {samples} samples in {time.perf_counter() - start:.1f}s, "
+          f"from {pathlib.Path(text_file).stat().st_size / 1e6:.1f}MB of text to {pathlib.Path(binary_file).stat().st_size / 1e6:.1f}MB")
+
+
 @ml.command()
 def try_bot_game() -> None:
     engine = SchnapsenGamePlayEngine()
@@ -188,6 +612,91 @@ def try_bot_game() -> None:
     print(f"The ML bot with name {model_name}, won {ml_bot_wins_against_random} times out of {number_of_games} games played.")
 
 
+@ml.command()
+@click.option("--games", default=200, help="The number of random games from which the perspectives are taken")
+def featurizer_benchmark(games: int) -> None:
+    """Compare the time of the list based features of ml_bot with the NumPy features of ml_features, and check that they are the same."""
+    engine = SchnapsenGamePlayEngine()
+    recorder = _RecordingRandBot(random.Random(5234243))
+    for seed in range(games):
+        engine.play_game(recorder, RandBot(random.Random(seed)), random.Random(seed))
+    # the list based features cannot encode closing the talon
+    decisions = [(perspective, leader_move, [move for move in perspective.valid_moves() if not move.is_close_talon()])
+                 for perspective, leader_move in recorder.decisions]
+    print(f"Featurizing {len(decisions)} decisions with {sum(len(moves) for _, _, moves in decisions)} moves")
+
+    start = time.perf_counter()
+    expected_states = [get_state_feature_vector(perspective) for perspective, _, _ in decisions]
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    states = state_feature_vectors([perspective for perspective, _, _ in decisions])
+    batch_time = time.perf_counter() - start
+    assert states.tolist() == expected_states, "The features are not the same"
+    print(f"States, lists: {list_time / len(decisions) * 1e6:.1f}us per state")
+    print(f"States, NumPy in one batch: {batch_time / len(decisions) * 1e6:.1f}us per state ({list_time / batch_time:.1f}x faster)")
+
+    # the features of all valid moves, like the MLPlayingBot needs them
+    start = time.perf_counter()
+    expected = []
+    for perspective, leader_move, moves in decisions:
+        for move in moves:
+            if leader_move is None:
+                expected.append(create_state_and_actions_vector_representation(perspective, move, None))
+            else:
+                expected.append(create_state_and_actions_vector_representation(perspective, leader_move, move))
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    candidates = [candidate_feature_vectors(perspective, leader_move, moves) for perspective, leader_move, moves in decisions]
+    numpy_time = time.perf_counter() - start
+    assert np.concatenate(candidates).tolist() == expected, "The features are not the same"
+    print(f"Valid moves, lists: {list_time / len(decisions) * 1e6:.1f}us per decision")
+    print(f"Valid moves, NumPy: {numpy_time / len(decisions) * 1e6:.1f}us per decision ({list_time / numpy_time:.1f}x faster)")
+
+
+@ml.command()
+@click.option("--games", default=200, help="The number of random games from which the decisions are taken")
+def inference_benchmark(games: int) -> None:
+    """
+    Compare the time the MLPlayingBot needs to score the valid moves of a decision with predict_proba of scikit-learn and with the
+    NumpyNetwork it uses now, for the two kinds of models of train_ML_model, and check that the probabilities are identical.
+    """
+    engine = SchnapsenGamePlayEngine()
+    recorder = _RecordingRandBot(random.Random(5234243))
+    for seed in range(games):
+        engine.play_game(recorder, RandBot(random.Random(seed)), random.Random(seed))
+    decisions = [candidate_feature_vectors(perspective, leader_move, perspective.valid_moves()) for perspective, leader_move in recorder.decisions]
+    print(f"Scoring the valid moves of {len(decisions)} decisions")
+    # the labels do not matter for the time, nor for comparing the probabilities
+    features = np.concatenate(decisions)
+    labels = np.random.default_rng(0).integers(0, 2, len(features))
+    models = [("LR", LogisticRegression(max_iter=1000)),
+              ("NN", MLPClassifier(hidden_layer_sizes=(30,), activation="tanh", max_iter=20, random_state=0))]
+    for model_class, learner in models:
+        learner.fit(features, labels)
+        network = NumpyNetwork.from_sklearn(learner)
+        start = time.perf_counter()
+        expected = [learner.predict_proba(decision)[:, 1] for decision in decisions]
+        sklearn_time = time.perf_counter() - start
+        start = time.perf_counter()
+        probabilities = [network(decision) for decision in decisions]
+        numpy_time = time.perf_counter() - start
+        assert all(np.array_equal(left, right) for left, right in zip(expected, probabilities)), "The probabilities are not identical"
+        print(f"{model_class}, predict_proba: {sklearn_time / len(decisions) * 1e6:.1f}us per decision")
+        print(f"{model_class}, NumPy: {numpy_time / len(decisions) * 1e6:.1f}us per decision ({sklearn_time / numpy_time:.1f}x faster)")
+
+
+class _RecordingRandBot(RandBot):
+    """Plays randomly, and records its perspectives and the moves of the leader."""
+
+    def __init__(self, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.decisions: list[tuple[PlayerPerspective, Optional[Move]]] = []
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        self.decisions.append((perspective, leader_move))
+        return super().get_move(perspective, leader_move)
+
+
 @main.command()
 def game_24() -> None:
     engine = TwentyFourSchnapsenGamePlayEngine()
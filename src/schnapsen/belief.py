@@ -0,0 +1,321 @@
+"""
+In this module you will find the BeliefState, which keeps track of what a player knows about the location of the cards,
+and the information set key, which identifies everything a player knows.
+"""
+
+from __future__ import annotations
+
+from enum import IntEnum
+from typing import Optional, cast
+
+from .deck import Card, Suit, index_by_id
+from .game import ExchangeTrick, GamePhase, Marriage, Move, PlayerPerspective, RegularTrick, Trick
+
+InformationSetKey = tuple[int, ...]
+"""
+A hashable description of everything a player knows, see BeliefState.information_set_key.
+Two situations have the same key exactly when they are the same up to a relabeling of the three non-trump suits.
+"""
+
+_LEADER_MOVE = 6
+"""The code of the card played by the opponent in the current trick, in the descriptions of the suits in the information set key."""
+
+
+class CardLocation(IntEnum):
+    """
+    Where a card is, as far as a player knows. The values are in the same order as the one-hot encoding of the deck knowledge
+    used by the featurizer of the MLPlayingBot.
+    """
+
+    UNKNOWN = 0
+    """The card is either in the hand of the opponent or in the talon"""
+    TRUMP = 1
+    """The card is the trump card at the bottom of the talon"""
+    OPPONENT_WON = 2
+    """The card was won by the opponent"""
+    OPPONENT_HAND = 3
+    """The card is known to be in the hand of the opponent"""
+    MY_WON = 4
+    """The card was won by the player"""
+    MY_HAND = 5
+    """The card is in the hand of the player"""
+
+
+class BeliefState:
+    """
+    Keeps track of the location of all cards from the perspective of one player.
+
+    The BeliefState is fed with the perspective each time the bot is asked for a move. Only the tricks played since the
+    previous update are processed, so an update is cheap and does not depend on the length of the game.
+    Afterwards, the location of a card and the probability that it is in the hand of the opponent or in the talon can be queried in constant time.
+    The probabilities assume that all unknown cards are distributed uniformly over the unknown positions, like PlayerPerspective.make_assumption does.
+
+    When the perspective is from another game than the previous update, the BeliefState starts over.
+
+    Besides the locations, the BeliefState keeps what else the player knows: the scores, the leader and the state of the talon.
+    Together they form the information set key, which is kept up to date with the locations, such that computing it is cheap.
+    """
+
+    def __init__(self) -> None:
+        self.__index: dict[int, int] = {}
+        self.__cards: list[Card] = []
+        self.__locations: list[CardLocation] = []
+        self.__counts: list[int] = [0] * len(CardLocation)
+        self.__last_trick: Optional[Trick] = None
+        self.__trump_card: Optional[Card] = None
+        self.__unknown_in_opponent_hand = 0
+        self.__talon_size = 0
+        # For each suit a number describing the locations of its cards, with a digit in base 8 for each card. See information_set_key.
+        self.__suit_of: list[int] = []
+        self.__weight: list[int] = []
+        self.__suit_codes: list[int] = [0] * len(Suit)
+        self.__trump_suit = 0
+        self.__leader_move: Optional[tuple[int, bool]] = None
+        self.__scalars: tuple[int, ...] = ()
+        self.__closed_by_me: Optional[bool] = None
+        self.__non_closer_had_won_cards = False
+        self.__leader_changed_since_close = False
+
+    def reset(self, deck: list[Card]) -> None:
+        """
+        Forget everything, all cards in the deck get an unknown location.
+
+        :param deck: (list[Card]): All cards used in the game.
+        """
+        self.__cards = list(deck)
+        self.__index = index_by_id(self.__cards)
+        self.__locations = [CardLocation.UNKNOWN] * len(self.__cards)
+        self.__counts = [0] * len(CardLocation)
+        self.__counts[CardLocation.UNKNOWN] = len(self.__cards)
+        self.__last_trick = None
+        self.__trump_card = None
+        self.__unknown_in_opponent_hand = 0
+        self.__talon_size = 0
+        suits = list(Suit)
+        self.__suit_of = [suits.index(card.suit) for card in self.__cards]
+        # the cards of a suit get the digits in the order of the deck
+        self.__weight = [8 ** sum(other.suit is card.suit for other in self.__cards[:index]) for index, card in enumerate(self.__cards)]
+        self.__suit_codes = [0] * len(Suit)
+        self.__leader_move = None
+        self.__scalars = ()
+        self.__closed_by_me = None
+        self.__non_closer_had_won_cards = False
+        self.__leader_changed_since_close = False
+
+    def update(self, perspective: PlayerPerspective, leader_move: Optional[Move] = None) -> None:
+        """
+        Bring the belief up to date with the perspective. This should be called each time the bot is asked for a move.
+
+        :param perspective: (PlayerPerspective): The current perspective of the player.
+        :param leader_move: (Optional[Move]): The move the opponent already played in the current trick, if any.
+        """
+        # collect the tricks played since the last update, they come newest first
+        new_tricks: list[tuple[Trick, bool]] = []
+        for trick, leader_remained_leader in perspective.get_past_tricks():
+            if trick is self.__last_trick:
+                break
+            new_tricks.append((trick, leader_remained_leader))
+        else:
+            # The last trick we processed is not part of this game, we start over and process the complete history
+            self.reset(perspective.get_engine().deck_generator.get_initial_deck().get_cards())
+
+        # Like in get_game_history, we find out who was leading each trick by walking back from the current situation
+        i_am_leader = perspective.am_i_leader()
+        tricks_with_roles: list[tuple[Trick, bool, bool]] = []
+        for trick, leader_remained_leader in new_tricks:
+            i_was_leader = not i_am_leader ^ leader_remained_leader
+            tricks_with_roles.append((trick, i_was_leader, i_am_leader))
+            i_am_leader = i_was_leader
+        for trick, i_was_leader, i_won in reversed(tricks_with_roles):
+            self.__process_trick(trick, i_was_leader, i_won)
+        if new_tricks:
+            self.__last_trick = new_tricks[0][0]
+
+        hand = perspective.get_hand()
+        for card in hand:
+            self.__set(card, CardLocation.MY_HAND)
+        trump_card = perspective.get_trump_card()
+        if self.__trump_card is not None and trump_card is None and self.__get(self.__trump_card) is CardLocation.TRUMP:
+            # The talon ran out, so the opponent took the face up trump card if we did not.
+            self.__set(self.__trump_card, CardLocation.OPPONENT_HAND)
+        if trump_card is not None:
+            self.__set(trump_card, CardLocation.TRUMP)
+        self.__trump_card = trump_card
+        self.__leader_move = None
+        if leader_move is not None:
+            for card in leader_move.cards:
+                self.__set(card, CardLocation.OPPONENT_HAND)
+            # the card which is actually played, for a marriage that is the king
+            played_card = cast(Marriage, leader_move).underlying_regular_move().card if leader_move.is_marriage() else leader_move.cards[0]
+            self.__leader_move = (self.__index[id(played_card)], leader_move.is_marriage())
+        if perspective.get_phase() == GamePhase.TWO:
+            for card in perspective.get_opponent_hand_in_phase_two():
+                self.__set(card, CardLocation.OPPONENT_HAND)
+
+        # During a trick, the opponent still holds the card it played, so both hands have the same size.
+        self.__unknown_in_opponent_hand = len(hand) - self.__counts[CardLocation.OPPONENT_HAND]
+        self.__talon_size = perspective.get_talon_size()
+        suits = list(Suit)
+        self.__trump_suit = suits.index(perspective.get_trump_suit())
+        my_score = perspective.get_my_score()
+        opponent_score = perspective.get_opponent_score()
+        self.__scalars = (my_score.direct_points, my_score.pending_points, opponent_score.direct_points, opponent_score.pending_points,
+                          self.__talon_size, perspective.am_i_leader())
+        unknown_in_talon = self.__talon_size - (1 if trump_card is not None else 0)
+        assert self.__unknown_in_opponent_hand + unknown_in_talon == self.__counts[CardLocation.UNKNOWN], \
+            "Logical error. The number of cards with an unknown location must be equal to the number of unknown positions"
+
+    def __process_trick(self, trick: Trick, i_was_leader: bool, i_won: bool) -> None:
+        """Update the locations of the cards used in a trick, and what is known about closing the talon."""
+        if trick.is_close_talon():
+            self.__closed_by_me = i_was_leader
+            self.__non_closer_had_won_cards = self.__counts[CardLocation.OPPONENT_WON if i_was_leader else CardLocation.MY_WON] > 0
+            self.__leader_changed_since_close = False
+            return
+        if self.__closed_by_me is not None and i_was_leader != i_won:
+            self.__leader_changed_since_close = True
+        if trick.is_trump_exchange():
+            exchange = cast(ExchangeTrick, trick)
+            self.__set(exchange.exchange.jack, CardLocation.TRUMP)
+            self.__set(exchange.trump_card, CardLocation.MY_HAND if i_was_leader else CardLocation.OPPONENT_HAND)
+            return
+        regular_trick = cast(RegularTrick, trick)
+        leader_move = regular_trick.leader_move
+        if leader_move.is_marriage():
+            marriage = cast(Marriage, leader_move)
+            # The queen of a marriage is shown, but stays in the hand of the leader
+            self.__set(marriage.queen_card, CardLocation.MY_HAND if i_was_leader else CardLocation.OPPONENT_HAND)
+            played_card = marriage.underlying_regular_move().card
+        else:
+            played_card = leader_move.cards[0]
+        won = CardLocation.MY_WON if i_won else CardLocation.OPPONENT_WON
+        self.__set(played_card, won)
+        self.__set(regular_trick.follower_move.card, won)
+
+    def __get(self, card: Card) -> CardLocation:
+        return self.__locations[self.__index[id(card)]]
+
+    def __set(self, card: Card, location: CardLocation) -> None:
+        index = self.__index[id(card)]
+        old_location = self.__locations[index]
+        self.__counts[old_location] -= 1
+        self.__counts[location] += 1
+        self.__locations[index] = location
+        self.__suit_codes[self.__suit_of[index]] += (location - old_location) * self.__weight[index]
+
+    def get_location(self, card: Card) -> CardLocation:
+        """
+        Get the location of a card, as far as the player knows.
+
+        :param card: (Card): The card.
+        :returns: (CardLocation): The location of the card.
+        """
+        return self.__locations[self.__index[id(card)]]
+
+    def probability_in_opponent_hand(self, card: Card) -> float:
+        """
+        The probability that the card is in the hand of the opponent.
+
+        :param card: (Card): The card.
+        :returns: (float): The probability, 1.0 for known cards of the opponent, 0.0 for cards known to be elsewhere.
+        """
+        location = self.__locations[self.__index[id(card)]]
+        if location is CardLocation.UNKNOWN:
+            return self.__unknown_in_opponent_hand / self.__counts[CardLocation.UNKNOWN]
+        return 1.0 if location is CardLocation.OPPONENT_HAND else 0.0
+
+    def probability_in_talon(self, card: Card) -> float:
+        """
+        The probability that the card is in the talon.
+
+        :param card: (Card): The card.
+        :returns: (float): The probability, 1.0 for the trump card, 0.0 for cards known to be elsewhere.
+        """
+        location = self.__locations[self.__index[id(card)]]
+        if location is CardLocation.UNKNOWN:
+            return 1.0 - self.__unknown_in_opponent_hand / self.__counts[CardLocation.UNKNOWN]
+        return 1.0 if location is CardLocation.TRUMP else 0.0
+
+    def get_cards(self, location: CardLocation) -> list[Card]:
+        """
+        Get all cards with the given location, in the order of the deck.
+
+        :param location: (CardLocation): The location.
+        :returns: (list[Card]): The cards at that location.
+        """
+        return [card for card, card_location in zip(self.__cards, self.__locations) if card_location is location]
+
+    def count(self, location: CardLocation) -> int:
+        """
+        The number of cards with the given location.
+
+        :param location: (CardLocation): The location.
+        :returns: (int): The number of cards at that location.
+        """
+        return self.__counts[location]
+
+    def get_unknown_cards_in_opponent_hand(self) -> int:
+        """The number of cards in the hand of the opponent which are not known to the player."""
+        return self.__unknown_in_opponent_hand
+
+    def get_locations(self) -> list[CardLocation]:
+        """
+        Get the location of each card of the deck, in the order of the deck.
+
+        :returns: (list[CardLocation]): The locations. This is a copy, changes to it do not affect the BeliefState.
+        """
+        return list(self.__locations)
+
+    def information_set_key(self) -> InformationSetKey:
+        """
+        A hashable key for everything the player knows after the last update: the own hand, the trump card, the cards which were seen and who won them,
+        the known cards of the opponent, the card the opponent already played in this trick, the scores, the size of the talon, whether the player
+        is the leader, and, when the talon was closed, what matters for the game points.
+
+        The key is canonical under relabeling the non-trump suits: two situations which only differ by a permutation of the non-trump suits get the same key.
+        Which cards were played in which order does not matter either, as long as the same cards are in the same locations.
+        The key is computed from numbers describing the suits, which are kept up to date while updating, so the key takes constant time.
+
+        :returns: (InformationSetKey): The key.
+        """
+        suit_codes = self.__suit_codes_with_leader_move()
+        marriage = self.__leader_move is not None and self.__leader_move[1]
+        trump_code = suit_codes.pop(self.__trump_suit)
+        suit_codes.sort()
+        closed = -1 if self.__closed_by_me is None else self.__closed_by_me * 4 + self.__non_closer_had_won_cards * 2 + self.__leader_changed_since_close
+        return (trump_code, *suit_codes, *self.__scalars, marriage, closed)
+
+    def canonical_suits(self) -> list[Suit]:
+        """
+        The suits in the order used by the information set key: the trump suit first, followed by the other suits ordered by their description.
+        Relabeling the suits of a situation to the suits of another situation with the same key in the same position gives the same situation,
+        which can be used to translate moves stored for a key.
+
+        :returns: (list[Suit]): All suits, in canonical order.
+        """
+        suit_codes = self.__suit_codes_with_leader_move()
+        others = sorted((index for index in range(len(suit_codes)) if index != self.__trump_suit), key=lambda index: suit_codes[index])
+        suits = list(Suit)
+        return [suits[self.__trump_suit]] + [suits[index] for index in others]
+
+    def __suit_codes_with_leader_move(self) -> list[int]:
+        """The numbers describing the suits, in which the card played by the opponent in this trick gets its own code."""
+        suit_codes = list(self.__suit_codes)
+        if self.__leader_move is not None:
+            card, _ = self.__leader_move
+            suit_codes[self.__suit_of[card]] += (_LEADER_MOVE - self.__locations[card]) * self.__weight[card]
+        return suit_codes
+
+
+def information_set_key(perspective: PlayerPerspective, leader_move: Optional[Move] = None) -> InformationSetKey:
+    """
+    Compute the information set key of a perspective from scratch. Bots asking for the key on every move should keep a BeliefState instead,
+    and call its information_set_key after each update, which does not process the whole game history every time.
+
+    :param perspective: (PlayerPerspective): The perspective of the player.
+    :param leader_move: (Optional[Move]): The move the opponent already played in the current trick, if any.
+    :returns: (InformationSetKey): The key, see BeliefState.information_set_key.
+    """
+    belief = BeliefState()
+    belief.update(perspective, leader_move)
+    return belief.information_set_key()
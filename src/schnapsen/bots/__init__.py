@@ -3,10 +3,25 @@ it by from schnapsen.bots import MyBot.
 """
 from .rand import RandBot
 from .alphabeta import AlphaBetaBot
-from .rdeep import RdeepBot
-from .ml_bot import MLDataBot, MLPlayingBot, train_ML_model
+from .rdeep import RdeepBot, RolloutEvaluator, score_ratio_evaluator
+from .ml_bot import MLDataBot, MLPlayingBot, train_ML_model, generate_replay_memory
 from .gui.guibot import SchnapsenServer
 from .minimax import MiniMaxBot
 from .bully_bot import BullyBot
+from .ismcts import ISMCTSBot
+from .pimc import PIMCBot
+from .tablebase_bot import TablebaseBot
+from .expectimax import ExpectimaxBot
+from .opening_book_bot import OpeningBookBot
+from .distilled_bot import DistilledBot, generate_teacher_decisions, train_distilled_policy
+from .value_model import ValueModelEvaluator, generate_value_data, train_value_model
+from .rollout_policy import RolloutPolicy, DistilledRolloutPolicy, greedy_rollout_policy
+from .numpy_network import NumpyNetwork
+from .replay_memory import (append_replay_memory, open_replay_memory, convert_text_replay_memory, ReplayMemoryWriter, shard_location,
+                            write_replay_memory_manifest, merge_replay_memory_shards)
 
-__all__ = ["RandBot", "AlphaBetaBot", "RdeepBot", "MLDataBot", "MLPlayingBot", "train_ML_model", "SchnapsenServer", "MiniMaxBot", "BullyBot"]
+__all__ = ["RandBot", "AlphaBetaBot", "RdeepBot", "MLDataBot", "MLPlayingBot", "train_ML_model", "SchnapsenServer", "MiniMaxBot", "BullyBot", "ISMCTSBot", "PIMCBot", "TablebaseBot", "ExpectimaxBot", "OpeningBookBot", "DistilledBot",
+           "generate_teacher_decisions", "train_distilled_policy", "RolloutEvaluator", "score_ratio_evaluator", "ValueModelEvaluator", "generate_value_data",
+           "train_value_model", "RolloutPolicy", "DistilledRolloutPolicy", "greedy_rollout_policy", "NumpyNetwork",
+           "append_replay_memory", "open_replay_memory", "convert_text_replay_memory", "ReplayMemoryWriter",
+           "shard_location", "write_replay_memory_manifest", "merge_replay_memory_shards", "generate_replay_memory"]
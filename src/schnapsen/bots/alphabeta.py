@@ -1,3 +1,5 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
 from typing import Optional
 
 from schnapsen.game import (
@@ -9,8 +11,13 @@ from schnapsen.game import (
     FollowerPerspective,
     LeaderPerspective,
     GamePlayEngine,
+    Previous,
+    RegularMove,
     SchnapsenTrickScorer,
 )
+from schnapsen.tablebase import Tablebase
+from schnapsen.transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, SharedTranspositionTable, TranspositionTable, ZobristHasher, find_move, move_code,
+                                     negated_flag)
 
 
 class AlphaBetaBot(Bot):
@@ -29,21 +36,114 @@ class AlphaBetaBot(Bot):
                 return self.delegate_phase2.get_move(state, leader_move)
             else:
                 # The logic of your bot
+
+    Different orders of playing the same cards lead to the same position. With a transposition table, the results of searching a position
+    are kept in it, such that it is only searched once. The table is kept between moves. There is no table unless transposition_table_size
+    or transposition_table is given. The number of positions searched is counted in nodes, the table counts how often a position was found in it.
+
+    With an endgame tablebase (see schnapsen.tablebase), the search stops at the positions which are in it, and uses their value from the tablebase.
+
+    With more than one process, the moves at the root are searched in parallel (Young Brothers Wait): the first move is searched in this
+    process, and the other ones are handed out to a pool of worker processes, each time with the best value found so far as bound.
+    The workers keep their own transposition tables between moves. The parallel search finds the same value, and breaks ties between equally
+    good moves in the same way as the serial search. Call close() to stop the worker processes when the bot is not needed anymore.
     """
 
-    def __init__(self, name: Optional[str] = None) -> None:
+    def __init__(self, name: Optional[str] = None, transposition_table_size: Optional[int] = None,
+                 time_limit: Optional[float] = None, move_ordering: bool = True, tablebase: Optional[Tablebase] = None,
+                 processes: int = 1, transposition_table: Optional[TranspositionTable] = None) -> None:
+        """
+        Create a new AlphaBetaBot.
+
+        :param name: the name of this Bot
+        :param transposition_table_size: the number of entries in the transposition table, a power of two, for example 2 ** 16. None to search without a table.
+        :param time_limit: the maximum number of seconds to search per move, or None to always search until the end of the game.
+        :param move_ordering: whether to order the moves to prune more, or to search them in the order of valid_moves()
+        :param tablebase: an endgame tablebase to look positions up in, or None to search all positions
+        :param processes: the number of processes searching the moves at the root. With 1, everything is done in this process.
+        :param transposition_table: a table to use instead of creating one, for example a SharedTranspositionTable which is used by other bots as well,
+            or by the worker processes of the parallel search. Such a table is not cleared when the engine changes, all bots using it must play by the same rules.
+        """
         super().__init__(name)
+        assert time_limit is None or time_limit > 0, f"the time limit must be positive, got {time_limit}"
+        assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+        assert processes == 1 or time_limit is None, "The parallel search cannot be combined with a time limit"
+        self.__own_table = transposition_table is None
+        if transposition_table is None and transposition_table_size is not None:
+            transposition_table = TranspositionTable(transposition_table_size)
+        self.transposition_table = transposition_table
+        """The transposition table, or None if the bot searches without one"""
+        self.time_limit = time_limit
+        self.move_ordering = move_ordering
+        self.tablebase = tablebase
+        self.processes = processes
+        self.nodes = 0
+        """The number of positions searched by this bot"""
+        self.last_depth = 0
+        """The number of tricks searched for the last move. The search was complete if this is the number of tricks left in the game."""
+        self.__hasher = ZobristHasher()
+        self.__engine: Optional[GamePlayEngine] = None
+        # The last engine, and whether the tablebase is valid for it
+        self.__tablebase_engine: Optional[tuple[GamePlayEngine, bool]] = None
+        self.__deadline: Optional[float] = None
+        # The number of calls to value() we are in, 0 at the root of the search
+        self.__ply = 0
+        # The killer moves are the last moves which caused a cutoff, for each number of tricks left and for leader and follower
+        self.__killers: dict[tuple[int, bool], list[Move]] = {}
+        # The history heuristic counts how often, and how deep in the tree, each move caused a cutoff
+        self.__history: dict[Move, int] = {}
+        self.__executor: Optional[Executor] = None
 
     def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
         assert (perspective.get_phase() == GamePhase.TWO), "AlphaBetaBot can only work in the second phase of the game."
-        _, move = self.value(
-            perspective.get_state_in_phase_two(),
-            perspective.get_engine(),
-            leader_move=leader_move,
-            maximizing=True,
-        )
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        self.__killers.clear()
+        self.__history.clear()
+        state = perspective.get_state_in_phase_two()
+        engine = perspective.get_engine()
+        if self.time_limit is None:
+            _, move = self.value(state, engine, leader_move=leader_move, maximizing=True)
+            self.last_depth = len(state.leader.hand.cards)
+            return move
+
+        # Iterative deepening: search one trick deeper each time, until the end of the game or until the time is up.
+        # The transposition table and the killer and history heuristics make sure the deeper searches start with the best moves.
+        start = time.perf_counter()
+        tricks_left = len(state.leader.hand.cards)
+        move = perspective.valid_moves()[0]
+        self.last_depth = 0
+        # searching all tricks but the last one is the same as a complete search
+        for depth in range(1, max(tricks_left, 2)):
+            # A search of one trick is always done, such that we have a reasonable move
+            self.__deadline = start + self.time_limit if depth > 1 else None
+            try:
+                _, move = self.value(state, engine, leader_move=leader_move, maximizing=True, depth=depth)
+            except _SearchTimeout:
+                break
+            finally:
+                self.__deadline = None
+            self.last_depth = depth if depth < tricks_left - 1 else tricks_left
         return move
 
+    def evaluate(self, state: GameState, engine: GamePlayEngine) -> float:
+        """
+        The heuristic value of a state in which the search stops before the end of the game, for the leader.
+        It is the difference in points, counting the points of the cards in the hands for half, scaled and rounded to a multiple of 0.25.
+        Coarse values make alphabeta prune much more than exact differences would. The result is always between -0.75 and 0.75,
+        so it is less important than winning or losing even a single game point.
+
+        :param state: the state in which the leader is to move
+        :param engine: the engine, used to get the points of the cards
+        :returns: the heuristic value for the leader of the state
+        """
+        scorer = engine.trick_scorer
+        leader_hand_points = sum(scorer.rank_to_points(card.rank) for card in state.leader.hand.cards)
+        follower_hand_points = sum(scorer.rank_to_points(card.rank) for card in state.follower.hand.cards)
+        leader_points = state.leader.score.direct_points + state.leader.score.pending_points + leader_hand_points / 2
+        follower_points = state.follower.score.direct_points + state.follower.score.pending_points + follower_hand_points / 2
+        return max(-0.75, min(0.75, round((leader_points - follower_points) / 132 * 4) / 4))
+
     def value(
         self,
         state: GameState,
@@ -52,7 +152,32 @@ class AlphaBetaBot(Bot):
         maximizing: bool,
         alpha: float = float("-inf"),
         beta: float = float("inf"),
+        depth: Optional[int] = None,
     ) -> tuple[float, Move]:
+        """
+        Get the value of the state and the best move for the player to move, using alphabeta search.
+
+        :param state: the current state of the game
+        :param engine: the engine playing the game
+        :param leader_move: the move already played by the leader, or None if the leader is to move
+        :param maximizing: whether the player to move is the one for whom the value is computed
+        :param alpha: the value the maximizing player is already sure of
+        :param beta: the value the minimizing player is already sure of
+        :param depth: the number of tricks to search, including the current one, after which the state is evaluated with evaluate(). None to search until the end of the game.
+        :returns: the value and the best move
+        """
+        self.nodes += 1
+        if self.__deadline is not None and self.nodes % 32 == 0 and time.perf_counter() > self.__deadline:
+            raise _SearchTimeout()
+        if self.tablebase is not None and leader_move is None and self.__ply > 0:
+            # At the root we still search, since we need the best move and not only the value
+            if self.__tablebase_engine is None or self.__tablebase_engine[0] is not engine:
+                self.__tablebase_engine = (engine, Tablebase.supports(engine))
+            if self.__tablebase_engine[1]:
+                tablebase_value = self.tablebase.lookup(state)
+                if tablebase_value is not None:
+                    # the move is not used below the root
+                    return (tablebase_value if maximizing else -tablebase_value), RegularMove(state.leader.hand.cards[0])
         my_perspective: PlayerPerspective
         if leader_move is None:
             # we are the leader
@@ -61,6 +186,69 @@ class AlphaBetaBot(Bot):
             my_perspective = FollowerPerspective(state, engine, leader_move)
         valid_moves = my_perspective.valid_moves()
 
+        tricks_left = len(state.leader.hand.cards)
+        if depth is not None and depth >= tricks_left - 1:
+            # The last trick is forced, so searching until the end of the game costs hardly more than evaluating, and gives the exact value
+            depth = None
+        if depth is not None and depth <= 0:
+            evaluation = self.evaluate(state, engine)
+            return (evaluation if maximizing else -evaluation), valid_moves[0]
+        # The search is complete if it goes until the end of the game
+        search_depth = tricks_left if depth is None else min(depth, tricks_left)
+
+        table = self.transposition_table
+        first_move: Optional[Move] = None
+        if table is not None:
+            if engine is not self.__engine:
+                # the entries are only valid for the rules of the engine they were computed with
+                if self.__own_table:
+                    table.clear()
+                self.__engine = engine
+            key = self.__hasher.hash(state, leader_move)
+            entry = table.probe(key)
+            # the stored move is None if the entry is for another position with the same key
+            stored_move = find_move(valid_moves, entry[2]) if entry is not None else None
+            if entry is not None and stored_move is not None:
+                # The table stores the value for the player to move, we convert it to the value for the maximizing player
+                stored_value, flag, _, stored_depth = entry
+                if not maximizing:
+                    stored_value = -stored_value
+                    flag = negated_flag(flag)
+                if stored_depth >= search_depth and (flag == EXACT or (flag == LOWER_BOUND and stored_value >= beta) or (flag == UPPER_BOUND and stored_value <= alpha)):
+                    return stored_value, stored_move
+                # The best move found before, even in a shallower search, is likely to be good again, so we try it first
+                first_move = stored_move
+            original_alpha, original_beta = alpha, beta
+        if self.move_ordering and self.__ply > 0:
+            valid_moves = self.__order_moves(valid_moves, state, leader_move, first_move, (tricks_left, leader_move is not None))
+        elif first_move is not None:
+            # At the root, the moves stay in the order of valid_moves(), such that ties are broken like MiniMaxBot does.
+            valid_moves = [first_move] + [move for move in valid_moves if move is not first_move]
+
+        self.__ply += 1
+        try:
+            if self.__ply == 1 and self.processes > 1 and depth is None and len(valid_moves) > 1:
+                best_value, best_move = self.__search_root_in_parallel(state, engine, leader_move, maximizing, alpha, beta, valid_moves, tricks_left)
+            else:
+                best_value, best_move = self.__search_moves(state, engine, leader_move, maximizing, alpha, beta, depth, valid_moves, tricks_left)
+        finally:
+            self.__ply -= 1
+        if table is not None:
+            if best_value <= original_alpha:
+                flag = UPPER_BOUND
+            elif best_value >= original_beta:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            stored_value = best_value if maximizing else -best_value
+            if not maximizing:
+                flag = negated_flag(flag)
+            table.store(key, stored_value, flag, move_code(best_move), search_depth)
+        return best_value, best_move
+
+    def __search_moves(self, state: GameState, engine: GamePlayEngine, leader_move: Optional[Move], maximizing: bool,
+                       alpha: float, beta: float, depth: Optional[int], valid_moves: list[Move], tricks_left: int) -> tuple[float, Move]:
+        """Search the moves in the given order, and return the best value and move. This is the loop of the alphabeta search."""
         best_value = float("-inf") if maximizing else float("inf")
         best_move: Optional[Move] = None
         for move in valid_moves:
@@ -75,6 +263,7 @@ class AlphaBetaBot(Bot):
                     maximizing=not maximizing,
                     alpha=alpha,
                     beta=beta,
+                    depth=depth,
                 )
             else:
                 # We are the follower. We need to complete the trick and then call self to play the next trick, with the correct maximizing, depending on who is the new leader
@@ -103,13 +292,14 @@ class AlphaBetaBot(Bot):
                         # At the next step we will have become the leader, so we will keep doing what we did
                         next_maximizing = maximizing
                     # implementation note: the previous two case could be written with a xor, but this seemed more readable
-                    value, _ = self.value(new_game_state, engine, None, next_maximizing, alpha, beta)
+                    value, _ = self.value(new_game_state, engine, None, next_maximizing, alpha, beta, None if depth is None else depth - 1)
             if maximizing:
                 if value > best_value:
                     best_move = move
                     best_value = value
                 alpha = max(alpha, best_value)  # alphabeta pruning
                 if beta <= alpha:
+                    self.__record_cutoff(move, (tricks_left, leader_move is not None))
                     break
             else:
                 if value < best_value:
@@ -117,10 +307,150 @@ class AlphaBetaBot(Bot):
                     best_value = value
                 beta = min(beta, best_value)  # alphabeta pruning
                 if beta <= alpha:
+                    self.__record_cutoff(move, (tricks_left, leader_move is not None))
                     break
         assert best_move, "We are sure the best_move can no longer be None"  # We assert to make sure we did not make a logical mistake
         return best_value, best_move
 
+    def __search_root_in_parallel(self, state: GameState, engine: GamePlayEngine, leader_move: Optional[Move], maximizing: bool,
+                                  alpha: float, beta: float, valid_moves: list[Move], tricks_left: int) -> tuple[float, Move]:
+        """
+        Search the moves at the root with Young Brothers Wait: the first move here, the other ones by the worker processes.
+        A move is handed out when a worker is free, with the best value found until then as bound.
+        """
+        best_value, _ = self.__search_moves(state, engine, leader_move, maximizing, alpha, beta, None, valid_moves[:1], tricks_left)
+        values = {0: best_value}
+        if self.__executor is None:
+            # The workers use the same table if it is shared, otherwise each one gets its own table of the same size
+            table = self.transposition_table
+            shared_table = table if isinstance(table, SharedTranspositionTable) else None
+            self.__executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_initialize_worker,
+                                                  initargs=(table.size if table is not None else None, shared_table,
+                                                            self.move_ordering, self.tablebase.path if self.tablebase is not None else None))
+        shared_state = _without_bots(state)
+        running: dict[Future[float], int] = {}
+        next_move = 1
+        while True:
+            if maximizing:
+                alpha = max(alpha, best_value)
+            else:
+                beta = min(beta, best_value)
+            while next_move < len(valid_moves) and len(running) < self.processes and alpha < beta:
+                # The bound is a little below the best value, such that a move which is equally good gets its exact value too.
+                # Ties are then broken in favour of the first of these moves, like in the serial search.
+                window = (alpha - _TIE_MARGIN, beta) if maximizing else (alpha, beta + _TIE_MARGIN)
+                future = self.__executor.submit(_search_in_worker, shared_state, engine, leader_move, valid_moves[next_move], maximizing, *window)
+                running[future] = next_move
+                next_move += 1
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                values[index] = future.result()
+                best_value = max(best_value, values[index]) if maximizing else min(best_value, values[index])
+        best_index = min(index for index, value in values.items() if value == best_value)
+        return best_value, valid_moves[best_index]
+
+    def _search_root_move(self, state: GameState, engine: GamePlayEngine, leader_move: Optional[Move], move: Move, maximizing: bool,
+                          alpha: float, beta: float) -> float:
+        """
+        Search one of the moves at the root, in a worker process of the parallel search. The move is searched as if it were part of the
+        serial search at the root.
+
+        :returns: the value of the move, which is exact if it is within the window
+        """
+        self.__ply = 1
+        try:
+            value, _ = self.__search_moves(state, engine, leader_move, maximizing, alpha, beta, None, [move], len(state.leader.hand.cards))
+        finally:
+            self.__ply = 0
+        return value
+
+    def close(self) -> None:
+        """Stop the worker processes of the parallel search, if any. The bot can still be used afterwards, new workers are started when needed."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __order_moves(self, moves: list[Move], state: GameState, leader_move: Optional[Move], first_move: Optional[Move], ply: tuple[int, bool]) -> list[Move]:
+        """
+        Order the moves such that the best ones are likely to come first: the move from the transposition table, then the killer moves,
+        then the moves with the highest history score, and finally by a static score. For the leader, marriages, trumps and cards with
+        many points go first. The follower first tries to win the trick as cheaply as possible, otherwise it plays its cheapest card.
+        """
+        killers = self.__killers.get(ply, [])
+        history = self.__history
+        trump_suit = state.talon.trump_suit()
+        scores = SchnapsenTrickScorer.SCORES
+
+        def static_score(move: Move) -> int:
+            if move.is_marriage():
+                return 100
+            card = move.cards[0]
+            points = scores.get(card.rank, 0)
+            if leader_move is None:
+                return (0 if card.suit is trump_suit else 50) + points
+            leader_card = leader_move.cards[-1] if leader_move.is_marriage() else leader_move.cards[0]
+            if card.suit is leader_card.suit:
+                wins = points > scores.get(leader_card.rank, 0)
+            else:
+                wins = card.suit is trump_suit
+            return (50 if wins else 0) - points
+
+        return sorted(moves, key=lambda move: (move == first_move, static_score(move), move in killers, history.get(move, 0)), reverse=True)
+
+    def __record_cutoff(self, move: Move, ply: tuple[int, bool]) -> None:
+        """Remember that the move caused a cutoff, for the killer and history heuristics."""
+        killers = self.__killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        tricks_left = ply[0]
+        self.__history[move] = self.__history.get(move, 0) + tricks_left * tricks_left
+
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the time limit is reached."""
+
+
+_TIE_MARGIN = 1 / 16
+"""Less than the difference between any two values the search can find, which are multiples of 0.25."""
+
+_worker_bot: Optional[AlphaBetaBot] = None
+"""The bot of a worker process of a parallel AlphaBetaBot."""
+
+
+def _initialize_worker(transposition_table_size: Optional[int], shared_table: Optional[SharedTranspositionTable], move_ordering: bool,
+                       tablebase_path: Optional[str]) -> None:
+    """Create the bot of a worker process, with the same settings as the bot using the worker."""
+    global _worker_bot
+    tablebase = Tablebase(tablebase_path) if tablebase_path is not None else None
+    _worker_bot = AlphaBetaBot(transposition_table_size=transposition_table_size, move_ordering=move_ordering, tablebase=tablebase,
+                               transposition_table=shared_table)
+
+
+def _search_in_worker(state: GameState, engine: GamePlayEngine, leader_move: Optional[Move], move: Move, maximizing: bool,
+                      alpha: float, beta: float) -> float:
+    """Search a move at the root in a worker process."""
+    assert _worker_bot is not None, "The worker process was not initialized"
+    return _worker_bot._search_root_move(state, engine, leader_move, move, maximizing, alpha, beta)
+
+
+class _NoBot(Bot):
+    """Replaces the real bots in the states sent to the worker processes. It cannot play."""
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        raise AssertionError("This bot only replaces a real bot in a state sent to a worker process, it cannot play")
+
+
+def _without_bots(state: GameState) -> GameState:
+    """A copy of the state in which the bots are replaced, also in the history, such that it can be sent to a worker process."""
+    copy = state.copy_with_other_bots(_NoBot(), _NoBot())
+    if state.previous is not None:
+        copy.previous = Previous(_without_bots(state.previous.state), state.previous.trick, state.previous.leader_remained_leader)
+    return copy
+
 
 class OneFixedMoveBot(Bot):
     def __init__(self, move: Move) -> None:
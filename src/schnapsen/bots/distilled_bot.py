@@ -0,0 +1,161 @@
+"""
+In this module you will find a pipeline to distill an expensive search bot, like RdeepBot or ISMCTSBot, into a fast policy.
+
+1. generate_teacher_decisions lets the teacher play games, in parallel, and records every decision it makes: the feature vectors of
+   all valid moves, and which one the teacher chose.
+2. train_distilled_policy trains a small neural network which scores a move by its feature vector, such that the move chosen by the
+   teacher gets the highest score, and stores the weights as NumPy arrays.
+3. DistilledBot plays the move with the highest score. This takes a few matrix products per move, instead of thousands of rollouts.
+
+The feature vector of a move is the one used by the MLDataBot and the MLPlayingBot, see create_state_and_actions_vector_representation,
+followed by one more feature telling whether the move closes the talon, which has no feature vector of its own.
+"""
+
+import pathlib
+import random
+from itertools import repeat
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from schnapsen.game import Bot, Move, PlayerPerspective, SchnapsenGamePlayEngine, TrumpExchange
+from schnapsen.parallel import map_in_processes, split
+from .ml_features import STATE_AND_ACTIONS_FEATURES, candidate_feature_vectors
+from .numpy_network import NumpyNetwork
+
+TeacherFactory = Callable[[random.Random], Bot]
+"""Creates a bot from a source of randomness. To generate decisions in parallel it must be picklable, like a function defined at the top level of a module."""
+
+
+def get_candidate_feature_vectors(perspective: PlayerPerspective, leader_move: Optional[Move], moves: list[Move]) -> np.ndarray:
+    """
+    The feature vectors of the moves the player can play, one row per move.
+
+    :param perspective: the perspective of the player
+    :param leader_move: the move of the leader, if the player is the follower
+    :param moves: the moves of the player
+    :returns: an integer array of shape (len(moves), number of features)
+    """
+    features = np.zeros((len(moves), STATE_AND_ACTIONS_FEATURES + 1), dtype=np.int16)
+    candidate_feature_vectors(perspective, leader_move, moves, features[:, :STATE_AND_ACTIONS_FEATURES])
+    features[:, STATE_AND_ACTIONS_FEATURES] = [move.is_close_talon() for move in moves]
+    return features
+
+
+class _RecordingBot(Bot):
+    """Plays like the teacher, and records the feature vectors of the valid moves and the move the teacher chose for every decision."""
+
+    def __init__(self, teacher: Bot) -> None:
+        super().__init__(str(teacher))
+        self.teacher = teacher
+        self.features: list[np.ndarray] = []
+        self.chosen: list[np.ndarray] = []
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = perspective.valid_moves()
+        move = self.teacher.get_move(perspective, leader_move)
+        if len(moves) > 1:
+            self.features.append(get_candidate_feature_vectors(perspective, leader_move, moves))
+            self.chosen.append(np.array([candidate == move for candidate in moves]))
+        return move
+
+    def notify_game_end(self, won: bool, perspective: PlayerPerspective) -> None:
+        self.teacher.notify_game_end(won, perspective)
+
+    def notify_trump_exchange(self, move: TrumpExchange) -> None:
+        self.teacher.notify_trump_exchange(move)
+
+
+def _play_teacher_games(teacher: TeacherFactory, opponent: Optional[TeacherFactory], seeds: Sequence[int]) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """Play one game for each seed and return the recorded decisions, in the order in which they were made."""
+    engine = SchnapsenGamePlayEngine()
+    features: list[np.ndarray] = []
+    chosen: list[np.ndarray] = []
+    for seed in seeds:
+        recorder = _RecordingBot(teacher(random.Random(2 * seed)))
+        if opponent is None:
+            # self play, the decisions of both players are recorded
+            other: Bot = _RecordingBot(teacher(random.Random(2 * seed + 1)))
+        else:
+            other = opponent(random.Random(2 * seed + 1))
+        bots = (recorder, other) if seed % 2 == 0 else (other, recorder)
+        engine.play_game(bots[0], bots[1], random.Random(seed))
+        for bot in bots:
+            if isinstance(bot, _RecordingBot):
+                features.extend(bot.features)
+                chosen.extend(bot.chosen)
+    return features, chosen
+
+
+def generate_teacher_decisions(teacher: TeacherFactory, games: int, opponent: Optional[TeacherFactory] = None, processes: int = 1,
+                               seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Let the teacher play games and record its decisions. Game i is dealt with seed + i, and the bots get their randomness from it too,
+    so the result does not depend on the number of processes. Decisions with only one valid move are not recorded.
+
+    :param teacher: creates the bot whose decisions are recorded
+    :param games: the number of games to play
+    :param opponent: creates the opponent of the teacher, None to let the teacher play against itself and record both players
+    :param processes: the number of worker processes playing the games. With 1, everything is done in this process.
+    :param seed: the seed of the first game
+    :returns: the features of the valid moves, one row per move, whether the teacher chose the move, and the number of the decision of each move
+    """
+    assert games >= 1, f"we cannot work with less than one game, got {games}"
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    chunks = split(range(seed, seed + games), processes)
+    results = map_in_processes(_play_teacher_games, processes, repeat(teacher), repeat(opponent), chunks)
+    features = [decision for chunk_features, _ in results for decision in chunk_features]
+    chosen = [decision for _, chunk_chosen in results for decision in chunk_chosen]
+    decisions = np.repeat(np.arange(len(features)), [len(decision) for decision in features])
+    return np.concatenate(features), np.concatenate(chosen), decisions
+
+
+def train_distilled_policy(features: np.ndarray, chosen: np.ndarray, policy_location: pathlib.Path,
+                           hidden_layer_sizes: tuple[int, ...] = (64,), max_iter: int = 200, seed: int = 0) -> None:
+    """
+    Train the policy of a DistilledBot on the decisions from generate_teacher_decisions, and store it.
+    The policy is a neural network with ReLU units classifying whether a move was chosen by the teacher. The features are standardized first.
+
+    :param features: the features of the valid moves, one row per move
+    :param chosen: whether the teacher chose the move
+    :param policy_location: the file to store the weights of the network in, as NumPy arrays
+    :param hidden_layer_sizes: the number of units in each hidden layer
+    :param max_iter: the largest number of epochs of training
+    :param seed: the seed of the initial weights and of the batches
+    """
+    NumpyNetwork.train(features, chosen, hidden_layer_sizes, max_iter, seed).save(policy_location)
+
+
+class DistilledBot(Bot):
+    """
+    A bot playing with a policy trained by train_distilled_policy. Every valid move is scored by the neural network, and the move with
+    the highest score is played. The network is evaluated with NumPy, for all moves at once.
+    """
+
+    def __init__(self, policy_location: pathlib.Path, name: Optional[str] = None) -> None:
+        """
+        Create a new DistilledBot.
+
+        :param policy_location: the file with the policy from train_distilled_policy
+        :param name: the name of this Bot
+        """
+        super().__init__(name)
+        assert policy_location.exists(), f"Policy could not be found at: {policy_location}"
+        self.__policy = NumpyNetwork.load(policy_location)
+
+    def scores(self, perspective: PlayerPerspective, leader_move: Optional[Move], moves: list[Move]) -> np.ndarray:
+        """
+        The scores of the moves, the higher the score the more likely the teacher would have played the move.
+
+        :param perspective: the perspective of the player
+        :param leader_move: the move of the leader, if the player is the follower
+        :param moves: the moves to score
+        :returns: the score of each move
+        """
+        return self.__policy(get_candidate_feature_vectors(perspective, leader_move, moves))
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = perspective.valid_moves()
+        if len(moves) == 1:
+            return moves[0]
+        return moves[int(np.argmax(self.scores(perspective, leader_move, moves)))]
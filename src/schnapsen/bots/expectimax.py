@@ -0,0 +1,278 @@
+import itertools
+import math
+import random
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import Bot, DeterminizationBatch, GamePlayEngine, Move, PlayerPerspective
+from schnapsen.isomorphism import CompactCanonicalizer
+from schnapsen.solver import DoubleDummySolver
+
+LeafEvaluator = Callable[[CompactEngine, CompactState], float]
+"""
+A function estimating the value of a state in the first phase of the game, in which the leader is to move, for the leader.
+The value is an estimate of the game points the leader will win, negative if the leader will lose. It must be between -3 and 3.
+"""
+
+_WIN = 3.0
+"""The highest number of game points, no value can be outside of [-_WIN, _WIN]."""
+
+
+def point_difference_evaluator(engine: CompactEngine, state: CompactState) -> float:
+    """
+    The default LeafEvaluator: the difference in points, counting the points of the cards in the hands for half, like AlphaBetaBot.evaluate.
+    The difference is scaled to at most one game point, so it is less important than winning or losing a game.
+
+    :param engine: (CompactEngine): The engine, used to get the points of the cards.
+    :param state: (CompactState): The state to evaluate, in which the leader is to move.
+    :returns: (float): The value for the leader, between -1 and 1.
+    """
+    points = engine.points
+    leader = state.leader
+    follower = 1 - leader
+    leader_points = state.direct_points[leader] + state.pending_points[leader] + sum(points[card] for card in state.hands[leader]) / 2
+    follower_points = state.direct_points[follower] + state.pending_points[follower] + sum(points[card] for card in state.hands[follower]) / 2
+    return max(-1.0, min(1.0, (leader_points - follower_points) / 66))
+
+
+class ExpectimaxBot(Bot):
+    """
+    A bot for the first phase of the game, which searches an expectimax tree with chance nodes for the cards drawn from the talon.
+
+    Sampling complete worlds, like RdeepBot and PIMCBot do, fixes the order of the talon, while it is the part of the game which is
+    the most uncertain. This bot only fixes the hand of the opponent, and lets the drawing of the cards be a chance node:
+    after each trick in the first phase, every pair of unseen talon cards can be drawn by the winner and the loser of the trick, with
+    the same probability. The search is a *-minimax search (Ballard's Star1): an alphabeta search in which the chance nodes prune as
+    well, by using that no value can be outside of [-3, 3].
+
+    * The hands of the opponent are enumerated when there are at most max_worlds of them, which is the case near the end of the first
+      phase, otherwise max_worlds hands are sampled. The values of the moves are averaged over the hands.
+    * Draws and hands leading to positions which are the same up to a relabeling of the three non-trump suits are merged, with a
+      higher weight. The moves of a merged hand are relabeled back to the cards of the player. Positions are cached by the same canonical
+      key, for the duration of a move.
+    * After depth tricks in the first phase, the search stops and the position is valued by the leaf evaluator.
+    * Once the talon is exhausted or closed, all cards are known and the rest of the game is solved exactly by a DoubleDummySolver.
+
+    Near the end of the first phase there are only a few cards left on the talon, and the search is exact, where sampling is noisy.
+    Within a world the players know each others hands, like in a PIMC search. The engine must follow the Schnapsen rules, see CompactEngine.supports.
+    """
+
+    def __init__(self, rand: random.Random, depth: int = 2, max_worlds: int = 20, evaluator: LeafEvaluator = point_difference_evaluator,
+                 name: Optional[str] = None) -> None:
+        """
+        Create a new ExpectimaxBot.
+
+        :param rand: the source of randomness for this Bot, used to sample hands of the opponent and to break ties
+        :param depth: the number of tricks in the first phase searched before the leaf evaluator is used
+        :param max_worlds: the largest number of hands of the opponent which are enumerated, with more possible hands this many are sampled
+        :param evaluator: the function estimating the value of the positions at the depth limit
+        :param name: the name of this Bot
+        """
+        super().__init__(name)
+        assert depth >= 1, f"it does not make sense to use a depth <1, got {depth}"
+        assert max_worlds >= 1, f"we cannot work with less than one world, got {max_worlds}"
+        self.__rand = rand
+        self.depth = depth
+        self.max_worlds = max_worlds
+        self.evaluator = evaluator
+        self.nodes = 0
+        """The number of positions searched by this bot"""
+        self.cache_hits = 0
+        """The number of positions found in the cache"""
+        self.__cache: dict[Hashable, tuple[int, float, float]] = {}
+        self.__compact_engine: Optional[tuple[GamePlayEngine, CompactEngine]] = None
+        self.__solver: Optional[DoubleDummySolver] = None
+        self.__canonicalizer: Optional[CompactCanonicalizer] = None
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = perspective.valid_moves()
+        # shuffle the moves, such that ties are broken randomly
+        self.__rand.shuffle(moves)
+        if len(moves) == 1:
+            return moves[0]
+        engine = self.__get_compact_engine(perspective.get_engine())
+        values = self.move_values(perspective, leader_move)
+        return max(moves, key=lambda move: values[engine.encode_move(move)])
+
+    def move_values(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> dict[int, float]:
+        """
+        Compute the expected value of each valid move, averaged over the hands of the opponent.
+
+        :param perspective: (PlayerPerspective): The perspective of the player who is to move.
+        :param leader_move: (Optional[Move]): The move the opponent already played in the current trick, if any.
+        :returns: (dict[int, float]): The expected game points for the player after each move, indexed by the move encoded by the CompactEngine.
+        """
+        engine = self.__get_compact_engine(perspective.get_engine())
+        self.__cache.clear()
+        assert self.__canonicalizer is not None, "The canonicalizer is created together with the compact engine"
+        canonicalizer = self.__canonicalizer
+        worlds: dict[Hashable, list[CompactState]] = {}
+        total_weight = 0
+        for state in engine.from_determinizations(self.__worlds(perspective, leader_move), leader_move):
+            worlds.setdefault(self.__canonical_key(state), []).append(state)
+            total_weight += 1
+        # The leader of the perspective is player 0 in the states, the values are searched for player 0
+        sign = 1 if perspective.am_i_leader() else -1
+        values: dict[int, float] = {}
+        for states in worlds.values():
+            # Only the first world is searched. The relabeling of the suits which merges the worlds can also relabel the cards of the
+            # player, so the moves of each world are mapped to the moves of the searched world through their canonical images.
+            searched = states[0]
+            mapping = canonicalizer.permutation(searched)
+            searched_values: dict[int, float] = {}
+            for move in engine.legal_moves(searched):
+                child = searched.copy()
+                value = self.__play(engine, child, move, self.depth, -_WIN, _WIN)
+                searched_values[canonicalizer.move(move, mapping)] = value
+            for state in states:
+                mapping = canonicalizer.permutation(state)
+                for move in engine.legal_moves(state):
+                    value = searched_values[canonicalizer.move(move, mapping)]
+                    values[move] = values.get(move, 0.0) + sign * value / total_weight
+        return values
+
+    def __worlds(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> DeterminizationBatch:
+        """All hands of the opponent if there are at most max_worlds of them, otherwise a sample. The order of the talon does not matter."""
+        batch = perspective.make_assumptions(leader_move, 0, self.__rand)
+        unseen = len(batch.unseen_cards)
+        in_hand = len(batch.opponent_hand_slots)
+        if math.comb(unseen, in_hand) > self.max_worlds:
+            return perspective.make_assumptions(leader_move, self.max_worlds, self.__rand)
+        rows = []
+        for hand in itertools.combinations(range(unseen), in_hand):
+            rows.append([card for card in range(unseen) if card not in hand] + list(hand))
+        permutations = np.array(rows, dtype=np.int8).reshape(len(rows), unseen)
+        return DeterminizationBatch(batch.base_state, batch.opponent_is_leader, batch.unseen_cards, batch.talon_slots,
+                                    batch.opponent_hand_slots, permutations)
+
+    def __value(self, engine: CompactEngine, state: CompactState, depth: int, alpha: float, beta: float) -> float:
+        """
+        The value for player 0 of a state in which the leader is to move. The search is fail-soft: a value at or below alpha is an upper bound,
+        a value at or above beta is a lower bound, other values are exact.
+        """
+        self.nodes += 1
+        winner = engine.winner(state)
+        if winner is not None:
+            return winner[1] if winner[0] == 0 else -winner[1]
+        sign = 1 if state.leader == 0 else -1
+        if state.is_phase_two():
+            if self.__solver is None or self.__solver.engine is not engine:
+                self.__solver = DoubleDummySolver(engine)
+            return sign * self.__solver.solve(state)
+        if depth == 0:
+            return sign * self.evaluator(engine, state)
+
+        key = self.__canonical_key(state)
+        entry = self.__cache.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, lower, upper = entry
+            if lower >= beta or lower == upper:
+                self.cache_hits += 1
+                return lower
+            if upper <= alpha:
+                self.cache_hits += 1
+                return upper
+
+        maximizing = state.leader == 0
+        best_value = -_WIN - 1 if maximizing else _WIN + 1
+        window_alpha, window_beta = alpha, beta
+        for move in engine.legal_leader_moves(state):
+            value = self.__play(engine, state.copy(), move, depth, window_alpha, window_beta)
+            if maximizing:
+                best_value = max(best_value, value)
+                window_alpha = max(window_alpha, value)
+            else:
+                best_value = min(best_value, value)
+                window_beta = min(window_beta, value)
+            if window_alpha >= window_beta:
+                break
+
+        if best_value <= alpha:
+            self.__cache[key] = (depth, -_WIN, best_value)
+        elif best_value >= beta:
+            self.__cache[key] = (depth, best_value, _WIN)
+        else:
+            self.__cache[key] = (depth, best_value, best_value)
+        return best_value
+
+    def __play(self, engine: CompactEngine, state: CompactState, move: int, depth: int, alpha: float, beta: float) -> float:
+        """The value for player 0 after playing the move on the state, which is modified."""
+        if state.leader_move is None:
+            if engine.play(state, move):
+                # a trump exchange or closing the talon, the leader moves again
+                return self.__value(engine, state, depth, alpha, beta)
+            return self.__follow(engine, state, depth, alpha, beta)
+        return self.__draw(engine, state, move, depth, alpha, beta)
+
+    def __follow(self, engine: CompactEngine, state: CompactState, depth: int, alpha: float, beta: float) -> float:
+        """The value for player 0 of a state in which the follower is to move."""
+        self.nodes += 1
+        maximizing = state.leader == 1
+        best_value = -_WIN - 1 if maximizing else _WIN + 1
+        for move in engine.legal_follower_moves(state):
+            value = self.__draw(engine, state, move, depth, alpha, beta)
+            if maximizing:
+                best_value = max(best_value, value)
+                alpha = max(alpha, value)
+            else:
+                best_value = min(best_value, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return best_value
+
+    def __draw(self, engine: CompactEngine, state: CompactState, follower_card: int, depth: int, alpha: float, beta: float) -> float:
+        """
+        The value for player 0 of completing the trick with the card of the follower. In the first phase this is a chance node over the
+        cards drawn from the talon, which prunes like Star1. The state is not modified.
+        """
+        talon = state.talon
+        if not talon or state.is_talon_closed or len(talon) == 2:
+            # Nothing is drawn, or the only unseen card goes to the winner and the trump card to the loser
+            child = state.copy()
+            engine.play(child, follower_card)
+            return self.__value(engine, child, depth - 1, alpha, beta)
+
+        # The winner draws any of the unseen cards on the talon and the loser any of the others, all with the same probability.
+        unseen, trump_card = talon[:-1], talon[-1]
+        children: dict[Hashable, tuple[CompactState, int]] = {}
+        for first, second in itertools.permutations(unseen, 2):
+            child = state.copy()
+            child.talon = [first, second] + [card for card in unseen if card != first and card != second] + [trump_card]
+            engine.play(child, follower_card)
+            key = self.__canonical_key(child)
+            merged, weight = children.get(key, (child, 0))
+            children[key] = (merged, weight + 1)
+
+        total_weight = len(unseen) * (len(unseen) - 1)
+        known = 0.0
+        remaining = 1.0
+        for child, weight in children.values():
+            probability = weight / total_weight
+            remaining -= probability
+            # The window for the child, such that the chance node is outside of its window when the child is outside of this one
+            child_alpha = (alpha - known - remaining * _WIN) / probability
+            child_beta = (beta - known + remaining * _WIN) / probability
+            value = self.__value(engine, child, depth - 1, max(child_alpha, -_WIN), min(child_beta, _WIN))
+            if value <= child_alpha:
+                return known + probability * value + remaining * _WIN
+            if value >= child_beta:
+                return known + probability * value - remaining * _WIN
+            known += probability * value
+        return known
+
+    def __canonical_key(self, state: CompactState) -> Hashable:
+        """The key of a state which is the same for the states which are the same up to a relabeling of the non-trump suits."""
+        assert self.__canonicalizer is not None, "The canonicalizer is created together with the compact engine"
+        return self.__canonicalizer.key(state)
+
+    def __get_compact_engine(self, engine: GamePlayEngine) -> CompactEngine:
+        """Get the CompactEngine playing the same game as the engine. It is cached, since the engine is normally the same for all moves."""
+        if self.__compact_engine is None or self.__compact_engine[0] is not engine:
+            compact_engine = CompactEngine(engine)
+            self.__compact_engine = (engine, compact_engine)
+            # The order of the unseen cards on the talon does not matter in the search, nor which cards were won
+            self.__canonicalizer = CompactCanonicalizer(compact_engine, ordered_talon=False, won_cards=False)
+        return self.__compact_engine[1]
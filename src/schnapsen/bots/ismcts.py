@@ -0,0 +1,196 @@
+import math
+import random
+import time
+from typing import Optional, cast
+
+from schnapsen.compact import CLOSE_TALON, EXCHANGE, CompactEngine, CompactState
+from schnapsen.game import Bot, GamePlayEngine, Move, PlayerPerspective, RegularTrick
+
+
+class _Node:
+    """
+    A node in the information set search tree. It is reached by a sequence of moves, and shared by all determinizations in which that sequence is possible.
+
+    :attr mine: Whether the move leading to this node was made by the bot itself.
+    :attr children: The child nodes, indexed by the encoded move.
+    :attr visits: How often this node was selected.
+    :attr availability: How often the move leading to this node was legal when its parent was visited.
+    :attr wins: The sum of the rewards, from the point of view of the player who made the move leading to this node.
+    """
+
+    __slots__ = ("mine", "children", "visits", "availability", "wins")
+
+    def __init__(self, mine: bool) -> None:
+        self.mine = mine
+        self.children: dict[int, _Node] = {}
+        self.visits = 0
+        self.availability = 0
+        self.wins = 0.0
+
+
+class ISMCTSBot(Bot):
+    """
+    A bot using Information Set Monte Carlo Tree Search (single observer ISMCTS).
+
+    Each iteration samples one determinization of the unknown cards using PlayerPerspective.make_assumptions, and descends one tree
+    which is shared by all determinizations. Only the moves which are legal in the sampled determinization are considered, and the
+    UCB1 formula uses how often a move was available instead of how often its parent was visited. The game is then played out with random moves
+    on a CompactEngine, and the result is backpropagated.
+
+    The tree is kept between the moves of a game: on the next move, the bot descends the tree along the moves played since, and continues
+    searching from there.
+
+    The engine must follow the Schnapsen rules, see CompactEngine.supports.
+    """
+
+    def __init__(self, rand: random.Random, iterations: Optional[int] = 1000, time_limit: Optional[float] = None,
+                 exploration: float = 0.7, reuse_tree: bool = True, name: Optional[str] = None) -> None:
+        """
+        Create a new ISMCTS bot. The search for a move stops as soon as either the number of iterations or the time limit is reached.
+
+        :param rand: the source of randomness for this Bot
+        :param iterations: the maximum number of iterations per move, or None for no limit
+        :param time_limit: the maximum number of seconds to search per move, or None for no limit
+        :param exploration: the exploration constant of the UCB1 formula
+        :param reuse_tree: whether to keep the relevant part of the search tree for the next move
+        :param name: the name of this Bot
+        """
+        super().__init__(name)
+        assert iterations is not None or time_limit is not None, "At least one of iterations and time_limit must be given"
+        assert iterations is None or iterations >= 1, f"we cannot work with less than one iteration, got {iterations}"
+        assert time_limit is None or time_limit > 0, f"the time limit must be positive, got {time_limit}"
+        self.__rand = rand
+        self.__iterations = iterations
+        self.__time_limit = time_limit
+        self.__exploration = exploration
+        self.__reuse_tree = reuse_tree
+        self.__compact_engine: Optional[tuple[GamePlayEngine, CompactEngine]] = None
+        self.__root: Optional[_Node] = None
+        self.__root_history: list[int] = []
+        self.last_iterations = 0
+        """The number of iterations done for the last move"""
+        self.last_reused_visits = 0
+        """The number of visits of the root which were already there because of tree reuse, for the last move"""
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        start = time.perf_counter()
+        engine = self.__get_compact_engine(perspective.get_engine())
+        moves = perspective.valid_moves()
+        encoded_moves = {engine.encode_move(move): move for move in moves}
+        if len(moves) == 1:
+            # the tree of the previous move stays, the forced move will be found in it on the next move
+            return moves[0]
+
+        history = self.__history(engine, perspective, leader_move)
+        root = self.__find_root(history)
+        self.last_reused_visits = root.visits
+        # the leader is player 0 in the compact states
+        me = 1 if leader_move else 0
+
+        iterations = 0
+        batch: list[CompactState] = []
+        while self.__iterations is None or iterations < self.__iterations:
+            if self.__time_limit is not None and time.perf_counter() - start >= self.__time_limit:
+                break
+            if not batch:
+                batch_size = 64 if self.__iterations is None else min(64, self.__iterations - iterations)
+                batch = engine.from_determinizations(perspective.make_assumptions(leader_move, batch_size, self.__rand), leader_move)
+            self.__iterate(engine, root, batch.pop(), me)
+            iterations += 1
+        self.last_iterations = iterations
+
+        candidates = [(child.visits, child.wins / child.visits, move) for move, child in root.children.items() if move in encoded_moves and child.visits > 0]
+        if not candidates:
+            return self.__rand.choice(moves)
+        _, _, best = max(candidates)
+        if self.__reuse_tree:
+            self.__root = root
+            self.__root_history = history
+        return encoded_moves[best]
+
+    def notify_game_end(self, won: bool, perspective: PlayerPerspective) -> None:
+        self.__root = None
+        self.__root_history = []
+
+    def __iterate(self, engine: CompactEngine, root: _Node, state: CompactState, me: int) -> None:
+        """Perform one iteration of the search on the given determinization, which is modified."""
+        rand = self.__rand
+        node = root
+        path = [root]
+        while state.leader_move is not None or engine.winner(state) is None:
+            legal = engine.legal_moves(state)
+            untried = [move for move in legal if move not in node.children]
+            children = node.children
+            for move in legal:
+                if move in children:
+                    children[move].availability += 1
+            if untried:
+                move = rand.choice(untried)
+                child = _Node(mine=state.to_move() == me)
+                child.availability = 1
+                children[move] = child
+                engine.play(state, move)
+                path.append(child)
+                break
+            move, node = self.__select(node, legal)
+            engine.play(state, move)
+            path.append(node)
+
+        engine.random_playout(state, 1_000, rand)
+        winner = engine.winner(state)
+        assert winner is not None, "A random playout without a limit on the number of rounds must end the game"
+        i_won = winner[0] == me
+        for visited in path:
+            visited.visits += 1
+            if visited.mine == i_won:
+                visited.wins += 1
+
+    def __select(self, node: _Node, legal: list[int]) -> tuple[int, _Node]:
+        """Select the move with the highest UCB1 value among the legal moves, and return it with its child node."""
+        best_value = float('-inf')
+        best_move = legal[0]
+        for move in legal:
+            child = node.children[move]
+            value = child.wins / child.visits + self.__exploration * math.sqrt(math.log(child.availability) / child.visits)
+            if value > best_value:
+                best_value = value
+                best_move = move
+        return best_move, node.children[best_move]
+
+    def __find_root(self, history: list[int]) -> _Node:
+        """Find the node for the current situation in the tree of the previous move, or create a new root."""
+        root = self.__root
+        previous = self.__root_history
+        if root is None or not self.__reuse_tree or len(history) < len(previous) or history[:len(previous)] != previous:
+            return _Node(mine=False)
+        for move in history[len(previous):]:
+            next_node = root.children.get(move)
+            if next_node is None:
+                return _Node(mine=False)
+            root = next_node
+        return root
+
+    @staticmethod
+    def __history(engine: CompactEngine, perspective: PlayerPerspective, leader_move: Optional[Move]) -> list[int]:
+        """All moves played in this game until now, encoded and in chronological order."""
+        history: list[int] = []
+        for trick, _ in perspective.get_past_tricks():
+            if trick.is_close_talon():
+                history.append(CLOSE_TALON)
+            elif trick.is_trump_exchange():
+                history.append(EXCHANGE)
+            else:
+                regular_trick = cast(RegularTrick, trick)
+                # we reverse the list in the end, so the follower move goes first
+                history.append(engine.encode_move(regular_trick.follower_move))
+                history.append(engine.encode_move(regular_trick.leader_move))
+        history.reverse()
+        if leader_move is not None:
+            history.append(engine.encode_move(leader_move))
+        return history
+
+    def __get_compact_engine(self, engine: GamePlayEngine) -> CompactEngine:
+        """Get the CompactEngine playing the same game as the engine. It is cached, since the engine is normally the same for all moves."""
+        if self.__compact_engine is None or self.__compact_engine[0] is not engine:
+            self.__compact_engine = (engine, CompactEngine(engine))
+        return self.__compact_engine[1]
@@ -11,6 +11,7 @@ from schnapsen.game import (
     GamePlayEngine,
     SchnapsenTrickScorer,
 )
+from schnapsen.transposition import EXACT, TranspositionTable, ZobristHasher, find_move, move_code
 
 
 class MiniMaxBot(Bot):
@@ -28,13 +29,37 @@ class MiniMaxBot(Bot):
             else:
                 # The logic of your bot
     </pre>
+
+    Different orders of playing the same cards lead to the same position. With a transposition table, the results of searching a position
+    are kept in it, such that it is only searched once. The table is kept between moves. There is no table unless transposition_table_size
+    or transposition_table is given. The number of positions searched is counted in nodes, the table counts how often a position was found in it.
     """
 
-    def __init__(self, name: Optional[str] = None) -> None:
+    def __init__(self, name: Optional[str] = None, transposition_table_size: Optional[int] = None,
+                 transposition_table: Optional[TranspositionTable] = None) -> None:
+        """
+        Create a new MiniMaxBot.
+
+        :param name: the name of this Bot
+        :param transposition_table_size: the number of entries in the transposition table, a power of two, for example 2 ** 16. None to search without a table.
+        :param transposition_table: a table to use instead of creating one, for example a SharedTranspositionTable which is used by other bots as well.
+            Such a table is not cleared when the engine changes, all bots using it must play by the same rules.
+        """
         super().__init__(name)
+        self.__own_table = transposition_table is None
+        if transposition_table is None and transposition_table_size is not None:
+            transposition_table = TranspositionTable(transposition_table_size)
+        self.transposition_table = transposition_table
+        """The transposition table, or None if the bot searches without one"""
+        self.nodes = 0
+        """The number of positions searched by this bot"""
+        self.__hasher = ZobristHasher()
+        self.__engine: Optional[GamePlayEngine] = None
 
     def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
         assert (perspective.get_phase() == GamePhase.TWO), "MiniMaxBot can only work in the second phase of the game."
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
         _, move = self.value(
             perspective.get_state_in_phase_two(),
             perspective.get_engine(),
@@ -61,6 +86,7 @@ class MiniMaxBot(Bot):
         Returns:
             tuple[float, Optional[Move]]: _description_
         """
+        self.nodes += 1
         my_perspective: PlayerPerspective
         if leader_move is None:
             # we are the leader
@@ -69,6 +95,24 @@ class MiniMaxBot(Bot):
             my_perspective = FollowerPerspective(state, engine, leader_move)
         valid_moves = my_perspective.valid_moves()
 
+        table = self.transposition_table
+        if table is not None:
+            if engine is not self.__engine:
+                # the entries are only valid for the rules of the engine they were computed with
+                if self.__own_table:
+                    table.clear()
+                self.__engine = engine
+            key = self.__hasher.hash(state, leader_move)
+            entry = table.probe(key)
+            # Minimax only stores exact values of complete searches, but a table shared with an AlphaBetaBot can contain bounds as well.
+            # The table stores the value for the player to move.
+            if entry is not None and entry[1] == EXACT and entry[3] >= len(state.leader.hand.cards):
+                stored_value, _, code, _ = entry
+                stored_move = find_move(valid_moves, code)
+                # the stored move is None if the entry is for another position with the same key
+                if stored_move is not None:
+                    return (stored_value if maximizing else -stored_value), stored_move
+
         best_value = float("-inf") if maximizing else float("inf")
         best_move: Optional[Move] = None
         for move in valid_moves:
@@ -117,6 +161,10 @@ class MiniMaxBot(Bot):
                 best_move = move
                 best_value = value
         assert best_move, "We are sure the best_move can no longer be None."  # We assert to make sure we did not make a logical mistake
+        if table is not None:
+            # the search always goes until the end of the game, i.e. until the hand of the leader is empty
+            depth = len(state.leader.hand.cards)
+            table.store(key, best_value if maximizing else -best_value, EXACT, move_code(best_move), depth)
         return best_value, best_move
 
 
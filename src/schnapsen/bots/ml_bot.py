@@ -1,11 +1,23 @@
-from schnapsen.game import Bot, PlayerPerspective, SchnapsenDeckGenerator, Move, Trick, GamePhase
-from typing import Optional, cast, Literal
+from schnapsen.game import Bot, PlayerPerspective, SchnapsenDeckGenerator, SchnapsenGamePlayEngine, Move, Trick, GamePhase, CloseTalonTrick
+from typing import Any, Callable, Optional, Sequence, Union, cast, Literal
 from schnapsen.deck import Suit, Rank
+from schnapsen.parallel import map_in_processes, split
 from sklearn.neural_network import MLPClassifier
 from sklearn.linear_model import LogisticRegression
 import joblib
+import numpy as np
 import time
 import pathlib
+import random
+from itertools import repeat
+
+from .ml_features import candidate_feature_vectors, state_and_actions_feature_vectors
+from .numpy_network import NumpyNetwork
+from .replay_memory import (ReplayMemoryWriter, append_replay_memory, is_binary_replay_memory, open_replay_memory, shard_location,
+                            write_replay_memory_manifest)
+
+BotFactory = Callable[[random.Random], Bot]
+"""Creates a bot from a source of randomness. To generate a replay memory in parallel it must be picklable, like a function defined at the top level of a module."""
 
 
 class MLPlayingBot(Bot):
@@ -24,34 +36,25 @@ class MLPlayingBot(Bot):
         assert model_location.exists(), f"Model could not be found at: {model_location}"
         # load model
         self.__model = joblib.load(model_location)
+        # The models trained by train_ML_model are evaluated with NumPy, which is much faster than predict_proba for a few moves.
+        # Any other model still works, through predict_proba.
+        self.__network: Optional[NumpyNetwork] = None
+        if isinstance(self.__model, (LogisticRegression, MLPClassifier)) and list(self.__model.classes_) == [0, 1]:
+            self.__network = NumpyNetwork.from_sklearn(self.__model)
 
     def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
-        # get the sate feature representation
-        state_representation = get_state_feature_vector(perspective)
-        # get the leader's move representation, even if it is None
-        leader_move_representation = get_move_feature_vector(leader_move)
         # get all my valid moves
         my_valid_moves = perspective.valid_moves()
-        # get the feature representations for all my valid moves
-        my_move_representations: list[list[int]] = []
-        for my_move in my_valid_moves:
-            my_move_representations.append(get_move_feature_vector(my_move))
-
-        # create all model inputs, for all bot's valid moves
-        action_state_representations: list[list[int]] = []
-
-        if perspective.am_i_leader():
-            follower_move_representation = get_move_feature_vector(None)
-            for my_move_representation in my_move_representations:
-                action_state_representations.append(
-                    state_representation + my_move_representation + follower_move_representation)
-        else:
-            for my_move_representation in my_move_representations:
-                action_state_representations.append(
-                    state_representation + leader_move_representation + my_move_representation)
+        # create all model inputs, for all bot's valid moves: the state, followed by the moves of the leader and the follower.
+        # This gives the same features as create_state_and_actions_vector_representation, but much faster, see ml_features.
+        action_state_representations = candidate_feature_vectors(perspective, leader_move, my_valid_moves)
 
-        model_output = self.__model.predict_proba(action_state_representations)
-        winning_probabilities_of_moves = [outcome_prob[1] for outcome_prob in model_output]
+        if self.__network is not None:
+            # the same probabilities as predict_proba gives, see NumpyNetwork
+            winning_probabilities_of_moves = self.__network(action_state_representations).tolist()
+        else:
+            model_output = self.__model.predict_proba(action_state_representations)
+            winning_probabilities_of_moves = [outcome_prob[1] for outcome_prob in model_output]
         highest_value: float = -1
         best_move = None
         for index, value in enumerate(winning_probabilities_of_moves):
@@ -73,14 +76,25 @@ class MLDataBot(Bot):
     This class only records the decisions and game outcomes of the provided bot, according to its own perspective - incomplete game state knowledge.
     """
 
-    def __init__(self, bot: Bot, replay_memory_location: pathlib.Path) -> None:
+    def __init__(self, bot: Bot, replay_memory_location: Union[pathlib.Path, ReplayMemoryWriter],
+                 replay_memory_format: Literal["text", "binary"] = "text") -> None:
         """
         :param bot: the provided bot that will actually play the game and make decisions
-        :param replay_memory_location: the filename under which the replay memory records will be
+        :param replay_memory_location: the filename under which the replay memory records will be, or a ReplayMemoryWriter which
+            buffers the records in the binary format. Bots recording into the same file should share the writer, and it must be closed
+            after the games.
+        :param replay_memory_format: 'text' to write the records as lines of text, or 'binary' to write them as rows of bytes, see replay_memory.
+            A ReplayMemoryWriter always writes the binary format.
         """
-
+        assert replay_memory_format == "text" or replay_memory_format == "binary", "Unknown replay memory format"
         self.bot: Bot = bot
+        self.replay_memory_writer: Optional[ReplayMemoryWriter] = None
+        if isinstance(replay_memory_location, ReplayMemoryWriter):
+            self.replay_memory_writer = replay_memory_location
+            replay_memory_location = replay_memory_location.location
+            replay_memory_format = "binary"
         self.replay_memory_file_path: pathlib.Path = replay_memory_location
+        self.replay_memory_format = replay_memory_format
 
     def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
         """
@@ -103,11 +117,15 @@ class MLDataBot(Bot):
         won_label = won
 
         # we iterate over all the rounds of the game
+        samples: list[tuple[PlayerPerspective, Optional[Move], Optional[Move]]] = []
         for round_player_perspective, round_trick in game_history:
 
             if round_trick.is_trump_exchange():
                 leader_move = round_trick.exchange
                 follower_move = None
+            elif round_trick.is_close_talon():
+                leader_move = cast(CloseTalonTrick, round_trick).close_talon
+                follower_move = None
             else:
                 leader_move = round_trick.leader_move
                 follower_move = round_trick.follower_move
@@ -116,16 +134,64 @@ class MLDataBot(Bot):
             if round_player_perspective.am_i_leader():
                 follower_move = None
 
-            state_actions_representation = create_state_and_actions_vector_representation(
-                perspective=round_player_perspective, leader_move=leader_move, follower_move=follower_move)
+            samples.append((round_player_perspective, leader_move, follower_move))
+
+        # the same as create_state_and_actions_vector_representation for every round, but for all rounds at once, see ml_features
+        state_actions_representations = state_and_actions_feature_vectors(samples)
 
-            # append replay memory to file
-            with open(file=self.replay_memory_file_path, mode="a") as replay_memory_file:
+        # append replay memory to file
+        if self.replay_memory_writer is not None:
+            self.replay_memory_writer.write(state_actions_representations, np.full(len(samples), won_label))
+            return
+        if self.replay_memory_format == "binary":
+            append_replay_memory(self.replay_memory_file_path, state_actions_representations, np.full(len(samples), won_label))
+            return
+        with open(file=self.replay_memory_file_path, mode="a") as replay_memory_file:
+            for state_actions_representation in state_actions_representations.tolist():
                 # replay_memory_line: list[tuple[list, number]] = [state_actions_representation, won_label]
                 # writing to replay memory file in the form "[feature list] || int(won_label)]
                 replay_memory_file.write(f"{str(state_actions_representation)[1:-1]} || {int(won_label)}\n")
 
 
+def _record_games(bot1: BotFactory, bot2: BotFactory, seeds: Sequence[int], location: pathlib.Path) -> int:
+    """Play one game for each seed, record the decisions of both bots in a shard, and return the number of samples."""
+    engine = SchnapsenGamePlayEngine()
+    with ReplayMemoryWriter(location) as writer:
+        for seed in seeds:
+            recording_bot_1 = MLDataBot(bot1(random.Random(2 * seed)), writer)
+            recording_bot_2 = MLDataBot(bot2(random.Random(2 * seed + 1)), writer)
+            engine.play_game(recording_bot_1, recording_bot_2, random.Random(seed))
+    return writer.samples
+
+
+def generate_replay_memory(bot1: BotFactory, bot2: BotFactory, games: int, shard_directory: pathlib.Path, processes: int = 1,
+                           seed: int = 0, games_per_shard: Optional[int] = None) -> dict[str, Any]:
+    """
+    Let two bots play games, recording the decisions of both in a replay memory in the binary format, split into shards.
+    Game i is dealt with seed + i, and both bots are created anew for every game, with randomness from that seed, so every game is the
+    same whichever process plays it. The games are split into shards of consecutive games, each written by one process. Merged with
+    merge_replay_memory_shards, the samples are in the order of the games, so the merged file does not depend on the number of
+    processes, nor on the size of the shards.
+
+    :param bot1: creates the bot which leads the first trick of every game
+    :param bot2: creates its opponent
+    :param games: the number of games to play
+    :param shard_directory: the directory to write the shards and the manifest to, which must not have any shards yet
+    :param processes: the number of worker processes playing the games. With 1, everything is done in this process.
+    :param seed: the seed of the first game
+    :param games_per_shard: the number of games recorded in each shard. If None, four shards per process, such that all processes
+        stay busy until the end.
+    :returns: the manifest of the shards, see write_replay_memory_manifest
+    """
+    assert games >= 1, f"we cannot work with less than one game, got {games}"
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    assert not any(shard_directory.glob("shard_*.bin")), f"There are shards in {shard_directory} already"
+    chunks = split(range(seed, seed + games), processes, chunk_size=games_per_shard)
+    locations = [shard_location(shard_directory, shard) for shard in range(len(chunks))]
+    map_in_processes(_record_games, processes, repeat(bot1), repeat(bot2), chunks, locations)
+    return write_replay_memory_manifest(shard_directory)
+
+
 def train_ML_model(replay_memory_location: Optional[pathlib.Path],
                    model_location: Optional[pathlib.Path],
                    model_class: Literal["NN", "LR"] = "LR"
@@ -135,7 +201,7 @@ def train_ML_model(replay_memory_location: Optional[pathlib.Path],
     This implementation has the option to train a neural network model or a model based on linear regression.
     The model classes used in this implemntation are not necesarily optimal.
 
-    :param replay_memory_location: Location of the games stored by MLDataBot, default pathlib.Path('ML_replay_memories') / 'test_replay_memory'
+    :param replay_memory_location: Location of the games stored by MLDataBot, in the text or in the binary format, default pathlib.Path('ML_replay_memories') / 'test_replay_memory'
     :param model_location: Location where the model will be stored, default pathlib.Path("ML_models") / 'test_model'
     :param model_class: The machine learning model class to be used, either 'NN' for a neural network, or 'LR' for a linear regression.
     :param overwrite: Whether to overwrite a possibly existing model.
@@ -158,19 +224,25 @@ def train_ML_model(replay_memory_location: Optional[pathlib.Path],
     # check if directory exists, and if not, then create it
     model_location.parent.mkdir(parents=True, exist_ok=True)
 
-    data: list[list[int]] = []
-    targets: list[int] = []
-    with open(file=replay_memory_location, mode="r") as replay_memory_file:
-        for line in replay_memory_file:
-            feature_string, won_label_str = line.split("||")
-            feature_list_strings: list[str] = feature_string.split(",")
-            feature_list = [int(feature) for feature in feature_list_strings]
-            won_label = int(won_label_str)
-            data.append(feature_list)
-            targets.append(won_label)
+    data: Union[list[list[int]], np.ndarray]
+    targets: Union[list[int], np.ndarray]
+    if is_binary_replay_memory(replay_memory_location):
+        # the binary format is memory-mapped, the samples are not parsed nor copied
+        data, targets = open_replay_memory(replay_memory_location)
+    else:
+        data = []
+        targets = []
+        with open(file=replay_memory_location, mode="r") as replay_memory_file:
+            for line in replay_memory_file:
+                feature_string, won_label_str = line.split("||")
+                feature_list_strings: list[str] = feature_string.split(",")
+                feature_list = [int(feature) for feature in feature_list_strings]
+                won_label = int(won_label_str)
+                data.append(feature_list)
+                targets.append(won_label)
 
     print("Dataset Statistics:")
-    samples_of_wins = sum(targets)
+    samples_of_wins = int(np.sum(targets))
     samples_of_losses = len(targets) - samples_of_wins
     print("Samples of wins:", samples_of_wins)
     print("Samples of losses:", samples_of_losses)
@@ -0,0 +1,177 @@
+"""
+In this module you will find a fast implementation of the features of the MLDataBot and the MLPlayingBot.
+
+The functions in ml_bot build the features as Python lists, which is easy to read, but slow: every call creates a new deck, walks
+through chains of if/elif to build the one-hot encodings, and looks every card up in the lists of cards in the hand, the won cards
+and the known cards. The functions here give exactly the same values, but
+
+* write into NumPy arrays, which can be allocated once by the caller and passed as out,
+* take the one-hot encodings of suits, ranks and moves from tables built once,
+* find the location of every card at once, from bitmasks of the hand, the won cards and the known cards,
+* featurize many perspectives, or many moves, in one call.
+
+The one exception is CloseTalon, which the functions in ml_bot cannot encode. Here it gets the same features as no move at all.
+"""
+
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from schnapsen.deck import Card, Rank, Suit, index_by_id, value_by_id
+from schnapsen.game import Move, PlayerPerspective, GamePhase, SchnapsenDeckGenerator
+
+STATE_FEATURES = 133
+"""The number of features of a state, see get_state_feature_vector."""
+MOVE_FEATURES = 20
+"""The number of features of a move, see get_move_feature_vector."""
+STATE_AND_ACTIONS_FEATURES = STATE_FEATURES + 2 * MOVE_FEATURES
+"""The number of features of a state with the moves of the leader and the follower, see create_state_and_actions_vector_representation."""
+
+_DECK = list(SchnapsenDeckGenerator().get_initial_deck())
+# cards and suits are looked up by their id(), see index_by_id
+_BIT = value_by_id(_DECK, [1 << index for index in range(len(_DECK))])
+_BITS = np.array([1 << index for index in range(len(_DECK))], dtype=np.int64)
+# the order of the one-hot encodings of get_one_hot_encoding_of_card_suit and get_one_hot_encoding_of_card_rank
+_SUIT_ORDER = [Suit.DIAMONDS, Suit.SPADES, Suit.CLUBS, Suit.HEARTS]
+_RANK_ORDER = [Rank.KING, Rank.QUEEN, Rank.JACK, Rank.TEN, Rank.NINE, Rank.EIGHT, Rank.SEVEN, Rank.SIX, Rank.FIVE, Rank.FOUR,
+               Rank.THREE, Rank.TWO, Rank.ACE]
+# the column of the trump suit in the features
+_TRUMP_COLUMN = value_by_id(_SUIT_ORDER, range(4, 4 + len(_SUIT_ORDER)))
+# the position of the one in the one-hot encoding of a card for each location, from the lowest to the highest priority
+_LOCATION_SLOTS = np.arange(1, 6)[None, :, None]
+_CARD_COLUMNS = 13 + 6 * np.arange(len(_DECK))
+# The features of all moves: for every card a regular move, a trump exchange and a marriage, and one row of zeros for no move.
+# A move is featurized by its row in the table, the row of a card is the position of the card in the Card enum.
+_REGULAR, _EXCHANGE, _MARRIAGE = range(3)
+_MOVE_TABLE = np.zeros((3 * len(Card) + 1, MOVE_FEATURES), dtype=np.int16)
+_NO_MOVE = 3 * len(Card)
+_CARD_ROW = index_by_id(Card)
+for _row, _card in enumerate(Card):
+    for _move_type in (_REGULAR, _EXCHANGE, _MARRIAGE):
+        _MOVE_TABLE[_move_type * len(Card) + _row, [_move_type, 3 + _RANK_ORDER.index(_card.rank), 16 + _SUIT_ORDER.index(_card.suit)]] = 1
+
+
+def _mask(cards: Iterable[Card]) -> int:
+    """The bitmask of the cards, only cards in the deck of Schnapsen have a bit."""
+    bit = _BIT.get
+    mask = 0
+    for card in cards:
+        mask |= bit(id(card), 0)
+    return mask
+
+
+def state_feature_vectors(perspectives: Sequence[PlayerPerspective], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The features of get_state_feature_vector of many perspectives.
+
+    :param perspectives: the perspectives
+    :param out: the array to write the features into, of shape (len(perspectives), STATE_FEATURES). A new array if None.
+    :returns: the features, one row per perspective
+    """
+    if out is None:
+        out = np.zeros((len(perspectives), STATE_FEATURES), dtype=np.int16)
+    else:
+        assert out.shape == (len(perspectives), STATE_FEATURES), f"Expected an array of shape {(len(perspectives), STATE_FEATURES)}, got {out.shape}"
+        out[:] = 0
+    counts = []
+    ones = []
+    # the bitmasks of the locations of the cards, from the lowest to the highest priority in get_state_feature_vector
+    masks = []
+    for perspective in perspectives:
+        my_score = perspective.get_my_score()
+        opponent_score = perspective.get_opponent_score()
+        counts.append((my_score.direct_points, my_score.pending_points, opponent_score.direct_points, opponent_score.pending_points,
+                       perspective.get_talon_size()))
+        ones.append((_TRUMP_COLUMN[id(perspective.get_trump_suit())], 8 if perspective.get_phase() == GamePhase.TWO else 9,
+                     12 if perspective.am_i_leader() else 11))
+        trump_card = perspective.get_trump_card()
+        masks.append((0 if trump_card is None else _BIT.get(id(trump_card), 0),
+                      _mask(perspective.get_opponent_won_cards().get_cards()),
+                      _mask(perspective.get_known_cards_of_opponent_hand().get_cards()),
+                      _mask(perspective.get_won_cards().get_cards()),
+                      _mask(perspective.get_hand().cards)))
+    rows = np.arange(len(perspectives))[:, None]
+    out[:, [0, 1, 2, 3, 10]] = counts
+    out[rows, ones] = 1
+    # for every card the highest priority location with its bit set, 0 if it is in none of them
+    in_location = (np.array(masks, dtype=np.int64)[:, :, None] & _BITS) != 0
+    slots = (in_location * _LOCATION_SLOTS).max(axis=1)
+    out[rows, _CARD_COLUMNS + slots] = 1
+    return out
+
+
+def move_feature_vectors(moves: Sequence[Optional[Move]], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The features of get_move_feature_vector of many moves. None and CloseTalon get zeros.
+
+    :param moves: the moves
+    :param out: the array to write the features into, of shape (len(moves), MOVE_FEATURES). A new array if None.
+    :returns: the features, one row per move
+    """
+    if out is None:
+        out = np.zeros((len(moves), MOVE_FEATURES), dtype=np.int16)
+    else:
+        assert out.shape == (len(moves), MOVE_FEATURES), f"Expected an array of shape {(len(moves), MOVE_FEATURES)}, got {out.shape}"
+    table_rows = []
+    for move in moves:
+        if move is None or move.is_close_talon():
+            table_rows.append(_NO_MOVE)
+        elif move.is_marriage():
+            table_rows.append(_MARRIAGE * len(Card) + _CARD_ROW[id(move.as_marriage().queen_card)])
+        elif move.is_trump_exchange():
+            table_rows.append(_EXCHANGE * len(Card) + _CARD_ROW[id(move.as_trump_exchange().jack)])
+        else:
+            table_rows.append(_CARD_ROW[id(move.as_regular_move().card)])
+    out[:] = _MOVE_TABLE[table_rows]
+    return out
+
+
+def state_and_actions_feature_vectors(samples: Sequence[tuple[PlayerPerspective, Optional[Move], Optional[Move]]],
+                                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The features of create_state_and_actions_vector_representation of many perspectives with the moves of the leader and the follower.
+
+    :param samples: the perspectives, each with the move of the leader and the move of the follower
+    :param out: the array to write the features into, of shape (len(samples), STATE_AND_ACTIONS_FEATURES). A new array if None.
+    :returns: the features, one row per sample
+    """
+    if out is None:
+        out = np.zeros((len(samples), STATE_AND_ACTIONS_FEATURES), dtype=np.int16)
+    else:
+        assert out.shape == (len(samples), STATE_AND_ACTIONS_FEATURES), \
+            f"Expected an array of shape {(len(samples), STATE_AND_ACTIONS_FEATURES)}, got {out.shape}"
+    state_feature_vectors([perspective for perspective, _, _ in samples], out[:, :STATE_FEATURES])
+    move_feature_vectors([leader_move for _, leader_move, _ in samples], out[:, STATE_FEATURES:STATE_FEATURES + MOVE_FEATURES])
+    move_feature_vectors([follower_move for _, _, follower_move in samples], out[:, STATE_FEATURES + MOVE_FEATURES:])
+    return out
+
+
+def candidate_feature_vectors(perspective: PlayerPerspective, leader_move: Optional[Move], moves: Sequence[Move],
+                              out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    The features the MLPlayingBot scores for each of its valid moves: the state, followed by the move of the leader and the move of the
+    follower, where the move of the player is one of the moves. The state is only featurized once.
+
+    :param perspective: the perspective of the player
+    :param leader_move: the move of the leader, if the player is the follower
+    :param moves: the moves of the player
+    :param out: the array to write the features into, of shape (len(moves), STATE_AND_ACTIONS_FEATURES). A new array if None.
+    :returns: the features, one row per move
+    """
+    if out is None:
+        out = np.zeros((len(moves), STATE_AND_ACTIONS_FEATURES), dtype=np.int16)
+    else:
+        assert out.shape == (len(moves), STATE_AND_ACTIONS_FEATURES), \
+            f"Expected an array of shape {(len(moves), STATE_AND_ACTIONS_FEATURES)}, got {out.shape}"
+    state_feature_vectors([perspective], out[:1, :STATE_FEATURES])
+    out[1:, :STATE_FEATURES] = out[0, :STATE_FEATURES]
+    leader_columns = out[:, STATE_FEATURES:STATE_FEATURES + MOVE_FEATURES]
+    follower_columns = out[:, STATE_FEATURES + MOVE_FEATURES:]
+    if perspective.am_i_leader():
+        move_feature_vectors(moves, leader_columns)
+        follower_columns[:] = 0
+    else:
+        move_feature_vectors([leader_move], leader_columns[:1])
+        leader_columns[1:] = leader_columns[0]
+        move_feature_vectors(moves, follower_columns)
+    return out
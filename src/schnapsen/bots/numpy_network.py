@@ -0,0 +1,158 @@
+"""
+In this module you will find NumpyNetwork, a feed-forward neural network evaluated with plain NumPy.
+
+The bots which score moves or states with a model call it once per decision, or once per step of their rollouts, on a handful of rows.
+For such small inputs, the input validation and conversion of scikit-learn take much longer than the matrix products themselves.
+A NumpyNetwork holds the weights of a trained model as NumPy arrays, and evaluates them with exactly the same operations as
+scikit-learn, so the outputs are identical.
+
+A NumpyNetwork can be created from a fitted LogisticRegression or MLPClassifier, see from_sklearn, or loaded from the .npz files written
+by save, which are used by the DistilledBot, the ValueModelEvaluator and the DistilledRolloutPolicy.
+"""
+
+from __future__ import annotations
+
+import pathlib
+from typing import Any, Literal, Optional, Union
+
+import numpy as np
+from scipy.special import expit
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+
+Activation = Literal["identity", "relu", "tanh", "logistic"]
+
+
+def _activate(values: np.ndarray, activation: Activation) -> None:
+    """Apply the activation function to the values in place, like the ACTIVATIONS of scikit-learn."""
+    if activation == "relu":
+        np.maximum(values, 0, out=values)
+    elif activation == "tanh":
+        np.tanh(values, out=values)
+    elif activation == "logistic":
+        expit(values, out=values)
+    else:
+        assert activation == "identity", f"Unknown activation {activation}"
+
+
+class NumpyNetwork:
+    """
+    A feed-forward neural network with one output, evaluated with NumPy.
+
+    :param layers: (list[tuple[np.ndarray, np.ndarray]]): The weights and the biases of each layer.
+    :param hidden_activation: (Activation): The activation function of the hidden layers.
+    :param output_activation: (Activation): The activation function of the output.
+    :param mean: (Optional[np.ndarray]): If given, the features are standardized first: this is subtracted from them,
+    :param scale: (Optional[np.ndarray]): and they are divided by this.
+    """
+
+    def __init__(self, layers: list[tuple[np.ndarray, np.ndarray]], hidden_activation: Activation = "relu",
+                 output_activation: Activation = "identity", mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None) -> None:
+        assert layers, "A network needs at least one layer"
+        assert layers[-1][0].shape[1] == 1, f"A network must have one output, got {layers[-1][0].shape[1]}"
+        assert (mean is None) == (scale is None), "Standardizing needs both the mean and the scale"
+        self.layers = layers
+        self.hidden_activation = hidden_activation
+        self.output_activation = output_activation
+        self.mean = mean
+        self.scale = scale
+
+    @staticmethod
+    def from_sklearn(model: Union[LogisticRegression, MLPClassifier], mean: Optional[np.ndarray] = None,
+                     scale: Optional[np.ndarray] = None) -> NumpyNetwork:
+        """
+        Take the weights of a fitted binary classifier. The output of the network is the probability of the second class,
+        the second column of the predict_proba of the model.
+
+        :param model: (Union[LogisticRegression, MLPClassifier]): The fitted model, with two classes.
+        :param mean: (Optional[np.ndarray]): The mean to subtract from the features, if the model was trained on standardized features.
+        :param scale: (Optional[np.ndarray]): The scale to divide the features by, if the model was trained on standardized features.
+        :returns: (NumpyNetwork): The network computing the same probabilities as the model.
+        """
+        assert len(model.classes_) == 2, f"Only binary classifiers are supported, the model has {len(model.classes_)} classes"
+        if isinstance(model, LogisticRegression):
+            return NumpyNetwork([(model.coef_.T, model.intercept_)], output_activation="logistic", mean=mean, scale=scale)
+        assert isinstance(model, MLPClassifier), f"Unsupported model {type(model).__name__}"
+        return NumpyNetwork(list(zip(model.coefs_, model.intercepts_)), hidden_activation=model.activation,
+                            output_activation=model.out_activation_, mean=mean, scale=scale)
+
+    @staticmethod
+    def train(features: np.ndarray, labels: np.ndarray, hidden_layer_sizes: tuple[int, ...] = (64,), max_iter: int = 200,
+              seed: int = 0) -> NumpyNetwork:
+        """
+        Train a neural network with ReLU units classifying the labels, on the standardized features. A part of the features is held out,
+        and the training stops early when the score on it does not improve anymore.
+
+        :param features: (np.ndarray): The features, one row per sample.
+        :param labels: (np.ndarray): The binary label of each sample.
+        :param hidden_layer_sizes: (tuple[int, ...]): The number of units in each hidden layer.
+        :param max_iter: (int): The largest number of epochs of training.
+        :param seed: (int): The seed of the initial weights and of the batches.
+        :returns: (NumpyNetwork): The trained network, which standardizes the features itself.
+        """
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        # features which never change carry no information
+        scale[scale == 0] = 1
+        learner = MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, activation="relu", max_iter=max_iter, early_stopping=True,
+                                n_iter_no_change=6, random_state=seed)
+        learner.fit((features - mean) / scale, labels)
+        return NumpyNetwork.from_sklearn(learner, mean, scale)
+
+    @staticmethod
+    def load(location: pathlib.Path) -> NumpyNetwork:
+        """
+        Load a network stored by save.
+
+        :param location: (pathlib.Path): The .npz file.
+        :returns: (NumpyNetwork): The network.
+        """
+        assert location.exists(), f"Network could not be found at: {location}"
+        with np.load(location) as stored:
+            number_of_layers = sum(1 for key in stored.files if key.startswith("weights_"))
+            layers = [(stored[f"weights_{layer}"], stored[f"biases_{layer}"]) for layer in range(number_of_layers)]
+            # the files written before the activations were stored are networks with ReLU units and no output activation
+            hidden_activation = str(stored["hidden_activation"]) if "hidden_activation" in stored.files else "relu"
+            output_activation = str(stored["output_activation"]) if "output_activation" in stored.files else "identity"
+            mean = stored["mean"] if "mean" in stored.files else None
+            scale = stored["scale"] if "scale" in stored.files else None
+        return NumpyNetwork(layers, hidden_activation=hidden_activation,  # type: ignore[arg-type]
+                            output_activation=output_activation, mean=mean, scale=scale)  # type: ignore[arg-type]
+
+    def save(self, location: pathlib.Path) -> None:
+        """
+        Store the network as NumPy arrays in a .npz file, creating the directory if needed.
+
+        :param location: (pathlib.Path): The file.
+        """
+        location.parent.mkdir(parents=True, exist_ok=True)
+        arrays: dict[str, Any] = {}
+        for layer, (weights, biases) in enumerate(self.layers):
+            arrays[f"weights_{layer}"] = weights
+            arrays[f"biases_{layer}"] = biases
+        if self.mean is not None and self.scale is not None:
+            arrays["mean"] = self.mean
+            arrays["scale"] = self.scale
+        with open(location, "wb") as network_file:
+            np.savez(network_file, hidden_activation=np.array(self.hidden_activation), output_activation=np.array(self.output_activation),
+                     **arrays)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the network.
+
+        :param features: (np.ndarray): The features, one row per sample.
+        :returns: (np.ndarray): The output for each row.
+        """
+        if self.mean is not None and self.scale is not None:
+            values = (features - self.mean) / self.scale
+        else:
+            # like scikit-learn, integer features are converted to floats first
+            values = np.asarray(features, dtype=np.float64)
+        last = len(self.layers) - 1
+        for layer, (weights, biases) in enumerate(self.layers):
+            values = values @ weights
+            values += biases
+            _activate(values, self.hidden_activation if layer < last else self.output_activation)
+        result: np.ndarray = values[:, 0]
+        return result
@@ -0,0 +1,41 @@
+from typing import Optional
+
+from schnapsen.game import Bot, GamePlayEngine, Move, PlayerPerspective
+from schnapsen.opening_book import OpeningBook
+
+
+class OpeningBookBot(Bot):
+    """
+    A bot playing the first move of a game from an opening book, see schnapsen.opening_book.
+
+    When the bot leads the first trick and the opening is in the book, the recommended move is played, which takes a constant time.
+    All other moves are delegated to the fallback bot, which can then spend its time on the moves which are not in the book.
+
+    The engine must be one for which the book is valid, see OpeningBook.supports. For other engines everything is delegated.
+    """
+
+    def __init__(self, opening_book: OpeningBook, fallback: Bot, name: Optional[str] = None) -> None:
+        """
+        Create a new OpeningBookBot.
+
+        :param opening_book: the opening book to look the first move up in
+        :param fallback: the bot used for all moves which are not in the book
+        :param name: the name of this Bot
+        """
+        super().__init__(name)
+        self.opening_book = opening_book
+        self.fallback = fallback
+        self.lookups = 0
+        """The number of moves which were found in the opening book, instead of delegated to the fallback bot"""
+        self.__supported: Optional[tuple[GamePlayEngine, bool]] = None
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        engine = perspective.get_engine()
+        if self.__supported is None or self.__supported[0] is not engine:
+            self.__supported = (engine, self.opening_book.supports(engine))
+        if self.__supported[1] and leader_move is None:
+            entry = self.opening_book.lookup(perspective)
+            if entry is not None and entry.move in perspective.valid_moves():
+                self.lookups += 1
+                return entry.move
+        return self.fallback.get_move(perspective, leader_move)
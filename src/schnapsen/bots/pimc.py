@@ -0,0 +1,131 @@
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Literal, Optional
+
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import Bot, GamePlayEngine, GamePhase, Move, PlayerPerspective
+from schnapsen.solver import DoubleDummySolver
+from schnapsen.transposition import SharedTranspositionTable
+
+
+class PIMCBot(Bot):
+    """
+    A bot using Perfect Information Monte Carlo search.
+
+    For each move, the bot samples a number of determinizations of the unknown cards with PlayerPerspective.make_assumptions.
+    Each determinization is a perfect information game, which is solved exactly until the end of the game by a DoubleDummySolver.
+    The move with the best result over all determinizations is played:
+
+    * "average": the move with the highest total value, i.e., the most game points on average
+    * "majority": the move which is the best one in most determinizations
+
+    In the second phase of the game, all cards are known, so the state is solved only once.
+
+    The determinizations can be solved in parallel, by a pool of worker processes. Each worker solves a contiguous part of the
+    samples, with its own solver. The solvers keep their transposition tables, so the endgames shared by many samples are solved
+    only once per worker. The chosen move does not depend on the number of processes.
+    Call close() to stop the worker processes when the bot is not needed anymore.
+
+    The solvers can also share a SharedTranspositionTable, with each other and with the solvers of other bots, also in other processes,
+    and across runs. The endgames are then looked up in that table when they are not in the own table of a solver.
+
+    The engine must follow the Schnapsen rules, see CompactEngine.supports.
+    """
+
+    def __init__(self, rand: random.Random, num_samples: int = 20, voting: Literal["average", "majority"] = "average",
+                 win_only: bool = False, processes: int = 1, name: Optional[str] = None,
+                 transposition_table: Optional[SharedTranspositionTable] = None) -> None:
+        """
+        Create a new PIMC bot.
+
+        :param rand: the source of randomness for this Bot
+        :param num_samples: how many determinizations to solve per move in the first phase
+        :param voting: how the results of the determinizations are combined, either "average" or "majority"
+        :param win_only: whether to only solve who wins each determinization, instead of how many game points. This is about twice as fast.
+        :param processes: the number of worker processes solving the determinizations. With 1, everything is done in this process.
+        :param name: the name of this Bot
+        :param transposition_table: a table shared by the solvers, or None for only the own tables of the solvers. All users of the table must use the same deck.
+        """
+        super().__init__(name)
+        assert num_samples >= 1, f"we cannot work with less than one sample, got {num_samples}"
+        assert voting in ("average", "majority"), f"Unknown voting {voting}"
+        assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+        self.__rand = rand
+        self.__num_samples = num_samples
+        self.__voting = voting
+        self.__win_only = win_only
+        self.__processes = processes
+        self.__transposition_table = transposition_table
+        self.__compact_engine: Optional[tuple[GamePlayEngine, CompactEngine]] = None
+        self.__solver: Optional[DoubleDummySolver] = None
+        self.__executor: Optional[Executor] = None
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = perspective.valid_moves()
+        # shuffle the moves, such that ties are broken randomly
+        self.__rand.shuffle(moves)
+        if len(moves) == 1:
+            return moves[0]
+        engine = self.__get_compact_engine(perspective.get_engine())
+        num_samples = 1 if perspective.get_phase() == GamePhase.TWO else self.__num_samples
+        states = engine.from_determinizations(perspective.make_assumptions(leader_move, num_samples, self.__rand), leader_move)
+
+        scores = dict.fromkeys(map(engine.encode_move, moves), 0)
+        for values in self.__solve(engine, states):
+            if self.__voting == "average":
+                for move, value in values.items():
+                    scores[move] += value
+            else:
+                best_value = max(values.values())
+                for move, value in values.items():
+                    if value == best_value:
+                        scores[move] += 1
+        return max(moves, key=lambda move: scores[engine.encode_move(move)])
+
+    def close(self) -> None:
+        """Stop the worker processes, if any. The bot can still be used afterwards, new workers are started when needed."""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __solve(self, engine: CompactEngine, states: list[CompactState]) -> list[dict[int, int]]:
+        """Solve all states, in parallel if we have more than one process."""
+        if self.__processes == 1 or len(states) == 1:
+            if self.__solver is None or self.__solver.engine is not engine:
+                self.__solver = DoubleDummySolver(engine, shared_table=self.__transposition_table)
+            results = [self.__solver.solve_moves(state, self.__win_only) for state in states]
+        else:
+            if self.__executor is None:
+                self.__executor = ProcessPoolExecutor(max_workers=self.__processes, initializer=_initialize_worker,
+                                                      initargs=(engine, self.__transposition_table))
+            chunk_size = -(-len(states) // self.__processes)
+            chunks = [states[start:start + chunk_size] for start in range(0, len(states), chunk_size)]
+            results = [values for chunk_values in self.__executor.map(_solve_in_worker, chunks, [self.__win_only] * len(chunks)) for values in chunk_values]
+        if self.__win_only:
+            # Only the sign of the values is exact. We drop the rest, such that the result does not depend on the contents of the transposition tables.
+            results = [{move: 1 if value > 0 else -1 for move, value in values.items()} for values in results]
+        return results
+
+    def __get_compact_engine(self, engine: GamePlayEngine) -> CompactEngine:
+        """Get the CompactEngine playing the same game as the engine. It is cached, since the engine is normally the same for all moves."""
+        if self.__compact_engine is None or self.__compact_engine[0] is not engine:
+            # the workers solve for the old engine, they are replaced
+            self.close()
+            self.__compact_engine = (engine, CompactEngine(engine))
+        return self.__compact_engine[1]
+
+
+_worker_solver: Optional[DoubleDummySolver] = None
+"""The solver of a worker process of a PIMCBot."""
+
+
+def _initialize_worker(engine: CompactEngine, shared_table: Optional[SharedTranspositionTable]) -> None:
+    """Create the solver of a worker process."""
+    global _worker_solver
+    _worker_solver = DoubleDummySolver(engine, shared_table=shared_table)
+
+
+def _solve_in_worker(states: list[CompactState], win_only: bool) -> list[dict[int, int]]:
+    """Solve the states in a worker process."""
+    assert _worker_solver is not None, "The worker process was not initialized"
+    return [_worker_solver.solve_moves(state, win_only) for state in states]
@@ -1,29 +1,86 @@
-from typing import Optional
+from typing import Callable, Literal, Optional, Sequence
 from schnapsen.game import Bot, PlayerPerspective, Move, GameState, GamePlayEngine
+from schnapsen.compact import CompactEngine, CompactState
+import math
 import random
 
 from .rand import RandBot
+from .rollout_policy import RolloutPolicy, play_rollouts
+
+RolloutEvaluator = Callable[[CompactEngine, list[CompactState], int], Sequence[float]]
+"""
+Scores the states reached by a batch of rollouts: gets the engine, the states and the player the states are evaluated for,
+and returns a value for each state. The higher the value, the better the state is for the player.
+"""
+
+
+def score_ratio_evaluator(engine: CompactEngine, states: list[CompactState], player: int) -> list[float]:
+    """
+    The classic rdeep heuristic: the share of the player in the direct points of both players.
+    A rollout can end before anyone scored, for instance after a trump exchange and closing the talon. Such a state is worth 0.5.
+    """
+    values = []
+    for state in states:
+        my_score = state.direct_points[player]
+        opponent_score = state.direct_points[1 - player]
+        values.append(my_score / (my_score + opponent_score) if my_score + opponent_score else 0.5)
+    return values
 
 
 class RdeepBot(Bot):
     """
     Rdeep bot is a bot which performs many random rollouts of the game to decide which move to play.
+
+    By default every valid move gets the same number of rollouts. Alternatively, the rollouts can be allocated
+    as a multi-armed bandit problem, which spends most of the budget on the promising moves:
+
+    * "uniform": every move gets num_samples rollouts (the classic rdeep behaviour)
+    * "ucb1": every move gets one rollout, the rest of the budget goes to the move with the highest UCB1 index
+    * "successive_halving": the budget is split over rounds, after each round the worst half of the moves is dropped
+
+    In all cases the total number of rollouts per decision is num_samples times the number of valid moves.
+
+    If the engine follows the standard Schnapsen rules, the rollouts are played on a CompactEngine instead of the full GamePlayEngine.
+    The outcome of the rollouts is identical, but they are much faster.
+
+    The states reached by the rollouts are scored by a RolloutEvaluator, by default the share of the bot in the direct points.
+    A better evaluator, like a trained value model (see schnapsen.bots.value_model), lets fewer and shallower rollouts play as well.
+    The moves in the rollouts are random, unless a RolloutPolicy is given (see schnapsen.bots.rollout_policy). The rollouts are then
+    advanced in lockstep, such that the policy chooses the moves of all rollouts of a step at once.
+    All rollouts which are played together are evaluated together, in one batch. Evaluators other than the default one and rollout
+    policies need the CompactEngine, so they can only be used for engines following the standard Schnapsen rules.
     """
-    def __init__(self, num_samples: int, depth: int, rand: random.Random, name: Optional[str] = None) -> None:
+    def __init__(self, num_samples: int, depth: int, rand: random.Random, name: Optional[str] = None,
+                 allocation: Literal["uniform", "ucb1", "successive_halving"] = "uniform",
+                 exploration: float = 0.3, fast_rollouts: bool = True, evaluator: Optional[RolloutEvaluator] = None,
+                 rollout_policy: Optional[RolloutPolicy] = None) -> None:
         """
         Create a new rdeep bot.
 
-        :param num_samples: how many samples to take per move
+        :param num_samples: how many samples to take per move. With a bandit allocation, this is the average number of samples per move.
         :param depth: how deep to sample
         :param rand: the source of randomness for this Bot
         :param name: the name of this Bot
+        :param allocation: how the rollouts are divided over the valid moves, one of "uniform", "ucb1" or "successive_halving"
+        :param exploration: the exploration constant used by the "ucb1" allocation. The heuristic values of the moves are close together,
+            so this is much smaller than the textbook sqrt(2)
+        :param fast_rollouts: whether to play the rollouts on a CompactEngine when the engine supports it
+        :param evaluator: scores the states reached by the rollouts, None for score_ratio_evaluator
+        :param rollout_policy: chooses the moves in the rollouts, None for random moves
         """
         super().__init__(name)
         assert num_samples >= 1, f"we cannot work with less than one sample, got {num_samples}"
         assert depth >= 1, f"it does not make sense to use a dept <1. got {depth}"
+        assert allocation in ("uniform", "ucb1", "successive_halving"), f"Unknown allocation {allocation}"
         self.__num_samples = num_samples
         self.__depth = depth
         self.__rand = rand
+        self.__allocation = allocation
+        self.__exploration = exploration
+        self.__fast_rollouts = fast_rollouts
+        self.__evaluator = evaluator
+        self.__rollout_policy = rollout_policy
+        self.__compact_engine: Optional[tuple[GamePlayEngine, Optional[CompactEngine]]] = None
 
     def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
         # get the list of valid moves, and shuffle it such
@@ -32,13 +89,19 @@ class RdeepBot(Bot):
         moves = perspective.valid_moves()
         self.__rand.shuffle(moves)
 
+        if self.__allocation != "uniform" and len(moves) == 1:
+            # a bandit allocation does not need to spend any rollouts on a forced move
+            return moves[0]
+        if self.__allocation == "ucb1":
+            return self.__get_move_ucb1(perspective, leader_move, moves)
+        if self.__allocation == "successive_halving":
+            return self.__get_move_successive_halving(perspective, leader_move, moves)
+
         best_score = float('-inf')
         best_move = None
-        for move in moves:
+        for move, scores in zip(moves, self.__sample(perspective, leader_move, moves, self.__num_samples)):
             sum_of_scores = 0.0
-            for _ in range(self.__num_samples):
-                gamestate = perspective.make_assumption(leader_move=leader_move, rand=self.__rand)
-                score = self.__evaluate(gamestate, perspective.get_engine(), leader_move, move)
+            for score in scores:
                 sum_of_scores += score
             average_score = sum_of_scores / self.__num_samples
             if average_score > best_score:
@@ -47,6 +110,102 @@ class RdeepBot(Bot):
         assert best_move is not None, "We went over all the moves, selecting the one we expect to lead to the highest average score. Simce there must have been at least one move at the start, this can never be None"
         return best_move
 
+    def __get_move_ucb1(self, perspective: PlayerPerspective, leader_move: Optional[Move], moves: list[Move]) -> Move:
+        """
+        Allocate the rollouts using UCB1. Each move is sampled once, after which every next rollout goes to the move with the highest
+        upper confidence bound. The move which was sampled most often is returned, ties are broken by the average score.
+        """
+        budget = self.__num_samples * len(moves)
+        sums = [scores[0] for scores in self.__sample(perspective, leader_move, moves, 1)]
+        counts = [1] * len(moves)
+        for total in range(len(moves), budget):
+            log_total = math.log(total)
+            best_index = max(range(len(moves)), key=lambda i: sums[i] / counts[i] + self.__exploration * math.sqrt(log_total / counts[i]))
+            sums[best_index] += self.__sample(perspective, leader_move, [moves[best_index]], 1)[0][0]
+            counts[best_index] += 1
+        chosen = max(range(len(moves)), key=lambda i: (counts[i], sums[i] / counts[i]))
+        return moves[chosen]
+
+    def __get_move_successive_halving(self, perspective: PlayerPerspective, leader_move: Optional[Move], moves: list[Move]) -> Move:
+        """
+        Allocate the rollouts using successive halving. The budget is divided evenly over ceil(log2(#moves)) rounds.
+        In each round, all remaining moves get the same number of rollouts, after which the worst half is discarded.
+        """
+        budget = self.__num_samples * len(moves)
+        rounds = max(1, math.ceil(math.log2(len(moves))))
+        sums = [0.0] * len(moves)
+        counts = [0] * len(moves)
+        remaining = list(range(len(moves)))
+        for _ in range(rounds):
+            samples_per_move = max(1, budget // (len(remaining) * rounds))
+            for index, scores in zip(remaining, self.__sample(perspective, leader_move, [moves[index] for index in remaining], samples_per_move)):
+                for score in scores:
+                    sums[index] += score
+                counts[index] += samples_per_move
+            # keep the best half; sorted is stable, so ties keep the (shuffled) move order
+            remaining = sorted(remaining, key=lambda i: sums[i] / counts[i], reverse=True)[:math.ceil(len(remaining) / 2)]
+            if len(remaining) == 1:
+                break
+        return moves[remaining[0]]
+
+    def __sample(self, perspective: PlayerPerspective, leader_move: Optional[Move], my_moves: list[Move], n: int) -> list[Sequence[float]]:
+        """
+        Perform n rollouts for each of my_moves, each starting from a random assumption about the unknown cards.
+
+        :returns: For each move, the values of the states reached by its rollouts, in the order of the rollouts
+        """
+        engine = perspective.get_engine()
+        compact_engine = self.__get_compact_engine(engine)
+        if compact_engine:
+            states = []
+            for my_move in my_moves:
+                for _ in range(n):
+                    gamestate = perspective.make_assumption(leader_move=leader_move, rand=self.__rand)
+                    states.append(self.__rollout_compact(gamestate, compact_engine, leader_move, my_move))
+            if self.__rollout_policy is not None:
+                # the rollouts were only started, all of them are played together
+                max_rounds = [self.__depth - rounds_played for _, rounds_played in states]
+                play_rollouts(compact_engine, [state for state, _ in states], max_rounds, self.__rollout_policy, self.__rand)
+            # the leader of the assumed gamestate is player 0 in the compact states
+            values = (self.__evaluator or score_ratio_evaluator)(compact_engine, [state for state, _ in states], 1 if leader_move else 0)
+            return [values[index * n:(index + 1) * n] for index in range(len(my_moves))]
+        assert self.__evaluator is None and self.__rollout_policy is None, \
+            "Evaluators and rollout policies need fast rollouts, on an engine supported by the CompactEngine"
+        results: list[Sequence[float]] = []
+        for my_move in my_moves:
+            move_values = []
+            for _ in range(n):
+                gamestate = perspective.make_assumption(leader_move=leader_move, rand=self.__rand)
+                move_values.append(self.__evaluate(gamestate, engine, leader_move, my_move))
+            results.append(move_values)
+        return results
+
+    def __get_compact_engine(self, engine: GamePlayEngine) -> Optional[CompactEngine]:
+        """
+        Get the CompactEngine playing the same game as the engine, or None if fast rollouts are disabled or not supported by the engine.
+        The CompactEngine is cached, since the engine is normally the same for all moves in a game.
+        """
+        if not self.__fast_rollouts:
+            return None
+        if self.__compact_engine is None or self.__compact_engine[0] is not engine:
+            self.__compact_engine = (engine, CompactEngine(engine) if CompactEngine.supports(engine) else None)
+        return self.__compact_engine[1]
+
+    def __rollout_compact(self, gamestate: GameState, compact_engine: CompactEngine, leader_move: Optional[Move],
+                          my_move: Move) -> tuple[CompactState, int]:
+        """
+        Does the same rollout as __evaluate, but plays it on the compact engine, and returns the state reached instead of its value.
+        The random number generator is used in exactly the same way, so the state is the same as the one reached by __evaluate.
+        With a rollout policy, only my_move is played, and the rest of the rollout is left to play_rollouts.
+
+        :returns: The state, and the number of rounds played in it
+        """
+        state = compact_engine.from_game_state(gamestate, leader_move)
+        rounds_played = 1 if compact_engine.play(state, compact_engine.encode_move(my_move)) else 0
+        if self.__rollout_policy is None:
+            rounds_played += compact_engine.random_playout(state, self.__depth - rounds_played, self.__rand)
+        return state, rounds_played
+
     def __evaluate(self, gamestate: GameState, engine: GamePlayEngine, leader_move: Optional[Move], my_move: Move) -> float:
         """
         Evaluates the value of the given state for the given player
@@ -79,7 +238,8 @@ class RdeepBot(Bot):
             my_score = new_game_state.follower.score.direct_points
             opponent_score = new_game_state.leader.score.direct_points
 
-        heuristic = my_score / (my_score + opponent_score)
+        # like score_ratio_evaluator, a rollout in which nobody scored is worth 0.5
+        heuristic = my_score / (my_score + opponent_score) if my_score + opponent_score else 0.5
         return heuristic
 
 
@@ -0,0 +1,268 @@
+"""
+In this module you will find a binary format for the replay memories of the MLDataBot, and the functions to write and read it.
+
+The text format writes every sample as a line "1, 0, 0, ... || 1", which train_ML_model parses back feature by feature. In the binary
+format every sample is a row of fixed width: the features followed by the label, each stored as one unsigned byte, or as a 16 bit
+integer. The file starts with a header of fixed size, which holds the magic bytes and, as JSON, the version of the format, the type of
+the values and the number of features. The number of rows is not stored: rows are only ever appended, and the file has as many rows as
+fit after the header. So writing a game is a single append, and reading the file memory-maps it, without parsing or copying anything.
+
+* append_replay_memory creates a replay memory file, or adds samples to the end of one.
+* open_replay_memory memory-maps the features and the labels of a replay memory file.
+* convert_text_replay_memory converts a replay memory in the text format to the binary format.
+* ReplayMemoryWriter collects the samples in memory, and appends them to a file in large blocks.
+
+The MLDataBot writes the binary format when it is created with replay_memory_format="binary", or with a ReplayMemoryWriter, and
+train_ML_model reads both formats.
+
+To generate a replay memory in parallel, every process writes its own shard, a file in the binary format named by shard_location,
+in the same directory. When all are done, write_replay_memory_manifest records the shards and their numbers of samples in a manifest,
+and merge_replay_memory_shards concatenates the shards listed in the manifest into one replay memory file.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import shutil
+from types import TracebackType
+from typing import Any, Literal, Optional
+
+import numpy as np
+
+_MAGIC = b"SCHNAPRM"
+_HEADER_SIZE = 1024
+"""The number of bytes before the first row in the file: the magic bytes followed by the header as JSON, padded with spaces."""
+VERSION = 1
+"""The version of the binary format written by this module."""
+ValueType = Literal["uint8", "int16"]
+"""The type of the values in the rows of a replay memory file."""
+_CONVERSION_ROWS = 10000
+"""The number of lines converted at once by convert_text_replay_memory."""
+MANIFEST_NAME = "manifest.json"
+"""The name of the manifest in a directory of shards."""
+
+
+def is_binary_replay_memory(location: pathlib.Path) -> bool:
+    """
+    Check whether a file is a replay memory in the binary format, rather than in the text format.
+
+    :param location: the file
+    :returns: whether the file starts with the magic bytes of the binary format
+    """
+    with open(location, "rb") as replay_memory_file:
+        return replay_memory_file.read(len(_MAGIC)) == _MAGIC
+
+
+def _read_header(location: pathlib.Path) -> dict[str, Any]:
+    with open(location, "rb") as replay_memory_file:
+        data = replay_memory_file.read(_HEADER_SIZE)
+    assert data[:len(_MAGIC)] == _MAGIC, f"{location} is not a binary replay memory file"
+    header: dict[str, Any] = json.loads(data[len(_MAGIC):].decode("ascii"))
+    assert header["version"] == VERSION, f"{location} has version {header['version']} of the format, only version {VERSION} can be read"
+    return header
+
+
+def _create(location: pathlib.Path, features: int, value_type: ValueType) -> None:
+    """Create an empty replay memory file, with only the header, and the directory if needed."""
+    header = json.dumps({"version": VERSION, "dtype": value_type, "features": features}).encode("ascii")
+    assert len(_MAGIC) + len(header) <= _HEADER_SIZE, "The header of the replay memory is too long"
+    location.parent.mkdir(parents=True, exist_ok=True)
+    with open(location, "wb") as replay_memory_file:
+        replay_memory_file.write((_MAGIC + header).ljust(_HEADER_SIZE, b" "))
+
+
+def append_replay_memory(location: pathlib.Path, features: np.ndarray, won: np.ndarray, value_type: ValueType = "uint8") -> None:
+    """
+    Append samples to a replay memory file in the binary format. The file is created if it does not exist yet.
+    The features of the MLDataBot are small counts and one-hot encodings, which fit in an unsigned byte.
+
+    :param location: the file
+    :param features: the features of the samples, one row per sample
+    :param won: the label of each sample, whether the bot won the game
+    :param value_type: the type of the values, if the file is created. Otherwise, the type of the existing file is used.
+    """
+    assert features.ndim == 2, f"Expected one row of features per sample, got an array of shape {features.shape}"
+    assert len(features) == len(won), f"Got {len(features)} samples of features, but {len(won)} labels"
+    if not location.exists():
+        _create(location, features.shape[1], value_type)
+    header = _read_header(location)
+    assert features.shape[1] == header["features"], f"{location} has {header['features']} features, got {features.shape[1]}"
+    dtype = np.dtype(header["dtype"])
+    rows = np.empty((len(features), header["features"] + 1), dtype=dtype)
+    limits = np.iinfo(dtype)
+    if len(features):
+        assert limits.min <= features.min() and features.max() <= limits.max, f"The features do not fit in the {dtype} values of {location}"
+    rows[:, :-1] = features
+    rows[:, -1] = won
+    with open(location, "ab") as replay_memory_file:
+        replay_memory_file.write(rows.tobytes())
+
+
+def _samples(location: pathlib.Path, header: dict[str, Any]) -> int:
+    """The number of samples in a replay memory file, from its size."""
+    row_size = (header["features"] + 1) * np.dtype(header["dtype"]).itemsize
+    data_size = location.stat().st_size - _HEADER_SIZE
+    assert data_size % row_size == 0, f"{location} ends with an incomplete row"
+    samples: int = data_size // row_size
+    return samples
+
+
+def open_replay_memory(location: pathlib.Path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Memory-map a replay memory file in the binary format. Nothing is read until the arrays are used, and slicing them does not copy.
+
+    :param location: the file
+    :returns: the features of the samples, one row per sample, and the label of each sample
+    """
+    header = _read_header(location)
+    samples = _samples(location, header)
+    if samples == 0:
+        # an empty region cannot be memory-mapped
+        rows = np.zeros((0, header["features"] + 1), dtype=header["dtype"])
+    else:
+        rows = np.memmap(location, dtype=header["dtype"], mode="r", offset=_HEADER_SIZE, shape=(samples, header["features"] + 1))
+    return rows[:, :-1], rows[:, -1]
+
+
+def convert_text_replay_memory(text_location: pathlib.Path, binary_location: pathlib.Path, value_type: ValueType = "uint8") -> int:
+    """
+    Convert a replay memory in the text format of the MLDataBot to the binary format. The samples are appended to the binary file.
+
+    :param text_location: the file in the text format
+    :param binary_location: the file in the binary format
+    :param value_type: the type of the values, if the binary file is created
+    :returns: the number of samples converted
+    """
+    with ReplayMemoryWriter(binary_location, value_type, buffer_rows=_CONVERSION_ROWS) as writer, open(text_location, "r") as text_file:
+        for line in text_file:
+            feature_string, won_label_str = line.split("||")
+            writer.write(np.array([[int(feature) for feature in feature_string.split(",")]]), np.array([int(won_label_str)]))
+    return writer.samples
+
+
+class ReplayMemoryWriter:
+    """
+    Writes samples to a replay memory file in the binary format, in large blocks. The samples are kept in memory until there are
+    buffer_rows of them, and then appended to the file at once, so the file is opened once per block instead of once per game.
+    All bots recording into the same file in a process must share one writer. Samples still in memory are only written by flush or
+    close, so the writer has to be closed when the games are done, for instance by using it in a with statement.
+    """
+
+    def __init__(self, location: pathlib.Path, value_type: ValueType = "uint8", buffer_rows: int = 100000) -> None:
+        """
+        Create a new ReplayMemoryWriter. Nothing is written until the first block is full.
+
+        :param location: the file to append the samples to, it is created if it does not exist yet
+        :param value_type: the type of the values, if the file is created
+        :param buffer_rows: the number of samples kept in memory before they are written
+        """
+        assert buffer_rows >= 1, f"we cannot buffer less than one row, got {buffer_rows}"
+        self.location = location
+        self.value_type = value_type
+        self.buffer_rows = buffer_rows
+        self.samples = 0
+        """The number of samples given to the writer, including those which are not written yet."""
+        self.__features: list[np.ndarray] = []
+        self.__won: list[np.ndarray] = []
+        self.__buffered = 0
+
+    def write(self, features: np.ndarray, won: np.ndarray) -> None:
+        """
+        Add samples. They are written when the block is full.
+
+        :param features: the features of the samples, one row per sample
+        :param won: the label of each sample, whether the bot won the game
+        """
+        assert len(features) == len(won), f"Got {len(features)} samples of features, but {len(won)} labels"
+        self.__features.append(features)
+        self.__won.append(won)
+        self.__buffered += len(features)
+        self.samples += len(features)
+        if self.__buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the samples kept in memory to the file."""
+        if self.__buffered:
+            append_replay_memory(self.location, np.concatenate(self.__features), np.concatenate(self.__won), self.value_type)
+        self.__features = []
+        self.__won = []
+        self.__buffered = 0
+
+    def close(self) -> None:
+        """Write the samples which are still kept in memory."""
+        self.flush()
+
+    def __enter__(self) -> ReplayMemoryWriter:
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+
+def shard_location(directory: pathlib.Path, shard: int) -> pathlib.Path:
+    """
+    The file of a shard in a directory of shards.
+
+    :param directory: the directory of the shards
+    :param shard: the number of the shard, for instance the number of the process writing it
+    :returns: the file of the shard
+    """
+    return directory / f"shard_{shard:05d}.bin"
+
+
+def write_replay_memory_manifest(directory: pathlib.Path) -> dict[str, Any]:
+    """
+    Write the manifest of a directory of shards, after all shards are written. It lists the shards in order, with their number of
+    samples, and the format they share.
+
+    :param directory: the directory of the shards
+    :returns: the manifest
+    """
+    shards: list[dict[str, Any]] = []
+    header: Optional[dict[str, Any]] = None
+    for location in sorted(directory.glob("shard_*.bin")):
+        shard_header = _read_header(location)
+        if header is None:
+            header = shard_header
+        assert (shard_header["dtype"], shard_header["features"]) == (header["dtype"], header["features"]), \
+            f"{location} has {shard_header['features']} {shard_header['dtype']} features, the other shards {header['features']} {header['dtype']}"
+        shards.append({"file": location.name, "samples": _samples(location, shard_header)})
+    assert header is not None, f"There are no shards in {directory}"
+    manifest = {"version": VERSION, "dtype": header["dtype"], "features": header["features"], "shards": shards,
+                "samples": sum(shard["samples"] for shard in shards)}
+    with open(directory / MANIFEST_NAME, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+    return manifest
+
+
+def merge_replay_memory_shards(directory: pathlib.Path, location: pathlib.Path) -> int:
+    """
+    Concatenate the shards listed in the manifest of a directory into one replay memory file, in the order of the manifest.
+    The samples are appended if the file exists already. The shards are checked against the manifest first, such that a shard which is
+    missing, or which changed after the manifest was written, is noticed.
+
+    :param directory: the directory of the shards, with a manifest from write_replay_memory_manifest
+    :param location: the replay memory file to write
+    :returns: the number of samples merged
+    """
+    with open(directory / MANIFEST_NAME) as manifest_file:
+        manifest: dict[str, Any] = json.load(manifest_file)
+    assert manifest["version"] == VERSION, f"The manifest has version {manifest['version']} of the format, only version {VERSION} can be read"
+    for shard in manifest["shards"]:
+        shard_file_location = directory / shard["file"]
+        samples = _samples(shard_file_location, _read_header(shard_file_location))
+        assert samples == shard["samples"], f"{shard_file_location} has {samples} samples, the manifest {shard['samples']}"
+    if not location.exists():
+        _create(location, manifest["features"], manifest["dtype"])
+    header = _read_header(location)
+    assert (header["dtype"], header["features"]) == (manifest["dtype"], manifest["features"]), \
+        f"{location} has {header['features']} {header['dtype']} features, the shards {manifest['features']} {manifest['dtype']}"
+    with open(location, "ab") as replay_memory_file:
+        for shard in manifest["shards"]:
+            with open(directory / shard["file"], "rb") as shard_file:
+                shard_file.seek(_HEADER_SIZE)
+                shutil.copyfileobj(shard_file, replay_memory_file)
+    merged: int = manifest["samples"]
+    return merged
@@ -0,0 +1,186 @@
+"""
+In this module you will find rollout policies for the RdeepBot, which choose the moves in the rollouts instead of picking them at random.
+
+The rollouts of all moves and samples are advanced in lockstep by play_rollouts: at every step, each unfinished rollout needs one move,
+and the policy chooses all of them in a single call. A policy which evaluates a neural network, like DistilledRolloutPolicy, does one
+forward pass for all rollouts, instead of one for every move in every rollout.
+
+* greedy_rollout_policy is a cheap heuristic: declare marriages, and win tricks as cheaply as possible.
+* DistilledRolloutPolicy plays the moves of a policy trained by train_distilled_policy, like the DistilledBot.
+"""
+
+import pathlib
+import random
+from typing import Callable
+
+import numpy as np
+
+from schnapsen.compact import CLOSE_TALON, EXCHANGE, MARRIAGE_OFFSET, CompactEngine, CompactState
+from schnapsen.deck import Rank
+from .ml_bot import get_one_hot_encoding_of_card_rank, get_one_hot_encoding_of_card_suit
+from .ml_features import MOVE_FEATURES, STATE_FEATURES
+from .numpy_network import NumpyNetwork
+from .value_model import compact_state_feature_vectors
+
+RolloutPolicy = Callable[[CompactEngine, list[CompactState], list[list[int]], random.Random], list[int]]
+"""
+Chooses the moves of a step of the rollouts: gets the engine, the states, the legal moves of the player to move in each state and a
+source of randomness, and returns one of the legal moves for each state.
+"""
+
+
+def play_rollouts(engine: CompactEngine, states: list[CompactState], max_rounds: list[int], policy: RolloutPolicy, rand: random.Random) -> None:
+    """
+    Play the rollouts in lockstep, each for at most the given number of rounds, or until its game ended. The states are modified.
+    Rounds are counted like CompactEngine.random_playout does: a trick, a trump exchange and closing the talon are one round each.
+
+    :param engine: the engine which created the states
+    :param states: the states to start from
+    :param max_rounds: for each state, the largest number of rounds to play
+    :param policy: chooses the moves
+    :param rand: the source of randomness given to the policy
+    """
+    remaining = list(max_rounds)
+    active = [index for index in range(len(states)) if remaining[index] > 0]
+    while active:
+        playing = []
+        for index in active:
+            state = states[index]
+            if state.leader_move is None and engine.winner(state) is not None:
+                continue
+            playing.append(index)
+        if not playing:
+            return
+        moves = policy(engine, [states[index] for index in playing], [engine.legal_moves(states[index]) for index in playing], rand)
+        active = []
+        for index, move in zip(playing, moves):
+            if engine.play(states[index], move):
+                remaining[index] -= 1
+            if remaining[index] > 0:
+                active.append(index)
+
+
+def greedy_rollout_policy(engine: CompactEngine, states: list[CompactState], moves: list[list[int]], rand: random.Random) -> list[int]:
+    """
+    A simple heuristic policy. The leader declares the marriage worth most if it has one, exchanges the trump jack if it can, and
+    otherwise plays a random card; it never closes the talon. The follower wins the trick with its cheapest winning card, and otherwise
+    throws its cheapest card, preferring cards which are not trumps. Ties are broken at random.
+    """
+    points = engine.points
+    suit_of = engine.suit_of
+    chosen = []
+    for state, legal in zip(states, moves):
+        trump = state.trump
+        if state.leader_move is None:
+            marriages = [move for move in legal if move >= MARRIAGE_OFFSET]
+            if marriages:
+                chosen.append(max(marriages, key=lambda move: suit_of[move - MARRIAGE_OFFSET] == trump))
+            elif EXCHANGE in legal:
+                chosen.append(EXCHANGE)
+            else:
+                chosen.append(rand.choice([move for move in legal if move >= 0]))
+            continue
+        leader_move = state.leader_move
+        # the king of a marriage is the card which is played
+        leader_card = engine.king_of_suit[suit_of[leader_move - MARRIAGE_OFFSET]] if leader_move >= MARRIAGE_OFFSET else leader_move
+        assert leader_card is not None
+        leader_suit = suit_of[leader_card]
+        if leader_suit == trump:
+            winning = [card for card in legal if suit_of[card] == trump and points[card] > points[leader_card]]
+        else:
+            winning = [card for card in legal if suit_of[card] == trump or (suit_of[card] == leader_suit and points[card] > points[leader_card])]
+        candidates = winning if winning else legal
+        cheapest = min((points[card], suit_of[card] == trump) for card in candidates)
+        chosen.append(rand.choice([card for card in candidates if (points[card], suit_of[card] == trump) == cheapest]))
+    return chosen
+
+
+class DistilledRolloutPolicy:
+    """
+    A RolloutPolicy playing the move with the highest score of a policy trained by train_distilled_policy, like the DistilledBot does.
+    The moves of all states are scored in one forward pass. The features of the moves are those of get_candidate_feature_vectors,
+    computed on the CompactStates, so the cards of the opponent shown in a marriage or a trump exchange are unknown in the first phase.
+    """
+
+    def __init__(self, policy_location: pathlib.Path) -> None:
+        """
+        Create a new DistilledRolloutPolicy.
+
+        :param policy_location: the file with the policy from train_distilled_policy
+        """
+        assert policy_location.exists(), f"Policy could not be found at: {policy_location}"
+        self.__policy = NumpyNetwork.load(policy_location)
+        self.__move_features: dict[int, tuple[CompactEngine, np.ndarray]] = {}
+
+    def __move_feature_table(self, engine: CompactEngine) -> np.ndarray:
+        """
+        The features of get_move_feature_vector of every encoded move, for the trump exchange one row per trump suit.
+        Rows 0 to the number of cards are the regular moves, followed by the marriages, the exchanges and one row of zeros.
+        """
+        cached = self.__move_features.get(id(engine))
+        # the engine is kept in the cache, such that its id is not reused
+        if cached is None or cached[0] is not engine:
+            cards = len(engine.cards)
+            table = np.zeros((2 * cards + len(engine.suits) + 1, MOVE_FEATURES), dtype=np.int16)
+            for index, card in enumerate(engine.cards):
+                encoding = get_one_hot_encoding_of_card_rank(card.rank) + get_one_hot_encoding_of_card_suit(card.suit)
+                table[index] = [1, 0, 0] + encoding
+                table[cards + index] = [0, 0, 1] + encoding
+            for suit_index, suit in enumerate(engine.suits):
+                table[2 * cards + suit_index] = [0, 1, 0] + get_one_hot_encoding_of_card_rank(Rank.JACK) + get_one_hot_encoding_of_card_suit(suit)
+            cached = self.__move_features[id(engine)] = (engine, table)
+        return cached[1]
+
+    def scores(self, engine: CompactEngine, states: list[CompactState], moves: list[list[int]]) -> np.ndarray:
+        """
+        The scores of the legal moves of all states, the higher the score the more likely the teacher would have played the move.
+
+        :param engine: the engine which created the states
+        :param states: the states
+        :param moves: the legal moves of the player to move in each state
+        :returns: the scores of all moves, in the order of the states and their moves
+        """
+        table = self.__move_feature_table(engine)
+        cards = len(engine.cards)
+        no_move = len(table) - 1
+
+        def row(move: int, trump: int) -> int:
+            if move == EXCHANGE:
+                return 2 * cards + trump
+            if move == CLOSE_TALON:
+                return no_move
+            if move >= MARRIAGE_OFFSET:
+                return cards + move - MARRIAGE_OFFSET
+            return move
+
+        counts = [len(legal) for legal in moves]
+        # the features of a state depend on the player to move, the states are featurized in two batches
+        state_features = np.zeros((len(states), STATE_FEATURES), dtype=np.int16)
+        for player in (0, 1):
+            rows = [index for index, state in enumerate(states) if state.to_move() == player]
+            if rows:
+                state_features[rows] = compact_state_feature_vectors(engine, [states[index] for index in rows], player)
+        leader_rows = []
+        follower_rows = []
+        close = []
+        for state, legal in zip(states, moves):
+            for move in legal:
+                if state.leader_move is None:
+                    leader_rows.append(row(move, state.trump))
+                    follower_rows.append(no_move)
+                else:
+                    leader_rows.append(row(state.leader_move, state.trump))
+                    follower_rows.append(row(move, state.trump))
+                close.append(move == CLOSE_TALON)
+        features = np.concatenate([np.repeat(state_features, counts, axis=0), table[leader_rows], table[follower_rows],
+                                   np.array(close, dtype=np.int16)[:, None]], axis=1)
+        return self.__policy(features)
+
+    def __call__(self, engine: CompactEngine, states: list[CompactState], moves: list[list[int]], rand: random.Random) -> list[int]:
+        scores = self.scores(engine, states, moves)
+        chosen = []
+        start = 0
+        for legal in moves:
+            chosen.append(legal[int(np.argmax(scores[start:start + len(legal)]))])
+            start += len(legal)
+        return chosen
@@ -0,0 +1,76 @@
+from typing import Optional
+
+from schnapsen.bots.alphabeta import AlphaBetaBot
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import Bot, GamePlayEngine, GamePhase, Move, PlayerPerspective
+from schnapsen.tablebase import Tablebase
+
+
+class TablebaseBot(Bot):
+    """
+    A bot playing the second phase of the game with an endgame tablebase, see schnapsen.tablebase.
+
+    If the positions after the current trick are in the tablebase, the bot plays every possible trick on a CompactEngine and looks the
+    result up, instead of searching. This takes a constant time. All other positions, like the ones with more cards in the hands or with a
+    closed talon, are delegated to the fallback bot, which is by default an AlphaBetaBot using the same tablebase to end its search early.
+    Like the AlphaBetaBot, this bot cannot be used for the first phase.
+
+    The engine must be one for which the tablebase is valid, see Tablebase.supports. For other engines everything is delegated.
+    """
+
+    def __init__(self, tablebase: Tablebase, fallback: Optional[Bot] = None, name: Optional[str] = None) -> None:
+        """
+        Create a new TablebaseBot.
+
+        :param tablebase: the tablebase to look positions up in
+        :param fallback: the bot used for positions which are not in the tablebase, None for an AlphaBetaBot with the same tablebase
+        :param name: the name of this Bot
+        """
+        super().__init__(name)
+        self.tablebase = tablebase
+        self.fallback = fallback if fallback is not None else AlphaBetaBot(tablebase=tablebase)
+        self.lookups = 0
+        """The number of moves which were found with the tablebase, instead of delegated to the fallback bot"""
+        self.__compact_engine: Optional[tuple[GamePlayEngine, Optional[CompactEngine]]] = None
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        assert (perspective.get_phase() == GamePhase.TWO), "TablebaseBot can only work in the second phase of the game."
+        engine = self.__get_compact_engine(perspective.get_engine())
+        if engine is not None:
+            moves = perspective.valid_moves()
+            state = engine.from_game_state(perspective.get_state_in_phase_two(), leader_move)
+            me = state.to_move()
+            best_value: Optional[int] = None
+            best_move = moves[0]
+            for move in moves:
+                value = self.__move_value(engine, state, engine.encode_move(move), me)
+                if value is None:
+                    best_value = None
+                    break
+                if best_value is None or value > best_value:
+                    best_value, best_move = value, move
+            if best_value is not None:
+                self.lookups += 1
+                return best_move
+        return self.fallback.get_move(perspective, leader_move)
+
+    def __move_value(self, engine: CompactEngine, state: CompactState, move: int, me: int) -> Optional[int]:
+        """The game points for me after playing the move, assuming the best play of the opponent. None if a position is not in the tablebase."""
+        after_move = state.copy()
+        if not engine.play(after_move, move):
+            # we are the leader, the follower picks the reply which is worst for us
+            values = [self.__move_value(engine, after_move, reply, me) for reply in engine.legal_moves(after_move)]
+            return None if None in values else min(value for value in values if value is not None)
+        winner = engine.winner(after_move)
+        if winner is not None:
+            return winner[1] if winner[0] == me else -winner[1]
+        value = self.tablebase.lookup_compact(engine, after_move)
+        if value is None:
+            return None
+        return value if after_move.leader == me else -value
+
+    def __get_compact_engine(self, engine: GamePlayEngine) -> Optional[CompactEngine]:
+        """Get the CompactEngine playing the same game as the engine, or None if the tablebase is not valid for the engine."""
+        if self.__compact_engine is None or self.__compact_engine[0] is not engine:
+            self.__compact_engine = (engine, CompactEngine(engine) if Tablebase.supports(engine) else None)
+        return self.__compact_engine[1]
@@ -0,0 +1,186 @@
+"""
+In this module you will find a learned leaf evaluator for the RdeepBot: a value model which estimates the probability that a player
+wins the game from a state reached by a rollout, instead of looking only at the share of the direct points.
+
+1. generate_value_data plays games with random moves on the CompactEngine, and records the features of every state between two
+   tricks, for both players, together with whether that player won the game.
+2. train_value_model trains a small neural network on them, and stores the weights as NumPy arrays, like train_distilled_policy.
+3. ValueModelEvaluator is a RolloutEvaluator for the RdeepBot. It evaluates all rollouts of a move in one batch.
+
+The features of a state are those of get_state_feature_vector, computed directly on CompactStates, see compact_state_feature_vectors.
+"""
+
+import pathlib
+import random
+from typing import Optional, Sequence
+
+import numpy as np
+
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import SchnapsenDeckGenerator, SchnapsenGamePlayEngine
+from schnapsen.parallel import map_in_processes, split
+from .ml_features import STATE_FEATURES
+from .numpy_network import NumpyNetwork
+
+_FEATURE_DECK = list(SchnapsenDeckGenerator().get_initial_deck())
+_CARD_FEATURES = 6
+"""The number of features of each card, a one-hot encoding of where the card is."""
+# the slot of the one in the one-hot encoding of a card, see get_state_feature_vector
+_UNKNOWN, _TRUMP_CARD, _OPPONENT_WON, _OPPONENT_KNOWN, _MY_WON, _MY_HAND = range(_CARD_FEATURES)
+_CARD_BITS: dict[int, tuple[CompactEngine, np.ndarray]] = {}
+
+
+def _card_bits(engine: CompactEngine) -> np.ndarray:
+    """For each card of the feature deck, its bit in the bitmasks of the engine, or 0 if the deck of the engine does not have the card."""
+    cached = _CARD_BITS.get(id(engine))
+    # the engine is kept in the cache, such that its id is not reused
+    if cached is None or cached[0] is not engine:
+        bits = np.array([1 << engine.index[card] if card in engine.index else 0 for card in _FEATURE_DECK], dtype=np.int64)
+        cached = _CARD_BITS[id(engine)] = (engine, bits)
+    return cached[1]
+
+
+def compact_state_feature_vectors(engine: CompactEngine, states: list[CompactState], player: int) -> np.ndarray:
+    """
+    The feature vectors of get_state_feature_vector for CompactStates, seen by one of the players, for many states at once.
+    In the middle of a trick, the card played by the leader is still in its hand, like in the GameState seen by the follower.
+    A CompactState does not remember which cards of the opponent were shown in a marriage or
+    a trump exchange, so in the first phase all cards in the hand of the opponent are unknown. Apart from that, the features are the
+    same as those of the perspective of the player.
+
+    :param engine: the engine which created the states
+    :param states: the states
+    :param player: the player who sees the states, 0 or 1
+    :returns: an integer array of shape (len(states), number of features)
+    """
+    features = np.zeros((len(states), STATE_FEATURES), dtype=np.int16)
+    opponent = 1 - player
+    # the bits of the cards which are in the hand of the player, in the hands of the opponent and which are the trump card
+    hands = np.zeros(len(states), dtype=np.int64)
+    opponent_hands = np.zeros(len(states), dtype=np.int64)
+    trump_cards = np.zeros(len(states), dtype=np.int64)
+    won_cards = np.array([state.won_cards[player] for state in states], dtype=np.int64)
+    opponent_won_cards = np.array([state.won_cards[opponent] for state in states], dtype=np.int64)
+    for row, state in enumerate(states):
+        phase_two = not state.talon or state.is_talon_closed
+        for card in state.hands[player]:
+            hands[row] |= 1 << card
+        if phase_two:
+            for card in state.hands[opponent]:
+                opponent_hands[row] |= 1 << card
+        if state.talon:
+            trump_cards[row] = 1 << state.talon[-1]
+        features[row, 0] = state.direct_points[player]
+        features[row, 1] = state.pending_points[player]
+        features[row, 2] = state.direct_points[opponent]
+        features[row, 3] = state.pending_points[opponent]
+        # the one-hot encoding of the suits is in the reverse order of the Suit enum
+        features[row, 7 - state.trump] = 1
+        features[row, 8 if phase_two else 9] = 1
+        features[row, 10] = len(state.talon)
+        features[row, 12 if state.leader == player else 11] = 1
+
+    bits = _card_bits(engine)
+    slots = np.full((len(states), len(_FEATURE_DECK)), _UNKNOWN)
+    # from the lowest to the highest priority, like the order of the checks in get_state_feature_vector reversed
+    for masks, slot in ((trump_cards, _TRUMP_CARD), (opponent_won_cards, _OPPONENT_WON), (opponent_hands, _OPPONENT_KNOWN),
+                        (won_cards, _MY_WON), (hands, _MY_HAND)):
+        slots[(masks[:, None] & bits) != 0] = slot
+    columns = 13 + _CARD_FEATURES * np.arange(len(_FEATURE_DECK))
+    features[np.arange(len(states))[:, None], columns + slots] = 1
+    return features
+
+
+def _play_random_games(seeds: Sequence[int]) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """Play one game with random moves for each seed, and return the features of the states and whether the player won."""
+    engine = CompactEngine(SchnapsenGamePlayEngine())
+    features: list[np.ndarray] = []
+    won: list[np.ndarray] = []
+    for seed in seeds:
+        rng = random.Random(seed)
+        deck = list(range(len(engine.cards)))
+        rng.shuffle(deck)
+        state = CompactState(hands=[deck[0:10:2], deck[1:11:2]], talon=deck[10:], trump=engine.suit_of[deck[-1]],
+                             direct_points=[0, 0], pending_points=[0, 0], won_cards=[0, 0])
+        states = []
+        outcome = engine.winner(state)
+        while outcome is None:
+            states.append(state.copy())
+            engine.random_playout(state, 1, rng)
+            outcome = engine.winner(state)
+        winner, _ = outcome
+        for player in (0, 1):
+            features.append(compact_state_feature_vectors(engine, states, player))
+            won.append(np.full(len(states), player == winner))
+    return features, won
+
+
+def generate_value_data(games: int, processes: int = 1, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Play games with random moves and record the states between the tricks, seen by both players, and who won.
+    Random play is what the rollouts of the RdeepBot do, so this is the value the leaf evaluator has to estimate.
+    Game i is dealt and played with seed + i, so the result does not depend on the number of processes.
+
+    :param games: the number of games to play
+    :param processes: the number of worker processes playing the games. With 1, everything is done in this process.
+    :param seed: the seed of the first game
+    :returns: the features of the states, one row per state and player, and whether that player won the game
+    """
+    assert games >= 1, f"we cannot work with less than one game, got {games}"
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    results = map_in_processes(_play_random_games, processes, split(range(seed, seed + games), processes))
+    features = [game for chunk_features, _ in results for game in chunk_features]
+    won = [game for _, chunk_won in results for game in chunk_won]
+    return np.concatenate(features), np.concatenate(won)
+
+
+def train_value_model(features: np.ndarray, won: np.ndarray, model_location: pathlib.Path,
+                      hidden_layer_sizes: tuple[int, ...] = (64,), max_iter: int = 200, seed: int = 0) -> None:
+    """
+    Train the value model of a ValueModelEvaluator on the data from generate_value_data, and store it.
+    The model is a neural network with ReLU units classifying whether the player wins. The features are standardized first.
+
+    :param features: the features of the states, one row per state
+    :param won: whether the player won the game
+    :param model_location: the file to store the weights of the network in, as NumPy arrays
+    :param hidden_layer_sizes: the number of units in each hidden layer
+    :param max_iter: the largest number of epochs of training
+    :param seed: the seed of the initial weights and of the batches
+    """
+    NumpyNetwork.train(features, won, hidden_layer_sizes, max_iter, seed).save(model_location)
+
+
+class ValueModelEvaluator:
+    """
+    A RolloutEvaluator for the RdeepBot, which scores a state by the probability that the player wins, estimated by the model
+    trained by train_value_model. The network is evaluated with NumPy, for all states at once. Games which ended are scored 1 if the
+    player won and 0 otherwise.
+    """
+
+    def __init__(self, model_location: pathlib.Path) -> None:
+        """
+        Create a new ValueModelEvaluator.
+
+        :param model_location: the file with the model from train_value_model
+        """
+        assert model_location.exists(), f"Model could not be found at: {model_location}"
+        self.__model = NumpyNetwork.load(model_location)
+
+    def win_probabilities(self, engine: CompactEngine, states: list[CompactState], player: int) -> np.ndarray:
+        """
+        The probability that the player wins from each of the states, according to the model. It does not check whether the games ended.
+
+        :param engine: the engine which created the states
+        :param states: the states
+        :param player: the player, 0 or 1
+        :returns: the probability for each state
+        """
+        return self.__model(compact_state_feature_vectors(engine, states, player))
+
+    def __call__(self, engine: CompactEngine, states: list[CompactState], player: int) -> list[float]:
+        values: list[float] = self.win_probabilities(engine, states, player).tolist()
+        for index, state in enumerate(states):
+            outcome: Optional[tuple[int, int]] = engine.winner(state)
+            if outcome is not None:
+                values[index] = 1.0 if outcome[0] == player else 0.0
+        return values
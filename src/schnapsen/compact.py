@@ -0,0 +1,482 @@
+"""
+In this module you will find a compact, perfect-information representation of a game of Schnapsen, together with an engine
+which plays moves on it.
+
+The GamePlayEngine in schnapsen.game is built for clarity and for safety against misbehaving bots: every trick copies the
+GameState, creates perspectives for the bots, validates the moves and links the history. That is too much work for bots which
+simulate thousands of games per move. The CompactEngine implements exactly the same rules on a CompactState, in which cards
+are small integers, moves are encoded as integers and the state is modified in place.
+
+For a uniformly random policy, a rollout on the CompactEngine consumes the random number generator in the same way as
+RandBot does on the GamePlayEngine, hence the outcomes are identical for the same random stream.
+"""
+
+from __future__ import annotations
+
+from random import Random
+from typing import Optional, cast
+
+import numpy as np
+
+from .deck import Card, Rank, Suit, index_by_id, value_by_id
+from .game import (
+    DeterminizationBatch,
+    GamePlayEngine,
+    GameState,
+    Marriage,
+    Move,
+    RegularMove,
+    SchnapsenMoveValidator,
+    SchnapsenTrickImplementer,
+    SchnapsenTrickScorer,
+    TrumpExchange,
+    CloseTalon,
+)
+
+EXCHANGE = -1
+"""The encoding of a trump exchange move. The jack is always the jack of the trump suit."""
+CLOSE_TALON = -2
+"""The encoding of a close talon move."""
+MARRIAGE_OFFSET = 64
+"""Marriages are encoded as MARRIAGE_OFFSET plus the index of the queen. Regular moves are encoded as the index of the card."""
+
+
+class CompactState:
+    """
+    The complete state of a game, in a form which is cheap to copy and to modify.
+    Cards are represented by their index in the deck of the CompactEngine which created this state.
+    The two players are called 0 and 1. When a state is created from a GameState, the leader of that GameState is player 0.
+
+    :attr hands: The cards in the hand of player 0 and player 1, in the same order as the Hand in the GameState.
+    :attr talon: The cards on the talon. The first card is the top card, the last one is the trump card.
+    :attr trump: The index of the trump suit (the position of the suit in the Suit enum).
+    :attr direct_points: The direct points of player 0 and player 1.
+    :attr pending_points: The pending points of player 0 and player 1.
+    :attr won_cards: For player 0 and player 1 a bitmask of the indices of the cards they won.
+    :attr leader: The player leading the current trick.
+    :attr leader_move: The encoded move the leader already played in the current trick, or None if the leader still has to play.
+    :attr is_talon_closed: Whether the talon has been closed.
+    :attr leader_changed_since_close: Whether the leader changed in any trick after the talon was closed.
+    :attr non_closer_had_won_cards: Whether the player who did not close the talon had won any cards at the time of closing. None if unknown.
+    """
+
+    __slots__ = ("hands", "talon", "trump", "direct_points", "pending_points", "won_cards", "leader", "leader_move",
+                 "is_talon_closed", "leader_changed_since_close", "non_closer_had_won_cards")
+
+    def __init__(self, hands: list[list[int]], talon: list[int], trump: int, direct_points: list[int], pending_points: list[int],
+                 won_cards: list[int], leader: int = 0, leader_move: Optional[int] = None, is_talon_closed: bool = False,
+                 leader_changed_since_close: bool = False, non_closer_had_won_cards: Optional[bool] = None) -> None:
+        self.hands = hands
+        self.talon = talon
+        self.trump = trump
+        self.direct_points = direct_points
+        self.pending_points = pending_points
+        self.won_cards = won_cards
+        self.leader = leader
+        self.leader_move = leader_move
+        self.is_talon_closed = is_talon_closed
+        self.leader_changed_since_close = leader_changed_since_close
+        self.non_closer_had_won_cards = non_closer_had_won_cards
+
+    def copy(self) -> CompactState:
+        """
+        Create an independent copy of this state.
+
+        :returns: (CompactState): A copy of this state. Changes to the original will not affect the copy and vice versa.
+        """
+        return CompactState(
+            hands=[list(self.hands[0]), list(self.hands[1])],
+            talon=list(self.talon),
+            trump=self.trump,
+            direct_points=list(self.direct_points),
+            pending_points=list(self.pending_points),
+            won_cards=list(self.won_cards),
+            leader=self.leader,
+            leader_move=self.leader_move,
+            is_talon_closed=self.is_talon_closed,
+            leader_changed_since_close=self.leader_changed_since_close,
+            non_closer_had_won_cards=self.non_closer_had_won_cards,
+        )
+
+    def to_move(self) -> int:
+        """Returns the player who has to make the next move."""
+        return self.leader if self.leader_move is None else 1 - self.leader
+
+    def is_phase_two(self) -> bool:
+        """Returns True if the game is in the second phase, i.e., the talon is empty or closed."""
+        return not self.talon or self.is_talon_closed
+
+    def __repr__(self) -> str:
+        return f"CompactState(hands={self.hands}, talon={self.talon}, trump={self.trump}, direct_points={self.direct_points}, "\
+               f"pending_points={self.pending_points}, won_cards={self.won_cards}, leader={self.leader}, leader_move={self.leader_move}, "\
+               f"is_talon_closed={self.is_talon_closed}, leader_changed_since_close={self.leader_changed_since_close}, "\
+               f"non_closer_had_won_cards={self.non_closer_had_won_cards})"
+
+
+class CompactEngine:
+    """
+    Plays games on CompactStates, following the rules of the provided GamePlayEngine.
+    The deck and the points of the cards are taken from the engine. The rules themselves are those of the Schnapsen
+    trick implementer, move validator and trick scorer. Use supports() to check whether an engine can be used.
+
+    :param engine: (GamePlayEngine): The engine whose deck and card points are used.
+    :attr cards: (list[Card]): The cards of the deck, the index of a card in this list is used as its encoding.
+    """
+
+    def __init__(self, engine: GamePlayEngine) -> None:
+        assert CompactEngine.supports(engine), f"The engine {engine} does not follow the rules implemented by the {CompactEngine.__name__}"
+        scorer = engine.trick_scorer
+        self.cards: list[Card] = list(engine.deck_generator.get_initial_deck())
+        self.index: dict[Card, int] = {card: index for index, card in enumerate(self.cards)}
+        # converting states looks cards and suits up by their id(), see index_by_id
+        self._index_by_id: dict[int, int] = index_by_id(self.cards)
+        self._bit_by_id: dict[int, int] = value_by_id(self.cards, [1 << index for index in range(len(self.cards))])
+        self.suits: list[Suit] = list(Suit)
+        self._suit_index_by_id: dict[int, int] = index_by_id(self.suits)
+        self.suit_of: list[int] = [self.suits.index(card.suit) for card in self.cards]
+        self.points: list[int] = [scorer.rank_to_points(card.rank) for card in self.cards]
+        self.is_queen: list[bool] = [card.rank is Rank.QUEEN for card in self.cards]
+        self.jack_of_suit: list[Optional[int]] = [self.index.get(Card.get_card(Rank.JACK, suit)) for suit in self.suits]
+        self.king_of_suit: list[Optional[int]] = [self.index.get(Card.get_card(Rank.KING, suit)) for suit in self.suits]
+        self.marriage_king: list[Optional[int]] = [self.king_of_suit[self.suit_of[index]] if self.is_queen[index] else None for index in range(len(self.cards))]
+        """For each queen the king it can marry, None for all other cards."""
+
+    @staticmethod
+    def supports(engine: GamePlayEngine) -> bool:
+        """
+        Whether the rules of the engine are the ones implemented by the CompactEngine.
+        Engines may use any deck and may change the points of the ranks, but the trick implementer, the move validator
+        and the scoring of tricks, marriages and the winner must be the ones of Schnapsen.
+
+        :param engine: (GamePlayEngine): The engine to check.
+        :returns: (bool): True if the CompactEngine plays the same game as the engine.
+        """
+        scorer_class = type(engine.trick_scorer)
+        return type(engine.trick_implementer) is SchnapsenTrickImplementer \
+            and type(engine.move_validator) is SchnapsenMoveValidator \
+            and isinstance(engine.trick_scorer, SchnapsenTrickScorer) \
+            and scorer_class.score is SchnapsenTrickScorer.score \
+            and scorer_class.marriage is SchnapsenTrickScorer.marriage \
+            and scorer_class.declare_winner is SchnapsenTrickScorer.declare_winner
+
+    def from_game_state(self, game_state: GameState, leader_move: Optional[Move] = None) -> CompactState:
+        """
+        Create a CompactState from a GameState. The leader of the GameState becomes player 0.
+
+        :param game_state: (GameState): The state to convert. This state is not modified.
+        :param leader_move: (Optional[Move]): The move the leader already played in the current trick, if any.
+        :returns: (CompactState): The compact version of the state.
+        """
+        index = self._index_by_id.__getitem__
+        bit = self._bit_by_id.__getitem__
+        leader = game_state.leader
+        follower = game_state.follower
+        leader_score = leader.score
+        follower_score = follower.score
+        talon = list(map(index, map(id, game_state.talon)))
+        state = CompactState(
+            hands=[list(map(index, map(id, leader.hand.cards))), list(map(index, map(id, follower.hand.cards)))],
+            talon=talon,
+            trump=self.suit_of[talon[-1]] if talon else self._suit_index_by_id[id(game_state.trump_suit)],
+            direct_points=[leader_score.direct_points, follower_score.direct_points],
+            pending_points=[leader_score.pending_points, follower_score.pending_points],
+            won_cards=[sum(map(bit, map(id, leader.won_cards))), sum(map(bit, map(id, follower.won_cards)))],
+            leader=0,
+            leader_move=None if leader_move is None else self.encode_move(leader_move),
+            is_talon_closed=game_state.is_talon_closed,
+        )
+        if state.is_talon_closed:
+            # We mirror the way SchnapsenTrickScorer.declare_winner finds out who closed the talon
+            previous = game_state.previous
+            while previous:
+                if previous.trick.is_close_talon():
+                    state.non_closer_had_won_cards = len(previous.state.follower.won_cards) > 0
+                    break
+                if not previous.leader_remained_leader:
+                    state.leader_changed_since_close = True
+                previous = previous.state.previous
+        return state
+
+    def from_determinizations(self, batch: DeterminizationBatch, leader_move: Optional[Move] = None) -> list[CompactState]:
+        """
+        Create a CompactState for each guess in a batch from PlayerPerspective.make_assumptions, without creating GameStates.
+        The known part of the state is converted only once, the unseen cards are placed using NumPy indexing.
+        The leader of the states in the batch becomes player 0.
+
+        :param batch: (DeterminizationBatch): The guesses to convert.
+        :param leader_move: (Optional[Move]): The move the leader already played in the current trick, if any.
+        :returns: (list[CompactState]): The compact states, in the same order as the guesses in the batch.
+        """
+        base = self.from_game_state(batch.base_state, leader_move)
+        opponent = 0 if batch.opponent_is_leader else 1
+        n = len(batch)
+        if not batch.unseen_cards:
+            return [base.copy() for _ in range(n)]
+
+        placed = np.array([self.index[card] for card in batch.unseen_cards], dtype=np.int8)[batch.permutations]
+        number_of_talon_slots = len(batch.talon_slots)
+        talons = np.tile(np.array(base.talon, dtype=np.int8), (n, 1))
+        talons[:, batch.talon_slots] = placed[:, :number_of_talon_slots]
+        opponent_hands = np.tile(np.array(base.hands[opponent], dtype=np.int8), (n, 1))
+        opponent_hands[:, batch.opponent_hand_slots] = placed[:, number_of_talon_slots:]
+
+        states = []
+        for talon, opponent_hand in zip(talons.tolist(), opponent_hands.tolist()):
+            state = base.copy()
+            state.talon = talon
+            state.hands[opponent] = opponent_hand
+            states.append(state)
+        return states
+
+    def encode_move(self, move: Move) -> int:
+        """
+        Get the integer encoding of a Move.
+
+        :param move: (Move): The move to encode.
+        :returns: (int): The encoded move.
+        """
+        if move.is_trump_exchange():
+            return EXCHANGE
+        if move.is_close_talon():
+            return CLOSE_TALON
+        if move.is_marriage():
+            return MARRIAGE_OFFSET + self.index[cast(Marriage, move).queen_card]
+        return self.index[cast(RegularMove, move).card]
+
+    def decode_move(self, encoded_move: int, trump: int) -> Move:
+        """
+        Get the Move corresponding to an encoded move.
+
+        :param encoded_move: (int): The encoded move.
+        :param trump: (int): The index of the trump suit, needed to know the jack of a trump exchange.
+        :returns: (Move): The decoded move.
+        """
+        if encoded_move == EXCHANGE:
+            jack = self.jack_of_suit[trump]
+            assert jack is not None, "There is no trump jack in this deck"
+            return TrumpExchange(self.cards[jack])
+        if encoded_move == CLOSE_TALON:
+            return CloseTalon()
+        if encoded_move >= MARRIAGE_OFFSET:
+            queen = encoded_move - MARRIAGE_OFFSET
+            king = self.king_of_suit[self.suit_of[queen]]
+            assert king is not None, "There is no king for this marriage in this deck"
+            return Marriage(self.cards[queen], self.cards[king])
+        return RegularMove(self.cards[encoded_move])
+
+    def legal_moves(self, state: CompactState) -> list[int]:
+        """
+        Get the legal moves for the player who is to move. The moves are in the same order as the ones of the SchnapsenMoveValidator.
+
+        :param state: (CompactState): The current state.
+        :returns: (list[int]): The encoded legal moves.
+        """
+        if state.leader_move is None:
+            return self.legal_leader_moves(state)
+        return self.legal_follower_moves(state)
+
+    def legal_leader_moves(self, state: CompactState) -> list[int]:
+        """
+        Get the legal moves of the leader: all cards in the hand, a trump exchange, closing the talon and marriages.
+
+        :param state: (CompactState): The current state, in which the leader has not played yet.
+        :returns: (list[int]): The encoded legal moves.
+        """
+        hand = state.hands[state.leader]
+        moves = hand.copy()
+        if state.talon and not state.is_talon_closed:
+            if self.jack_of_suit[state.trump] in hand:
+                moves.append(EXCHANGE)
+            moves.append(CLOSE_TALON)
+        marriage_king = self.marriage_king
+        for card in hand:
+            king = marriage_king[card]
+            if king is not None and king in hand:
+                moves.append(MARRIAGE_OFFSET + card)
+        return moves
+
+    def legal_follower_moves(self, state: CompactState) -> list[int]:
+        """
+        Get the legal moves of the follower. In the first phase any card can be played.
+        In the second phase, the follower must follow suit, preferably with a higher card, and otherwise play a trump.
+
+        :param state: (CompactState): The current state, in which the leader has already played.
+        :returns: (list[int]): The encoded legal moves.
+        """
+        hand = state.hands[1 - state.leader]
+        if state.talon and not state.is_talon_closed:
+            return list(hand)
+        leader_move = cast(int, state.leader_move)
+        # like in the SchnapsenMoveValidator, the queen of a marriage is the card which has to be followed
+        leader_card = leader_move - MARRIAGE_OFFSET if leader_move >= MARRIAGE_OFFSET else leader_move
+        leader_suit = self.suit_of[leader_card]
+        leader_points = self.points[leader_card]
+        suit_of = self.suit_of
+        same_suit = [card for card in hand if suit_of[card] == leader_suit]
+        if same_suit:
+            higher = [card for card in same_suit if self.points[card] > leader_points]
+            return higher if higher else same_suit
+        if leader_suit != state.trump:
+            trumps = [card for card in hand if suit_of[card] == state.trump]
+            if trumps:
+                return trumps
+        return list(hand)
+
+    def play(self, state: CompactState, move: int) -> bool:
+        """
+        Play the move for the player who is to move. The state is modified.
+        The move is not validated, use legal_moves to obtain valid moves.
+
+        :param state: (CompactState): The state to play the move on. This state will be modified.
+        :param move: (int): The encoded move.
+        :returns: (bool): True if this move completed a round (a trick, a trump exchange or closing the talon), False if the follower still has to play.
+        """
+        leader = state.leader
+        if state.leader_move is None:
+            if move == EXCHANGE:
+                jack = cast(int, self.jack_of_suit[state.trump])
+                hand = state.hands[leader]
+                hand.remove(jack)
+                old_trump = state.talon[-1]
+                state.talon[-1] = jack
+                hand.append(old_trump)
+                return True
+            if move == CLOSE_TALON:
+                state.is_talon_closed = True
+                state.leader_changed_since_close = False
+                state.non_closer_had_won_cards = state.won_cards[1 - leader] != 0
+                return True
+            state.leader_move = move
+            return False
+        self._complete_trick(state, move)
+        return True
+
+    def _complete_trick(self, state: CompactState, follower_card: int) -> None:
+        """
+        Complete the current trick with the card of the follower: score it, determine the next leader and draw cards.
+
+        :param state: (CompactState): The state in which the leader has played. This state will be modified.
+        :param follower_card: (int): The card played by the follower.
+        """
+        leader = state.leader
+        follower = 1 - leader
+        leader_move = cast(int, state.leader_move)
+        trump = state.trump
+        suit_of = self.suit_of
+        if leader_move >= MARRIAGE_OFFSET:
+            queen = leader_move - MARRIAGE_OFFSET
+            marriage_suit = suit_of[queen]
+            state.pending_points[leader] += 40 if marriage_suit == trump else 20
+            leader_card = cast(int, self.king_of_suit[marriage_suit])
+        else:
+            leader_card = leader_move
+        state.hands[leader].remove(leader_card)
+        state.hands[follower].remove(follower_card)
+
+        leader_points = self.points[leader_card]
+        follower_points = self.points[follower_card]
+        leader_suit = suit_of[leader_card]
+        follower_suit = suit_of[follower_card]
+        if leader_suit == follower_suit:
+            leader_wins = leader_points > follower_points
+        elif leader_suit == trump:
+            leader_wins = True
+        elif follower_suit == trump:
+            leader_wins = False
+        else:
+            leader_wins = True
+        winner = leader if leader_wins else follower
+        state.won_cards[winner] |= (1 << leader_card) | (1 << follower_card)
+        state.direct_points[winner] += leader_points + follower_points + state.pending_points[winner]
+        state.pending_points[winner] = 0
+        if not leader_wins and state.is_talon_closed:
+            state.leader_changed_since_close = True
+        state.leader = winner
+        state.leader_move = None
+
+        talon = state.talon
+        if talon and not state.is_talon_closed:
+            # the winner takes the first card of the talon, the loser the second one.
+            state.hands[winner].append(talon[0])
+            state.hands[1 - winner].append(talon[1])
+            del talon[:2]
+
+    def winner(self, state: CompactState) -> Optional[tuple[int, int]]:
+        """
+        Determine whether the game has ended, following the logic of SchnapsenTrickScorer.declare_winner.
+        This must only be called between rounds, i.e., when the leader has not played yet.
+
+        :param state: (CompactState): The current state.
+        :returns: (Optional[tuple[int, int]]): The winning player and the number of game points, or None if the game has not ended yet.
+        """
+        leader = state.leader
+        follower = 1 - leader
+        if state.direct_points[leader] >= 66:
+            follower_score = state.direct_points[follower]
+            if follower_score == 0:
+                return leader, 3
+            if follower_score >= 33:
+                return leader, 1
+            return leader, 2
+        if state.direct_points[follower] >= 66:
+            raise AssertionError("Would declare the follower winner, but this should never happen in the current implementation")
+        if state.hands[0] or state.hands[1]:
+            return None
+        if not state.talon:
+            return leader, 1
+        if state.is_talon_closed:
+            assert state.non_closer_had_won_cards is not None, "Talon is closed but could not find CloseTalon move in history."
+            # Like the SchnapsenTrickScorer, the closer is assumed to be the current leader, unless the lead changed since closing
+            winner = leader if state.leader_changed_since_close else follower
+            return winner, 2 if state.non_closer_had_won_cards else 3
+        return None
+
+    def random_playout(self, state: CompactState, max_rounds: int, rand: Random) -> int:
+        """
+        Play at most max_rounds rounds with both players choosing uniformly among their legal moves. The state is modified.
+        If the leader already played in the current trick, completing that trick counts as the first round.
+
+        :param state: (CompactState): The state to start from. This state will be modified.
+        :param max_rounds: (int): The maximum number of rounds to play.
+        :param rand: (Random): The source of randomness, used like RandBot uses it.
+        :returns: (int): The number of rounds actually played. This is less than max_rounds if the game ended.
+        """
+        # This is the hot loop of all rollout based bots. It does the same as calling legal_moves and play repeatedly,
+        # but the move generation is inlined, which makes it considerably faster.
+        choice = rand.choice
+        complete_trick = self._complete_trick
+        legal_follower_moves = self.legal_follower_moves
+        jack_of_suit = self.jack_of_suit
+        marriage_king = self.marriage_king
+        direct_points = state.direct_points
+        hands = state.hands
+        rounds_played = 0
+        while rounds_played < max_rounds:
+            rounds_played += 1
+            if state.leader_move is not None:
+                complete_trick(state, choice(legal_follower_moves(state)))
+                continue
+            hand = hands[state.leader]
+            # the game can only have ended if someone reached 66 points or if the hands are empty
+            if (direct_points[0] >= 66 or direct_points[1] >= 66 or not hand) and self.winner(state) is not None:
+                return rounds_played - 1
+            moves = hand.copy()
+            phase_one = state.talon and not state.is_talon_closed
+            if phase_one:
+                if jack_of_suit[state.trump] in hand:
+                    moves.append(EXCHANGE)
+                moves.append(CLOSE_TALON)
+            for card in hand:
+                king = marriage_king[card]
+                if king is not None and king in hand:
+                    moves.append(MARRIAGE_OFFSET + card)
+            move = choice(moves)
+            if move < 0:
+                self.play(state, move)
+                continue
+            state.leader_move = move
+            if phase_one:
+                complete_trick(state, choice(hands[1 - state.leader]))
+            else:
+                complete_trick(state, choice(legal_follower_moves(state)))
+        return rounds_played
@@ -7,7 +7,7 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from enum import Enum, auto
 import enum
-from typing import Any, Iterable, Iterator, Optional
+from typing import Any, Iterable, Iterator, Optional, TypeVar
 import itertools
 
 
@@ -174,6 +174,33 @@ class Card(Enum):
         return f"Card.{self.name}"
 
 
+_V = TypeVar("_V")
+
+
+def index_by_id(members: Iterable[Any]) -> dict[int, int]:
+    """
+    Map the id() of each of the members, like the cards of a deck or the suits, to its position.
+
+    Hashing an Enum member is slow. Code which looks cards or suits up very often, like converting states or hashing positions,
+    therefore keys its dictionaries by the id() of the members. Enum members are singletons, so their id() identifies them.
+
+    :param members: (Iterable[Any]): The members, in order.
+    :returns: (dict[int, int]): The position of each member, by its id().
+    """
+    return {id(member): index for index, member in enumerate(members)}
+
+
+def value_by_id(members: Iterable[Any], values: Iterable[_V]) -> dict[int, _V]:
+    """
+    Map the id() of each of the members to a value, see index_by_id.
+
+    :param members: (Iterable[Any]): The members, in order.
+    :param values: (Iterable[_V]): The value of each member, in the same order.
+    :returns: (dict[int, _V]): The value of each member, by its id().
+    """
+    return {id(member): value for member, value in zip(members, values, strict=True)}
+
+
 class _CardCache:
     """
     Card cache class. This class is used to cache all possible cards in the game as a dict.
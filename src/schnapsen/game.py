@@ -11,10 +11,12 @@ from enum import Enum
 from io import StringIO
 from random import Random
 import sys
-from typing import Generator, Iterable, Optional, Union, cast, Any
+from typing import Generator, Iterable, Iterator, Optional, Union, cast, Any
 from .deck import CardCollection, OrderedCardCollection, Card, Rank, Suit
 import itertools
 
+import numpy as np
+
 
 class Bot(ABC):
     """
@@ -909,7 +911,8 @@ class PlayerPerspective(ABC):
             if current_leader:
                 current_player_perspective = LeaderPerspective(current.state, self.__engine)
             else:  # We are following
-                if current.trick.is_trump_exchange():
+                # like after a trump exchange, the follower does not play after the leader closed the talon
+                if current.trick.is_trump_exchange() or current.trick.is_close_talon():
                     current_player_perspective = ExchangeFollowerPerspective(current.state, self.__engine)
                 else:
                     current_player_perspective = FollowerPerspective(current.state, self.__engine, current.trick.as_partial().leader_move)
@@ -919,6 +922,18 @@ class PlayerPerspective(ABC):
             current = current.state.previous
         return game_state_history
 
+    def get_past_tricks(self) -> Iterator[tuple[Trick, bool]]:
+        """
+        Iterate over the tricks played until now, starting with the most recent one.
+        Unlike get_game_history, this does not create a PlayerPerspective for each trick, so it is cheap to only look at the last few tricks.
+
+        :returns: (Iterator[tuple[Trick, bool]]): For each trick, the trick and whether the leader of that trick remained the leader afterwards.
+        """
+        current = self.__game_state.previous
+        while current:
+            yield current.trick, current.leader_remained_leader
+            current = current.state.previous
+
     @abstractmethod
     def get_hand(self) -> Hand:
         """Get the cards in the hand of the current player"""
@@ -1064,6 +1079,10 @@ class PlayerPerspective(ABC):
         """
         Takes the current imperfect information state and makes a random guess as to the position of the unknown cards.
         This also takes into account cards seen earlier during marriages played by the opponent, as well as potential trump jack exchanges
+        (including the old trump card the opponent took in the exchange), so these cards are always in the hand of the opponent.
+
+        Every guess is consistent with what the player observed. The follow rules only apply in phase two, i.e., when the talon is empty
+        or closed, and in that phase the complete state is known and returned as is. Hence, failures to follow suit never exclude a guess.
 
         This removes the real bots from the GameState. If you want to continue the game, provide new Bots. See copy_with_other_bots in the GameState class.
 
@@ -1121,6 +1140,41 @@ class PlayerPerspective(ABC):
 
         return full_state
 
+    def make_assumptions(self, leader_move: Optional[Move], n: int, rand: Random) -> DeterminizationBatch:
+        """
+        Makes n random guesses as to the position of the unknown cards at once.
+        Each guess follows the same distribution as the one of make_assumption, but the batch is much cheaper to create:
+        the seen cards and the positions of the unknown cards are determined only once, and the n assignments of the unseen cards
+        to these positions are drawn together as the rows of a NumPy array of permutations.
+        GameStates are only created when they are requested from the returned batch.
+        Rollout based bots can also convert the batch directly using CompactEngine.from_determinizations.
+
+        :param leader_move: (Optional[Move]): the optional already executed leader_move in the current trick. This card is guaranteed to be in the hand of the leader in all guesses.
+        :param n: (int): the number of guesses to make
+        :param rand: (Random): the source of random numbers, used to seed the NumPy random generator. It is not used in phase two of the game, where all cards are known.
+
+        :returns: (DeterminizationBatch): The n guesses.
+        """
+        assert n >= 0, f"Cannot make a negative number of assumptions, got {n}"
+        opponent_hand = self.__get_opponent_bot_state().hand
+
+        if leader_move is not None:
+            assert all(card in opponent_hand for card in leader_move.cards), f"The specified leader_move {leader_move} is not in the hand of the opponent {opponent_hand}"
+
+        base_state = self.__game_state.copy_with_other_bots(_DummyBot(), _DummyBot())
+        if self.get_phase() == GamePhase.TWO:
+            return DeterminizationBatch(base_state, not self.am_i_leader(), [], [], [], np.empty((n, 0), dtype=np.int8))
+
+        seen_cards = set(self.seen_cards(leader_move))
+        talon_slots = [position for position, card in enumerate(base_state.talon) if card not in seen_cards]
+        opponent_hand_slots = [position for position, card in enumerate(opponent_hand) if card not in seen_cards]
+        unseen_cards = [card for card in self.__engine.deck_generator.get_initial_deck() if card not in seen_cards]
+        assert len(talon_slots) + len(opponent_hand_slots) == len(unseen_cards), "Logical error. The number of unseen cards in the opponents hand and in the talon must be equal to the number of unseen cards"
+
+        generator = np.random.default_rng(rand.getrandbits(64))
+        permutations = generator.permuted(np.tile(np.arange(len(unseen_cards), dtype=np.int8), (n, 1)), axis=1)
+        return DeterminizationBatch(base_state, not self.am_i_leader(), unseen_cards, talon_slots, opponent_hand_slots, permutations)
+
 
 class _DummyBot(Bot):
     """A bot used by PlayerPerspective.make_assumption to replace the real bots. This bot cannot play and will throw an Exception for everything"""
@@ -1135,6 +1189,67 @@ class _DummyBot(Bot):
         raise Exception("The GameState from make_assumption removes the real bots from the Game. If you want to continue the game, provide new Bots. See copy_with_other_bots in the GameState class.")
 
 
+class DeterminizationBatch:
+    """
+    A batch of random guesses about the positions of the unknown cards, created by PlayerPerspective.make_assumptions.
+
+    All guesses share the known part of the state. They only differ in how the unseen cards are placed in the unknown positions (slots)
+    of the talon and of the hand of the opponent. Row i of permutations describes guess i: column j holds the index (in unseen_cards)
+    of the card placed in slot j. The first len(talon_slots) slots are positions in the talon, the others positions in the hand of the opponent.
+
+    :param base_state: (GameState): The state with the real cards, in which the bots have been replaced by dummy bots. This state is not modified.
+    :param opponent_is_leader: (bool): Whether the opponent is the leader in base_state.
+    :param unseen_cards: (list[Card]): The cards which have not been seen by the player.
+    :param talon_slots: (list[int]): The positions in the talon holding an unseen card.
+    :param opponent_hand_slots: (list[int]): The positions in the hand of the opponent holding an unseen card.
+    :param permutations: (np.ndarray): An array of shape (n, len(unseen_cards)) with in each row a permutation of the unseen cards.
+    """
+
+    def __init__(self, base_state: GameState, opponent_is_leader: bool, unseen_cards: list[Card], talon_slots: list[int],
+                 opponent_hand_slots: list[int], permutations: np.ndarray) -> None:
+        assert permutations.ndim == 2 and permutations.shape[1] == len(unseen_cards) == len(talon_slots) + len(opponent_hand_slots), \
+            "Each permutation must place all unseen cards in the slots"
+        self.base_state = base_state
+        self.opponent_is_leader = opponent_is_leader
+        self.unseen_cards = unseen_cards
+        self.talon_slots = talon_slots
+        self.opponent_hand_slots = opponent_hand_slots
+        self.permutations = permutations
+
+    def __len__(self) -> int:
+        """The number of guesses in this batch."""
+        return int(self.permutations.shape[0])
+
+    def get_state(self, index: int) -> GameState:
+        """
+        Create the GameState for one of the guesses.
+
+        This removes the real bots from the GameState. If you want to continue the game, provide new Bots. See copy_with_other_bots in the GameState class.
+
+        :param index: (int): The index of the guess.
+        :returns: (GameState): A perfect information state object.
+        """
+        placed = [self.unseen_cards[card_index] for card_index in self.permutations[index].tolist()]
+        talon = self.base_state.talon.get_cards()
+        for slot, card in zip(self.talon_slots, placed):
+            talon[slot] = card
+        opponent_cards = (self.base_state.leader if self.opponent_is_leader else self.base_state.follower).hand.get_cards()
+        for slot, card in zip(self.opponent_hand_slots, placed[len(self.talon_slots):]):
+            opponent_cards[slot] = card
+
+        state = self.base_state.copy_with_other_bots(_DummyBot(), _DummyBot())
+        state.talon = Talon(talon, self.base_state.talon.trump_suit())
+        if self.opponent_is_leader:
+            state.leader.hand = Hand(opponent_cards)
+        else:
+            state.follower.hand = Hand(opponent_cards)
+        return state
+
+    def __iter__(self) -> Iterator[GameState]:
+        """Iterate over the GameStates of all guesses. The states are created lazily."""
+        return (self.get_state(index) for index in range(len(self)))
+
+
 class LeaderPerspective(PlayerPerspective):
     """
     The playerperspective of the Leader.
@@ -1308,7 +1423,7 @@ class FollowerPerspective(PlayerPerspective):
 
 class ExchangeFollowerPerspective(PlayerPerspective):
     """
-    A special PlayerGameState only used for the history of a game in which a Trump Exchange happened.
+    A special PlayerGameState only used for the history of a game in which a Trump Exchange happened, or the talon was closed.
     This state is does not allow any moves.
 
     :param state: (GameState): The current state of the game
@@ -0,0 +1,122 @@
+"""
+In this module you will find tables with features of every possible hand of cards, for rule based bots, featurizers and leaf evaluators.
+
+Questions like "how many trumps do I have", "which marriages can I declare" or "how many points are in my hand" are asked again and again,
+every time by looping over the cards. The tables answer them for every subset of the deck at once: a hand is represented by a bitmask in
+which bit i is set if the hand contains the i-th card of the deck, in the same order as the cards of the CompactEngine, and the bitmask is
+the index into the NumPy arrays. Features which depend on the trump suit have one row per suit, in the order of the Suit enum.
+
+The tables have 2 ** (number of cards) entries, so they are only built for decks of at most MAX_DECK_SIZE cards. For the deck of
+Schnapsen, they take about 20 MB and are built in well under a second. The tables of a deck are built once and shared, see HandFeatures.of.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .deck import Card, Rank, Suit, index_by_id, value_by_id
+from .game import GamePlayEngine
+
+MAX_DECK_SIZE = 20
+"""The largest deck for which the tables are built, a larger deck would need too much memory."""
+
+_SUITS = list(Suit)
+_SUIT_INDEX = index_by_id(_SUITS)
+_POPCOUNT = np.array([bin(suits).count("1") for suits in range(1 << len(_SUITS))], dtype=np.uint8)
+
+
+class HandFeatures:
+    """
+    The features of all hands of a deck, indexed by the bitmask of the hand. Get the tables of an engine with HandFeatures.of.
+
+    :param cards: (list[Card]): The cards of the deck, bit i of a bitmask stands for cards[i].
+    :param points: (list[int]): The points of each card of the deck.
+    :attr cards: (list[Card]): The cards of the deck.
+    :attr suit_counts: (np.ndarray): The number of cards of each suit, shape (4, 2 ** len(cards)). For the trump suit, the number of trumps.
+    :attr suit_points: (np.ndarray): The points of the cards of each suit, shape (4, 2 ** len(cards)).
+    :attr points: (np.ndarray): The points of all cards in the hand, shape (2 ** len(cards),).
+    :attr marriages: (np.ndarray): A bitmask of the suits in which the hand has both the king and the queen, shape (2 ** len(cards),).
+    :attr void_suits: (np.ndarray): A bitmask of the suits of which the hand has no cards, shape (2 ** len(cards),).
+    :attr marriage_points: (np.ndarray): For each trump suit the points of all marriages in the hand, 40 for the royal marriage and
+        20 for the others, shape (4, 2 ** len(cards)).
+    :attr trump_jack: (np.ndarray): For each trump suit whether the hand has the jack of trumps, to exchange for the trump card,
+        shape (4, 2 ** len(cards)).
+    """
+
+    def __init__(self, cards: list[Card], points: list[int]) -> None:
+        assert len(cards) <= MAX_DECK_SIZE, f"The tables of a deck with {len(cards)} cards would not fit in memory, at most {MAX_DECK_SIZE} are supported"
+        assert len(points) == len(cards), "Every card needs its points"
+        self.cards = cards
+        self.__bits = value_by_id(cards, [1 << index for index in range(len(cards))])
+        hands = np.arange(1 << len(cards), dtype=np.uint32)
+        self.suit_counts = np.zeros((len(_SUITS), len(hands)), dtype=np.uint8)
+        self.suit_points = np.zeros((len(_SUITS), len(hands)), dtype=np.uint8)
+        has_card = {}
+        for index, card in enumerate(cards):
+            has = ((hands >> np.uint32(index)) & np.uint32(1)).astype(np.uint8)
+            has_card[card] = has
+            row = _SUIT_INDEX[id(card.suit)]
+            self.suit_counts[row] += has
+            self.suit_points[row] += has * np.uint8(points[index])
+        self.points = self.suit_points.sum(axis=0, dtype=np.uint8)
+
+        self.marriages = np.zeros(len(hands), dtype=np.uint8)
+        self.void_suits = np.zeros(len(hands), dtype=np.uint8)
+        self.trump_jack = np.zeros((len(_SUITS), len(hands)), dtype=np.bool_)
+        for suit_index, suit in enumerate(_SUITS):
+            king = has_card.get(Card.get_card(Rank.KING, suit))
+            queen = has_card.get(Card.get_card(Rank.QUEEN, suit))
+            if king is not None and queen is not None:
+                self.marriages |= (king & queen) << np.uint8(suit_index)
+            self.void_suits |= (self.suit_counts[suit_index] == 0).astype(np.uint8) << np.uint8(suit_index)
+            jack = has_card.get(Card.get_card(Rank.JACK, suit))
+            if jack is not None:
+                self.trump_jack[suit_index] = jack.astype(np.bool_)
+        all_marriages = 20 * _POPCOUNT[self.marriages]
+        self.marriage_points = np.stack([all_marriages + 20 * ((self.marriages >> np.uint8(suit)) & np.uint8(1)) for suit in range(len(_SUITS))])
+
+    @staticmethod
+    def of(engine: GamePlayEngine) -> Optional[HandFeatures]:
+        """
+        Get the tables for the deck and the points of the cards of an engine. They are built the first time, and shared afterwards.
+
+        :param engine: (GamePlayEngine): The engine.
+        :returns: (Optional[HandFeatures]): The tables, or None if the deck has more than MAX_DECK_SIZE cards.
+        """
+        cards = list(engine.deck_generator.get_initial_deck())
+        if len(cards) > MAX_DECK_SIZE:
+            return None
+        points = [engine.trick_scorer.rank_to_points(card.rank) for card in cards]
+        key = (tuple(card.name for card in cards), tuple(points))
+        features = _TABLES.get(key)
+        if features is None:
+            features = _TABLES[key] = HandFeatures(cards, points)
+        return features
+
+    @staticmethod
+    def suit_index(suit: Suit) -> int:
+        """
+        The row of a suit in the tables with one row per suit.
+
+        :param suit: (Suit): The suit.
+        :returns: (int): The position of the suit in the Suit enum.
+        """
+        return _SUIT_INDEX[id(suit)]
+
+    def mask(self, cards: Iterable[Card]) -> int:
+        """
+        The bitmask of a hand, the index into the tables.
+
+        :param cards: (Iterable[Card]): The cards in the hand, all from the deck.
+        :returns: (int): The bitmask.
+        """
+        bits = self.__bits
+        mask = 0
+        for card in cards:
+            mask |= bits[id(card)]
+        return mask
+
+
+_TABLES: dict[tuple[tuple[str, ...], tuple[int, ...]], HandFeatures] = {}
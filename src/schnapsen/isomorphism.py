@@ -0,0 +1,286 @@
+"""
+In this module you will find the suit isomorphism of Schnapsen: relabeling the suits of a situation, and of all moves, gives a
+situation which is played in exactly the same way. Tables indexed by situations, like transposition tables, caches and opening books,
+only need to store one situation of each group of relabeled ones, which makes them up to 24 times smaller.
+
+The canonical relabeling maps the trump suit to the first suit of the Suit enum, and the other suits to the remaining ones, ordered by
+a description of where their cards are. Situations which are the same up to relabeling get the same canonical form.
+Everything works for any deck, like the ones of SchnapsenDeckGenerator and of the 24 card Schnapsen.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Hashable, Iterable, Optional, Sequence, cast
+
+from .compact import MARRIAGE_OFFSET, CompactEngine, CompactState
+from .deck import Card, Rank, Suit, index_by_id, value_by_id
+from .game import BotState, CloseTalon, GameState, Hand, Marriage, Move, RegularMove, Talon, TrumpExchange
+
+_SUITS = list(Suit)
+_SUIT_INDEX = index_by_id(_SUITS)
+_RANK_INDEX = index_by_id(Rank)
+
+
+class SuitPermutation:
+    """
+    A relabeling of the suits, which maps every card to the card of the same rank in another suit.
+    All 24 permutations are created once, get them with SuitPermutation.of, or with canonical_permutation.
+
+    :param images: (tuple[Suit, ...]): For each suit, in the order of the Suit enum, the suit it is mapped to.
+    :attr images: (tuple[Suit, ...]): For each suit, in the order of the Suit enum, the suit it is mapped to.
+    """
+
+    __slots__ = ("images", "__cards", "__inverse")
+
+    def __init__(self, images: tuple[Suit, ...]) -> None:
+        assert sorted(images, key=_SUITS.index) == _SUITS, f"A permutation must map the suits to all suits, got {images}"
+        self.images = images
+        self.__cards = value_by_id(Card, [Card.get_card(card.rank, images[_SUIT_INDEX[id(card.suit)]]) for card in Card])
+        self.__inverse: Optional[SuitPermutation] = None
+
+    @staticmethod
+    def of(images: Sequence[Suit]) -> SuitPermutation:
+        """
+        Get the permutation mapping each suit, in the order of the Suit enum, to the given suit.
+
+        :param images: (Sequence[Suit]): The images of the suits.
+        :returns: (SuitPermutation): The permutation.
+        """
+        return _PERMUTATIONS[tuple(images)]
+
+    @staticmethod
+    def identity() -> SuitPermutation:
+        """The permutation which maps every suit to itself."""
+        return _PERMUTATIONS[tuple(_SUITS)]
+
+    def inverse(self) -> SuitPermutation:
+        """The permutation which undoes this one."""
+        if self.__inverse is None:
+            images = [Suit.HEARTS] * len(_SUITS)
+            for suit, image in zip(_SUITS, self.images):
+                images[_SUIT_INDEX[id(image)]] = suit
+            self.__inverse = SuitPermutation.of(images)
+        return self.__inverse
+
+    def suit(self, suit: Suit) -> Suit:
+        """The image of a suit."""
+        return self.images[_SUIT_INDEX[id(suit)]]
+
+    def card(self, card: Card) -> Card:
+        """The image of a card: the card with the same rank in the image of its suit."""
+        return self.__cards[id(card)]
+
+    def cards(self, cards: Iterable[Card]) -> list[Card]:
+        """The images of the cards, in the same order."""
+        image = self.__cards
+        return [image[id(card)] for card in cards]
+
+    def move(self, move: Move) -> Move:
+        """The image of a move, which plays the images of its cards."""
+        if move.is_regular_move():
+            return RegularMove(self.card(cast(RegularMove, move).card))
+        if move.is_marriage():
+            marriage = cast(Marriage, move)
+            return Marriage(self.card(marriage.queen_card), self.card(marriage.king_card))
+        if move.is_trump_exchange():
+            return TrumpExchange(self.card(cast(TrumpExchange, move).jack))
+        assert move.is_close_talon(), f"Unknown kind of move {move}"
+        return CloseTalon()
+
+    def state(self, state: GameState) -> GameState:
+        """
+        The image of a state, in which all cards are replaced by their image. The bots, the scores and whether the talon is closed stay the same.
+        The history is not relabeled: the new state refers to the same previous states as the original one. The rules only use the history to
+        find out who closed the talon, which does not depend on the suits.
+
+        :param state: (GameState): The state to relabel. It is not modified.
+        :returns: (GameState): The relabeled state.
+        """
+        return GameState(leader=self.__bot_state(state.leader), follower=self.__bot_state(state.follower),
+                         talon=Talon(self.cards(state.talon), trump_suit=self.suit(state.trump_suit)),
+                         previous=state.previous, is_talon_closed=state.is_talon_closed)
+
+    def __bot_state(self, bot_state: BotState) -> BotState:
+        return BotState(implementation=bot_state.implementation, hand=Hand(self.cards(bot_state.hand), max_size=bot_state.hand.max_size),
+                        score=bot_state.score, won_cards=self.cards(bot_state.won_cards))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SuitPermutation) and self.images == other.images
+
+    def __hash__(self) -> int:
+        return hash(self.images)
+
+    def __repr__(self) -> str:
+        return f"SuitPermutation({', '.join(f'{suit}->{image}' for suit, image in zip(_SUITS, self.images))})"
+
+
+_PERMUTATIONS: dict[tuple[Suit, ...], SuitPermutation] = {images: SuitPermutation(images) for images in itertools.permutations(_SUITS)}
+
+
+def canonical_permutation(groups: Sequence[Iterable[Card]], trump_suit: Suit) -> SuitPermutation:
+    """
+    The canonical relabeling of a situation described by groups of cards, for example the hand of a player and the trump card.
+    The trump suit is mapped to the first suit. The other suits are described by the group each of their cards is in, and mapped to the
+    remaining suits in the order of their descriptions. When two suits have the same description, mapping them either way gives the same result.
+
+    :param groups: (Sequence[Iterable[Card]]): Groups of cards. Cards in no group are in an unknown place, or out of the game.
+    :param trump_suit: (Suit): The trump suit.
+    :returns: (SuitPermutation): The permutation mapping the situation to its canonical form.
+    """
+    # Each suit is described by a number, with a digit in base len(groups) + 1 for each rank.
+    base = len(groups) + 1
+    descriptions = [0] * len(_SUITS)
+    suit_index = _SUIT_INDEX
+    rank_index = _RANK_INDEX
+    for code, cards in enumerate(groups, start=1):
+        for card in cards:
+            descriptions[suit_index[id(card.suit)]] += code * base ** rank_index[id(card.rank)]
+    trump = suit_index[id(trump_suit)]
+    others = sorted((suit for suit in range(len(_SUITS)) if suit != trump), key=descriptions.__getitem__)
+    images = [_SUITS[0]] * len(_SUITS)
+    for position, suit in enumerate(others, start=1):
+        images[suit] = _SUITS[position]
+    return _PERMUTATIONS[tuple(images)]
+
+
+def canonical_hand(hand: Iterable[Card], trump_card: Card) -> tuple[list[Card], Card, SuitPermutation]:
+    """
+    The canonical form of a hand together with the trump card, which is all a player knows at the start of a game.
+
+    :param hand: (Iterable[Card]): The cards in the hand.
+    :param trump_card: (Card): The trump card at the bottom of the talon.
+    :returns: (tuple[list[Card], Card, SuitPermutation]): The relabeled hand, sorted in the order of the Card enum, the relabeled trump card,
+        and the permutation which was used. Its inverse maps moves in the canonical form back to moves in the original situation.
+    """
+    cards = list(hand)
+    permutation = canonical_permutation([cards, [trump_card]], trump_card.suit)
+    card_order = list(Card)
+    return sorted(permutation.cards(cards), key=card_order.index), permutation.card(trump_card), permutation
+
+
+def canonical_state(state: GameState, leader_move: Optional[Move] = None) -> tuple[GameState, Optional[Move], SuitPermutation]:
+    """
+    The canonical form of a state, and of the move the leader already played in the current trick.
+    Two states which are the same up to a relabeling of the suits have the same canonical form, with the cards in the same order.
+
+    :param state: (GameState): The state. It is not modified.
+    :param leader_move: (Optional[Move]): The move the leader already played in the current trick, if any.
+    :returns: (tuple[GameState, Optional[Move], SuitPermutation]): The relabeled state, see SuitPermutation.state, the relabeled move, and the
+        permutation which was used. Its inverse maps moves in the canonical form back to moves in the original state.
+    """
+    groups: list[Iterable[Card]] = [state.leader.hand, state.follower.hand, state.leader.won_cards, state.follower.won_cards]
+    # The order of the talon matters, every position is a group of its own
+    groups.extend([card] for card in state.talon)
+    if leader_move is not None:
+        groups.append(leader_move.cards)
+    permutation = canonical_permutation(groups, state.trump_suit)
+    return permutation.state(state), None if leader_move is None else permutation.move(leader_move), permutation
+
+
+class CompactCanonicalizer:
+    """
+    Computes canonical keys of CompactStates, fast enough to be used for every node of a search.
+    Two states get the same key if and only if they are the same up to a relabeling of the non-trump suits.
+    The trump suit itself is not relabeled, since all states searched together have the same trump suit.
+
+    Searches which do not need all details can merge more states:
+
+    * without ordered_talon, the cards on the talon other than the bottom one are only known to be on the talon, like for a player who cannot see them
+    * without won_cards, the cards which were won only count by their points, and by whether a player won any cards at all
+
+    :param engine: (CompactEngine): The engine which created the states.
+    :param ordered_talon: (bool): Whether the order of the talon is part of the key.
+    :param won_cards: (bool): Whether which player won which cards is part of the key.
+    """
+
+    def __init__(self, engine: CompactEngine, ordered_talon: bool = True, won_cards: bool = True) -> None:
+        self.engine = engine
+        self.ordered_talon = ordered_talon
+        self.won_cards = won_cards
+        number_of_cards = len(engine.cards)
+        self.__cards_of_suit = [[card for card in range(number_of_cards) if engine.suit_of[card] == suit] for suit in range(len(engine.suits))]
+        self.__won_masks = [sum(1 << card for card in cards) for cards in self.__cards_of_suit]
+
+    def key(self, state: CompactState) -> Hashable:
+        """
+        The canonical key of a state.
+
+        :param state: (CompactState): The state.
+        :returns: (Hashable): The key.
+        """
+        suits = self.__describe(state)
+        trump_suit = suits.pop(state.trump)
+        suits.sort()
+        marriage = state.leader_move is not None and state.leader_move >= MARRIAGE_OFFSET
+        return (trump_suit, tuple(suits), state.leader, marriage, state.direct_points[0], state.direct_points[1], state.pending_points[0],
+                state.pending_points[1], state.won_cards[0] != 0, state.won_cards[1] != 0, state.is_talon_closed, state.leader_changed_since_close,
+                state.non_closer_had_won_cards)
+
+    def permutation(self, state: CompactState) -> list[int]:
+        """
+        The canonical relabeling of a state, as a mapping of the cards. The non-trump suits are mapped to the non-trump suits in the order of their
+        descriptions in the key. States with the same key are mapped to the same state, up to the order of the cards in the hands, and, without
+        ordered_talon, of the talon.
+
+        :param state: (CompactState): The state.
+        :returns: (list[int]): For each card of the engine, the card it is mapped to.
+        """
+        suits = self.__describe(state)
+        non_trump = [suit for suit in range(len(suits)) if suit != state.trump]
+        ordered = sorted(non_trump, key=suits.__getitem__)
+        mapping = list(range(len(self.engine.cards)))
+        cards_of_suit = self.__cards_of_suit
+        for suit, target in zip(ordered, non_trump):
+            for card, image in zip(cards_of_suit[suit], cards_of_suit[target]):
+                mapping[card] = image
+        return mapping
+
+    @staticmethod
+    def move(move: int, mapping: list[int]) -> int:
+        """
+        The image of an encoded move under a mapping of the cards from permutation.
+
+        :param move: (int): The encoded move.
+        :param mapping: (list[int]): The mapping of the cards.
+        :returns: (int): The encoded image of the move.
+        """
+        if move < 0:
+            # Trump exchanges and closing the talon only involve the trump suit, which is not relabeled
+            return move
+        if move >= MARRIAGE_OFFSET:
+            return MARRIAGE_OFFSET + mapping[move - MARRIAGE_OFFSET]
+        return mapping[move]
+
+    def __describe(self, state: CompactState) -> list[tuple[int, ...]]:
+        """For each suit the codes of the locations of its cards, see key."""
+        # The code of each card: 0 out of the game, 1 and 2 for the hands, 3 for the bottom of the talon, 4 for the card played by the
+        # leader in this trick, 5 and 6 for the cards won by player 0 and 1, and from 7 on the positions on the talon.
+        locations: dict[int, int] = {}
+        if self.won_cards:
+            for player in (0, 1):
+                won = state.won_cards[player]
+                code = 5 + player
+                for cards, mask in zip(self.__cards_of_suit, self.__won_masks):
+                    if won & mask:
+                        for card in cards:
+                            if won >> card & 1:
+                                locations[card] = code
+        for card in state.hands[0]:
+            locations[card] = 1
+        for card in state.hands[1]:
+            locations[card] = 2
+        talon = state.talon
+        if talon:
+            if self.ordered_talon:
+                for position, card in enumerate(talon):
+                    locations[card] = 7 + position
+            else:
+                for card in talon:
+                    locations[card] = 7
+            locations[talon[-1]] = 3
+        leader_move = state.leader_move
+        if leader_move is not None:
+            locations[leader_move - MARRIAGE_OFFSET if leader_move >= MARRIAGE_OFFSET else leader_move] = 4
+        get = locations.get
+        return [tuple([get(card, 0) for card in cards]) for cards in self.__cards_of_suit]
@@ -0,0 +1,280 @@
+"""
+In this module you will find an opening book for the first trick of a game of Schnapsen, and the tool which generates it.
+
+At the start of a game, the leader only knows the five cards in their hand and the trump card at the bottom of the talon. Up to a
+relabeling of the suits, see schnapsen.isomorphism, there are only a few thousand such openings. The opening book contains for each
+of them the recommended first move and the equity of the hand: the game points the leader wins on average when playing that move.
+
+Both are estimated offline by Perfect Information Monte Carlo: for each opening a number of deals of the unseen cards is sampled,
+each deal is solved exactly until the end of the game with a DoubleDummySolver, and the move with the highest average value is
+recommended. The openings are divided among worker processes, and every opening uses its own random seed, so the book does not
+depend on the number of processes.
+
+The book is stored as arrays with one row per opening, including the ones which are not canonical and remain empty. The row of an
+opening is computed from its cards, so a lookup takes a constant time, and the file is memory-mapped when it is loaded.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import random
+from dataclasses import dataclass
+from itertools import repeat
+from math import comb
+from typing import Any, Iterable, Literal, Optional, Sequence
+
+import numpy as np
+
+from .compact import CLOSE_TALON, EXCHANGE, MARRIAGE_OFFSET, CompactEngine, CompactState
+from .deck import Card, Rank, Suit, index_by_id
+from .game import CloseTalon, GamePhase, GamePlayEngine, Marriage, Move, PlayerPerspective, RegularMove, TrumpExchange
+from .isomorphism import canonical_hand
+from .parallel import map_in_processes, split
+from .solver import DoubleDummySolver
+
+_MAGIC = b"SCHNAPOB"
+_HEADER_SIZE = 4096
+"""The number of bytes before the first array in the file: the magic bytes followed by the header as JSON, padded with spaces."""
+
+_MISSING = -128
+"""The move stored in the rows of openings which are not in the book."""
+_EQUITY_SCALE = 1000
+"""The equity is stored as an integer number of thousandths of a game point."""
+
+
+@dataclass(frozen=True)
+class OpeningBookEntry:
+    """
+    The entry of an opening in the book.
+
+    :attr move: (Move): The recommended first move.
+    :attr equity: (float): The game points the leader wins on average with this move, negative if the leader loses on average.
+    """
+    move: Move
+    equity: float
+
+
+def _read_header(path: str) -> dict[str, Any]:
+    with open(path, "rb") as file:
+        data = file.read(_HEADER_SIZE)
+    assert data[:len(_MAGIC)] == _MAGIC, f"{path} is not an opening book file"
+    header: dict[str, Any] = json.loads(data[len(_MAGIC):].decode("ascii"))
+    return header
+
+
+def _open_arrays(path: str, rows: int, mode: Literal["r", "r+"]) -> tuple[np.memmap[Any, np.dtype[Any]], np.memmap[Any, np.dtype[Any]]]:
+    """Memory-map the moves and the equities of an opening book file."""
+    moves = np.memmap(path, dtype=np.int8, mode=mode, offset=_HEADER_SIZE, shape=(rows,))
+    equities = np.memmap(path, dtype=np.int16, mode=mode, offset=_HEADER_SIZE + rows + rows % 2, shape=(rows,))
+    return moves, equities
+
+
+class _Layout:
+    """
+    The rows of the openings of a deck. The trump suit of every canonical opening is the first suit. The row of an opening is the position
+    of the trump card among the cards of the first suit, times the number of hands, plus the rank of the hand in the colexicographic order
+    of all hands made of the other cards.
+    """
+
+    def __init__(self, cards: list[Card], hand_size: int) -> None:
+        self.cards = cards
+        self.hand_size = hand_size
+        self.trump_suit = list(Suit)[0]
+        self.trump_cards = [index for index, card in enumerate(cards) if card.suit is self.trump_suit]
+        self.hands = comb(len(cards) - 1, hand_size)
+        self.rows = len(self.trump_cards) * self.hands
+        self.index_by_id = index_by_id(cards)
+
+    def row(self, hand: Iterable[int], trump_card: int) -> int:
+        """The row of an opening in canonical form, given by the indices of its cards."""
+        rank = 0
+        # The position of a card among the cards other than the trump card
+        positions = sorted(card - (card > trump_card) for card in hand)
+        for number, position in enumerate(positions, start=1):
+            rank += comb(position, number)
+        return self.trump_cards.index(trump_card) * self.hands + rank
+
+    def opening(self, row: int) -> tuple[list[int], int]:
+        """The hand and the trump card of a row, as indices of the cards, the inverse of row."""
+        trump_card = self.trump_cards[row // self.hands]
+        rank = row % self.hands
+        positions = []
+        for number in range(self.hand_size, 0, -1):
+            position = number - 1
+            while comb(position + 1, number) <= rank:
+                position += 1
+            rank -= comb(position, number)
+            positions.append(position)
+        return sorted(position + (position >= trump_card) for position in positions), trump_card
+
+
+def _hand_size(engine: GamePlayEngine) -> int:
+    hand, _, _ = engine.hand_generator.generateHands(engine.deck_generator.get_initial_deck())
+    return len(hand)
+
+
+def _canonical_rows(layout: _Layout) -> list[int]:
+    """The rows of all openings which are in canonical form."""
+    rows = []
+    for trump_card in layout.trump_cards:
+        others = [card for card in range(len(layout.cards)) if card != trump_card]
+        for hand in itertools.combinations(others, layout.hand_size):
+            canonical, _, _ = canonical_hand([layout.cards[card] for card in hand], layout.cards[trump_card])
+            # the trump card is in the first suit already, only the other suits can be relabeled
+            if sorted(layout.index_by_id[id(card)] for card in canonical) == list(hand):
+                rows.append(layout.row(hand, trump_card))
+    return sorted(rows)
+
+
+def _generate_chunk(path: str, engine: GamePlayEngine, rows: Sequence[int]) -> None:
+    """Estimate the best move and the equity of the openings in the rows, and write them to the file."""
+    header = _read_header(path)
+    compact_engine = CompactEngine(engine)
+    layout = _Layout(compact_engine.cards, header["hand_size"])
+    moves, equities = _open_arrays(path, layout.rows, "r+")
+    solver = DoubleDummySolver(compact_engine)
+    number_of_cards = len(compact_engine.cards)
+    for row in rows:
+        hand, trump_card = layout.opening(row)
+        unseen = [card for card in range(number_of_cards) if card not in hand and card != trump_card]
+        rng = random.Random(header["seed"] * layout.rows + row)
+        totals: dict[int, int] = {}
+        for _ in range(header["deals"]):
+            rng.shuffle(unseen)
+            state = CompactState(hands=[list(hand), unseen[:layout.hand_size]], talon=unseen[layout.hand_size:] + [trump_card],
+                                 trump=compact_engine.suit_of[trump_card], direct_points=[0, 0], pending_points=[0, 0], won_cards=[0, 0])
+            for move, value in solver.solve_moves(state).items():
+                totals[move] = totals.get(move, 0) + value
+        best_move = max(totals, key=totals.__getitem__)
+        moves[row] = best_move
+        equities[row] = round(totals[best_move] * _EQUITY_SCALE / header["deals"])
+    moves.flush()
+    equities.flush()
+
+
+def generate_opening_book(path: str, engine: GamePlayEngine, deals: int = 100, processes: int = 1, seed: int = 0,
+                          openings: Optional[Iterable[tuple[Iterable[Card], Card]]] = None) -> None:
+    """
+    Generate the opening book for the games of the engine, and write it to a file.
+    Solving a deal takes about a tenth of a second for the deck of 20 cards, so a complete book takes many hours, use a lot of processes.
+
+    :param path: (str): The file to write the opening book to. It is overwritten if it exists.
+    :param engine: (GamePlayEngine): The engine playing the games. It must follow the Schnapsen rules, see CompactEngine.supports.
+    :param deals: (int): The number of deals of the unseen cards solved for each opening.
+    :param processes: (int): The number of worker processes. With 1, everything is done in this process.
+    :param seed: (int): The seed from which the random deals of all openings are derived.
+    :param openings: (Optional[Iterable[tuple[Iterable[Card], Card]]]): Only put these openings, given as a hand and a trump card,
+        in the book, instead of all of them. Used for trying things out, lookups of other openings return None.
+    """
+    assert deals >= 1, f"we cannot work with less than one deal, got {deals}"
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    compact_engine = CompactEngine(engine)
+    hand_size = _hand_size(engine)
+    layout = _Layout(compact_engine.cards, hand_size)
+    if openings is None:
+        rows = _canonical_rows(layout)
+    else:
+        rows = []
+        for hand, trump_card in openings:
+            canonical, canonical_trump_card, _ = canonical_hand(hand, trump_card)
+            rows.append(layout.row([compact_engine.index[card] for card in canonical], compact_engine.index[canonical_trump_card]))
+        rows = sorted(set(rows))
+
+    header = json.dumps({"version": 1, "cards": [card.name for card in compact_engine.cards], "points": compact_engine.points,
+                         "hand_size": hand_size, "deals": deals, "seed": seed, "openings": len(rows)}).encode("ascii")
+    assert len(_MAGIC) + len(header) <= _HEADER_SIZE, "The header of the opening book is too long"
+    with open(path, "wb") as file:
+        file.write((_MAGIC + header).ljust(_HEADER_SIZE, b" "))
+        file.truncate(_HEADER_SIZE + layout.rows + layout.rows % 2 + 2 * layout.rows)
+    moves, _ = _open_arrays(path, layout.rows, "r+")
+    moves[:] = _MISSING
+    moves.flush()
+
+    map_in_processes(_generate_chunk, processes, repeat(path), repeat(engine), split(rows, processes, chunks_per_process=8))
+
+
+class OpeningBook:
+    """
+    An opening book generated by generate_opening_book, memory-mapped from its file.
+
+    :param path: (str): The file containing the opening book.
+    :attr path: (str): The file containing the opening book.
+    :attr deals: (int): The number of deals which were solved for each opening.
+    :attr openings: (int): The number of canonical openings in the book.
+    """
+
+    def __init__(self, path: str) -> None:
+        header = _read_header(path)
+        assert header["version"] == 1, f"Unknown opening book version {header['version']}"
+        self.path = path
+        self.deals: int = header["deals"]
+        self.openings: int = header["openings"]
+        self.__points: list[int] = header["points"]
+        self.__layout = _Layout([Card[name] for name in header["cards"]], header["hand_size"])
+        self.__moves, self.__equities = _open_arrays(path, self.__layout.rows, "r")
+
+    def supports(self, engine: GamePlayEngine) -> bool:
+        """
+        Whether the opening book is valid for the games of the engine: the rules of Schnapsen, with the deck and the points of the book.
+
+        :param engine: (GamePlayEngine): The engine to check.
+        :returns: (bool): True if the book was generated for games played by the engine.
+        """
+        if not CompactEngine.supports(engine):
+            return False
+        cards = list(engine.deck_generator.get_initial_deck())
+        return cards == self.__layout.cards and [engine.trick_scorer.rank_to_points(card.rank) for card in cards] == self.__points \
+            and _hand_size(engine) == self.__layout.hand_size
+
+    def lookup_cards(self, hand: Iterable[Card], trump_card: Card) -> Optional[OpeningBookEntry]:
+        """
+        Look up the opening of a leader with the hand, before the first trick.
+
+        :param hand: (Iterable[Card]): The cards in the hand of the leader.
+        :param trump_card: (Card): The trump card at the bottom of the talon.
+        :returns: (Optional[OpeningBookEntry]): The entry of the opening, with the move for the original suits, or None if it is not in the book.
+        """
+        layout = self.__layout
+        canonical, canonical_trump_card, permutation = canonical_hand(hand, trump_card)
+        index = layout.index_by_id
+        if len(canonical) != layout.hand_size or id(canonical_trump_card) not in index or not all(id(card) in index for card in canonical):
+            return None
+        row = layout.row([index[id(card)] for card in canonical], index[id(canonical_trump_card)])
+        move = int(self.__moves[row])
+        if move == _MISSING:
+            return None
+        equity = int(self.__equities[row]) / _EQUITY_SCALE
+        return OpeningBookEntry(permutation.inverse().move(self.__decode(move)), equity)
+
+    def lookup(self, perspective: PlayerPerspective) -> Optional[OpeningBookEntry]:
+        """
+        Look up the opening of the player, if the player is the leader of the first trick of the game. A trump exchange in the first trick
+        leads to another opening, which can be looked up as well.
+
+        :param perspective: (PlayerPerspective): The perspective of the player.
+        :returns: (Optional[OpeningBookEntry]): The entry of the opening, or None if it is not in the book.
+        """
+        trump_card = perspective.get_trump_card()
+        if trump_card is None or not perspective.am_i_leader() or perspective.get_phase() != GamePhase.ONE:
+            return None
+        if perspective.get_talon_size() != len(self.__layout.cards) - 2 * self.__layout.hand_size:
+            return None
+        if perspective.get_won_cards().get_cards() or perspective.get_opponent_won_cards().get_cards():
+            return None
+        my_score, opponent_score = perspective.get_my_score(), perspective.get_opponent_score()
+        if my_score.direct_points or my_score.pending_points or opponent_score.direct_points or opponent_score.pending_points:
+            return None
+        return self.lookup_cards(perspective.get_hand(), trump_card)
+
+    def __decode(self, move: int) -> Move:
+        """Get the Move of a move of the book, encoded like by the CompactEngine, with the first suit as the trump suit."""
+        cards = self.__layout.cards
+        if move == EXCHANGE:
+            return TrumpExchange(Card.get_card(Rank.JACK, self.__layout.trump_suit))
+        if move == CLOSE_TALON:
+            return CloseTalon()
+        if move >= MARRIAGE_OFFSET:
+            queen = cards[move - MARRIAGE_OFFSET]
+            return Marriage(queen, Card.get_card(Rank.KING, queen.suit))
+        return RegularMove(cards[move])
@@ -0,0 +1,51 @@
+"""
+In this module you will find the helpers with which the generators of data, tables and books spread their work over worker processes.
+
+The work is split into chunks of consecutive items, for example the seeds of the games to play, and every chunk is handed to a worker.
+Each item carries everything needed to reproduce it, like the seed of a game, so the result does not depend on the number of processes.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def split(items: Sequence[T], processes: int, chunks_per_process: int = 4, chunk_size: Optional[int] = None) -> list[Sequence[T]]:
+    """
+    Split the items into chunks of consecutive items, in order.
+    There are more chunks than processes, such that all processes stay busy until the end, also when some chunks take longer than others.
+
+    :param items: (Sequence[T]): The items, for example the seeds of the games to play, or a range of indices.
+    :param processes: (int): The number of processes the chunks are handed out to.
+    :param chunks_per_process: (int): The number of chunks for each process.
+    :param chunk_size: (Optional[int]): The number of items in each chunk, instead of dividing them by the number of chunks.
+    :returns: (list[Sequence[T]]): The chunks, each a slice of the items.
+    """
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(items) // (chunks_per_process * processes)))
+    assert chunk_size >= 1, f"we cannot work with chunks of less than one item, got {chunk_size}"
+    return [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+
+def map_in_processes(function: Callable[..., R], processes: int, *iterables: Iterable[Any], executor: Optional[Executor] = None) -> list[R]:
+    """
+    Call the function with an item of each of the iterables at a time, like map, in worker processes, and collect the results in order.
+    Arguments which are the same for all calls can be passed with itertools.repeat. The function and the arguments must be picklable,
+    like a function defined at the top level of a module.
+
+    :param function: (Callable[..., R]): The function, typically working on one chunk from split.
+    :param processes: (int): The number of worker processes. With 1, everything is done in this process.
+    :param iterables: (Iterable[Any]): The arguments of the calls, the shortest one decides the number of calls.
+    :param executor: (Optional[Executor]): A pool of workers to use instead of starting one, for example to reuse it for several maps.
+    :returns: (list[R]): The results of the calls, in the order of the arguments.
+    """
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    if executor is not None:
+        return list(executor.map(function, *iterables))
+    if processes == 1:
+        return list(map(function, *iterables))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(function, *iterables))
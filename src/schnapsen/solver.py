@@ -0,0 +1,367 @@
+"""
+In this module you will find the DoubleDummySolver, which computes the exact game theoretic value of a CompactState.
+
+The solver assumes that both players can see all cards, including the order of the talon. This is never the case in a real game,
+but it is the building block of Perfect Information Monte Carlo (PIMC) search: sample the unknown cards a number of times and
+solve each of the resulting perfect information games.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, cast
+
+from .compact import CLOSE_TALON, EXCHANGE, MARRIAGE_OFFSET, CompactEngine, CompactState
+from .transposition import EXACT, LOWER_BOUND, UPPER_BOUND, SharedTranspositionTable
+
+_LEADER_WON_CARDS = 1
+_FOLLOWER_WON_CARDS = 2
+_CLOSED = 4
+_CHANGED_SINCE_CLOSE = 8
+_NON_CLOSER_HAD_WON_CARDS = 16
+
+_WIN = 3
+"""The highest number of game points, no value can be outside of [-_WIN, _WIN]."""
+
+
+class DoubleDummySolver:
+    """
+    Solves perfect information games of Schnapsen, from any point in the game, with the talon included.
+
+    The value of a state is the number of game points the player who is to move will win, negated if that player will lose,
+    assuming both players play perfectly. Hence the value is one of -3, -2, -1, 1, 2 and 3.
+
+    The search is a negamax alpha-beta search over the rounds of the game. To make it fast enough to be called dozens of times per move:
+
+    * the state is kept in a handful of integers, the hands are bitmasks and the talon is only referred to by the number of cards drawn;
+    * positions are cached in a transposition table storing bounds on the value and the best move. The table is kept between calls,
+      so the endgames, which are the same in many determinizations of the same situation, are only solved once;
+    * the best move from the table is tried first, followed by trump exchanges, marriages and then the cards with the most points;
+    * with win_only, the search only finds out who wins, using a null window around zero, which prunes much more.
+
+    :param engine: (CompactEngine): The engine which created the states to be solved.
+    :param max_table_size: (int): The transposition table is cleared when it gets more entries than this.
+    :param shared_table: (Optional[SharedTranspositionTable]): A table shared with other solvers, possibly in other processes.
+        Positions in which the talon does not matter anymore are looked up in it when they are not in the own table of the solver.
+        All solvers sharing a table must use engines with the same deck.
+    :attr nodes: (int): The number of positions searched since the solver was created.
+    """
+
+    def __init__(self, engine: CompactEngine, max_table_size: int = 2_000_000, shared_table: Optional[SharedTranspositionTable] = None) -> None:
+        self.engine = engine
+        self.max_table_size = max_table_size
+        self.shared_table = shared_table
+        self.nodes = 0
+        number_of_cards = len(engine.cards)
+        points = engine.points
+        suit_of = engine.suit_of
+        self._points = points
+        self._suit_of = suit_of
+        self._suit_mask = [sum(1 << card for card in range(number_of_cards) if suit_of[card] == suit) for suit in range(len(engine.suits))]
+        self._higher_in_suit = [sum(1 << other for other in range(number_of_cards) if suit_of[other] == suit_of[card] and points[other] > points[card])
+                                for card in range(number_of_cards)]
+        self._by_points_ascending = sorted(range(number_of_cards), key=lambda card: points[card])
+        self._cards_cache: dict[int, list[int]] = {}
+        self._marriage_king = engine.marriage_king
+        self._table: dict[tuple[int, ...], tuple[int, int, int]] = {}
+        # The remaining talon is part of the key of the table, each different remaining talon gets a number.
+        self._talon_ids: dict[tuple[int, ...], int] = {}
+        # The legal moves of the leader depend on the trump suit, this cache is cleared with the table.
+        self._leader_moves_cache: dict[int, list[int]] = {}
+        # The state of the game currently being solved, which does not change during the search
+        self._trump = -1
+        self._trump_mask = 0
+        self._trump_jack: Optional[int] = None
+        self._talon: list[int] = []
+        self._remaining_talon_ids: list[int] = []
+
+    def clear(self) -> None:
+        """Empty the transposition table."""
+        self._table.clear()
+        self._talon_ids.clear()
+        self._leader_moves_cache.clear()
+
+    def solve(self, state: CompactState, win_only: bool = False) -> int:
+        """
+        Compute the value of the state for the player who is to move.
+
+        :param state: (CompactState): The state to solve. It is not modified. The game must not have ended yet.
+        :param win_only: (bool): If True, only the sign of the result is exact.
+        :returns: (int): The value of the state, see the class documentation.
+        """
+        return max(self.solve_moves(state, win_only).values())
+
+    def solve_moves(self, state: CompactState, win_only: bool = False) -> dict[int, int]:
+        """
+        Compute the value of each legal move of the player who is to move, i.e., the value of the state after the move,
+        for the player who made it.
+
+        :param state: (CompactState): The state to solve. It is not modified. The game must not have ended yet.
+        :param win_only: (bool): If True, only the sign of the values is exact.
+        :returns: (dict[int, int]): The values, indexed by the encoded moves.
+        """
+        self._prepare(state)
+        alpha, beta = (-1, 1) if win_only else (-_WIN, _WIN)
+        args = self._arguments(state)
+        if state.leader_move is None:
+            values = {}
+            for move in self._leader_moves(args[0], args[2], args[8], -100):
+                values[move] = self._play_leader_move(move, *args, alpha, beta)
+            return values
+        # The follower is to move. The trick is valued from the point of view of the leader, hence the negation.
+        follow_moves = self._follower_moves(args[1], state.leader_move, args[2], args[8])
+        return {card: -self._play_trick(state.leader_move, card, *args, -beta, -alpha) for card in follow_moves}
+
+    def _prepare(self, state: CompactState) -> None:
+        """Set up the parts of the state which are fixed during the search."""
+        engine = self.engine
+        if state.trump != self._trump or len(self._table) > self.max_table_size:
+            self.clear()
+        self._trump = state.trump
+        self._trump_mask = self._suit_mask[state.trump]
+        self._trump_jack = engine.jack_of_suit[state.trump]
+        talon = list(state.talon)
+        self._talon = talon
+        talon_ids = self._talon_ids
+        # the last card of the talon can change by a trump exchange, it is passed separately to the search
+        self._remaining_talon_ids = [talon_ids.setdefault(tuple(talon[drawn:-1]), len(talon_ids)) for drawn in range(len(talon) + 1)]
+
+    @staticmethod
+    def _arguments(state: CompactState) -> tuple[int, int, int, int, int, int, int, int, int]:
+        """Convert the state to the arguments of the search, from the point of view of the leader."""
+        leader = state.leader
+        follower = 1 - leader
+        flags = 0
+        if state.won_cards[leader]:
+            flags |= _LEADER_WON_CARDS
+        if state.won_cards[follower]:
+            flags |= _FOLLOWER_WON_CARDS
+        if state.is_talon_closed:
+            flags |= _CLOSED
+            if state.leader_changed_since_close:
+                flags |= _CHANGED_SINCE_CLOSE
+            if state.non_closer_had_won_cards:
+                flags |= _NON_CLOSER_HAD_WON_CARDS
+        return (sum(1 << card for card in state.hands[leader]), sum(1 << card for card in state.hands[follower]),
+                0, state.talon[-1] if state.talon else -1,
+                state.direct_points[leader], state.direct_points[follower],
+                state.pending_points[leader], state.pending_points[follower], flags)
+
+    def _leader_moves(self, hand: int, drawn: int, flags: int, first: int) -> list[int]:
+        """The legal moves of the leader, in the order in which they are searched. The move first goes first, if it is legal."""
+        phase_one = drawn < len(self._talon) and not flags & _CLOSED
+        key = hand << 1 | phase_one
+        moves = self._leader_moves_cache.get(key)
+        if moves is None:
+            moves = []
+            jack = self._trump_jack
+            if phase_one and jack is not None and hand >> jack & 1:
+                moves.append(EXCHANGE)
+            if phase_one:
+                moves.append(CLOSE_TALON)
+            marriage_king = self._marriage_king
+            cards = self._cards_in(hand)
+            for card in cards:
+                king = marriage_king[card]
+                if king is not None and hand >> king & 1:
+                    moves.append(MARRIAGE_OFFSET + card)
+            moves.extend(reversed(cards))
+            self._leader_moves_cache[key] = moves
+        if first in moves and moves[0] != first:
+            moves = moves.copy()
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def _cards_in(self, mask: int) -> list[int]:
+        """The cards in the mask, the cards with the least points first. The lists are cached, they must not be modified."""
+        cards = self._cards_cache.get(mask)
+        if cards is None:
+            cards = [card for card in self._by_points_ascending if mask >> card & 1]
+            self._cards_cache[mask] = cards
+        return cards
+
+    def _follower_moves(self, hand: int, leader_move: int, drawn: int, flags: int) -> list[int]:
+        """
+        The legal moves of the follower, following the rules of the SchnapsenMoveValidator.
+        The cards which win the trick go first, and within those and the others, the cards with the least points go first.
+        """
+        # like in the SchnapsenMoveValidator, the queen of a marriage is the card which has to be followed
+        queen_or_card = leader_move - MARRIAGE_OFFSET if leader_move >= MARRIAGE_OFFSET else leader_move
+        if drawn >= len(self._talon) or flags & _CLOSED:
+            same_suit = hand & self._suit_mask[self._suit_of[queen_or_card]]
+            if same_suit:
+                higher = same_suit & self._higher_in_suit[queen_or_card]
+                hand = higher if higher else same_suit
+            elif hand & self._trump_mask:
+                hand &= self._trump_mask
+        leader_card = cast(int, self._marriage_king[queen_or_card]) if leader_move >= MARRIAGE_OFFSET else leader_move
+        winning = self._higher_in_suit[leader_card]
+        if self._suit_of[leader_card] != self._trump:
+            winning |= self._trump_mask
+        winning &= hand
+        losing = hand & ~winning
+        return self._cards_in(winning) + self._cards_in(losing)
+
+    def _lead(self, leader_hand: int, follower_hand: int, drawn: int, bottom: int, leader_points: int, follower_points: int,
+              leader_pending: int, follower_pending: int, flags: int, alpha: int, beta: int) -> int:
+        """The value of a state in which the leader is to move, for the leader. The search is fail-soft."""
+        self.nodes += 1
+        endgame = drawn >= len(self._talon) or flags & _CLOSED
+        if not endgame:
+            key = (leader_hand, follower_hand, self._remaining_talon_ids[drawn], bottom, leader_points, follower_points, leader_pending, follower_pending, flags)
+        else:
+            # The talon does not matter anymore, such that the same endgame is found in the table for all determinizations
+            key = (leader_hand, follower_hand, -1, -1, leader_points, follower_points, leader_pending, follower_pending, flags)
+        table = self._table
+        entry = table.get(key)
+        shared_table = self.shared_table
+        if entry is None and endgame and shared_table is not None:
+            entry = self._probe_shared(shared_table, key)
+        first = -100
+        if entry is not None:
+            lower, upper, first = entry
+            if lower >= beta or lower == upper:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha = max(alpha, lower)
+            beta = min(beta, upper)
+        else:
+            lower, upper = -_WIN, _WIN
+        original_alpha, original_beta = alpha, beta
+
+        best_value = -_WIN - 1
+        best_move = first
+        for move in self._leader_moves(leader_hand, drawn, flags, first):
+            value = self._play_leader_move(move, leader_hand, follower_hand, drawn, bottom, leader_points, follower_points,
+                                           leader_pending, follower_pending, flags, alpha, beta)
+            if value > best_value:
+                best_value = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best_value <= original_alpha:
+            upper = best_value
+        elif best_value >= original_beta:
+            lower = best_value
+        else:
+            lower = upper = best_value
+        table[key] = (lower, upper, best_move)
+        if endgame and shared_table is not None:
+            self._store_shared(shared_table, key, lower, upper, best_move, leader_hand.bit_count())
+        return best_value
+
+    def _shared_key(self, key: tuple[int, ...]) -> int:
+        """The key of a position in the shared table. Hashing a tuple of integers gives the same result in every process."""
+        return hash((self._trump,) + key) & 0xFFFFFFFFFFFFFFFF
+
+    def _probe_shared(self, shared_table: SharedTranspositionTable, key: tuple[int, ...]) -> Optional[tuple[int, int, int]]:
+        """Look a position up in the shared table, and convert the entry to the (lower, upper, best move) of the own table."""
+        entry = shared_table.probe(self._shared_key(key))
+        if entry is None:
+            return None
+        value, flag, move, _ = entry
+        if flag == EXACT:
+            return int(value), int(value), move
+        if flag == LOWER_BOUND:
+            return int(value), _WIN, move
+        return -_WIN, int(value), move
+
+    def _store_shared(self, shared_table: SharedTranspositionTable, key: tuple[int, ...], lower: int, upper: int, best_move: int, cards: int) -> None:
+        """Store an entry of the own table in the shared table. Entries with two bounds cannot be stored, they are rare."""
+        if lower == upper:
+            shared_table.store(self._shared_key(key), lower, EXACT, best_move, cards)
+        elif upper == _WIN:
+            shared_table.store(self._shared_key(key), lower, LOWER_BOUND, best_move, cards)
+        elif lower == -_WIN:
+            shared_table.store(self._shared_key(key), upper, UPPER_BOUND, best_move, cards)
+
+    def _play_leader_move(self, move: int, leader_hand: int, follower_hand: int, drawn: int, bottom: int, leader_points: int, follower_points: int,
+                          leader_pending: int, follower_pending: int, flags: int, alpha: int, beta: int) -> int:
+        """The value of a move of the leader, for the leader."""
+        if move == EXCHANGE:
+            jack = self._trump_jack
+            assert jack is not None, "Logical error. An exchange was generated without a trump jack in the deck"
+            return self._lead(leader_hand & ~(1 << jack) | 1 << bottom, follower_hand, drawn, jack, leader_points, follower_points,
+                              leader_pending, follower_pending, flags, alpha, beta)
+        if move == CLOSE_TALON:
+            closed_flags = flags & ~_CHANGED_SINCE_CLOSE | _CLOSED
+            if flags & _FOLLOWER_WON_CARDS:
+                closed_flags |= _NON_CLOSER_HAD_WON_CARDS
+            return self._lead(leader_hand, follower_hand, drawn, bottom, leader_points, follower_points,
+                              leader_pending, follower_pending, closed_flags, alpha, beta)
+        # The follower picks the card which is worst for the leader
+        best_value = _WIN + 1
+        for card in self._follower_moves(follower_hand, move, drawn, flags):
+            value = self._play_trick(move, card, leader_hand, follower_hand, drawn, bottom, leader_points, follower_points,
+                                     leader_pending, follower_pending, flags, alpha, beta)
+            if value < best_value:
+                best_value = value
+                if value < beta:
+                    beta = value
+                    if alpha >= beta:
+                        break
+        return best_value
+
+    def _play_trick(self, leader_move: int, follower_card: int, leader_hand: int, follower_hand: int, drawn: int, bottom: int,
+                    leader_points: int, follower_points: int, leader_pending: int, follower_pending: int, flags: int, alpha: int, beta: int) -> int:
+        """The value of a trick for the leader of the trick. This mirrors CompactEngine._complete_trick and CompactEngine.winner."""
+        suit_of = self._suit_of
+        points = self._points
+        if leader_move >= MARRIAGE_OFFSET:
+            queen = leader_move - MARRIAGE_OFFSET
+            leader_pending += 40 if suit_of[queen] == self._trump else 20
+            leader_card = self._marriage_king[queen]
+            assert leader_card is not None, "Logical error. A marriage was generated for a queen without a king"
+        else:
+            leader_card = leader_move
+        leader_hand &= ~(1 << leader_card)
+        follower_hand &= ~(1 << follower_card)
+        leader_suit = suit_of[leader_card]
+        follower_suit = suit_of[follower_card]
+        if leader_suit == follower_suit:
+            leader_wins = points[leader_card] > points[follower_card]
+        else:
+            leader_wins = follower_suit != self._trump
+        trick_points = points[leader_card] + points[follower_card]
+
+        # From here on, everything is from the point of view of the winner of the trick, who becomes the new leader
+        if leader_wins:
+            winner_hand, loser_hand = leader_hand, follower_hand
+            winner_points, loser_points = leader_points + trick_points + leader_pending, follower_points
+            loser_pending = follower_pending
+            new_flags = flags | _LEADER_WON_CARDS
+        else:
+            winner_hand, loser_hand = follower_hand, leader_hand
+            winner_points, loser_points = follower_points + trick_points + follower_pending, leader_points
+            loser_pending = leader_pending
+            new_flags = (flags & ~(_LEADER_WON_CARDS | _FOLLOWER_WON_CARDS)) | _LEADER_WON_CARDS
+            if flags & _LEADER_WON_CARDS:
+                new_flags |= _FOLLOWER_WON_CARDS
+            if flags & _CLOSED:
+                new_flags |= _CHANGED_SINCE_CLOSE
+
+        talon = self._talon
+        if drawn < len(talon) and not flags & _CLOSED:
+            # the winner takes the first card of the talon, the loser the second one
+            winner_hand |= 1 << talon[drawn]
+            loser_hand |= 1 << (bottom if drawn + 2 == len(talon) else talon[drawn + 1])
+            drawn += 2
+
+        if winner_points >= 66:
+            value = 3 if loser_points == 0 else 1 if loser_points >= 33 else 2
+        elif winner_hand or loser_hand:
+            if leader_wins:
+                return self._lead(winner_hand, loser_hand, drawn, bottom, winner_points, loser_points, 0, loser_pending, new_flags, alpha, beta)
+            return -self._lead(winner_hand, loser_hand, drawn, bottom, winner_points, loser_points, 0, loser_pending, new_flags, -beta, -alpha)
+        elif new_flags & _CLOSED:
+            # Like the SchnapsenTrickScorer, the closer is assumed to be the current leader, unless the lead changed since closing
+            value = 2 if new_flags & _NON_CLOSER_HAD_WON_CARDS else 3
+            if not new_flags & _CHANGED_SINCE_CLOSE:
+                value = -value
+        else:
+            value = 1
+        return value if leader_wins else -value
@@ -0,0 +1,396 @@
+"""
+In this module you will find an endgame tablebase for the second phase of Schnapsen, and the tool which generates it.
+
+Once the talon is empty (and was not closed), all cards are known and the rest of the game is determined by the hands of the
+leader and the follower, the trump suit and the scores. The tablebase contains the exact value of all such positions in which
+the players have at most a few cards left, computed once by retrograde analysis. A bot can then look the value of a position up,
+instead of searching it.
+
+The positions are reduced by suit isomorphism: the trump suit is renamed to the first suit, and the three other suits are put
+in the order which gives the smallest key. The value is stored for all scores at once. After the first trick of the game the
+leader never has pending points, and the follower has at most the points of one marriage pending. The direct points of the
+follower follow from the points in the hands and the points of the marriages declared so far, so a position is stored as
+(pending points of the follower, points of the marriages declared so far, direct points of the leader). The values are packed two
+per byte, and the file is memory-mapped when it is loaded, so only the parts which are used are read from disk.
+
+The tablebase is only valid for the standard game of Schnapsen with 20 cards, see Tablebase.supports.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Literal, Optional, Sequence, Union
+
+import numpy as np
+
+from .compact import CompactEngine, CompactState
+from .deck import Card, Rank, Suit, value_by_id
+from .game import GamePlayEngine, GameState, SchnapsenDeckGenerator, SchnapsenTrickScorer
+from .parallel import map_in_processes, split
+
+MAX_CARDS = 3
+"""The largest number of cards per hand the tablebase can be generated for. With 4 cards, the intermediate tables would not fit in memory."""
+
+_MAGIC = b"SCHNAPTB"
+_HEADER_SIZE = 1024
+"""The number of bytes before the first array in the file: the magic bytes followed by the header as JSON, padded with spaces."""
+
+_RANKS = [Rank.ACE, Rank.TEN, Rank.KING, Rank.QUEEN, Rank.JACK]
+"""The ranks of the Schnapsen deck, from high to low. A card has bit 5 * suit + rank, in which the trump suit is suit 0."""
+_POINTS = [11, 10, 4, 3, 2]
+_KING = 2
+_QUEEN = 3
+_TOTAL_POINTS = 4 * sum(_POINTS)
+
+_GRID = 66
+"""The direct points of the players in positions where the game has not ended are below 66."""
+_PENDING = 3
+"""The pending points of the follower: 0, 20 or 40."""
+_MARRIAGES = 6
+"""The points of the marriages declared so far: 0, 20, ..., 100."""
+
+_PERMUTATIONS = list(itertools.permutations((1, 2, 3)))
+# The points of the winner if the game ends, indexed by the direct points of the loser
+_WIN_POINTS = np.array([3] + [2] * 32 + [1] * 33, dtype=np.int8)
+
+
+def _canonical_key(leader: int, follower: int) -> int:
+    """
+    The key of a pair of hands, given as bitmasks: the smallest key over all orders of the non-trump suits.
+    The hand of the leader is in the lowest 20 bits, the hand of the follower in the next 20 bits.
+    """
+    leader_suits = [(leader >> (5 * suit)) & 31 for suit in range(4)]
+    follower_suits = [(follower >> (5 * suit)) & 31 for suit in range(4)]
+    keys = []
+    for a, b, c in _PERMUTATIONS:
+        leader_key = leader_suits[0] | leader_suits[a] << 5 | leader_suits[b] << 10 | leader_suits[c] << 15
+        follower_key = follower_suits[0] | follower_suits[a] << 5 | follower_suits[b] << 10 | follower_suits[c] << 15
+        keys.append(leader_key | follower_key << 20)
+    return min(keys)
+
+
+def _hand_masks(cards: int) -> np.ndarray:
+    """All bitmasks of hands with the given number of cards."""
+    return np.array([sum(1 << bit for bit in hand) for hand in itertools.combinations(range(20), cards)], dtype=np.uint64)
+
+
+def _enumerate_keys(cards: int) -> np.ndarray:
+    """The sorted canonical keys of all pairs of hands with the given number of cards each."""
+    hands = _hand_masks(cards)
+    leaders, followers = np.meshgrid(hands, hands, indexing="ij")
+    disjoint = (leaders & followers) == 0
+    leaders = leaders[disjoint]
+    followers = followers[disjoint]
+    suits = [(np.uint64(5 * suit), np.uint64(31)) for suit in range(4)]
+    leader_suits = [(leaders >> shift) & mask for shift, mask in suits]
+    follower_suits = [(followers >> shift) & mask for shift, mask in suits]
+    keys = None
+    for permutation in _PERMUTATIONS:
+        order = (0,) + permutation
+        key = np.zeros_like(leaders)
+        for position, suit in enumerate(order):
+            key |= leader_suits[suit] << np.uint64(5 * position)
+            key |= follower_suits[suit] << np.uint64(5 * position + 20)
+        keys = key if keys is None else np.minimum(keys, key)
+    assert keys is not None
+    return np.unique(keys)
+
+
+def _bits(mask: int) -> list[int]:
+    """The bits set in a bitmask."""
+    return [bit for bit in range(20) if mask >> bit & 1]
+
+
+def _hand_points(mask: int) -> int:
+    return sum(_POINTS[bit % 5] for bit in _bits(mask))
+
+
+def _follower_cards(hand: int, follow_card: int) -> list[int]:
+    """The cards the follower may play, like the SchnapsenMoveValidator in the second phase."""
+    cards = _bits(hand)
+    suit = follow_card // 5
+    same_suit = [card for card in cards if card // 5 == suit]
+    if same_suit:
+        # a lower rank is a higher card
+        higher = [card for card in same_suit if card % 5 < follow_card % 5]
+        return higher if higher else same_suit
+    if suit != 0:
+        trumps = [card for card in cards if card // 5 == 0]
+        if trumps:
+            return trumps
+    return cards
+
+
+def _solve_pair(leader: int, follower: int, child_keys: Optional[np.ndarray], child_grids: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Compute the values of a pair of hands for all scores: an array indexed by the pending points of the follower / 20, the direct
+    points of the leader and the direct points of the follower, holding the game points for the leader.
+
+    :param leader: the hand of the leader
+    :param follower: the hand of the follower
+    :param child_keys: the sorted keys of the pairs with one card less, None if these are the last cards
+    :param child_grids: the values of these pairs, in the same format as the result
+    """
+    # the moves of the leader: the card played, the card to follow and the marriage points
+    leader_moves = [(card, card, 0) for card in _bits(leader)]
+    for suit in range(4):
+        king, queen = 5 * suit + _KING, 5 * suit + _QUEEN
+        if leader >> king & 1 and leader >> queen & 1:
+            leader_moves.append((king, queen, 40 if suit == 0 else 20))
+
+    best: Optional[np.ndarray] = None
+    for leader_card, follow_card, marriage in leader_moves:
+        worst: Optional[np.ndarray] = None
+        for follower_card in _follower_cards(follower, follow_card):
+            if leader_card // 5 == follower_card // 5:
+                leader_wins = leader_card % 5 < follower_card % 5
+            else:
+                leader_wins = follower_card // 5 != 0
+            points = _POINTS[leader_card % 5] + _POINTS[follower_card % 5]
+            new_leader = leader & ~(1 << leader_card)
+            new_follower = follower & ~(1 << follower_card)
+            if not leader_wins:
+                new_leader, new_follower = new_follower, new_leader
+            child: Union[np.ndarray, int]
+            if child_keys is None:
+                # the last trick is worth one game point
+                child = 1
+            else:
+                assert child_grids is not None
+                child = child_grids[np.searchsorted(child_keys, _canonical_key(new_leader, new_follower))]
+
+            result = np.empty((_PENDING, _GRID, _GRID), dtype=np.int8)
+            if leader_wins:
+                gain = points + marriage
+                cut = _GRID - gain
+                result[:, :cut, :] = child if isinstance(child, int) else child[:, gain:, :]
+                result[:, cut:, :] = _WIN_POINTS[np.newaxis, np.newaxis, :]
+            else:
+                for pending in range(_PENDING):
+                    gain = points + 20 * pending
+                    cut = _GRID - gain
+                    # the follower becomes the leader, and the marriage of the leader becomes pending
+                    result[pending, :, :cut] = -child if isinstance(child, int) else -child[marriage // 20, gain:, :].T
+                    result[pending, :, cut:] = -_WIN_POINTS[:, np.newaxis]
+            worst = result if worst is None else np.minimum(worst, result)
+        assert worst is not None
+        best = worst if best is None else np.maximum(best, worst)
+    assert best is not None
+    return best
+
+
+def _pack(grid: np.ndarray, hand_points: int) -> np.ndarray:
+    """
+    Select the scores which are possible with these hands from the values of _solve_pair and pack them two per byte.
+    A value v is stored as v + 8, impossible scores as 0.
+    """
+    leader_points = np.arange(_GRID)
+    packed = np.zeros((_PENDING, _MARRIAGES, _GRID), dtype=np.uint8)
+    for pending in range(_PENDING):
+        for marriages in range(_MARRIAGES):
+            follower_points = _TOTAL_POINTS - hand_points + 20 * marriages - 20 * pending - leader_points
+            possible = (follower_points >= 0) & (follower_points < _GRID)
+            packed[pending, marriages, possible] = grid[pending, leader_points[possible], follower_points[possible]] + 8
+    return packed[:, :, 0::2] | packed[:, :, 1::2] << 4
+
+
+def _read_header(path: str) -> dict[str, Any]:
+    with open(path, "rb") as file:
+        data = file.read(_HEADER_SIZE)
+    assert data[:len(_MAGIC)] == _MAGIC, f"{path} is not a tablebase file"
+    header: dict[str, Any] = json.loads(data[len(_MAGIC):].decode("ascii"))
+    return header
+
+
+def _open_level(path: str, level: dict[str, int], mode: Literal["r", "r+"]) -> tuple[np.memmap[Any, np.dtype[Any]], np.memmap[Any, np.dtype[Any]]]:
+    """Memory-map the keys and the packed values of one level of a tablebase file."""
+    keys = np.memmap(path, dtype=np.uint64, mode=mode, offset=level["keys"], shape=(level["pairs"],))
+    values = np.memmap(path, dtype=np.uint8, mode=mode, offset=level["values"], shape=(level["pairs"], _PENDING, _MARRIAGES, _GRID // 2))
+    return keys, values
+
+
+def _generate_chunk(path: str, cards: int, pairs: Sequence[int], grid_directory: str) -> None:
+    """
+    Solve the pairs with the given indices in the level with the given number of cards, and write them to the file.
+    The unpacked values are needed for the next level, they are written to a file in grid_directory, if there is a next level.
+    """
+    header = _read_header(path)
+    levels = header["levels"]
+    keys, values = _open_level(path, levels[cards - 1], "r+")
+    child_keys: Optional[np.ndarray] = None
+    child_grids: Optional[np.ndarray] = None
+    if cards > 1:
+        child_keys = np.array(_open_level(path, levels[cards - 2], "r")[0])
+        child_grids = np.memmap(os.path.join(grid_directory, f"{cards - 1}.grid"), dtype=np.int8, mode="r",
+                                shape=(len(child_keys), _PENDING, _GRID, _GRID))
+    grids: Optional[np.memmap[Any, np.dtype[Any]]] = None
+    if cards < header["max_cards"]:
+        grids = np.memmap(os.path.join(grid_directory, f"{cards}.grid"), dtype=np.int8, mode="r+", shape=(len(keys), _PENDING, _GRID, _GRID))
+    for index in pairs:
+        key = int(keys[index])
+        leader, follower = key & 0xFFFFF, key >> 20
+        grid = _solve_pair(leader, follower, child_keys, child_grids)
+        values[index] = _pack(grid, _hand_points(leader) + _hand_points(follower))
+        if grids is not None:
+            grids[index] = grid
+    values.flush()
+    if grids is not None:
+        grids.flush()
+
+
+def generate_tablebase(path: str, max_cards: int = MAX_CARDS, processes: int = 1) -> None:
+    """
+    Generate the tablebase for all positions with an empty talon in which both players have at most max_cards cards, and write it to a file.
+    The positions with one card are solved first, then the ones with two cards, which look up the values after their first trick, and so on.
+    The positions of one level are divided among the worker processes.
+
+    :param path: (str): The file to write the tablebase to. It is overwritten if it exists.
+    :param max_cards: (int): The largest number of cards in the hands, at most MAX_CARDS.
+    :param processes: (int): The number of worker processes. With 1, everything is done in this process.
+    """
+    assert 1 <= max_cards <= MAX_CARDS, f"max_cards must be between 1 and {MAX_CARDS}, got {max_cards}"
+    assert processes >= 1, f"we cannot work with less than one process, got {processes}"
+    all_keys = [_enumerate_keys(cards) for cards in range(1, max_cards + 1)]
+    levels: list[dict[str, int]] = []
+    offset = _HEADER_SIZE
+    for cards, keys in enumerate(all_keys, start=1):
+        values_offset = offset + keys.nbytes
+        levels.append({"cards": cards, "pairs": len(keys), "keys": offset, "values": values_offset})
+        offset = values_offset + len(keys) * _PENDING * _MARRIAGES * (_GRID // 2)
+    header = json.dumps({"version": 1, "max_cards": max_cards, "levels": levels}).encode("ascii")
+    assert len(_MAGIC) + len(header) <= _HEADER_SIZE, "The header of the tablebase is too long"
+
+    with open(path, "wb") as file:
+        file.write((_MAGIC + header).ljust(_HEADER_SIZE, b" "))
+        file.truncate(offset)
+    for level, keys in zip(levels, all_keys):
+        level_keys, _ = _open_level(path, level, "r+")
+        level_keys[:] = keys
+        level_keys.flush()
+
+    with tempfile.TemporaryDirectory() as grid_directory:
+        executor = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+        try:
+            for level in levels:
+                cards, pairs = level["cards"], level["pairs"]
+                if cards < max_cards:
+                    with open(os.path.join(grid_directory, f"{cards}.grid"), "wb") as file:
+                        file.truncate(pairs * _PENDING * _GRID * _GRID)
+                # the next level needs all pairs of this one, so the chunks of a level are all solved before the next level starts
+                map_in_processes(_generate_chunk, processes, itertools.repeat(path), itertools.repeat(cards),
+                                 split(range(pairs), processes, chunks_per_process=8), itertools.repeat(grid_directory), executor=executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+
+class Tablebase:
+    """
+    A tablebase generated by generate_tablebase, memory-mapped from its file.
+
+    The value of a position is the number of game points the leader wins with perfect play by both players, negative if the leader loses.
+    It is available for positions in which the talon is empty and was not closed, the leader has to play, both players have at most max_cards
+    cards, and the points are possible in a game, see lookup.
+
+    :param path: (str): The file containing the tablebase.
+    :attr path: (str): The file containing the tablebase.
+    :attr max_cards: (int): The largest number of cards in the hands of the positions in the tablebase.
+    """
+
+    def __init__(self, path: str) -> None:
+        header = _read_header(path)
+        assert header["version"] == 1, f"Unknown tablebase version {header['version']}"
+        self.path = path
+        self.max_cards: int = header["max_cards"]
+        self.__levels = [_open_level(path, level, "r") for level in header["levels"]]
+        # the bit of a card is looked up by the id() of the trump suit and of the card, see index_by_id
+        self.__bits: dict[int, dict[int, int]] = {}
+        for trump in Suit:
+            suit_position = {suit: position for position, suit in enumerate([trump] + [suit for suit in Suit if suit is not trump])}
+            cards = [card for card in Card if card.rank in _RANKS]
+            self.__bits[id(trump)] = value_by_id(cards, [1 << (5 * suit_position[card.suit] + _RANKS.index(card.rank)) for card in cards])
+
+    @staticmethod
+    def supports(engine: GamePlayEngine) -> bool:
+        """
+        Whether the tablebase is valid for the games of the engine: the rules of Schnapsen, with its deck of 20 cards and the usual points.
+
+        :param engine: (GamePlayEngine): The engine to check.
+        :returns: (bool): True if the values in the tablebase are the ones of games played by the engine.
+        """
+        if not CompactEngine.supports(engine):
+            return False
+        deck = engine.deck_generator.get_initial_deck()
+        standard_scorer = SchnapsenTrickScorer()
+        return set(deck.get_cards()) == set(SchnapsenDeckGenerator().get_initial_deck().get_cards()) \
+            and all(engine.trick_scorer.rank_to_points(rank) == standard_scorer.rank_to_points(rank) for rank in _RANKS)
+
+    def lookup_cards(self, leader_cards: Iterable[Card], follower_cards: Iterable[Card], trump: Suit,
+                     leader_points: int, follower_points: int, follower_pending_points: int) -> Optional[int]:
+        """
+        Look up the value of a position given by its cards and points.
+
+        :param leader_cards: (Iterable[Card]): The cards in the hand of the leader.
+        :param follower_cards: (Iterable[Card]): The cards in the hand of the follower.
+        :param trump: (Suit): The trump suit.
+        :param leader_points: (int): The direct points of the leader. The leader has no pending points.
+        :param follower_points: (int): The direct points of the follower.
+        :param follower_pending_points: (int): The pending points of the follower.
+        :returns: (Optional[int]): The game points for the leader, or None if the position is not in the tablebase.
+        """
+        bits = self.__bits[id(trump)]
+        leader = follower = 0
+        leader_count = follower_count = 0
+        for card in leader_cards:
+            leader |= bits[id(card)]
+            leader_count += 1
+        for card in follower_cards:
+            follower |= bits[id(card)]
+            follower_count += 1
+        if leader_count != follower_count or not 1 <= leader_count <= self.max_cards:
+            return None
+        if leader_points >= _GRID or follower_points >= _GRID or follower_pending_points % 20 or not 0 <= follower_pending_points < 20 * _PENDING:
+            return None
+        marriage_points = leader_points + follower_points + follower_pending_points - (_TOTAL_POINTS - _hand_points(leader) - _hand_points(follower))
+        if marriage_points % 20 or not 0 <= marriage_points < 20 * _MARRIAGES:
+            return None
+        keys, values = self.__levels[leader_count - 1]
+        key = _canonical_key(leader, follower)
+        index = int(np.searchsorted(keys, key))
+        assert index < len(keys) and keys[index] == key, "Every pair of hands must be in the tablebase"
+        packed = int(values[index, follower_pending_points // 20, marriage_points // 20, leader_points >> 1])
+        value = (packed >> (4 * (leader_points & 1))) & 15
+        return value - 8 if value else None
+
+    def lookup(self, state: GameState) -> Optional[int]:
+        """
+        Look up the value of a GameState, in which the leader has to play.
+
+        :param state: (GameState): The state to look up.
+        :returns: (Optional[int]): The game points for the leader, or None if the state is not in the tablebase.
+        """
+        if state.is_talon_closed or not state.talon.is_empty() or state.leader.score.pending_points:
+            return None
+        follower_score = state.follower.score
+        return self.lookup_cards(state.leader.hand.cards, state.follower.hand.cards, state.talon.trump_suit(),
+                                 state.leader.score.direct_points, follower_score.direct_points, follower_score.pending_points)
+
+    def lookup_compact(self, engine: CompactEngine, state: CompactState) -> Optional[int]:
+        """
+        Look up the value of a CompactState, in which the leader has to play.
+
+        :param engine: (CompactEngine): The engine the state belongs to.
+        :param state: (CompactState): The state to look up.
+        :returns: (Optional[int]): The game points for the leader, or None if the state is not in the tablebase.
+        """
+        leader = state.leader
+        follower = 1 - leader
+        if state.is_talon_closed or state.talon or state.leader_move is not None or state.pending_points[leader]:
+            return None
+        cards = engine.cards
+        return self.lookup_cards([cards[card] for card in state.hands[leader]], [cards[card] for card in state.hands[follower]], engine.suits[state.trump],
+                                 state.direct_points[leader], state.direct_points[follower], state.pending_points[follower])
@@ -0,0 +1,346 @@
+"""
+In this module you will find Zobrist hashing of GameStates and a bounded transposition table, used by the search bots.
+
+Searching the second phase of the game, the same position is reached many times: playing the same cards in a different order
+leads to the same hands and the same scores. A transposition table remembers the result of searching a position, such that it
+does not have to be searched again.
+
+A SharedTranspositionTable lives in a memory-mapped file, such that the bots in all worker processes of a tournament can use the same
+table, and such that it can be kept from one run to the next.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+import tempfile
+from random import Random
+from typing import Any, Optional
+
+import numpy as np
+
+from .deck import Card, Suit, index_by_id, value_by_id
+from .game import GameState, Move
+
+EMPTY = 0
+"""The flag of a slot in the table which does not contain an entry."""
+EXACT = 1
+"""The flag of an entry whose value is the exact value of the position."""
+LOWER_BOUND = 2
+"""The flag of an entry whose value is a lower bound on the value of the position."""
+UPPER_BOUND = 3
+"""The flag of an entry whose value is an upper bound on the value of the position."""
+
+
+_CARD_CODE = index_by_id(Card)
+_SUIT_CODE = index_by_id(Suit)
+
+
+def move_code(move: Move) -> int:
+    """
+    A number identifying a move, which is stored in the table as the best move of a position.
+    The valid moves of a position are in the order of the cards in the hands, which is not part of the hash. The same position can be
+    reached with the cards in another order, so the table stores what the move is, rather than where it is among the valid moves.
+
+    :param move: (Move): The move.
+    :returns: (int): The card for a regular move, followed by the suits of the marriages, of the trump exchanges and closing the talon.
+    """
+    if move.is_marriage():
+        return len(Card) + _SUIT_CODE[id(move.as_marriage().suit)]
+    if move.is_trump_exchange():
+        return len(Card) + len(Suit) + _SUIT_CODE[id(move.as_trump_exchange().jack.suit)]
+    if move.is_close_talon():
+        return len(Card) + 2 * len(Suit)
+    return _CARD_CODE[id(move.as_regular_move().card)]
+
+
+def find_move(moves: list[Move], code: int) -> Optional[Move]:
+    """
+    Find the move with a code of move_code among the valid moves of a position.
+
+    :param moves: (list[Move]): The valid moves.
+    :param code: (int): The code of the move, as stored in the table.
+    :returns: (Optional[Move]): The move, or None if none of the moves has the code, which means the entry is for another position.
+    """
+    for move in moves:
+        if move_code(move) == code:
+            return move
+    return None
+
+
+def negated_flag(flag: int) -> int:
+    """
+    The flag of an entry after negating its value, i.e., after changing the point of view to the other player.
+
+    :param flag: (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+    :returns: (int): The flag for the negated value, a lower bound becomes an upper bound and vice versa.
+    """
+    if flag == LOWER_BOUND:
+        return UPPER_BOUND
+    if flag == UPPER_BOUND:
+        return LOWER_BOUND
+    return flag
+
+
+class ZobristHasher:
+    """
+    Computes a 64 bit Zobrist hash of a GameState: each feature of the state gets a random number, and the hash is the XOR of
+    the numbers of all features present in the state.
+
+    The hash covers everything which determines the outcome of the rest of the game: the cards in the hands of the leader and
+    the follower, their direct and pending points, the trump suit, whether the talon is closed, and, when it is, who is assumed to
+    have closed it and whether the other player had won cards at that moment. The move already played by the leader is hashed too.
+    The numbers are generated from a fixed seed, so the same state has the same hash in every process.
+    """
+
+    MAX_POINTS = 256
+    """Points are hashed up to this value, which is much more than can be reached in a game."""
+
+    def __init__(self, seed: int = 2022) -> None:
+        rand = Random(seed)
+
+        def bits() -> int:
+            return rand.getrandbits(64)
+        cards = list(Card)
+        suits = list(Suit)
+        # the numbers are looked up by the id() of the cards and suits, see index_by_id
+        self.__leader_card = value_by_id(cards, [bits() for _ in cards])
+        self.__follower_card = value_by_id(cards, [bits() for _ in cards])
+        self.__leader_move_card = value_by_id(cards, [bits() for _ in cards])
+        self.__trump = value_by_id(suits, [bits() for _ in suits])
+        self.__points = [[bits() for _ in range(self.MAX_POINTS)] for _ in range(4)]
+        self.__marriage = bits()
+        self.__closed = bits()
+        self.__changed_since_close = bits()
+        self.__non_closer_had_won_cards = bits()
+
+    def hash(self, state: GameState, leader_move: Optional[Move] = None) -> int:
+        """
+        Compute the hash of a state.
+
+        :param state: (GameState): The state to hash.
+        :param leader_move: (Optional[Move]): The move the leader already played in the current trick, if any.
+        :returns: (int): The hash, a number in [0, 2**64).
+        """
+        leader = state.leader
+        follower = state.follower
+        leader_card = self.__leader_card
+        follower_card = self.__follower_card
+        value = self.__trump[id(state.talon.trump_suit())]
+        for card in leader.hand.cards:
+            value ^= leader_card[id(card)]
+        for card in follower.hand.cards:
+            value ^= follower_card[id(card)]
+        points = self.__points
+        value ^= points[0][leader.score.direct_points] ^ points[1][leader.score.pending_points] \
+            ^ points[2][follower.score.direct_points] ^ points[3][follower.score.pending_points]
+        if leader_move is not None:
+            if leader_move.is_marriage():
+                value ^= self.__marriage
+            for card in leader_move.cards:
+                value ^= self.__leader_move_card[id(card)]
+        if state.is_talon_closed:
+            value ^= self.__closed
+            # We mirror the way SchnapsenTrickScorer.declare_winner finds out who closed the talon
+            previous = state.previous
+            changed_since_close = False
+            while previous:
+                if previous.trick.is_close_talon():
+                    if previous.state.follower.won_cards:
+                        value ^= self.__non_closer_had_won_cards
+                    break
+                changed_since_close |= not previous.leader_remained_leader
+                previous = previous.state.previous
+            if changed_since_close:
+                value ^= self.__changed_since_close
+        return value
+
+
+class TranspositionTable:
+    """
+    A transposition table with a fixed number of slots. An entry is stored in the slot given by the lowest bits of the hash of its
+    position. The full hash is stored as well, to recognize the position when the table is probed.
+
+    When two positions need the same slot, the replacement policy decides which one is kept. The new entry replaces the old one if
+    it is for the same position, if the old one was stored during an earlier search (see new_search), or if the new entry took at
+    least as much work to compute, as measured by its depth: the number of tricks which were searched below the position.
+
+    The entries are kept in NumPy arrays, one per field.
+
+    :param size: (int): The number of slots, this must be a power of two.
+    :attr probes: (int): The number of times the table was probed.
+    :attr hits: (int): The number of probes which found an entry for the position.
+    :attr stores: (int): The number of entries stored, including the ones replacing an older entry.
+    """
+
+    def __init__(self, size: int = 2 ** 16) -> None:
+        assert size > 0 and size & (size - 1) == 0, f"The size of the table must be a power of two, got {size}"
+        self.size = size
+        self.__mask = size - 1
+        self.keys = np.zeros(size, dtype=np.uint64)
+        self.values = np.zeros(size, dtype=np.float32)
+        self.flags = np.zeros(size, dtype=np.int8)
+        self.moves = np.zeros(size, dtype=np.int8)
+        self.depths = np.zeros(size, dtype=np.int8)
+        self.generations = np.zeros(size, dtype=np.uint8)
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> Optional[tuple[float, int, int, int]]:
+        """
+        Look up the entry for a position.
+
+        :param key: (int): The hash of the position.
+        :returns: (Optional[tuple[float, int, int, int]]): The value, the flag, the best move as stored and the depth,
+            or None if the position is not in the table.
+        """
+        self.probes += 1
+        slot = key & self.__mask
+        if self.flags[slot] == EMPTY or int(self.keys[slot]) != key:
+            return None
+        self.hits += 1
+        return float(self.values[slot]), int(self.flags[slot]), int(self.moves[slot]), int(self.depths[slot])
+
+    def store(self, key: int, value: float, flag: int, move: int, depth: int) -> None:
+        """
+        Store an entry, unless the replacement policy keeps the entry which is already in the slot.
+
+        :param key: (int): The hash of the position.
+        :param value: (int): The value of the position, or a bound on it.
+        :param flag: (int): EXACT, LOWER_BOUND or UPPER_BOUND.
+        :param move: (int): The best move, identified independently of the order of the valid moves, see move_code.
+        :param depth: (int): The number of tricks searched below the position. Entries with a higher depth are kept longer.
+        """
+        slot = key & self.__mask
+        if self.flags[slot] != EMPTY and int(self.keys[slot]) != key and self.generations[slot] == self.generation and self.depths[slot] > depth:
+            return
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.depths[slot] = depth
+        self.generations[slot] = self.generation
+        self.stores += 1
+
+    def new_search(self) -> None:
+        """Start a new search. The entries of earlier searches stay, but can be replaced by any new entry."""
+        self.generation = (self.generation + 1) % 256
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self.flags[:] = EMPTY
+
+    def hit_rate(self) -> float:
+        """The fraction of the probes which found an entry, 0.0 if the table was never probed."""
+        return self.hits / self.probes if self.probes else 0.0
+
+    def reset_statistics(self) -> None:
+        """Set the number of probes, hits and stores back to zero."""
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    A transposition table in a memory-mapped file, which can be used by many processes at the same time.
+
+    Processes open the same file, and share its contents through the operating system. When the table is pickled, for example to pass
+    it to a worker process, only the name of the file is sent, and the receiving process opens the same file. Without a file name, the
+    table is created in a temporary file, in shared memory (/dev/shm) when available, which is removed by close().
+
+    Each entry is packed into two 64 bit words: the data (value, flag, move, depth and generation) and the data XOR the key.
+    Processes read and write entries without locking. If a process reads an entry while another process is writing it, the key does not
+    match the words read, and the entry is treated as missing. Entries are never wrong, at worst an entry is lost.
+    The statistics and the generation (see new_search) are kept per process.
+
+    All users of a table must play by the same rules: unlike a private table, a shared table is not cleared when the engine changes.
+    Bots reach the same positions with the cards of the hands in other orders, in other processes and in later runs of a dumped table,
+    so the best move is stored as its move_code, never as its place among the valid moves.
+
+    :param path: (Optional[str]): The file of the table. If it exists, the table in it is opened, otherwise a new empty table is created in it.
+    :param size: (int): The number of slots of a new table, a power of two. The size of an existing table is the one in its file.
+    """
+
+    def __init__(self, path: Optional[str] = None, size: int = 2 ** 20) -> None:
+        self.__temporary = path is None
+        if path is None:
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+            file, path = tempfile.mkstemp(prefix="schnapsen_tt_", dir=directory)
+            os.close(file)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            assert size > 0 and size & (size - 1) == 0, f"The size of the table must be a power of two, got {size}"
+            with open(path, "wb") as new_file:
+                new_file.truncate(size * 16)
+        size = os.path.getsize(path) // 16
+        assert size > 0 and size & (size - 1) == 0 and os.path.getsize(path) == size * 16, f"{path} does not contain a transposition table"
+        self.path = path
+        self.size = size
+        self.__mask = size - 1
+        self.words: np.memmap = np.memmap(path, dtype=np.uint64, mode="r+", shape=(size, 2))
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Another process opens the same file, it does not become responsible for removing a temporary file
+        return SharedTranspositionTable, (self.path,)
+
+    def probe(self, key: int) -> Optional[tuple[float, int, int, int]]:
+        self.probes += 1
+        slot = key & self.__mask
+        check = int(self.words[slot, 0])
+        data = int(self.words[slot, 1])
+        flag = (data >> 32) & 3
+        if flag == EMPTY or check ^ data != key:
+            return None
+        self.hits += 1
+        value: float = struct.unpack("<f", struct.pack("<I", data & 0xFFFFFFFF))[0]
+        return value, flag, ((data >> 34) & 0xFF) - 128, ((data >> 42) & 0xFF) - 128
+
+    def store(self, key: int, value: float, flag: int, move: int, depth: int) -> None:
+        slot = key & self.__mask
+        old_data = int(self.words[slot, 1])
+        if (old_data >> 32) & 3 != EMPTY and int(self.words[slot, 0]) ^ old_data != key \
+                and (old_data >> 50) & 0xFF == self.generation and ((old_data >> 42) & 0xFF) - 128 > depth:
+            return
+        data = struct.unpack("<I", struct.pack("<f", value))[0] | flag << 32 | (move + 128) << 34 | (depth + 128) << 42 | self.generation << 50
+        self.words[slot, 0] = key ^ data
+        self.words[slot, 1] = data
+        self.stores += 1
+
+    def clear(self) -> None:
+        self.words[:] = 0
+
+    def dump(self, path: str) -> None:
+        """
+        Write a copy of the table to a file, which can be loaded in a later run with load().
+        Entries which are written by other processes while copying may be lost.
+
+        :param path: (str): The file to write to. It is overwritten if it exists.
+        """
+        self.words.flush()
+        shutil.copyfile(self.path, path)
+
+    @staticmethod
+    def load(path: str) -> SharedTranspositionTable:
+        """
+        Create a new temporary table with the entries of a table written by dump(). The file itself is not changed by using the table.
+
+        :param path: (str): The file written by dump().
+        :returns: (SharedTranspositionTable): The new table, which can be shared like any other.
+        """
+        table = SharedTranspositionTable(size=os.path.getsize(path) // 16)
+        table.words[:] = np.fromfile(path, dtype=np.uint64).reshape(table.size, 2)
+        return table
+
+    def close(self) -> None:
+        """Stop using the table. If this process created it in a temporary file, the file is removed."""
+        self.words.flush()
+        del self.words
+        if self.__temporary and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,78 @@
+from unittest import TestCase
+import pathlib
+import random
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from schnapsen.bots import DistilledBot, RandBot, generate_teacher_decisions, train_distilled_policy
+from schnapsen.deck import Suit
+from schnapsen.game import Bot, Move, PlayerPerspective, SchnapsenGamePlayEngine
+
+
+class _GreedyBot(Bot):
+    """Plays the regular move with the most points, of those the one with the first suit. Simple enough to be learned from a few games."""
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        scorer = perspective.get_engine().trick_scorer
+        moves = [move.as_regular_move() for move in perspective.valid_moves() if move.is_regular_move()]
+        return max(moves, key=lambda move: (scorer.rank_to_points(move.card.rank), -list(Suit).index(move.card.suit)))
+
+
+class _ComparingBot(Bot):
+    """Plays like the teacher, and counts how often the student would have played the same move."""
+
+    def __init__(self, teacher: Bot, student: Bot) -> None:
+        super().__init__()
+        self.teacher = teacher
+        self.student = student
+        self.agreed = 0
+        self.decisions = 0
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        move = self.teacher.get_move(perspective, leader_move)
+        if len(perspective.valid_moves()) > 1:
+            self.agreed += self.student.get_move(perspective, leader_move) == move
+            self.decisions += 1
+        return move
+
+
+def _greedy_teacher(rand: random.Random) -> Bot:
+    return _GreedyBot()
+
+
+def _random_opponent(rand: random.Random) -> Bot:
+    return RandBot(rand)
+
+
+class DistilledBotTest(TestCase):
+    def test_decisions(self) -> None:
+        features, chosen, decisions = generate_teacher_decisions(_greedy_teacher, 6, opponent=_random_opponent)
+        self.assertEqual(len(features), len(chosen))
+        self.assertEqual(len(features), len(decisions))
+        # exactly one move is chosen in every decision
+        self.assertTrue(np.all(np.bincount(decisions, weights=chosen) == 1))
+        self.assertTrue(np.all(np.bincount(decisions) > 1))
+        self.assertEqual(features.shape[1], 174)
+
+        parallel = generate_teacher_decisions(_greedy_teacher, 6, opponent=_random_opponent, processes=2)
+        for expected, result in zip((features, chosen, decisions), parallel):
+            np.testing.assert_array_equal(expected, result)
+
+    def test_distilled_bot(self) -> None:
+        features, chosen, _ = generate_teacher_decisions(_greedy_teacher, 100, opponent=_random_opponent)
+        with tempfile.TemporaryDirectory() as directory:
+            policy_location = pathlib.Path(directory) / "policy.npz"
+            train_distilled_policy(features, chosen, policy_location)
+            bot = DistilledBot(policy_location)
+
+        # the student agrees with the teacher on most decisions
+        engine = SchnapsenGamePlayEngine()
+        comparing = _ComparingBot(_GreedyBot(), bot)
+        for seed in range(10):
+            engine.play_game(comparing, RandBot(random.Random(seed)), random.Random(100 + seed))
+        self.assertGreater(comparing.agreed / comparing.decisions, 0.8)
+
+        for seed in range(4):
+            engine.play_game(bot, RandBot(random.Random(seed)), random.Random(seed))
@@ -0,0 +1,145 @@
+from unittest import TestCase
+import itertools
+import random
+from typing import Optional
+
+from schnapsen.bots import ExpectimaxBot, RandBot
+from schnapsen.bots.expectimax import point_difference_evaluator
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.deck import Card
+from schnapsen.game import (Bot, BotState, FollowerPerspective, GameState, Hand, LeaderPerspective, Move, PlayerPerspective,
+                            SchnapsenGamePlayEngine, Talon)
+from schnapsen.solver import DoubleDummySolver
+
+
+def _expectimax(engine: CompactEngine, solver: DoubleDummySolver, state: CompactState, depth: int) -> float:
+    """The value of the state for player 0, by searching the complete expectimax tree without pruning, merging or caching."""
+    if state.leader_move is None:
+        winner = engine.winner(state)
+        if winner is not None:
+            return winner[1] if winner[0] == 0 else -winner[1]
+        sign = 1 if state.leader == 0 else -1
+        if state.is_phase_two():
+            return sign * solver.solve(state)
+        if depth == 0:
+            return sign * point_difference_evaluator(engine, state)
+    values = [_move_value(engine, solver, state, move, depth) for move in engine.legal_moves(state)]
+    return max(values) if state.to_move() == 0 else min(values)
+
+
+def _move_value(engine: CompactEngine, solver: DoubleDummySolver, state: CompactState, move: int, depth: int) -> float:
+    """The value for player 0 after the move, averaged over all possible draws from the talon."""
+    talon = state.talon
+    if state.leader_move is None or not talon or state.is_talon_closed or len(talon) == 2:
+        child = state.copy()
+        engine.play(child, move)
+        return _expectimax(engine, solver, child, depth - 1 if state.leader_move is not None else depth)
+    outcomes = []
+    for first, second in itertools.permutations(talon[:-1], 2):
+        child = state.copy()
+        child.talon = [first, second] + [card for card in talon[:-1] if card not in (first, second)] + [talon[-1]]
+        engine.play(child, move)
+        outcomes.append(_expectimax(engine, solver, child, depth - 1))
+    return sum(outcomes) / len(outcomes)
+
+
+class _ScriptedBot(Bot):
+    """Plays the given cards, in order."""
+
+    def __init__(self, cards: list[Card]) -> None:
+        super().__init__()
+        self.cards = list(cards)
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        card = self.cards.pop(0)
+        return next(move for move in perspective.valid_moves() if move.is_regular_move() and move.cards == [card])
+
+
+class ExpectimaxBotTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+
+    def _state_with_talon(self, rng: random.Random, talon_size: int) -> Optional[GameState]:
+        cards = self.engine.deck_generator.shuffle_deck(self.engine.deck_generator.get_initial_deck(), rng)
+        hand1, hand2, talon = self.engine.hand_generator.generateHands(cards)
+        state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                          talon=talon, previous=None)
+        while len(state.talon) > talon_size and not state.is_talon_closed:
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), 1)
+            if self.engine.trick_scorer.declare_winner(state):
+                return None
+        return state if len(state.talon) == talon_size and not state.is_talon_closed else None
+
+    def test_same_as_complete_expectimax(self) -> None:
+        rng = random.Random(0)
+        solver = DoubleDummySolver(self.compact_engine)
+        checked = 0
+        while checked < 4:
+            state = self._state_with_talon(rng, 4)
+            if state is None:
+                continue
+            depth = rng.choice([1, 3])
+            bot = ExpectimaxBot(random.Random(1), depth=depth, max_worlds=1000)
+            leader_move = LeaderPerspective(state, self.engine).valid_moves()[0] if checked % 2 else None
+            perspective = FollowerPerspective(state, self.engine, leader_move) if leader_move else LeaderPerspective(state, self.engine)
+            values = bot.move_values(perspective, leader_move)
+            expected = self._complete_expectimax(solver, perspective, leader_move, depth, rng)
+            self.assertEqual(set(values), set(expected))
+            for move, value in values.items():
+                self.assertAlmostEqual(value, expected[move])
+            checked += 1
+
+    def test_symmetric_hand(self) -> None:
+        # Diamonds and clubs are the same for the leader, so the worlds come in pairs which are merged by relabeling these suits,
+        # and the moves with the cards of one suit must get the values of the moves with the cards of the other suit in the other world.
+        def cards(*names: str) -> list[Card]:
+            return [Card[name] for name in names]
+
+        # the leader wins the aces and tens of diamonds, clubs and spades, and keeps Q♦ J♦ Q♣ J♣ K♠, hearts are trump
+        leader = _ScriptedBot(cards("ACE_DIAMONDS", "ACE_CLUBS", "ACE_SPADES"))
+        follower = _ScriptedBot(cards("TEN_DIAMONDS", "TEN_CLUBS", "TEN_SPADES"))
+        state = GameState(leader=BotState(implementation=leader, hand=Hand(cards("ACE_DIAMONDS", "ACE_CLUBS", "ACE_SPADES", "QUEEN_DIAMONDS",
+                                                                                 "JACK_DIAMONDS"))),
+                          follower=BotState(implementation=follower, hand=Hand(cards("TEN_DIAMONDS", "TEN_CLUBS", "TEN_SPADES", "KING_DIAMONDS",
+                                                                                     "KING_CLUBS"))),
+                          talon=Talon(cards("QUEEN_CLUBS", "QUEEN_SPADES", "JACK_CLUBS", "ACE_HEARTS", "KING_SPADES", "TEN_HEARTS", "JACK_SPADES",
+                                            "KING_HEARTS", "QUEEN_HEARTS", "JACK_HEARTS")),
+                          previous=None)
+        state, _ = self.engine.play_at_most_n_tricks(state, leader, follower, 3)
+        self.assertEqual(set(state.leader.hand), set(cards("QUEEN_DIAMONDS", "JACK_DIAMONDS", "QUEEN_CLUBS", "JACK_CLUBS", "KING_SPADES")))
+        solver = DoubleDummySolver(self.compact_engine)
+        perspective = LeaderPerspective(state, self.engine)
+        bot = ExpectimaxBot(random.Random(1), depth=2, max_worlds=1000)
+        values = bot.move_values(perspective, None)
+        expected = self._complete_expectimax(solver, perspective, None, 2, random.Random(0))
+        self.assertEqual(set(values), set(expected))
+        for move, value in values.items():
+            self.assertAlmostEqual(value, expected[move])
+        for first, second in (("QUEEN_DIAMONDS", "QUEEN_CLUBS"), ("JACK_DIAMONDS", "JACK_CLUBS")):
+            self.assertAlmostEqual(values[self.compact_engine.index[Card[first]]], values[self.compact_engine.index[Card[second]]])
+
+    def _complete_expectimax(self, solver: DoubleDummySolver, perspective: PlayerPerspective, leader_move: Optional[Move], depth: int,
+                             rng: random.Random) -> dict[int, float]:
+        """The values of the moves by searching the complete expectimax tree in every world, in which all hands of the opponent have the same probability."""
+        batch = perspective.make_assumptions(leader_move, 0, rng)
+        sign = -1 if leader_move else 1
+        expected: dict[int, float] = {}
+        hands = list(itertools.combinations(batch.unseen_cards, len(batch.opponent_hand_slots)))
+        for hand in hands:
+            world = self.compact_engine.from_game_state(batch.base_state, leader_move)
+            opponent = 1 if leader_move is None else 0
+            world.hands[opponent] = [card for card in world.hands[opponent] if self.compact_engine.cards[card] not in batch.unseen_cards] + \
+                [self.compact_engine.index[card] for card in hand]
+            world.talon = [self.compact_engine.index[card] for card in batch.unseen_cards if card not in hand] + world.talon[-1:]
+            for move in self.compact_engine.legal_moves(world):
+                value = _move_value(self.compact_engine, solver, world, move, depth)
+                expected[move] = expected.get(move, 0.0) + sign * value / len(hands)
+        return expected
+
+    def test_run(self) -> None:
+        bot1 = ExpectimaxBot(random.Random(42), depth=1, max_worlds=4, name="bot1")
+        bot2 = RandBot(random.Random(43), "bot2")
+        for i in range(2):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+            self.engine.play_game(bot2, bot1, random.Random(i))
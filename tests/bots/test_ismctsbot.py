@@ -0,0 +1,49 @@
+from unittest import TestCase
+import random
+from typing import Optional
+
+from schnapsen.bots import ISMCTSBot, RandBot
+from schnapsen.game import Move, PlayerPerspective, SchnapsenGamePlayEngine
+
+
+class _ReuseRecordingBot(ISMCTSBot):
+    """Remembers for each move how many visits of the root came from the search of earlier moves."""
+
+    def __init__(self, rand: random.Random, reuse_tree: bool = True) -> None:
+        super().__init__(rand, iterations=50, reuse_tree=reuse_tree)
+        self.reused: list[int] = []
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        move = super().get_move(perspective, leader_move)
+        self.reused.append(self.last_reused_visits)
+        return move
+
+
+class ISMCTSBotTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+
+    def test_run(self) -> None:
+        bot1 = ISMCTSBot(random.Random(42), iterations=50, name="bot1")
+        bot2 = RandBot(random.Random(43), "bot2")
+        for i in range(10):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+            self.engine.play_game(bot2, bot1, random.Random(i))
+
+    def test_time_limit(self) -> None:
+        bot1 = ISMCTSBot(random.Random(42), iterations=None, time_limit=0.005)
+        bot2 = ISMCTSBot(random.Random(43), iterations=None, time_limit=0.005)
+        self.engine.play_game(bot1, bot2, random.Random(1))
+        self.assertGreater(bot1.last_iterations, 0)
+
+    def test_tree_reuse(self) -> None:
+        bot = _ReuseRecordingBot(random.Random(42))
+        no_reuse_bot = _ReuseRecordingBot(random.Random(42), reuse_tree=False)
+        for i in range(3):
+            self.engine.play_game(bot, no_reuse_bot, random.Random(i))
+        self.assertTrue(any(reused > 0 for reused in bot.reused))
+        self.assertTrue(all(reused == 0 for reused in no_reuse_bot.reused))
+
+    def test_no_budget(self) -> None:
+        with self.assertRaises(AssertionError):
+            ISMCTSBot(random.Random(42), iterations=None)
@@ -1,5 +1,7 @@
 from unittest import TestCase
+import os
 import random
+import tempfile
 from typing import Optional
 import time
 from schnapsen.bots import RandBot, MiniMaxBot, AlphaBetaBot, RdeepBot
@@ -16,8 +18,10 @@ from schnapsen.game import (
     Talon,
     _DummyBot,
     Score,
+    LeaderPerspective,
 )
 from schnapsen.deck import Card, Suit
+from schnapsen.transposition import SharedTranspositionTable
 
 
 class TwoStageBot(Bot):
@@ -299,3 +303,197 @@ class MiniMaxBotAlphaBetaPhaseTwoHard(TestCase):
         # alphabeta should be faster, because it prunes more. Besides that, the result
         # should be the same
         self.assertTrue(self.alphabeta_time < self.minimax_time)
+
+
+def _phase_two_states(engine: SchnapsenGamePlayEngine, number_of_states: int, seed: int) -> list[GameState]:
+    """Random states in the second phase of the game, some with a closed talon and some with an exhausted one."""
+    rng = random.Random(seed)
+    states: list[GameState] = []
+    while len(states) < number_of_states:
+        cards = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), rng)
+        hand1, hand2, talon = engine.hand_generator.generateHands(cards)
+        state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                          talon=talon, previous=None)
+        # random bots close the talon regularly, so we get both closed and exhausted talons
+        state, _ = engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), rng.randrange(2, 7))
+        if engine.trick_scorer.declare_winner(state) is None and (state.talon.is_empty() or state.is_talon_closed):
+            states.append(state)
+    return states
+
+
+def _reordered(state: GameState) -> GameState:
+    """The same position, with the cards in the hands in the opposite order."""
+    reordered = state.copy_with_other_bots(state.leader.implementation, state.follower.implementation)
+    reordered.leader.hand.cards.reverse()
+    reordered.follower.hand.cards.reverse()
+    return reordered
+
+
+class TranspositionTableSearchTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.states = _phase_two_states(self.engine, 15, 5)
+
+    def test_same_values_with_table(self) -> None:
+        bot_classes: list[type[MiniMaxBot] | type[AlphaBetaBot]] = [MiniMaxBot, AlphaBetaBot]
+        for bot_class in bot_classes:
+            with_table = bot_class(transposition_table_size=2 ** 16)
+            # the table is only used when asked for
+            without_table = bot_class()
+            self.assertIsNone(without_table.transposition_table)
+            for state in self.states:
+                expected, _ = without_table.value(state, self.engine, leader_move=None, maximizing=True)
+                value, _ = with_table.value(state, self.engine, leader_move=None, maximizing=True)
+                self.assertEqual(expected, value)
+            # the table is kept between searches, so searching again finds almost everything in it
+            nodes = with_table.nodes
+            for state in self.states:
+                with_table.value(state, self.engine, leader_move=None, maximizing=True)
+            self.assertLess(with_table.nodes - nodes, 2 * len(self.states))
+            self.assertLess(with_table.nodes, without_table.nodes)
+            assert with_table.transposition_table is not None
+            self.assertGreater(with_table.transposition_table.hit_rate(), 0.0)
+
+    def test_other_order_of_the_hand(self) -> None:
+        # The table is kept between searches, and the same position can come back with the cards of the hands in another order.
+        # The move found in the table must then still be the best move, not the move at the same place among the valid moves.
+        bot_classes: list[type[MiniMaxBot] | type[AlphaBetaBot]] = [MiniMaxBot, AlphaBetaBot]
+        for bot_class in bot_classes:
+            bot = bot_class(transposition_table_size=2 ** 16)
+            for state in self.states:
+                expected, _ = bot.value(state, self.engine, leader_move=None, maximizing=True)
+                reordered = _reordered(state)
+                value, move = bot.value(reordered, self.engine, leader_move=None, maximizing=True)
+                self.assertEqual(value, expected)
+                move_value, _ = AlphaBetaBot(transposition_table_size=None).value(reordered, self.engine, leader_move=move, maximizing=False)
+                self.assertEqual(move_value, expected)
+
+    def test_shared_table(self) -> None:
+        table = SharedTranspositionTable(size=2 ** 16)
+        try:
+            expected = [AlphaBetaBot(transposition_table_size=None).value(state, self.engine, leader_move=None, maximizing=True)[0]
+                        for state in self.states]
+            first = AlphaBetaBot(transposition_table=table)
+            self.assertEqual([first.value(state, self.engine, leader_move=None, maximizing=True)[0] for state in self.states], expected)
+            # another bot finds the positions searched by the first one, and a minimax bot can use the exact values of the alphabeta bots
+            second = AlphaBetaBot(transposition_table=table)
+            self.assertEqual([second.value(state, self.engine, leader_move=None, maximizing=True)[0] for state in self.states], expected)
+            self.assertLess(second.nodes, first.nodes)
+            minimax = MiniMaxBot(transposition_table=table)
+            self.assertEqual([minimax.value(state, self.engine, leader_move=None, maximizing=True)[0] for state in self.states], expected)
+        finally:
+            table.close()
+
+    def test_loaded_table_with_other_order_of_the_hand(self) -> None:
+        # A dumped table is used in later runs, by other bots, where the same positions come with the cards in another order
+        table = SharedTranspositionTable(size=2 ** 16)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            try:
+                first = AlphaBetaBot(transposition_table=table)
+                expected = [first.value(state, self.engine, leader_move=None, maximizing=True)[0] for state in self.states]
+                table.dump(path)
+            finally:
+                table.close()
+            loaded = SharedTranspositionTable.load(path)
+        try:
+            bot = AlphaBetaBot(transposition_table=loaded)
+            exact = AlphaBetaBot(transposition_table_size=None)
+            for state, expected_value in zip(self.states, expected):
+                reordered = _reordered(state)
+                value, move = bot.value(reordered, self.engine, leader_move=None, maximizing=True)
+                self.assertEqual(value, expected_value)
+                self.assertEqual(exact.value(reordered, self.engine, leader_move=move, maximizing=False)[0], expected_value)
+            # the positions were found in the loaded table
+            self.assertEqual(bot.nodes, len(self.states))
+        finally:
+            loaded.close()
+
+
+class AlphaBetaIterativeDeepeningTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.states = _phase_two_states(self.engine, 15, 6)
+
+    def test_same_values_with_move_ordering(self) -> None:
+        ordered = AlphaBetaBot()
+        unordered = AlphaBetaBot(move_ordering=False)
+        for state in self.states:
+            expected, _ = unordered.value(state, self.engine, leader_move=None, maximizing=True)
+            value, _ = ordered.value(state, self.engine, leader_move=None, maximizing=True)
+            self.assertEqual(expected, value)
+
+    def test_depth_limited_search(self) -> None:
+        bot = AlphaBetaBot()
+        for state in self.states:
+            value, _ = bot.value(state, self.engine, leader_move=None, maximizing=True, depth=1)
+            if len(state.leader.hand.cards) > 2:
+                # either the game ended in the first trick, or the state was evaluated
+                self.assertTrue(abs(value) < 1 or abs(value) in (1, 2, 3))
+            evaluation = bot.evaluate(state, self.engine)
+            self.assertLessEqual(abs(evaluation), 0.75)
+
+    def test_time_limit(self) -> None:
+        for state in self.states:
+            perspective = LeaderPerspective(state, self.engine)
+            # with plenty of time, the search goes until the end of the game
+            bot = AlphaBetaBot(time_limit=10.0)
+            move = bot.get_move(perspective, leader_move=None)
+            self.assertEqual(bot.last_depth, len(state.leader.hand.cards))
+            expected, _ = AlphaBetaBot().value(state, self.engine, leader_move=None, maximizing=True)
+            follower_value, _ = AlphaBetaBot().value(state, self.engine, leader_move=move, maximizing=False)
+            self.assertEqual(expected, follower_value)
+            # with hardly any time, a move is still found
+            bot = AlphaBetaBot(time_limit=1e-6)
+            self.assertIn(bot.get_move(perspective, leader_move=None), perspective.valid_moves())
+            self.assertGreaterEqual(bot.last_depth, 1)
+
+    def test_play_with_time_limit(self) -> None:
+        bot1 = TwoStageBot("bot1", RandBot(random.Random(1)), AlphaBetaBot(time_limit=0.005))
+        bot2 = RandBot(random.Random(2), "bot2")
+        for i in range(10):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+
+
+class AlphaBetaParallelTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.states = _phase_two_states(self.engine, 8, 7)
+
+    def test_same_as_serial(self) -> None:
+        parallel = AlphaBetaBot(processes=2)
+        try:
+            for state in self.states:
+                expected_value, expected_move = AlphaBetaBot().value(state, self.engine, leader_move=None, maximizing=True)
+                value, move = parallel.value(state, self.engine, leader_move=None, maximizing=True)
+                self.assertEqual((expected_value, expected_move), (value, move))
+                leader_move = LeaderPerspective(state, self.engine).valid_moves()[-1]
+                expected_value, expected_move = AlphaBetaBot().value(state, self.engine, leader_move=leader_move, maximizing=True)
+                value, move = parallel.value(state, self.engine, leader_move=leader_move, maximizing=True)
+                self.assertEqual((expected_value, expected_move), (value, move))
+        finally:
+            parallel.close()
+
+    def test_shared_table(self) -> None:
+        table = SharedTranspositionTable(size=2 ** 16)
+        parallel = AlphaBetaBot(processes=2, transposition_table=table)
+        try:
+            for state in self.states:
+                expected, _ = AlphaBetaBot().value(state, self.engine, leader_move=None, maximizing=True)
+                value, _ = parallel.value(state, self.engine, leader_move=None, maximizing=True)
+                self.assertEqual(expected, value)
+            # the workers store their positions in the table of the bot
+            self.assertGreater(int((table.words[:, 1] != 0).sum()), table.stores)
+        finally:
+            parallel.close()
+            table.close()
+
+    def test_play(self) -> None:
+        parallel = AlphaBetaBot(processes=2)
+        try:
+            bot1 = TwoStageBot("bot1", RandBot(random.Random(1)), parallel)
+            bot2 = RandBot(random.Random(2), "bot2")
+            for i in range(3):
+                self.engine.play_game(bot1, bot2, random.Random(i))
+        finally:
+            parallel.close()
@@ -0,0 +1,65 @@
+from unittest import TestCase
+import random
+from typing import Optional
+
+import numpy as np
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import RandBot
+from schnapsen.bots.ml_bot import create_state_and_actions_vector_representation, get_move_feature_vector, get_state_feature_vector
+from schnapsen.bots.ml_features import candidate_feature_vectors, state_and_actions_feature_vectors, state_feature_vectors
+from schnapsen.game import GamePlayEngine, Move, PlayerPerspective, SchnapsenGamePlayEngine
+
+
+class _RecordingBot(RandBot):
+    """Plays randomly, and records its perspectives and the moves of the leader."""
+
+    def __init__(self, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.decisions: list[tuple[PlayerPerspective, Optional[Move]]] = []
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        self.decisions.append((perspective, leader_move))
+        return super().get_move(perspective, leader_move)
+
+
+def _decisions(engine: GamePlayEngine, games: int) -> list[tuple[PlayerPerspective, Optional[Move]]]:
+    bot1 = _RecordingBot(random.Random(1))
+    bot2 = _RecordingBot(random.Random(2))
+    for seed in range(games):
+        engine.play_game(bot1, bot2, random.Random(seed))
+    return bot1.decisions + bot2.decisions
+
+
+class MLFeaturesTest(TestCase):
+    def test_same_as_lists(self) -> None:
+        for engine in [SchnapsenGamePlayEngine(), TwentyFourSchnapsenGamePlayEngine()]:
+            decisions = _decisions(engine, 10)
+            perspectives = [perspective for perspective, _ in decisions]
+            expected_states = [get_state_feature_vector(perspective) for perspective in perspectives]
+            self.assertEqual(state_feature_vectors(perspectives).tolist(), expected_states)
+
+            samples: list[tuple[PlayerPerspective, Optional[Move], Optional[Move]]] = []
+            for perspective, leader_move in decisions:
+                moves = perspective.valid_moves()
+                features = candidate_feature_vectors(perspective, leader_move, moves)
+                for move, row in zip(moves, features):
+                    if move.is_close_talon():
+                        # the list features cannot encode closing the talon, it gets the features of no move
+                        expected = get_state_feature_vector(perspective) + get_move_feature_vector(None) * 2
+                    elif leader_move is None:
+                        expected = create_state_and_actions_vector_representation(perspective, move, None)
+                        samples.append((perspective, move, None))
+                    else:
+                        expected = create_state_and_actions_vector_representation(perspective, leader_move, move)
+                        samples.append((perspective, leader_move, move))
+                    self.assertEqual(row.tolist(), expected)
+            expected_samples = [create_state_and_actions_vector_representation(*sample) for sample in samples]
+            self.assertEqual(state_and_actions_feature_vectors(samples).tolist(), expected_samples)
+
+    def test_out(self) -> None:
+        decisions = _decisions(SchnapsenGamePlayEngine(), 2)
+        perspectives = [perspective for perspective, _ in decisions]
+        out = np.full((len(perspectives), 133), 7, dtype=np.int16)
+        self.assertIs(state_feature_vectors(perspectives, out), out)
+        self.assertEqual(out.tolist(), [get_state_feature_vector(perspective) for perspective in perspectives])
@@ -0,0 +1,71 @@
+from unittest import TestCase
+import pathlib
+import random
+import tempfile
+import warnings
+
+import joblib
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+
+from schnapsen.bots import MLPlayingBot, NumpyNetwork, RandBot
+from schnapsen.bots.ml_features import STATE_AND_ACTIONS_FEATURES
+from schnapsen.game import SchnapsenGamePlayEngine
+
+
+def _data() -> tuple[np.ndarray, np.ndarray]:
+    """Integer features like those of the MLPlayingBot, with labels depending on a few of them."""
+    rng = np.random.default_rng(0)
+    features = rng.integers(0, 2, (300, STATE_AND_ACTIONS_FEATURES)).astype(np.int16)
+    labels = (features[:, :5].sum(axis=1) + rng.integers(0, 2, len(features)) > 3).astype(int)
+    return features, labels
+
+
+def _models() -> list[LogisticRegression | MLPClassifier]:
+    features, labels = _data()
+    models: list[LogisticRegression | MLPClassifier] = [
+        LogisticRegression(max_iter=1000),
+        MLPClassifier(hidden_layer_sizes=(30,), activation="tanh", max_iter=20, random_state=0),
+        MLPClassifier(hidden_layer_sizes=(16, 8), activation="relu", max_iter=20, random_state=0),
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        for model in models:
+            model.fit(features, labels)
+    return models
+
+
+class NumpyNetworkTest(TestCase):
+    def test_same_as_predict_proba(self) -> None:
+        features, _ = _data()
+        for model in _models():
+            network = NumpyNetwork.from_sklearn(model)
+            # identical, not only close: the MLPlayingBot must choose the same moves
+            np.testing.assert_array_equal(network(features), model.predict_proba(features)[:, 1])
+            np.testing.assert_array_equal(network(features[:3]), model.predict_proba(features[:3])[:, 1])
+
+    def test_save_and_load(self) -> None:
+        features, _ = _data()
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0) + 1
+        with tempfile.TemporaryDirectory() as directory:
+            for model in _models():
+                network = NumpyNetwork.from_sklearn(model, mean, scale)
+                location = pathlib.Path(directory) / "network.npz"
+                network.save(location)
+                loaded = NumpyNetwork.load(location)
+                self.assertEqual(loaded.hidden_activation, network.hidden_activation)
+                self.assertEqual(loaded.output_activation, network.output_activation)
+                np.testing.assert_array_equal(loaded(features), network(features))
+
+    def test_ml_playing_bot(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        with tempfile.TemporaryDirectory() as directory:
+            for model in _models()[:2]:
+                model_location = pathlib.Path(directory) / "model"
+                joblib.dump(model, model_location)
+                bot = MLPlayingBot(model_location)
+                for seed in range(4):
+                    engine.play_game(bot, RandBot(random.Random(seed)), random.Random(seed))
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import os
+import random
+import tempfile
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import OpeningBookBot, RandBot
+from schnapsen.deck import Card
+from schnapsen.game import SchnapsenGamePlayEngine
+from schnapsen.opening_book import OpeningBook, generate_opening_book
+
+
+class OpeningBookBotTest(TestCase):
+    directory: tempfile.TemporaryDirectory[str]
+    path: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "opening_book.bin")
+        engine = SchnapsenGamePlayEngine()
+        openings: list[tuple[list[Card], Card]] = []
+        # the openings of the games played by play_game with the seeds 0 to 3
+        for seed in range(4):
+            hand, _, talon = engine.hand_generator.generateHands(engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), random.Random(seed)))
+            trump_card = talon.trump_card()
+            assert trump_card is not None
+            openings.append((hand.get_cards(), trump_card))
+        generate_opening_book(cls.path, engine, deals=2, openings=openings)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def test_plays_book_moves(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        bot = OpeningBookBot(OpeningBook(self.path), RandBot(random.Random(1)))
+        for seed in range(4):
+            engine.play_game(bot, RandBot(random.Random(2)), random.Random(seed))
+        # after a trump exchange from the book, the new opening can be in the book as well
+        self.assertGreaterEqual(bot.lookups, 4)
+        lookups = bot.lookups
+        # the follower never plays from the book
+        for seed in range(4):
+            engine.play_game(RandBot(random.Random(2)), bot, random.Random(seed))
+        self.assertEqual(bot.lookups, lookups)
+
+    def test_other_engine(self) -> None:
+        bot = OpeningBookBot(OpeningBook(self.path), RandBot(random.Random(1)))
+        engine = TwentyFourSchnapsenGamePlayEngine()
+        for seed in range(2):
+            engine.play_game(bot, RandBot(random.Random(2)), random.Random(seed))
+        self.assertEqual(bot.lookups, 0)
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import random
+
+from schnapsen.bots import PIMCBot, RandBot
+from schnapsen.game import SchnapsenGamePlayEngine
+from schnapsen.transposition import SharedTranspositionTable
+
+
+class PIMCBotTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+
+    def test_run(self) -> None:
+        bot1 = PIMCBot(random.Random(42), num_samples=4, name="bot1")
+        bot2 = RandBot(random.Random(43), "bot2")
+        for i in range(2):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+            self.engine.play_game(bot2, bot1, random.Random(i))
+
+    def test_majority_win_only(self) -> None:
+        bot1 = PIMCBot(random.Random(42), num_samples=4, voting="majority", win_only=True, name="bot1")
+        bot2 = RandBot(random.Random(43), "bot2")
+        for i in range(3):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+
+    def test_parallel_same_as_serial(self) -> None:
+        results = []
+        for processes in (1, 2):
+            bot1 = PIMCBot(random.Random(42), num_samples=4, processes=processes, name="bot1")
+            bot2 = RandBot(random.Random(43), "bot2")
+            try:
+                winner, points, score = self.engine.play_game(bot1, bot2, random.Random(7))
+            finally:
+                bot1.close()
+            results.append((str(winner), points, score.direct_points))
+        self.assertEqual(results[0], results[1])
+
+    def test_shared_table(self) -> None:
+        table = SharedTranspositionTable(size=2 ** 16)
+        results = []
+        try:
+            for processes, transposition_table in ((1, None), (1, table), (2, table)):
+                bot1 = PIMCBot(random.Random(42), num_samples=4, processes=processes, name="bot1", transposition_table=transposition_table)
+                bot2 = RandBot(random.Random(43), "bot2")
+                try:
+                    winner, points, score = self.engine.play_game(bot1, bot2, random.Random(7))
+                finally:
+                    bot1.close()
+                results.append((str(winner), points, score.direct_points))
+        finally:
+            table.close()
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
@@ -1,7 +1,9 @@
 from unittest import TestCase
-from schnapsen.bots import RdeepBot
+from schnapsen.bots import RdeepBot, score_ratio_evaluator
+from schnapsen.compact import CompactEngine, CompactState
 from schnapsen.game import SchnapsenGamePlayEngine
 import random
+from typing import Literal
 
 
 class RdeepBotTest(TestCase):
@@ -13,3 +15,49 @@ class RdeepBotTest(TestCase):
     def test_run(self) -> None:
         for i in range(10):
             self.engine.play_game(self.bot1, self.bot2, random.Random(i))
+
+    def test_bandit_allocations(self) -> None:
+        allocations: list[Literal["ucb1", "successive_halving"]] = ["ucb1", "successive_halving"]
+        for allocation in allocations:
+            bot1 = RdeepBot(4, 4, random.Random(42), "bot1", allocation=allocation)
+            bot2 = RdeepBot(4, 4, random.Random(43), "bot2")
+            for i in range(5):
+                self.engine.play_game(bot1, bot2, random.Random(i))
+
+    def test_unknown_allocation(self) -> None:
+        with self.assertRaises(AssertionError):
+            RdeepBot(4, 4, random.Random(42), allocation="greedy")  # type: ignore[arg-type]
+
+    def test_evaluator(self) -> None:
+        batches: list[int] = []
+
+        def evaluator(engine: CompactEngine, states: list[CompactState], player: int) -> list[float]:
+            batches.append(len(states))
+            for state in states:
+                self.assertIsNone(state.leader_move)
+            return score_ratio_evaluator(engine, states, player)
+
+        # the default evaluator plays the same as an explicit one
+        for i in range(3):
+            bot1 = RdeepBot(6, 4, random.Random(i), "bot1", evaluator=evaluator)
+            bot2 = RdeepBot(6, 4, random.Random(i), "bot2")
+            winner1, points1, score1 = self.engine.play_game(bot1, RdeepBot(4, 4, random.Random(9), "other"), random.Random(i))
+            winner2, points2, score2 = self.engine.play_game(bot2, RdeepBot(4, 4, random.Random(9), "other"), random.Random(i))
+            self.assertEqual((winner1 is bot1, points1, score1), (winner2 is bot2, points2, score2))
+        # all rollouts of all moves are evaluated in one batch
+        self.assertTrue(all(batch % 6 == 0 for batch in batches))
+        self.assertGreater(max(batches), 6)
+
+    def test_evaluator_needs_fast_rollouts(self) -> None:
+        bot1 = RdeepBot(4, 4, random.Random(42), "bot1", fast_rollouts=False, evaluator=score_ratio_evaluator)
+        with self.assertRaises(AssertionError):
+            self.engine.play_game(bot1, self.bot2, random.Random(0))
+
+    def test_score_ratio_without_points(self) -> None:
+        engine = CompactEngine(self.engine)
+        deck = list(range(len(engine.cards)))
+        state = CompactState(hands=[deck[0:10:2], deck[1:11:2]], talon=deck[10:], trump=engine.suit_of[deck[-1]],
+                             direct_points=[0, 0], pending_points=[0, 0], won_cards=[0, 0])
+        self.assertEqual(score_ratio_evaluator(engine, [state], 0), [0.5])
+        state.direct_points = [10, 30]
+        self.assertEqual(score_ratio_evaluator(engine, [state], 0), [0.25])
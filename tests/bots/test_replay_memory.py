@@ -0,0 +1,131 @@
+from unittest import TestCase
+import pathlib
+import random
+import tempfile
+from typing import Union
+
+import joblib
+import numpy as np
+
+from schnapsen.bots import BullyBot, MLDataBot, RandBot, generate_replay_memory, train_ML_model
+from schnapsen.bots.replay_memory import (MANIFEST_NAME, ReplayMemoryWriter, append_replay_memory, convert_text_replay_memory,
+                                          is_binary_replay_memory, merge_replay_memory_shards, open_replay_memory, shard_location,
+                                          write_replay_memory_manifest)
+from schnapsen.game import SchnapsenGamePlayEngine
+
+
+def _record(location: Union[pathlib.Path, ReplayMemoryWriter], replay_memory_format: str, games: int, first_game: int = 0) -> None:
+    engine = SchnapsenGamePlayEngine()
+    bot1 = MLDataBot(RandBot(random.Random(1 + first_game)), location, replay_memory_format=replay_memory_format)  # type: ignore[arg-type]
+    bot2 = MLDataBot(RandBot(random.Random(2 + first_game)), location, replay_memory_format=replay_memory_format)  # type: ignore[arg-type]
+    for seed in range(first_game, first_game + games):
+        engine.play_game(bot1, bot2, random.Random(seed))
+
+
+class ReplayMemoryTest(TestCase):
+    def test_same_as_text(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            text_location = pathlib.Path(directory) / "replay_memory.txt"
+            binary_location = pathlib.Path(directory) / "replay_memory.bin"
+            converted_location = pathlib.Path(directory) / "converted.bin"
+            _record(text_location, "text", 10)
+            _record(binary_location, "binary", 10)
+            self.assertFalse(is_binary_replay_memory(text_location))
+            self.assertTrue(is_binary_replay_memory(binary_location))
+
+            expected_features = []
+            expected_won = []
+            with open(text_location) as text_file:
+                for line in text_file:
+                    feature_string, won_string = line.split("||")
+                    expected_features.append([int(feature) for feature in feature_string.split(",")])
+                    expected_won.append(int(won_string))
+            features, won = open_replay_memory(binary_location)
+            self.assertEqual(features.dtype, np.uint8)
+            self.assertEqual(features.tolist(), expected_features)
+            self.assertEqual(won.tolist(), expected_won)
+
+            self.assertEqual(convert_text_replay_memory(text_location, converted_location), len(expected_features))
+            self.assertEqual(converted_location.read_bytes(), binary_location.read_bytes())
+
+            # the same model is trained from both formats
+            text_model_location = pathlib.Path(directory) / "text_model"
+            binary_model_location = pathlib.Path(directory) / "binary_model"
+            train_ML_model(text_location, text_model_location, "LR")
+            train_ML_model(binary_location, binary_model_location, "LR")
+            np.testing.assert_array_equal(joblib.load(text_model_location).coef_, joblib.load(binary_model_location).coef_)
+
+    def test_append(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            location = pathlib.Path(directory) / "nested" / "replay_memory.bin"
+            first = np.array([[0, 1, 2], [3, 4, 5]])
+            second = np.array([[300, 7, 8]])
+            append_replay_memory(location, first, np.array([True, False]), value_type="int16")
+            append_replay_memory(location, second, np.array([True]))
+            features, won = open_replay_memory(location)
+            self.assertEqual(features.dtype, np.int16)
+            self.assertEqual(features.tolist(), [[0, 1, 2], [3, 4, 5], [300, 7, 8]])
+            self.assertEqual(won.tolist(), [1, 0, 1])
+
+            with self.assertRaises(AssertionError):
+                append_replay_memory(location, np.array([[0, 1]]), np.array([True]))
+            small_location = pathlib.Path(directory) / "small.bin"
+            with self.assertRaises(AssertionError):
+                append_replay_memory(small_location, second, np.array([True]))
+            # a row which was not completely written is detected
+            with open(location, "ab") as replay_memory_file:
+                replay_memory_file.write(b"\0")
+            with self.assertRaises(AssertionError):
+                open_replay_memory(location)
+
+    def test_writer(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            expected_location = pathlib.Path(directory) / "expected.bin"
+            location = pathlib.Path(directory) / "buffered.bin"
+            _record(expected_location, "binary", 10)
+            with ReplayMemoryWriter(location, buffer_rows=50) as writer:
+                _record(writer, "binary", 10)
+                # the last samples are only written when the writer is closed
+                self.assertGreater(writer.samples, len(open_replay_memory(location)[0]))
+            self.assertEqual(writer.samples, len(open_replay_memory(location)[0]))
+            self.assertEqual(location.read_bytes(), expected_location.read_bytes())
+
+    def test_shards(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            shards = pathlib.Path(directory) / "shards"
+            expected_location = pathlib.Path(directory) / "expected.bin"
+            location = pathlib.Path(directory) / "merged.bin"
+            # the shards are written in any order, and merged in the order of their numbers
+            for shard in (2, 0, 1):
+                with ReplayMemoryWriter(shard_location(shards, shard)) as writer:
+                    _record(writer, "binary", 4, first_game=4 * shard)
+            for shard in range(3):
+                _record(expected_location, "binary", 4, first_game=4 * shard)
+            manifest = write_replay_memory_manifest(shards)
+            self.assertEqual([shard["file"] for shard in manifest["shards"]], [shard_location(shards, shard).name for shard in range(3)])
+            self.assertEqual(merge_replay_memory_shards(shards, location), len(open_replay_memory(expected_location)[0]))
+            self.assertEqual(manifest["samples"], len(open_replay_memory(expected_location)[0]))
+            self.assertEqual(location.read_bytes(), expected_location.read_bytes())
+            self.assertTrue((shards / MANIFEST_NAME).exists())
+
+            # a shard which changed after the manifest was written is noticed
+            _record(shard_location(shards, 1), "binary", 1, first_game=100)
+            with self.assertRaises(AssertionError):
+                merge_replay_memory_shards(shards, pathlib.Path(directory) / "other.bin")
+
+    def test_generate(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            merged = []
+            for processes in (1, 2):
+                shards = pathlib.Path(directory) / f"shards_{processes}"
+                games_per_shard = 5 if processes == 1 else 3
+                manifest = generate_replay_memory(BullyBot, RandBot, 9, shards, processes=processes, seed=3, games_per_shard=games_per_shard)
+                self.assertEqual(len(manifest["shards"]), -(-9 // games_per_shard))
+                location = pathlib.Path(directory) / f"merged_{processes}.bin"
+                self.assertEqual(merge_replay_memory_shards(shards, location), manifest["samples"])
+                merged.append(location.read_bytes())
+                # the shards of an earlier run are not overwritten
+                with self.assertRaises(AssertionError):
+                    generate_replay_memory(BullyBot, RandBot, 1, shards)
+            # the result does not depend on the number of processes, nor on the size of the shards
+            self.assertEqual(merged[0], merged[1])
@@ -0,0 +1,103 @@
+from unittest import TestCase
+import pathlib
+import random
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from schnapsen.bots import DistilledBot, RandBot, RdeepBot, generate_teacher_decisions, train_distilled_policy
+from schnapsen.bots.rollout_policy import DistilledRolloutPolicy, RolloutPolicy, greedy_rollout_policy, play_rollouts
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import Bot, GamePhase, Move, PlayerPerspective, SchnapsenGamePlayEngine
+
+
+def _random_policy(engine: CompactEngine, states: list[CompactState], moves: list[list[int]], rand: random.Random) -> list[int]:
+    return [rand.choice(legal) for legal in moves]
+
+
+def _random_teacher(rand: random.Random) -> Bot:
+    return RandBot(rand)
+
+
+class _ComparingBot(RandBot):
+    """Plays randomly, and in the second phase compares the scores of the rollout policy with those of the DistilledBot."""
+
+    def __init__(self, test: TestCase, bot: DistilledBot, policy: DistilledRolloutPolicy, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.test = test
+        self.bot = bot
+        self.policy = policy
+        self.compared = 0
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        moves = perspective.valid_moves()
+        if perspective.get_phase() == GamePhase.TWO:
+            engine = CompactEngine(perspective.get_engine())
+            state = engine.from_game_state(perspective.get_state_in_phase_two(), leader_move)
+            expected = self.bot.scores(perspective, leader_move, moves)
+            result = self.policy.scores(engine, [state], [[engine.encode_move(move) for move in moves]])
+            np.testing.assert_allclose(result, expected)
+            self.compared += 1
+        return super().get_move(perspective, leader_move)
+
+
+class RolloutPolicyTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+
+    def _states(self, count: int) -> list[CompactState]:
+        return [self.compact_engine.from_game_state(self.engine.get_random_phase_two_state(random.Random(seed))) if seed % 2
+                else self._initial_state(seed) for seed in range(count)]
+
+    def _initial_state(self, seed: int) -> CompactState:
+        cards = list(range(len(self.compact_engine.cards)))
+        random.Random(seed).shuffle(cards)
+        return CompactState(hands=[cards[0:10:2], cards[1:11:2]], talon=cards[10:], trump=self.compact_engine.suit_of[cards[-1]],
+                            direct_points=[0, 0], pending_points=[0, 0], won_cards=[0, 0])
+
+    def test_same_as_random_playout(self) -> None:
+        # one rollout with random moves is the same as a random playout
+        for index, state in enumerate(self._states(20)):
+            expected = state.copy()
+            self.compact_engine.random_playout(expected, 1 + index % 5, random.Random(index))
+            play_rollouts(self.compact_engine, [state], [1 + index % 5], _random_policy, random.Random(index))
+            self.assertEqual(repr(state), repr(expected))
+
+    def test_lockstep(self) -> None:
+        calls: list[int] = []
+
+        def policy(engine: CompactEngine, states: list[CompactState], moves: list[list[int]], rand: random.Random) -> list[int]:
+            calls.append(len(states))
+            chosen = greedy_rollout_policy(engine, states, moves, rand)
+            for move, legal in zip(chosen, moves):
+                self.assertIn(move, legal)
+            return chosen
+
+        states = self._states(30)
+        play_rollouts(self.compact_engine, states, [100] * len(states), policy, random.Random(0))
+        # all games are played to the end, in far fewer calls than moves
+        for state in states:
+            self.assertIsNotNone(self.compact_engine.winner(state))
+        self.assertEqual(calls[0], 30)
+        self.assertLess(len(calls), 40)
+
+    def test_rdeep_with_policies(self) -> None:
+        features, chosen, _ = generate_teacher_decisions(_random_teacher, 20)
+        with tempfile.TemporaryDirectory() as directory:
+            policy_location = pathlib.Path(directory) / "policy.npz"
+            train_distilled_policy(features, chosen, policy_location, max_iter=20)
+            policy = DistilledRolloutPolicy(policy_location)
+            bot = DistilledBot(policy_location)
+
+        comparing = _ComparingBot(self, bot, policy, random.Random(1))
+        for seed in range(3):
+            self.engine.play_game(comparing, RandBot(random.Random(seed)), random.Random(seed))
+        self.assertGreater(comparing.compared, 5)
+
+        rollout_policies: list[RolloutPolicy] = [greedy_rollout_policy, policy]
+        for rollout_policy in rollout_policies:
+            rdeep = RdeepBot(4, 4, random.Random(0), rollout_policy=rollout_policy)
+            for seed in range(3):
+                self.engine.play_game(rdeep, RandBot(random.Random(seed)), random.Random(seed))
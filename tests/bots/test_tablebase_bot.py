@@ -0,0 +1,68 @@
+from unittest import TestCase
+import os
+import random
+import tempfile
+
+from schnapsen.bots import AlphaBetaBot, TablebaseBot
+from schnapsen.compact import CompactEngine
+from schnapsen.game import FollowerPerspective, LeaderPerspective, SchnapsenGamePlayEngine
+from schnapsen.solver import DoubleDummySolver
+from schnapsen.tablebase import Tablebase, generate_tablebase
+
+
+class TablebaseBotTest(TestCase):
+    directory: tempfile.TemporaryDirectory[str]
+    path: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "tablebase.bin")
+        generate_tablebase(cls.path, max_cards=2)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+        self.tablebase = Tablebase(self.path)
+
+    def test_plays_optimal_moves(self) -> None:
+        solver = DoubleDummySolver(self.compact_engine)
+        bot = TablebaseBot(self.tablebase)
+        rng = random.Random(3)
+        moves = 0
+        for seed in range(20):
+            state = self.engine.get_random_phase_two_state(random.Random(seed))
+            if state.is_talon_closed:
+                continue
+            # with two cards in the tablebase, the bot can look up all moves with three cards
+            state, _ = self.engine.play_at_most_n_tricks(state, bot, bot, 2)
+            if self.engine.trick_scorer.declare_winner(state) is not None:
+                continue
+            leader_move = rng.choice(LeaderPerspective(state, self.engine).valid_moves())
+            for perspective, move_played in [(LeaderPerspective(state, self.engine), None), (FollowerPerspective(state, self.engine, leader_move), leader_move)]:
+                lookups = bot.lookups
+                move = bot.get_move(perspective, move_played)
+                self.assertEqual(bot.lookups, lookups + 1)
+                values = solver.solve_moves(self.compact_engine.from_game_state(state, move_played))
+                self.assertEqual(max(values.values()), values[self.compact_engine.encode_move(move)])
+                moves += 1
+        self.assertGreater(moves, 0)
+
+    def test_alphabeta_with_tablebase(self) -> None:
+        # the searches of single positions can take a few more nodes, since the killer and history heuristics see other cutoffs
+        plain_nodes = tablebase_nodes = 0
+        for seed in range(10):
+            state = self.engine.get_random_phase_two_state(random.Random(seed))
+            plain = AlphaBetaBot()
+            with_tablebase = AlphaBetaBot(tablebase=self.tablebase)
+            value, _ = plain.value(state, self.engine, leader_move=None, maximizing=True)
+            tablebase_value, _ = with_tablebase.value(state, self.engine, leader_move=None, maximizing=True)
+            self.assertEqual(value, tablebase_value)
+            if not state.is_talon_closed:
+                plain_nodes += plain.nodes
+                tablebase_nodes += with_tablebase.nodes
+        self.assertLess(tablebase_nodes, plain_nodes)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+import pathlib
+import random
+import tempfile
+
+import numpy as np
+
+from schnapsen.bots import RandBot, RdeepBot, ValueModelEvaluator, generate_value_data, train_value_model
+from schnapsen.bots.ml_bot import get_state_feature_vector
+from schnapsen.bots.value_model import compact_state_feature_vectors
+from schnapsen.compact import CompactEngine
+from schnapsen.game import Bot, Move, PlayerPerspective, SchnapsenGamePlayEngine
+from typing import Optional
+
+
+class _CheckingBot(RandBot):
+    """Plays randomly, and checks the features of the compact states against those of its perspective."""
+
+    def __init__(self, test: TestCase, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.test = test
+        self.checked = 0
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        # in the first phase, the compact states do not know which cards of the opponent were shown
+        if leader_move is None and (perspective.get_talon_size() == 0 or not perspective.get_known_cards_of_opponent_hand().get_cards()):
+            engine = CompactEngine(perspective.get_engine())
+            state = engine.from_game_state(perspective.get_state_in_phase_two() if perspective.get_talon_size() == 0
+                                           else perspective.make_assumption(None, random.Random(0)))
+            features = compact_state_feature_vectors(engine, [state], 0)
+            self.test.assertEqual(features[0].tolist(), get_state_feature_vector(perspective))
+            self.checked += 1
+        return super().get_move(perspective, leader_move)
+
+
+class ValueModelTest(TestCase):
+    def test_same_features_as_perspective(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        bot = _CheckingBot(self, random.Random(1))
+        for seed in range(10):
+            engine.play_game(bot, RandBot(random.Random(2)), random.Random(seed))
+        self.assertGreater(bot.checked, 20)
+
+    def test_value_data(self) -> None:
+        features, won = generate_value_data(6)
+        self.assertEqual(len(features), len(won))
+        self.assertEqual(features.shape[1], 133)
+        # every state is recorded for both players, and exactly one of them wins
+        self.assertEqual(int(won.sum()) * 2, len(won))
+        parallel = generate_value_data(6, processes=2)
+        for expected, result in zip((features, won), parallel):
+            np.testing.assert_array_equal(expected, result)
+
+    def test_evaluator(self) -> None:
+        features, won = generate_value_data(100)
+        with tempfile.TemporaryDirectory() as directory:
+            model_location = pathlib.Path(directory) / "value_model.npz"
+            train_value_model(features, won, model_location)
+            evaluator = ValueModelEvaluator(model_location)
+
+        engine = SchnapsenGamePlayEngine()
+        compact_engine = CompactEngine(engine)
+        state, _ = engine.play_at_most_n_tricks(
+            engine.get_random_phase_two_state(random.Random(0)), RandBot(random.Random(0)), RandBot(random.Random(1)), 100)
+        compact_state = compact_engine.from_game_state(state)
+        # the game ended, so the outcome is known
+        winner = compact_engine.winner(compact_state)
+        assert winner is not None
+        self.assertEqual(evaluator(compact_engine, [compact_state], 0), [1.0 if winner[0] == 0 else 0.0])
+        probabilities = evaluator.win_probabilities(compact_engine, [compact_state, compact_state], 1)
+        self.assertTrue(np.all((0 <= probabilities) & (probabilities <= 1)))
+
+        bot: Bot = RdeepBot(4, 4, random.Random(0), evaluator=evaluator)
+        for seed in range(3):
+            engine.play_game(bot, RandBot(random.Random(seed)), random.Random(seed))
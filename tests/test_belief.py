@@ -0,0 +1,113 @@
+from unittest import TestCase
+import random
+from typing import Optional
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.belief import BeliefState, CardLocation, information_set_key
+from schnapsen.bots import RandBot
+from schnapsen.deck import Card, Suit
+from schnapsen.game import (BotState, FollowerPerspective, GamePlayEngine, GameState, Hand, LeaderPerspective, Move, PlayerPerspective, RegularMove,
+                            SchnapsenGamePlayEngine, Talon)
+
+
+class _CheckingBot(RandBot):
+    """A RandBot which updates a BeliefState each move, and checks it against the information in the perspective."""
+
+    def __init__(self, test: TestCase, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.test = test
+        self.belief = BeliefState()
+        self.checked = 0
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        self.belief.update(perspective, leader_move)
+        hand = perspective.get_hand()
+        won_cards = perspective.get_won_cards()
+        opponent_won_cards = perspective.get_opponent_won_cards()
+        opponent_known_cards = list(perspective.get_known_cards_of_opponent_hand()) + (list(leader_move.cards) if leader_move else [])
+        trump_card = perspective.get_trump_card()
+        probability_opponent_hand = 0.0
+        probability_talon = 0.0
+        for card in perspective.get_engine().deck_generator.get_initial_deck():
+            if card in hand:
+                expected = CardLocation.MY_HAND
+            elif card in won_cards:
+                expected = CardLocation.MY_WON
+            elif card in opponent_known_cards:
+                expected = CardLocation.OPPONENT_HAND
+            elif card in opponent_won_cards:
+                expected = CardLocation.OPPONENT_WON
+            elif card == trump_card:
+                expected = CardLocation.TRUMP
+            else:
+                expected = CardLocation.UNKNOWN
+            self.test.assertEqual(expected, self.belief.get_location(card), f"wrong location for {card}")
+            probability_opponent_hand += self.belief.probability_in_opponent_hand(card)
+            probability_talon += self.belief.probability_in_talon(card)
+        self.test.assertAlmostEqual(len(hand), probability_opponent_hand)
+        self.test.assertAlmostEqual(perspective.get_talon_size(), probability_talon)
+        # the key kept up to date is the same as the one computed from scratch
+        self.test.assertEqual(self.belief.information_set_key(), information_set_key(perspective, leader_move))
+        self.test.assertEqual(self.belief.canonical_suits()[0], perspective.get_trump_suit())
+        self.checked += 1
+        return super().get_move(perspective, leader_move)
+
+
+class BeliefStateTest(TestCase):
+    def _play(self, engine: GamePlayEngine) -> None:
+        bot1 = _CheckingBot(self, random.Random(1))
+        bot2 = _CheckingBot(self, random.Random(2))
+        for i in range(50):
+            engine.play_game(bot1, bot2, random.Random(i))
+        self.assertGreater(bot1.checked, 0)
+
+    def test_matches_perspective(self) -> None:
+        self._play(SchnapsenGamePlayEngine())
+
+    def test_matches_perspective_twenty_four_cards(self) -> None:
+        self._play(TwentyFourSchnapsenGamePlayEngine())
+
+    def test_phase_two(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        state = engine.get_random_phase_two_state(random.Random(4))
+        belief = BeliefState()
+        belief.update(LeaderPerspective(state, engine))
+        self.assertEqual(belief.get_unknown_cards_in_opponent_hand(), 0)
+        self.assertEqual(set(belief.get_cards(CardLocation.OPPONENT_HAND)), set(state.follower.hand))
+        for card in belief.get_cards(CardLocation.UNKNOWN):
+            self.assertEqual(belief.probability_in_talon(card), 1.0)
+
+
+def _relabeled(state: GameState, suits: dict[Suit, Suit]) -> GameState:
+    """The state with the suits of all cards replaced, without history."""
+    def relabel(cards: list[Card]) -> list[Card]:
+        return [Card.get_card(card.rank, suits.get(card.suit, card.suit)) for card in cards]
+    rng = random.Random(0)
+    return GameState(leader=BotState(implementation=RandBot(rng), hand=Hand(relabel(state.leader.hand.cards))),
+                     follower=BotState(implementation=RandBot(rng), hand=Hand(relabel(state.follower.hand.cards))),
+                     talon=Talon(relabel(list(state.talon))), previous=None)
+
+
+class InformationSetKeyTest(TestCase):
+    def test_non_trump_suits_can_be_relabeled(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        rng = random.Random(3)
+        for _ in range(20):
+            cards = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), rng)
+            hand1, hand2, talon = engine.hand_generator.generateHands(cards)
+            state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                              talon=talon, previous=None)
+            others = [suit for suit in Suit if suit is not state.trump_suit]
+            rotated = _relabeled(state, dict(zip(others, others[1:] + others[:1])))
+            self.assertEqual(information_set_key(LeaderPerspective(state, engine)), information_set_key(LeaderPerspective(rotated, engine)))
+            leader_move = RegularMove(state.leader.hand.cards[0])
+            rotated_move = RegularMove(rotated.leader.hand.cards[0])
+            key = information_set_key(FollowerPerspective(state, engine, leader_move), leader_move)
+            self.assertEqual(key, information_set_key(FollowerPerspective(rotated, engine, rotated_move), rotated_move))
+            # the follower knows which card was played
+            self.assertNotEqual(key, information_set_key(FollowerPerspective(state, engine, None)))
+            # relabeling the trump suit too, including the trump card, gives the same situation as well
+            trump_swapped = _relabeled(state, {state.trump_suit: others[0], others[0]: state.trump_suit})
+            self.assertEqual(information_set_key(LeaderPerspective(state, engine)), information_set_key(LeaderPerspective(trump_swapped, engine)))
+            # the other player knows other things
+            self.assertNotEqual(information_set_key(LeaderPerspective(state, engine)), information_set_key(FollowerPerspective(state, engine, None)))
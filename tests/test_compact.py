@@ -0,0 +1,125 @@
+from unittest import TestCase
+import random
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import RandBot, RdeepBot
+from schnapsen.compact import CompactEngine, CLOSE_TALON
+from schnapsen.game import (BotState, GamePlayEngine, GameState, SchnapsenGamePlayEngine, SchnapsenMoveValidator,
+                            LeaderPerspective)
+
+
+class CompactEngineTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+
+    def _start_state(self, engine: GamePlayEngine, rng: random.Random) -> GameState:
+        cards = engine.deck_generator.get_initial_deck()
+        shuffled = engine.deck_generator.shuffle_deck(cards, rng)
+        hand1, hand2, talon = engine.hand_generator.generateHands(shuffled)
+        return GameState(leader=BotState(implementation=RandBot(rng), hand=hand1),
+                         follower=BotState(implementation=RandBot(rng), hand=hand2),
+                         talon=talon, previous=None)
+
+    def _assert_same_playout(self, engine: GamePlayEngine, compact_engine: CompactEngine, seed: int) -> None:
+        rng = random.Random(seed)
+        state = self._start_state(engine, rng)
+        # first play some tricks such that we also start from states in the middle of the game
+        state, _ = engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), rng.randrange(8))
+        if engine.trick_scorer.declare_winner(state):
+            return
+        n = rng.randrange(1, 20)
+        compact_state = compact_engine.from_game_state(state)
+
+        bot_rng = random.Random(seed)
+        leader, follower = RandBot(bot_rng), RandBot(bot_rng)
+        end_state, rounds = engine.play_at_most_n_tricks(state, leader, follower, n)
+        compact_rounds = compact_engine.random_playout(compact_state, n, random.Random(seed))
+
+        self.assertEqual(rounds, compact_rounds)
+        end_leader = 0 if end_state.leader.implementation is leader else 1
+        self.assertEqual(end_leader, compact_state.leader)
+        cards = compact_engine.cards
+        self.assertEqual(end_state.leader.hand.get_cards(), [cards[c] for c in compact_state.hands[end_leader]])
+        self.assertEqual(end_state.follower.hand.get_cards(), [cards[c] for c in compact_state.hands[1 - end_leader]])
+        self.assertEqual(end_state.talon.get_cards(), [cards[c] for c in compact_state.talon])
+        self.assertEqual(end_state.leader.score.direct_points, compact_state.direct_points[end_leader])
+        self.assertEqual(end_state.follower.score.direct_points, compact_state.direct_points[1 - end_leader])
+        self.assertEqual(end_state.leader.score.pending_points, compact_state.pending_points[end_leader])
+        self.assertEqual(end_state.is_talon_closed, compact_state.is_talon_closed)
+
+        winner = engine.trick_scorer.declare_winner(end_state)
+        compact_winner = compact_engine.winner(compact_state)
+        if winner is None:
+            self.assertIsNone(compact_winner)
+        else:
+            winner_state, points = winner
+            self.assertEqual((0 if winner_state.implementation is leader else 1, points), compact_winner)
+
+    def test_same_playout_as_engine(self) -> None:
+        for seed in range(300):
+            self._assert_same_playout(self.engine, self.compact_engine, seed)
+
+    def test_same_playout_as_twenty_four_card_engine(self) -> None:
+        engine = TwentyFourSchnapsenGamePlayEngine()
+        compact_engine = CompactEngine(engine)
+        for seed in range(100):
+            self._assert_same_playout(engine, compact_engine, seed)
+
+    def test_legal_moves(self) -> None:
+        rng = random.Random(1)
+        for _ in range(50):
+            state = self._start_state(self.engine, rng)
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), rng.randrange(6))
+            if self.engine.trick_scorer.declare_winner(state):
+                continue
+            compact_state = self.compact_engine.from_game_state(state)
+            expected = LeaderPerspective(state, self.engine).valid_moves()
+            decoded = [self.compact_engine.decode_move(move, compact_state.trump) for move in self.compact_engine.legal_moves(compact_state)]
+            self.assertEqual(expected, decoded)
+
+    def test_close_talon(self) -> None:
+        state = self._start_state(self.engine, random.Random(3))
+        compact_state = self.compact_engine.from_game_state(state)
+        self.assertIn(CLOSE_TALON, self.compact_engine.legal_moves(compact_state))
+        copy = compact_state.copy()
+        self.assertTrue(self.compact_engine.play(compact_state, CLOSE_TALON))
+        self.assertTrue(compact_state.is_phase_two())
+        self.assertFalse(compact_state.non_closer_had_won_cards)
+        self.assertFalse(copy.is_talon_closed)
+        self.assertNotIn(CLOSE_TALON, self.compact_engine.legal_moves(compact_state))
+
+    def test_supports(self) -> None:
+        self.assertTrue(CompactEngine.supports(self.engine))
+
+        class OtherValidator(SchnapsenMoveValidator):
+            pass
+        engine = SchnapsenGamePlayEngine()
+        engine.move_validator = OtherValidator()
+        self.assertFalse(CompactEngine.supports(engine))
+        with self.assertRaises(AssertionError):
+            CompactEngine(engine)
+
+    def test_rdeep_same_moves_with_fast_rollouts(self) -> None:
+        for seed in range(4):
+            results = []
+            for fast_rollouts in (True, False):
+                bot1 = RdeepBot(4, 4, random.Random(seed), "bot1", fast_rollouts=fast_rollouts)
+                bot2 = RdeepBot(4, 4, random.Random(seed + 100), "bot2", fast_rollouts=fast_rollouts)
+                winner, points, score = self.engine.play_game(bot1, bot2, random.Random(seed))
+                results.append((str(winner), points, score.direct_points))
+            self.assertEqual(results[0], results[1])
+
+    def test_from_determinizations(self) -> None:
+        rng = random.Random(5)
+        for _ in range(30):
+            state = self._start_state(self.engine, rng)
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), rng.randrange(6))
+            if self.engine.trick_scorer.declare_winner(state):
+                continue
+            batch = LeaderPerspective(state, self.engine).make_assumptions(None, 8, rng)
+            compact_states = self.compact_engine.from_determinizations(batch)
+            self.assertEqual(len(compact_states), 8)
+            for index, compact_state in enumerate(compact_states):
+                expected = self.compact_engine.from_game_state(batch.get_state(index))
+                self.assertEqual(repr(expected), repr(compact_state))
@@ -5,6 +5,8 @@ from schnapsen.deck import (
     Rank,
     Card,
     OrderedCardCollection,
+    index_by_id,
+    value_by_id,
 )
 
 
@@ -129,3 +131,19 @@ class CollectionTest(TestCase):
                 for card in removed:
                     self.assertNotEqual(card.rank, rank)
                     self.assertIn(card, collection)
+
+
+class IndexByIdTest(TestCase):
+
+    def test_index_by_id(self) -> None:
+        index = index_by_id(Suit)
+        for position, suit in enumerate(Suit):
+            self.assertEqual(index[id(suit)], position)
+        self.assertEqual(len(index_by_id(Card)), len(Card))
+
+    def test_value_by_id(self) -> None:
+        values = value_by_id(Card, [card.rank for card in Card])
+        for card in Card:
+            self.assertEqual(values[id(card)], card.rank)
+        with self.assertRaises(ValueError):
+            value_by_id(Suit, [1, 2])
@@ -2,6 +2,11 @@ import random
 from unittest import TestCase
 from schnapsen.deck import Card, Rank, Suit
 from schnapsen.game import (
+    Bot,
+    CloseTalon,
+    GamePhase,
+    Move,
+    PlayerPerspective,
     TrumpExchange,
     Marriage,
     Hand,
@@ -13,8 +18,10 @@ from schnapsen.game import (
     LeaderPerspective,
     RegularMove,
     FollowerPerspective,
+    ExchangeFollowerPerspective,
 )
 from schnapsen.bots.rand import RandBot
+from typing import Optional
 
 
 class MoveTest(TestCase):
@@ -431,3 +438,110 @@ class GameTest(TestCase):
         # make sure marriage poits are applied
         #        assert
         pass
+
+    def test_game_history_after_closing_the_talon(self) -> None:
+        # the follower does not play in the trick in which the leader closes the talon, like in a trump exchange
+        engine = SchnapsenGamePlayEngine()
+        hand0 = Hand([Card.JACK_HEARTS, Card.ACE_CLUBS, Card.TEN_CLUBS, Card.KING_SPADES, Card.QUEEN_DIAMONDS])
+        hand1 = Hand([Card.ACE_SPADES, Card.TEN_SPADES, Card.KING_CLUBS, Card.QUEEN_CLUBS, Card.JACK_CLUBS])
+        talon = Talon([Card.ACE_DIAMONDS, Card.TEN_DIAMONDS, Card.KING_DIAMONDS, Card.JACK_DIAMONDS, Card.QUEEN_SPADES, Card.JACK_SPADES,
+                       Card.KING_HEARTS, Card.QUEEN_HEARTS, Card.TEN_HEARTS, Card.ACE_HEARTS])
+        state = GameState(leader=BotState(implementation=RandBot(random.Random(1)), hand=hand0),
+                          follower=BotState(implementation=RandBot(random.Random(2)), hand=hand1),
+                          talon=talon, previous=None)
+        closed = engine.trick_implementer.play_trick_with_fixed_leader_move(engine, state, CloseTalon())
+        leader_move = RegularMove(Card.ACE_CLUBS)
+        history = FollowerPerspective(closed, engine, leader_move).get_game_history()
+        self.assertEqual(len(history), 2)
+        perspective, trick = history[0]
+        assert trick is not None
+        self.assertTrue(trick.is_close_talon())
+        self.assertIsInstance(perspective, ExchangeFollowerPerspective)
+        self.assertFalse(perspective.am_i_leader())
+        self.assertEqual(perspective.get_hand().get_cards(), hand1.get_cards())
+        self.assertEqual(perspective.get_phase(), GamePhase.ONE)
+        self.assertIsNone(history[1][1])
+        self.assertEqual(history[1][0].get_phase(), GamePhase.TWO)
+
+
+class _RecordingBot(RandBot):
+    """A RandBot which remembers all perspectives it got, to test the methods of PlayerPerspective on real games."""
+
+    def __init__(self, rand: random.Random) -> None:
+        super().__init__(rand)
+        self.seen: list[tuple[PlayerPerspective, Optional[Move]]] = []
+
+    def get_move(self, perspective: PlayerPerspective, leader_move: Optional[Move]) -> Move:
+        self.seen.append((perspective, leader_move))
+        return super().get_move(perspective, leader_move)
+
+
+class MakeAssumptionsTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        bot1 = _RecordingBot(random.Random(1))
+        bot2: Bot = RandBot(random.Random(2))
+        for i in range(5):
+            self.engine.play_game(bot1, bot2, random.Random(i))
+        self.seen = bot1.seen
+
+    def test_assumptions_are_consistent(self) -> None:
+        rng = random.Random(42)
+        for perspective, leader_move in self.seen:
+            batch = perspective.make_assumptions(leader_move, 10, rng)
+            self.assertEqual(len(batch), 10)
+            known_opponent_cards = list(perspective.get_known_cards_of_opponent_hand())
+            for state in batch:
+                me, opponent = (state.leader, state.follower) if perspective.am_i_leader() else (state.follower, state.leader)
+                self.assertEqual(me.hand.get_cards(), perspective.get_hand().get_cards())
+                self.assertEqual(len(state.talon), perspective.get_talon_size())
+                self.assertEqual(state.talon.trump_card(), perspective.get_trump_card())
+                all_cards = state.talon.get_cards() + me.hand.get_cards() + opponent.hand.get_cards() + me.won_cards + opponent.won_cards
+                self.assertCountEqual(all_cards, list(self.engine.deck_generator.get_initial_deck()))
+                for card in known_opponent_cards:
+                    self.assertIn(card, opponent.hand)
+                if leader_move is not None:
+                    for card in leader_move.cards:
+                        self.assertIn(card, opponent.hand)
+
+    def test_assumptions_in_phase_two(self) -> None:
+        phase_two = [(perspective, leader_move) for perspective, leader_move in self.seen if perspective.get_phase() == GamePhase.TWO]
+        self.assertTrue(phase_two)
+        for perspective, leader_move in phase_two:
+            state = perspective.make_assumptions(leader_move, 3, random.Random(0)).get_state(2)
+            opponent = state.follower if perspective.am_i_leader() else state.leader
+            self.assertEqual(opponent.hand.get_cards(), perspective.get_opponent_hand_in_phase_two().get_cards())
+
+    def test_assumptions_are_random(self) -> None:
+        perspective, leader_move = self.seen[0]
+        batch = perspective.make_assumptions(leader_move, 50, random.Random(42))
+        talons = {tuple(state.talon.get_cards()) for state in batch}
+        self.assertGreater(len(talons), 1)
+        again = perspective.make_assumptions(leader_move, 50, random.Random(42))
+        self.assertEqual(batch.get_state(7).talon.get_cards(), again.get_state(7).talon.get_cards())
+
+    def test_assumptions_after_exchange_and_closing(self) -> None:
+        # the opponent exchanges the trump jack and closes the talon. The old trump card must stay in its hand, and once the talon is closed,
+        # the follow rules apply and the assumption must be the actual state, hence it can not contain impossible voids.
+        hand0 = Hand([Card.JACK_HEARTS, Card.ACE_CLUBS, Card.TEN_CLUBS, Card.KING_SPADES, Card.QUEEN_DIAMONDS])
+        hand1 = Hand([Card.ACE_SPADES, Card.TEN_SPADES, Card.KING_CLUBS, Card.QUEEN_CLUBS, Card.JACK_CLUBS])
+        talon = Talon([Card.ACE_DIAMONDS, Card.TEN_DIAMONDS, Card.KING_DIAMONDS, Card.JACK_DIAMONDS, Card.QUEEN_SPADES, Card.JACK_SPADES,
+                       Card.KING_HEARTS, Card.QUEEN_HEARTS, Card.TEN_HEARTS, Card.ACE_HEARTS])
+        state = GameState(leader=BotState(implementation=RandBot(random.Random(1)), hand=hand0),
+                          follower=BotState(implementation=RandBot(random.Random(2)), hand=hand1),
+                          talon=talon, previous=None)
+        implementer = self.engine.trick_implementer
+        exchanged = implementer.play_trick_with_fixed_leader_move(self.engine, state, TrumpExchange(Card.JACK_HEARTS))
+        rng = random.Random(3)
+        for _ in range(10):
+            assumption = FollowerPerspective(exchanged, self.engine, RegularMove(Card.ACE_CLUBS)).make_assumption(RegularMove(Card.ACE_CLUBS), rng)
+            self.assertIn(Card.ACE_HEARTS, assumption.leader.hand)
+            self.assertIn(Card.ACE_CLUBS, assumption.leader.hand)
+
+        closed = implementer.play_trick_with_fixed_leader_move(self.engine, exchanged, CloseTalon())
+        self.assertEqual(closed.game_phase(), GamePhase.TWO)
+        perspective = FollowerPerspective(closed, self.engine, RegularMove(Card.ACE_CLUBS))
+        self.assertEqual(perspective.get_known_cards_of_opponent_hand().get_cards(), closed.leader.hand.get_cards())
+        assumption = perspective.make_assumption(RegularMove(Card.ACE_CLUBS), random.Random(3))
+        self.assertEqual(assumption.leader.hand.get_cards(), closed.leader.hand.get_cards())
+        self.assertEqual(assumption.talon.get_cards(), closed.talon.get_cards())
@@ -0,0 +1,36 @@
+from unittest import TestCase
+import random
+
+from schnapsen.alternative_engines.ace_one_engine import AceOneGamePlayEngine
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.deck import Rank, Suit
+from schnapsen.game import SchnapsenGamePlayEngine
+from schnapsen.hand_features import HandFeatures
+
+
+class HandFeaturesTest(TestCase):
+    def test_same_as_counting(self) -> None:
+        for engine in [SchnapsenGamePlayEngine(), AceOneGamePlayEngine()]:
+            features = HandFeatures.of(engine)
+            assert features is not None
+            scorer = engine.trick_scorer
+            rng = random.Random(0)
+            for _ in range(200):
+                hand = rng.sample(features.cards, rng.randint(0, 9))
+                mask = features.mask(hand)
+                self.assertEqual(int(features.points[mask]), sum(scorer.rank_to_points(card.rank) for card in hand))
+                marriages = [suit for suit in Suit if {Rank.KING, Rank.QUEEN} <= {card.rank for card in hand if card.suit == suit}]
+                self.assertEqual(int(features.marriages[mask]), sum(1 << HandFeatures.suit_index(suit) for suit in marriages))
+                for suit in Suit:
+                    index = HandFeatures.suit_index(suit)
+                    in_suit = [card for card in hand if card.suit == suit]
+                    self.assertEqual(int(features.suit_counts[index, mask]), len(in_suit))
+                    self.assertEqual(int(features.suit_points[index, mask]), sum(scorer.rank_to_points(card.rank) for card in in_suit))
+                    self.assertEqual(bool(features.void_suits[mask] >> index & 1), not in_suit)
+                    self.assertEqual(bool(features.trump_jack[index, mask]), any(card.rank == Rank.JACK for card in in_suit))
+                    self.assertEqual(int(features.marriage_points[index, mask]), 20 * len(marriages) + (20 if suit in marriages else 0))
+
+    def test_shared_tables(self) -> None:
+        self.assertIs(HandFeatures.of(SchnapsenGamePlayEngine()), HandFeatures.of(SchnapsenGamePlayEngine()))
+        self.assertIsNot(HandFeatures.of(SchnapsenGamePlayEngine()), HandFeatures.of(AceOneGamePlayEngine()))
+        self.assertIsNone(HandFeatures.of(TwentyFourSchnapsenGamePlayEngine()))
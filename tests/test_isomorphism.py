@@ -0,0 +1,122 @@
+from unittest import TestCase
+import random
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import RandBot
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.deck import Card, Suit
+from schnapsen.game import BotState, GamePlayEngine, GameState, LeaderPerspective, Marriage, SchnapsenGamePlayEngine
+from schnapsen.isomorphism import CompactCanonicalizer, SuitPermutation, canonical_hand, canonical_permutation, canonical_state
+from schnapsen.solver import DoubleDummySolver
+
+
+def _random_state(engine: GamePlayEngine, rng: random.Random) -> GameState:
+    cards = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), rng)
+    hand1, hand2, talon = engine.hand_generator.generateHands(cards)
+    state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                      talon=talon, previous=None)
+    state, _ = engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), rng.randrange(0, 5))
+    return state
+
+
+def _random_permutation(rng: random.Random) -> SuitPermutation:
+    images = list(Suit)
+    rng.shuffle(images)
+    return SuitPermutation.of(images)
+
+
+def _description(state: GameState) -> tuple[object, ...]:
+    return (state.leader.hand.cards, state.follower.hand.cards, state.leader.won_cards, state.follower.won_cards, list(state.talon),
+            state.trump_suit, state.leader.score, state.follower.score, state.is_talon_closed)
+
+
+class SuitPermutationTest(TestCase):
+    def test_inverse(self) -> None:
+        rng = random.Random(0)
+        for _ in range(10):
+            permutation = _random_permutation(rng)
+            for card in Card:
+                self.assertEqual(permutation.inverse().card(permutation.card(card)), card)
+                self.assertEqual(permutation.card(card).rank, card.rank)
+        self.assertEqual(SuitPermutation.identity().cards(list(Card)), list(Card))
+
+    def test_move(self) -> None:
+        permutation = SuitPermutation.of([Suit.CLUBS, Suit.HEARTS, Suit.DIAMONDS, Suit.SPADES])
+        self.assertEqual(permutation.move(Marriage(Card.QUEEN_HEARTS, Card.KING_HEARTS)), Marriage(Card.QUEEN_CLUBS, Card.KING_CLUBS))
+
+
+class CanonicalStateTest(TestCase):
+    def _check(self, engine: GamePlayEngine) -> None:
+        rng = random.Random(1)
+        compact_engine = CompactEngine(engine)
+        solver = DoubleDummySolver(compact_engine)
+        canonicalizer = CompactCanonicalizer(compact_engine)
+        for _ in range(30):
+            state = _random_state(engine, rng)
+            if engine.trick_scorer.declare_winner(state):
+                continue
+            relabeled = _random_permutation(rng).state(state)
+            canonical, _, permutation = canonical_state(state)
+            self.assertEqual(_description(canonical), _description(canonical_state(relabeled)[0]))
+            self.assertEqual(canonical.trump_suit, Suit.HEARTS)
+            self.assertEqual(_description(permutation.inverse().state(canonical)), _description(state))
+            # relabeling does not change the game
+            compact_state = compact_engine.from_game_state(state)
+            compact_canonical = compact_engine.from_game_state(canonical)
+            self.assertEqual(solver.solve(compact_state), solver.solve(compact_canonical))
+
+            # the compact keys only relabel the non-trump suits
+            others = [suit for suit in Suit if suit is not state.trump_suit]
+            shuffled = list(others)
+            rng.shuffle(shuffled)
+            non_trump = SuitPermutation.of([state.trump_suit if suit is state.trump_suit else shuffled[others.index(suit)] for suit in Suit])
+            compact_relabeled = compact_engine.from_game_state(non_trump.state(state))
+            self.assertEqual(canonicalizer.key(compact_state), canonicalizer.key(compact_relabeled))
+            mapping = canonicalizer.permutation(compact_state)
+            mapped = _map_compact_state(compact_state, mapping)
+            self.assertEqual(canonicalizer.key(mapped), canonicalizer.key(compact_state))
+            self.assertEqual(canonicalizer.permutation(mapped), list(range(len(compact_engine.cards))))
+            self.assertEqual(sorted(canonicalizer.move(move, mapping) for move in compact_engine.legal_moves(compact_state)),
+                             sorted(compact_engine.legal_moves(mapped)))
+            if state.leader.hand.cards != non_trump.state(state).leader.hand.cards:
+                self.assertNotEqual(canonicalizer.key(compact_state), canonicalizer.key(compact_engine.from_game_state(_swap_hands(state))))
+
+    def test_schnapsen(self) -> None:
+        self._check(SchnapsenGamePlayEngine())
+
+    def test_twenty_four_cards(self) -> None:
+        self._check(TwentyFourSchnapsenGamePlayEngine())
+
+
+def _swap_hands(state: GameState) -> GameState:
+    return GameState(leader=BotState(implementation=state.leader.implementation, hand=state.follower.hand.copy(), score=state.leader.score,
+                                     won_cards=state.leader.won_cards),
+                     follower=BotState(implementation=state.follower.implementation, hand=state.leader.hand.copy(), score=state.follower.score,
+                                       won_cards=state.follower.won_cards),
+                     talon=state.talon, previous=state.previous, is_talon_closed=state.is_talon_closed)
+
+
+def _map_compact_state(state: CompactState, mapping: list[int]) -> CompactState:
+    mapped = state.copy()
+    mapped.hands = [[mapping[card] for card in hand] for hand in state.hands]
+    mapped.talon = [mapping[card] for card in state.talon]
+    mapped.won_cards = [sum(1 << mapping[card] for card in range(len(mapping)) if won >> card & 1) for won in state.won_cards]
+    return mapped
+
+
+class CanonicalHandTest(TestCase):
+    def test_opening_hands(self) -> None:
+        engine = SchnapsenGamePlayEngine()
+        rng = random.Random(2)
+        for _ in range(30):
+            state = _random_state(engine, rng)
+            perspective = LeaderPerspective(state, engine)
+            trump_card = perspective.get_trump_card()
+            if trump_card is None:
+                continue
+            hand, canonical_trump_card, permutation = canonical_hand(perspective.get_hand(), trump_card)
+            relabeling = _random_permutation(rng)
+            self.assertEqual((hand, canonical_trump_card), canonical_hand(relabeling.cards(perspective.get_hand()), relabeling.card(trump_card))[:2])
+            self.assertEqual(sorted(permutation.inverse().cards(hand), key=list(Card).index), sorted(perspective.get_hand(), key=list(Card).index))
+            self.assertEqual(canonical_trump_card.suit, Suit.HEARTS)
+            self.assertEqual(canonical_permutation([hand, [canonical_trump_card]], Suit.HEARTS), SuitPermutation.identity())
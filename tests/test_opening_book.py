@@ -0,0 +1,93 @@
+from unittest import TestCase
+import os
+import random
+import tempfile
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import RandBot
+from schnapsen.deck import Card, Suit
+from schnapsen.game import BotState, GameState, LeaderPerspective, SchnapsenGamePlayEngine
+from schnapsen.isomorphism import SuitPermutation
+from schnapsen.opening_book import OpeningBook, generate_opening_book
+
+
+def _opening_state(engine: SchnapsenGamePlayEngine, seed: int) -> GameState:
+    rng = random.Random(seed)
+    cards = engine.deck_generator.shuffle_deck(engine.deck_generator.get_initial_deck(), rng)
+    hand1, hand2, talon = engine.hand_generator.generateHands(cards)
+    return GameState(leader=BotState(implementation=RandBot(rng), hand=hand1), follower=BotState(implementation=RandBot(rng), hand=hand2),
+                     talon=talon, previous=None)
+
+
+class OpeningBookTest(TestCase):
+    directory: tempfile.TemporaryDirectory[str]
+    path: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "opening_book.bin")
+        engine = SchnapsenGamePlayEngine()
+        openings = []
+        for seed in range(4):
+            perspective = LeaderPerspective(_opening_state(engine, seed), engine)
+            trump_card = perspective.get_trump_card()
+            assert trump_card is not None
+            openings.append((perspective.get_hand().get_cards(), trump_card))
+        generate_opening_book(cls.path, engine, deals=4, openings=openings)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.book = OpeningBook(self.path)
+
+    def test_lookup(self) -> None:
+        self.assertEqual(self.book.openings, 4)
+        for seed in range(4):
+            perspective = LeaderPerspective(_opening_state(self.engine, seed), self.engine)
+            entry = self.book.lookup(perspective)
+            assert entry is not None
+            self.assertIn(entry.move, perspective.valid_moves())
+            self.assertLessEqual(abs(entry.equity), 3)
+
+    def test_relabeled_lookup(self) -> None:
+        rng = random.Random(5)
+        for seed in range(4):
+            perspective = LeaderPerspective(_opening_state(self.engine, seed), self.engine)
+            trump_card = perspective.get_trump_card()
+            assert trump_card is not None
+            entry = self.book.lookup_cards(perspective.get_hand(), trump_card)
+            assert entry is not None
+            images = list(Suit)
+            rng.shuffle(images)
+            permutation = SuitPermutation.of(images)
+            relabeled = self.book.lookup_cards(permutation.cards(perspective.get_hand()), permutation.card(trump_card))
+            assert relabeled is not None
+            self.assertEqual(relabeled.equity, entry.equity)
+            self.assertEqual(relabeled.move, permutation.move(entry.move))
+
+    def test_missing_openings(self) -> None:
+        self.assertIsNone(self.book.lookup_cards([Card.ACE_HEARTS, Card.TEN_HEARTS, Card.KING_HEARTS, Card.QUEEN_HEARTS, Card.JACK_HEARTS],
+                                                 Card.ACE_SPADES))
+        # the talon was closed in the first trick
+        state, _ = self.engine.play_at_most_n_tricks(_opening_state(self.engine, 0), RandBot(random.Random(0)), RandBot(random.Random(1)), 1)
+        self.assertIsNone(self.book.lookup(LeaderPerspective(state, self.engine)))
+
+    def test_supports(self) -> None:
+        self.assertTrue(self.book.supports(self.engine))
+        self.assertFalse(self.book.supports(TwentyFourSchnapsenGamePlayEngine()))
+
+    def test_processes(self) -> None:
+        path = os.path.join(self.directory.name, "parallel.bin")
+        openings = []
+        for seed in range(4):
+            perspective = LeaderPerspective(_opening_state(self.engine, seed), self.engine)
+            trump_card = perspective.get_trump_card()
+            assert trump_card is not None
+            openings.append((perspective.get_hand().get_cards(), trump_card))
+        generate_opening_book(path, self.engine, deals=4, processes=2, openings=openings)
+        with open(path, "rb") as parallel, open(self.path, "rb") as serial:
+            self.assertEqual(parallel.read(), serial.read())
@@ -0,0 +1,27 @@
+from unittest import TestCase
+from itertools import repeat
+from typing import Sequence
+
+from schnapsen.parallel import map_in_processes, split
+
+
+def _shifted_sum(shift: int, chunk: Sequence[int]) -> int:
+    return sum(item + shift for item in chunk)
+
+
+class ParallelTest(TestCase):
+    def test_split(self) -> None:
+        chunks = split(list(range(10)), 2)
+        # more chunks than processes, consecutive and in order
+        self.assertEqual(chunks, [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]])
+        self.assertEqual(split(range(10), 1, chunk_size=4), [range(0, 4), range(4, 8), range(8, 10)])
+        self.assertEqual(split(range(3), 4), [range(0, 1), range(1, 2), range(2, 3)])
+        self.assertEqual(split([], 4), [])
+        with self.assertRaises(AssertionError):
+            split(range(3), 1, chunk_size=0)
+
+    def test_map_in_processes(self) -> None:
+        chunks = split(range(100), 2)
+        expected = [_shifted_sum(1, chunk) for chunk in chunks]
+        self.assertEqual(map_in_processes(_shifted_sum, 1, repeat(1), chunks), expected)
+        self.assertEqual(map_in_processes(_shifted_sum, 2, repeat(1), chunks), expected)
@@ -0,0 +1,121 @@
+from unittest import TestCase
+import random
+from typing import Optional
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import AlphaBetaBot, RandBot
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import BotState, GamePlayEngine, GameState, SchnapsenGamePlayEngine
+from schnapsen.solver import DoubleDummySolver
+from schnapsen.transposition import SharedTranspositionTable
+
+
+def _minimax(compact_engine: CompactEngine, state: CompactState) -> int:
+    """The value of the state for the player to move, by searching the complete game tree without any pruning."""
+    best: Optional[int] = None
+    player = state.to_move()
+    for move in compact_engine.legal_moves(state):
+        child = state.copy()
+        compact_engine.play(child, move)
+        winner = compact_engine.winner(child) if child.leader_move is None else None
+        if winner is not None:
+            value = winner[1] if winner[0] == player else -winner[1]
+        else:
+            child_value = _minimax(compact_engine, child)
+            value = child_value if child.to_move() == player else -child_value
+        if best is None or value > best:
+            best = value
+    assert best is not None
+    return best
+
+
+class DoubleDummySolverTest(TestCase):
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+        self.solver = DoubleDummySolver(self.compact_engine)
+
+    def _random_state(self, engine: GamePlayEngine, rng: random.Random, tricks: int) -> Optional[GameState]:
+        cards = engine.deck_generator.get_initial_deck()
+        shuffled = engine.deck_generator.shuffle_deck(cards, rng)
+        hand1, hand2, talon = engine.hand_generator.generateHands(shuffled)
+        state = GameState(leader=BotState(implementation=RandBot(rng), hand=hand1),
+                          follower=BotState(implementation=RandBot(rng), hand=hand2),
+                          talon=talon, previous=None)
+        state, _ = engine.play_at_most_n_tricks(state, RandBot(rng), RandBot(rng), tricks)
+        if engine.trick_scorer.declare_winner(state):
+            return None
+        return state
+
+    def _assert_same_as_minimax(self, engine: GamePlayEngine, seed: int) -> None:
+        compact_engine = CompactEngine(engine)
+        solver = DoubleDummySolver(compact_engine)
+        rng = random.Random(seed)
+        checked = 0
+        while checked < 20:
+            state = self._random_state(engine, rng, rng.randrange(3, 9))
+            if state is None:
+                continue
+            compact_state = compact_engine.from_game_state(state)
+            # keep the trees small enough for a search without pruning
+            if len(compact_state.talon) > 2 and not compact_state.is_talon_closed:
+                continue
+            if rng.random() < 0.5:
+                # also start in the middle of a trick
+                compact_engine.play(compact_state, rng.choice(compact_engine.legal_moves(compact_state)))
+                if compact_state.leader_move is None and compact_engine.winner(compact_state):
+                    continue
+            expected = _minimax(compact_engine, compact_state)
+            self.assertEqual(expected, solver.solve(compact_state))
+            self.assertEqual(expected > 0, solver.solve(compact_state, win_only=True) > 0)
+            checked += 1
+
+    def test_same_as_minimax(self) -> None:
+        self._assert_same_as_minimax(self.engine, 0)
+
+    def test_same_as_minimax_twenty_four_cards(self) -> None:
+        self._assert_same_as_minimax(TwentyFourSchnapsenGamePlayEngine(), 1)
+
+    def test_same_as_alphabeta_in_phase_two(self) -> None:
+        rng = random.Random(2)
+        alphabeta = AlphaBetaBot()
+        checked = 0
+        while checked < 20:
+            state = self._random_state(self.engine, rng, rng.randrange(5, 8))
+            if state is None or not (state.talon.is_empty() or state.is_talon_closed):
+                continue
+            expected, _ = alphabeta.value(state, self.engine, leader_move=None, maximizing=True)
+            self.assertEqual(expected, self.solver.solve(self.compact_engine.from_game_state(state)))
+            checked += 1
+
+    def test_solve_moves_from_the_start(self) -> None:
+        state = self._random_state(self.engine, random.Random(3), 0)
+        assert state is not None
+        compact_state = self.compact_engine.from_game_state(state)
+        copy = repr(compact_state)
+        values = self.solver.solve_moves(compact_state)
+        self.assertEqual(repr(compact_state), copy)
+        self.assertEqual(set(values), set(self.compact_engine.legal_moves(compact_state)))
+        self.assertTrue(all(value in (-3, -2, -1, 1, 2, 3) for value in values.values()))
+        # the values are exact, so solving with a fresh table gives the same result
+        self.assertEqual(values, DoubleDummySolver(self.compact_engine).solve_moves(compact_state))
+
+    def test_shared_table(self) -> None:
+        rng = random.Random(4)
+        states: list[CompactState] = []
+        while len(states) < 10:
+            game_state = self._random_state(self.engine, rng, rng.randrange(2, 5))
+            if game_state is not None:
+                states.append(self.compact_engine.from_game_state(game_state))
+        table = SharedTranspositionTable(size=2 ** 16)
+        try:
+            first = DoubleDummySolver(self.compact_engine, shared_table=table)
+            second = DoubleDummySolver(self.compact_engine, shared_table=table)
+            for state in states:
+                expected = self.solver.solve_moves(state)
+                self.assertEqual(expected, first.solve_moves(state))
+                # the endgames searched by the first solver are found in the shared table
+                self.assertEqual(expected, second.solve_moves(state))
+            self.assertLess(second.nodes, first.nodes)
+        finally:
+            table.close()
@@ -0,0 +1,90 @@
+from unittest import TestCase
+import os
+import random
+import tempfile
+from typing import Optional
+
+from schnapsen.alternative_engines.twenty_four_card_schnapsen import TwentyFourSchnapsenGamePlayEngine
+from schnapsen.bots import RandBot
+from schnapsen.compact import CompactEngine, CompactState
+from schnapsen.game import GameState, SchnapsenGamePlayEngine
+from schnapsen.solver import DoubleDummySolver
+from schnapsen.tablebase import Tablebase, generate_tablebase
+
+
+def _endgame_states(compact_engine: CompactEngine, max_cards: int, seed: int) -> list[CompactState]:
+    """States with an empty talon and at most max_cards cards in the hands, in which the leader has to play, from random games."""
+    engine = SchnapsenGamePlayEngine()
+    rng = random.Random(seed)
+    states = []
+    for game in range(300):
+        state = compact_engine.from_game_state(engine.get_random_phase_two_state(random.Random(seed * 1000 + game)))
+        if state.is_talon_closed:
+            continue
+        while compact_engine.winner(state) is None:
+            if state.leader_move is None and len(state.hands[state.leader]) <= max_cards:
+                states.append(state.copy())
+            compact_engine.play(state, rng.choice(compact_engine.legal_moves(state)))
+    return states
+
+
+class TablebaseTest(TestCase):
+    directory: tempfile.TemporaryDirectory[str]
+    path: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "tablebase.bin")
+        generate_tablebase(cls.path, max_cards=2)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def setUp(self) -> None:
+        self.engine = SchnapsenGamePlayEngine()
+        self.compact_engine = CompactEngine(self.engine)
+        self.tablebase = Tablebase(self.path)
+
+    def test_values_match_solver(self) -> None:
+        solver = DoubleDummySolver(self.compact_engine)
+        states = _endgame_states(self.compact_engine, 2, seed=1)
+        self.assertGreater(len(states), 50)
+        for state in states:
+            with self.subTest(state=state):
+                self.assertEqual(solver.solve(state), self.tablebase.lookup_compact(self.compact_engine, state))
+
+    def test_lookup_game_state(self) -> None:
+        found = 0
+        for seed in range(30):
+            state: Optional[GameState] = self.engine.get_random_phase_two_state(random.Random(seed))
+            assert state is not None
+            # five cards are too many for this tablebase
+            self.assertIsNone(self.tablebase.lookup(state))
+            state, _ = self.engine.play_at_most_n_tricks(state, RandBot(random.Random(seed)), RandBot(random.Random(seed + 1)), 3)
+            if self.engine.trick_scorer.declare_winner(state) is not None or state.is_talon_closed:
+                continue
+            found += 1
+            self.assertEqual(self.tablebase.lookup_compact(self.compact_engine, self.compact_engine.from_game_state(state)), self.tablebase.lookup(state))
+            self.assertIsNotNone(self.tablebase.lookup(state))
+        self.assertGreater(found, 0)
+
+    def test_closed_talon_not_in_tablebase(self) -> None:
+        state = _endgame_states(self.compact_engine, 2, seed=2)[0]
+        state.is_talon_closed = True
+        state.non_closer_had_won_cards = True
+        self.assertIsNone(self.tablebase.lookup_compact(self.compact_engine, state))
+
+    def test_parallel_generation_same_file(self) -> None:
+        contents = []
+        for processes in (1, 2):
+            path = os.path.join(self.directory.name, f"parallel_{processes}.bin")
+            generate_tablebase(path, max_cards=1, processes=processes)
+            with open(path, "rb") as file:
+                contents.append(file.read())
+        self.assertEqual(contents[0], contents[1])
+
+    def test_supports(self) -> None:
+        self.assertTrue(Tablebase.supports(self.engine))
+        self.assertFalse(Tablebase.supports(TwentyFourSchnapsenGamePlayEngine()))
@@ -0,0 +1,149 @@
+from unittest import TestCase
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+import random
+import tempfile
+
+from schnapsen.bots import RandBot
+from schnapsen.deck import Card, Suit
+from schnapsen.game import BotState, CloseTalon, GameState, Hand, Marriage, Move, RegularMove, Score, Talon, TrumpExchange
+from schnapsen.transposition import (EXACT, LOWER_BOUND, UPPER_BOUND, SharedTranspositionTable, TranspositionTable, ZobristHasher, find_move,
+                                     move_code, negated_flag)
+
+
+class ZobristHasherTest(TestCase):
+    def setUp(self) -> None:
+        self.hasher = ZobristHasher()
+
+    def _state(self, leader_cards: list[Card], follower_cards: list[Card], leader_points: int = 20) -> GameState:
+        rng = random.Random(0)
+        return GameState(leader=BotState(implementation=RandBot(rng), hand=Hand(leader_cards), score=Score(direct_points=leader_points)),
+                         follower=BotState(implementation=RandBot(rng), hand=Hand(follower_cards), score=Score(direct_points=30)),
+                         talon=Talon([], trump_suit=Suit.HEARTS), previous=None)
+
+    def test_order_of_cards_does_not_matter(self) -> None:
+        state1 = self._state([Card.ACE_CLUBS, Card.TEN_HEARTS], [Card.JACK_SPADES, Card.KING_HEARTS])
+        state2 = self._state([Card.TEN_HEARTS, Card.ACE_CLUBS], [Card.KING_HEARTS, Card.JACK_SPADES])
+        self.assertEqual(self.hasher.hash(state1), self.hasher.hash(state2))
+        self.assertEqual(self.hasher.hash(state1), ZobristHasher().hash(state1))
+
+    def test_different_states(self) -> None:
+        state = self._state([Card.ACE_CLUBS, Card.TEN_HEARTS], [Card.JACK_SPADES, Card.KING_HEARTS])
+        swapped = self._state([Card.JACK_SPADES, Card.KING_HEARTS], [Card.ACE_CLUBS, Card.TEN_HEARTS])
+        other_points = self._state([Card.ACE_CLUBS, Card.TEN_HEARTS], [Card.JACK_SPADES, Card.KING_HEARTS], leader_points=21)
+        hashes = {self.hasher.hash(state), self.hasher.hash(swapped), self.hasher.hash(other_points),
+                  self.hasher.hash(state, RegularMove(Card.ACE_CLUBS)), self.hasher.hash(state, RegularMove(Card.TEN_HEARTS))}
+        self.assertEqual(len(hashes), 5)
+
+    def test_marriage_differs_from_king(self) -> None:
+        state = self._state([Card.QUEEN_HEARTS, Card.KING_HEARTS], [Card.JACK_SPADES, Card.ACE_HEARTS])
+        marriage = Marriage(Card.QUEEN_HEARTS, Card.KING_HEARTS)
+        self.assertNotEqual(self.hasher.hash(state, marriage), self.hasher.hash(state, RegularMove(Card.KING_HEARTS)))
+
+
+class MoveCodeTest(TestCase):
+    def test_move_code(self) -> None:
+        moves: list[Move] = [RegularMove(card) for card in Card]
+        moves += [Marriage(Card.QUEEN_HEARTS, Card.KING_HEARTS), Marriage(Card.QUEEN_SPADES, Card.KING_SPADES)]
+        moves += [TrumpExchange(Card.JACK_HEARTS), TrumpExchange(Card.JACK_CLUBS), CloseTalon()]
+        codes = [move_code(move) for move in moves]
+        self.assertEqual(len(set(codes)), len(moves))
+        # the codes fit in the move field of the tables
+        self.assertTrue(all(0 <= code < 128 for code in codes))
+        # the move is found wherever it is among the moves
+        self.assertEqual(find_move(moves[::-1], move_code(moves[3])), moves[3])
+        self.assertIsNone(find_move(moves[:3], move_code(moves[3])))
+
+
+class TranspositionTableTest(TestCase):
+    def test_store_and_probe(self) -> None:
+        table = TranspositionTable(4)
+        self.assertIsNone(table.probe(5))
+        table.store(5, -2.0, LOWER_BOUND, 3, 6)
+        self.assertEqual(table.probe(5), (-2, LOWER_BOUND, 3, 6))
+        # same slot, other position
+        self.assertIsNone(table.probe(9))
+        self.assertEqual((table.probes, table.hits, table.stores), (3, 1, 1))
+        self.assertAlmostEqual(table.hit_rate(), 1 / 3)
+
+    def test_replacement_policy(self) -> None:
+        table = TranspositionTable(4)
+        table.store(5, 1, EXACT, 0, 6)
+        # a shallower entry for another position does not replace a deeper one of the same search
+        table.store(9, 2, EXACT, 0, 4)
+        self.assertIsNotNone(table.probe(5))
+        self.assertIsNone(table.probe(9))
+        # the same position is always replaced
+        table.store(5, 3, EXACT, 1, 2)
+        self.assertEqual(table.probe(5), (3, EXACT, 1, 2))
+        # entries of an earlier search are always replaced
+        table.store(13, 1, EXACT, 0, 10)
+        table.new_search()
+        table.store(9, 2, UPPER_BOUND, 0, 1)
+        self.assertEqual(table.probe(9), (2, UPPER_BOUND, 0, 1))
+        table.clear()
+        self.assertIsNone(table.probe(9))
+
+    def test_negated_flag(self) -> None:
+        self.assertEqual(negated_flag(EXACT), EXACT)
+        self.assertEqual(negated_flag(LOWER_BOUND), UPPER_BOUND)
+        self.assertEqual(negated_flag(UPPER_BOUND), LOWER_BOUND)
+
+
+def _store_in_other_process(table: SharedTranspositionTable, key: int) -> None:
+    table.store(key, 1.5, EXACT, 2, 7)
+
+
+class SharedTranspositionTableTest(TestCase):
+    def setUp(self) -> None:
+        self.table = SharedTranspositionTable(size=4)
+
+    def tearDown(self) -> None:
+        self.table.close()
+
+    def test_store_and_probe(self) -> None:
+        table = self.table
+        self.assertIsNone(table.probe(5))
+        table.store(5, -2.0, LOWER_BOUND, -100, 6)
+        self.assertEqual(table.probe(5), (-2, LOWER_BOUND, -100, 6))
+        self.assertIsNone(table.probe(9))
+        # the same replacement policy as a private table
+        table.store(9, 2, EXACT, 0, 4)
+        self.assertEqual(table.probe(5), (-2, LOWER_BOUND, -100, 6))
+        table.new_search()
+        table.store(9, 2, UPPER_BOUND, 0, 1)
+        self.assertEqual(table.probe(9), (2, UPPER_BOUND, 0, 1))
+        table.clear()
+        self.assertIsNone(table.probe(9))
+
+    def test_torn_entry_is_missing(self) -> None:
+        self.table.store(5, 1, EXACT, 0, 3)
+        # as if another process was halfway writing a different entry in the slot
+        self.table.words[1, 1] ^= 1 << 34
+        self.assertIsNone(self.table.probe(5))
+
+    def test_shared_between_processes(self) -> None:
+        opened = pickle.loads(pickle.dumps(self.table))
+        self.assertEqual(opened.path, self.table.path)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(_store_in_other_process, self.table, 6).result()
+        self.assertEqual(self.table.probe(6), (1.5, EXACT, 2, 7))
+        self.assertEqual(opened.probe(6), (1.5, EXACT, 2, 7))
+        opened.close()
+        # the process which did not create the file does not remove it
+        self.assertTrue(os.path.exists(self.table.path))
+
+    def test_dump_and_load(self) -> None:
+        self.table.store(7, -3, EXACT, 1, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.tt")
+            self.table.dump(path)
+            loaded = SharedTranspositionTable.load(path)
+            self.assertEqual(loaded.size, 4)
+            self.assertEqual(loaded.probe(7), (-3, EXACT, 1, 2))
+            # the loaded table is a copy
+            loaded.store(7, 3, EXACT, 1, 2)
+            self.assertEqual(SharedTranspositionTable(path).probe(7), (-3, EXACT, 1, 2))
+            loaded.close()
+            self.assertFalse(os.path.exists(loaded.path))